@@ -1,44 +1,79 @@
+import importlib.util
 import logging
+from logging.handlers import RotatingFileHandler
 from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
-from flask_migrate import Migrate
 from flask_login import LoginManager
 from flask_bcrypt import Bcrypt
-from flask_mail import Mail
 from flask_jwt_extended import JWTManager  # Impor JWTManager
 from config import Config
 
-# Inisialisasi objek
+# Inisialisasi objek (Flask-Migrate dan Flask-Mail baru dimuat saat dipakai, lihat app.cli dan app.mailer)
 db = SQLAlchemy()
-migrate = Migrate()
 login_manager = LoginManager()
 bcrypt = Bcrypt()
-mail = Mail()
 jwt = JWTManager()  # Inisialisasi JWTManager
 
-# Konfigurasi Logging
-logging.basicConfig(level=logging.INFO,  # Atur level log yang diinginkan (INFO, ERROR, DEBUG, dsb)
-                    format='%(asctime)s - %(levelname)s - %(message)s',
-                    handlers=[
-                        logging.StreamHandler(),  # Output log ke konsol
-                        logging.FileHandler('app.log')  # Simpan log ke file app.log
-                    ])
+
+def configure_logging(app):
+    """Log to the console and a rotating LOG_FILE, once per process."""
+    root = logging.getLogger()
+    if root.handlers:
+        return  # Sudah dikonfigurasi (create_app kedua, atau oleh server seperti gunicorn)
+    handlers = [logging.StreamHandler()]  # Output log ke konsol
+    if app.config.get('LOG_FILE'):
+        # delay=True: file log baru dibuka saat ada log pertama yang ditulis
+        handlers.append(RotatingFileHandler(app.config['LOG_FILE'], maxBytes=app.config.get('LOG_MAX_BYTES', 1000000),
+                                            backupCount=app.config.get('LOG_BACKUP_COUNT', 5), delay=True))
+    logging.basicConfig(level=app.config.get('LOG_LEVEL', 'INFO'),
+                        format='%(asctime)s - %(levelname)s - %(message)s',
+                        handlers=handlers)
+
 
 def create_app():
     app = Flask(__name__)
     app.config.from_object(Config)
+    configure_logging(app)
+
+    # JSON provider cepat (orjson jika tersedia) dan kompresi respons
+    from app.json_provider import FastJSONProvider
+    from app.compression import init_compression
+    app.json = FastJSONProvider(app)
+    init_compression(app)
+
+    # Admission control / load shedding per kelas endpoint
+    from app.admission import init_admission
+    init_admission(app)
+
+    # Worker job latar belakang dimulai bersama request pertama
+    from app.jobs import init_jobs
+    init_jobs(app)
+
+    # Perintah CLI pemeliharaan (flask offboard, dll.)
+    from app.cli import init_cli
+    init_cli(app)
     
-    # Inisialisasi db, migrate, login_manager, bcrypt, mail, jwt
+    # Inisialisasi db, login_manager, jwt (migrate lewat `flask db`, mail saat email pertama dikirim)
     db.init_app(app)
-    migrate.init_app(app, db)
     login_manager.init_app(app)
-    mail.init_app(app)
     jwt.init_app(app)  # Inisialisasi JWT
 
+    # Hash foto presensi butuh Pillow; dicek tanpa mengimpornya (PIL dimuat saat foto pertama di-hash)
+    if app.config.get('PHOTO_HASH_ENABLED', True) and importlib.util.find_spec('PIL') is None:
+        logging.error("PHOTO_HASH_ENABLED is on but Pillow is not installed: attendance photos will not be hashed "
+                      "or checked for reuse. Install Pillow or set PHOTO_HASH_ENABLED = False.")
+
+    # Pencabutan token (logout) berdasarkan jti
+    from app.revocation import init_revocation
+    init_revocation(app, jwt)
+
     # Konfigurasi LoginManager
     login_manager.login_view = 'auth_bp.login'  # Ganti dengan nama blueprint dan endpoint login Anda
     login_manager.login_message = "Please log in to access this page."  # Pesan yang ditampilkan saat pengguna tidak terautentikasi
     
+    # Registrasi event listener version stamp (ETag) untuk semua sesi, dan trigger change log/pencarian/jumlah karyawan untuk create_all
+    from app import version_stamps, mailer, change_log, employee_search, employee_counts  # noqa: F401
+
     logging.info("Application started.")  # Logging ketika aplikasi mulai dijalankan
 
     @app.context_processor
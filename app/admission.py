@@ -0,0 +1,213 @@
+"""Admission control and load shedding per endpoint class.
+
+Every request is mapped to a class ('read', 'write', 'admin', 'report', ...)
+through ADMISSION_ENDPOINTS (endpoint name first, then blueprint name;
+unmapped endpoints are not controlled). A class runs at most `concurrency`
+requests at once and the process at most ADMISSION_MAX_CONCURRENT. Requests
+over the limit wait in a short bounded queue; when the queue is full or the
+wait exceeds the class `timeout`, the request is shed with 503 and
+Retry-After instead of piling up behind the SQLite busy timeout. Freed slots
+go to waiting requests by class priority (lower number first), so cheap
+reads overtake heavy reports.
+
+In ASGI mode (app.asgi) the async endpoints wait for their slot on the
+event loop (acquire_async) instead of blocking a thread; both kinds of
+request share the same slots and queue.
+
+Counters are per process and exported by /admin/metrics.
+"""
+import bisect
+import itertools
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+
+from flask import current_app, g, jsonify, request
+
+OUTCOMES = ('admitted', 'queued', 'rejected_queue_full', 'rejected_timeout')
+
+
+class _Waiter:
+    __slots__ = ('priority', 'seq', 'name', 'event', 'granted')
+
+    def __init__(self, priority, seq, name, event):
+        self.priority = priority
+        self.seq = seq
+        self.name = name
+        self.event = event
+        self.granted = False
+
+    def __lt__(self, other):
+        return (self.priority, self.seq) < (other.priority, other.seq)
+
+
+class AdmissionController:
+    def __init__(self, classes, max_concurrent):
+        self.classes = classes
+        self.max_concurrent = max_concurrent
+        self._lock = threading.Lock()
+        self._seq = itertools.count()
+        self._waiters = []  # Terurut menurut (priority, seq)
+        self._active = defaultdict(int)
+        self._waiting = defaultdict(int)
+        self._active_total = 0
+        self._counts = defaultdict(int)
+        self._wait_sum = defaultdict(float)
+        self._wait_max = defaultdict(float)
+
+    def _can_run(self, name):
+        return (self._active_total < self.max_concurrent
+                and self._active[name] < self.classes[name]['concurrency'])
+
+    def _grant(self, name):
+        self._active[name] += 1
+        self._active_total += 1
+
+    def _enter(self, name, make_event):
+        # (admitted, outcome, None) tanpa menunggu, atau (None, None, waiter) jika masuk antrean
+        spec = self.classes[name]
+        with self._lock:
+            if self._can_run(name) and not self._waiting[name]:
+                self._grant(name)
+                self._counts[name, 'admitted'] += 1
+                return True, 'admitted', None
+            if self._waiting[name] >= spec['queue']:
+                self._counts[name, 'rejected_queue_full'] += 1
+                return False, 'rejected_queue_full', None
+            waiter = _Waiter(spec['priority'], next(self._seq), name, make_event())
+            bisect.insort(self._waiters, waiter)
+            self._waiting[name] += 1
+            return None, None, waiter
+
+    def acquire(self, name):
+        """Admit a request of this class. Returns (admitted, outcome)."""
+        admitted, outcome, waiter = self._enter(name, threading.Event)
+        if waiter is None:
+            return admitted, outcome
+        started = time.perf_counter()
+        waiter.event.wait(self.classes[name]['timeout'])
+        return self._leave_queue(waiter, time.perf_counter() - started)
+
+    async def acquire_async(self, name, make_event):
+        """acquire() for the event loop; make_event builds an awaitable event other threads can set."""
+        admitted, outcome, waiter = self._enter(name, make_event)
+        if waiter is None:
+            return admitted, outcome
+        started = time.perf_counter()
+        await waiter.event.wait(self.classes[name]['timeout'])
+        return self._leave_queue(waiter, time.perf_counter() - started)
+
+    def _leave_queue(self, waiter, waited):
+        name = waiter.name
+        with self._lock:
+            if not waiter.granted:
+                # Masih di antrean setelah timeout: keluarkan dan tolak
+                self._waiters.remove(waiter)
+                self._waiting[name] -= 1
+                self._counts[name, 'rejected_timeout'] += 1
+                return False, 'rejected_timeout'
+            self._counts[name, 'queued'] += 1
+            self._wait_sum[name] += waited
+            self._wait_max[name] = max(self._wait_max[name], waited)
+            return True, 'queued'
+
+    def release(self, name):
+        with self._lock:
+            self._active[name] -= 1
+            self._active_total -= 1
+            self._dispatch()
+
+    def _dispatch(self):
+        # Slot kosong diberikan ke waiter prioritas tertinggi yang kelasnya masih punya kuota
+        index = 0
+        while index < len(self._waiters) and self._active_total < self.max_concurrent:
+            waiter = self._waiters[index]
+            if self._active[waiter.name] < self.classes[waiter.name]['concurrency']:
+                del self._waiters[index]
+                self._waiting[waiter.name] -= 1
+                self._grant(waiter.name)
+                waiter.granted = True
+                waiter.event.set()
+            else:
+                index += 1
+
+    def snapshot(self):
+        """Current counters and gauges for every class."""
+        with self._lock:
+            return {
+                'pid': os.getpid(),
+                'max_concurrent': self.max_concurrent,
+                'active_total': self._active_total,
+                'classes': {name: {
+                    'priority': spec['priority'],
+                    'concurrency': spec['concurrency'],
+                    'queue': spec['queue'],
+                    'active': self._active[name],
+                    'waiting': self._waiting[name],
+                    'requests': {outcome: self._counts[name, outcome] for outcome in OUTCOMES},
+                    'wait_seconds_sum': round(self._wait_sum[name], 6),
+                    'wait_seconds_max': round(self._wait_max[name], 6),
+                } for name, spec in self.classes.items()},
+            }
+
+
+def prometheus_text(snapshot):
+    """Render a snapshot in the Prometheus text exposition format."""
+    lines = [
+        '# TYPE admission_requests_total counter',
+        '# TYPE admission_active gauge',
+        '# TYPE admission_waiting gauge',
+        '# TYPE admission_wait_seconds_sum counter',
+    ]
+    for name, data in snapshot['classes'].items():
+        for outcome, count in data['requests'].items():
+            lines.append(f'admission_requests_total{{class="{name}",outcome="{outcome}"}} {count}')
+        lines.append(f'admission_active{{class="{name}"}} {data["active"]}')
+        lines.append(f'admission_waiting{{class="{name}"}} {data["waiting"]}')
+        lines.append(f'admission_wait_seconds_sum{{class="{name}"}} {data["wait_seconds_sum"]}')
+    return '\n'.join(lines) + '\n'
+
+
+def get_admission_controller(app=None):
+    return (app or current_app).extensions['admission']
+
+
+def classify(endpoint, blueprint):
+    """Admission class for an endpoint, or None when it is not controlled."""
+    mapping = current_app.config.get('ADMISSION_ENDPOINTS', {})
+    if endpoint in mapping:
+        return mapping[endpoint]
+    return mapping.get(blueprint)
+
+
+def init_admission(app):
+    """Install the admission controller as before/teardown request hooks."""
+    app.extensions['admission'] = AdmissionController(
+        app.config.get('ADMISSION_CLASSES', {}), app.config.get('ADMISSION_MAX_CONCURRENT', 32)
+    )
+
+    @app.before_request
+    def admit():
+        if not app.config.get('ADMISSION_CONTROL_ENABLED', True) or request.endpoint is None:
+            return None
+        name = classify(request.endpoint, request.blueprint)
+        if name is None:
+            return None
+
+        admitted, outcome = get_admission_controller(app).acquire(name)
+        if admitted:
+            g.admission_class = name
+            return None
+
+        logging.warning(f"Request to {request.endpoint} shed ({name}: {outcome})")
+        response = jsonify({'status': 'error', 'message': 'Server sedang sibuk, coba lagi sebentar lagi.'})
+        response.headers['Retry-After'] = str(app.config['ADMISSION_CLASSES'][name].get('retry_after', 1))
+        return response, 503
+
+    @app.teardown_request
+    def release(exc):
+        name = g.pop('admission_class', None)
+        if name is not None:
+            get_admission_controller(app).release(name)
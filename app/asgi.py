@@ -0,0 +1,510 @@
+"""ASGI serving mode.
+
+create_asgi_app() puts the Flask app behind an ASGI application (served by
+asgi.py, e.g. `uvicorn asgi:application --workers 4`). The I/O-bound
+endpoints are answered by async handlers (app.routes.async_routes) on the
+event loop:
+
+- POST /employee/attendance and /employee/leave insert through an
+  aiosqlite engine,
+- GET /employee/attendance_status reads through the aiosqlite engine,
+- GET /admin/attendance_report streams the report while it is read,
+- GET /admin/stream holds the SSE connection without a thread.
+
+A request waiting for the SQLite lock, a pooled connection or the next
+event then costs a coroutine instead of a worker thread. Code that only
+exists in sync form (photo blob store, shift index, photo hash, work
+calendar, revocation check, photo reuse and travel checks) runs in the default thread pool
+for its short duration (run_sync). Every other request goes to the Flask
+app on a pool of ASGI_WSGI_THREADS threads, with the usual
+before/after-request hooks.
+
+The async handlers apply the same JWT checks and admission control as
+the Flask views. All requests go to the Flask app instead when
+ASGI_ASYNC_ENDPOINTS is off, aiosqlite is not installed, the database is
+not SQLite or attendance is sharded (ATTENDANCE_SHARDS > 0).
+"""
+import asyncio
+import io
+import logging
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qsl
+
+from flask import current_app
+
+try:
+    import aiosqlite  # noqa: F401  Driver sqlite+aiosqlite
+    from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+    from sqlalchemy.pool import AsyncAdaptedQueuePool
+except ImportError:
+    aiosqlite = None
+
+
+class HTTPError(Exception):
+    """Ends an async handler with {'status': 'error', 'message': message} and the given status."""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+class ClientDisconnected(Exception):
+    pass
+
+
+class LoopEvent:
+    """Event awaited on the event loop that any thread may set (asyncio.Event itself is not thread-safe).
+
+    Same interface as threading.Event, with an awaitable wait(), so the
+    admission controller and the event bus can wake async waiters.
+    """
+
+    def __init__(self):
+        self._loop = asyncio.get_running_loop()
+        self._event = asyncio.Event()
+
+    def set(self):
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is self._loop:
+            self._event.set()
+            return
+        try:
+            self._loop.call_soon_threadsafe(self._event.set)
+        except RuntimeError:
+            pass  # Loop sudah ditutup (server berhenti)
+
+    def clear(self):
+        self._event.clear()
+
+    def is_set(self):
+        return self._event.is_set()
+
+    async def wait(self, timeout=None):
+        """True once set, False after timeout."""
+        try:
+            await asyncio.wait_for(self._event.wait(), timeout)
+        except asyncio.TimeoutError:
+            return False
+        return True
+
+
+class AsyncRequest:
+    """The parts of an HTTP request the async handlers use."""
+
+    def __init__(self, scope, receive):
+        self.scope = scope
+        self.receive = receive
+        self.method = scope['method']
+        self.headers = {}
+        for name, value in scope['headers']:
+            name = name.decode('latin-1').lower()
+            value = value.decode('latin-1')
+            self.headers[name] = f'{self.headers[name]},{value}' if name in self.headers else value
+        self.args = {}
+        for name, value in parse_qsl(scope.get('query_string', b'').decode('latin-1'), keep_blank_values=True):
+            self.args.setdefault(name, value)  # Seperti request.args.get: nilai pertama
+        self.identity = None
+        self._body = None
+
+    async def body(self):
+        if self._body is None:
+            limit = current_app.config.get('MAX_CONTENT_LENGTH')
+            chunks, size = [], 0
+            while True:
+                message = await self.receive()
+                if message['type'] == 'http.disconnect':
+                    raise ClientDisconnected()
+                chunk = message.get('body', b'')
+                size += len(chunk)
+                if limit is not None and size > limit:
+                    raise HTTPError(413, 'Request too large')
+                chunks.append(chunk)
+                if not message.get('more_body'):
+                    break
+            self._body = b''.join(chunks)
+        return self._body
+
+    async def get_json(self):
+        """Parsed JSON body; ValueError like request.get_json() raising for a non-JSON body."""
+        content_type = self.headers.get('content-type', '').split(';')[0].strip()
+        if content_type != 'application/json' and not content_type.endswith('+json'):
+            raise ValueError('Content-Type must be application/json')
+        return current_app.json.loads(await self.body())
+
+
+class StreamingResponse:
+    """Response whose body is an async generator of bytes, sent while it is produced.
+
+    The status line goes out with the first chunk: when the generator fails
+    before that, the client gets a 500 with error_message instead.
+    """
+
+    def __init__(self, chunks, content_type, headers=None, error_message='Internal Server Error'):
+        self.chunks = chunks
+        self.content_type = content_type
+        self.headers = headers or {}
+        self.error_message = error_message
+
+    async def __call__(self, send, receive):
+        sender = asyncio.ensure_future(self._send(send))
+
+        async def watch():
+            while (await receive())['type'] != 'http.disconnect':
+                pass
+            sender.cancel()  # Klien sudah pergi: generator dihentikan juga saat sedang menunggu (feed SSE yang sepi)
+
+        watcher = asyncio.ensure_future(watch())
+        try:
+            await sender
+        except asyncio.CancelledError:
+            if not watcher.done():
+                raise
+        finally:
+            watcher.cancel()
+            await self.chunks.aclose()
+
+    async def _send(self, send):
+        try:
+            first = await self.chunks.__anext__()
+        except StopAsyncIteration:
+            first = b''
+        except Exception as e:
+            logging.error(f"{self.error_message}: {e}")
+            await send_json(send, {'status': 'error', 'message': self.error_message}, 500)
+            return
+        headers = {'Content-Type': self.content_type, **self.headers}
+        await send({'type': 'http.response.start', 'status': 200, 'headers': _encode_headers(headers)})
+        await send({'type': 'http.response.body', 'body': first, 'more_body': True})
+        async for chunk in self.chunks:
+            await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+        await send({'type': 'http.response.body', 'body': b''})
+
+
+class AsyncRoutes:
+    """(method, path) -> (endpoint, handler, JWT locations) table, filled with the route decorator.
+
+    endpoint is the name of the Flask view the handler stands in for; it
+    selects the admission class (ADMISSION_ENDPOINTS) like the view would.
+    """
+
+    def __init__(self):
+        self.table = {}
+
+    def route(self, method, path, endpoint, jwt_locations=('headers',)):
+        def decorator(handler):
+            self.table[method, path] = (endpoint, handler, jwt_locations)
+            return handler
+        return decorator
+
+
+def _encode_headers(headers):
+    return [(name.lower().encode('latin-1'), str(value).encode('latin-1')) for name, value in headers.items()]
+
+
+async def send_json(send, payload, status=200, headers=None):
+    body = current_app.json.dumps(payload).encode('utf-8') + b'\n'
+    headers = {'Content-Type': 'application/json', 'Content-Length': len(body), **(headers or {})}
+    await send({'type': 'http.response.start', 'status': status, 'headers': _encode_headers(headers)})
+    await send({'type': 'http.response.body', 'body': body})
+
+
+def _in_thread(fn, args):
+    from app import db
+
+    try:
+        return fn(*args)
+    finally:
+        db.session.remove()  # Koneksi kembali ke pool sebelum thread dipakai request lain
+
+
+async def run_sync(fn, *args):
+    """Run sync code in the default thread pool; it sees the request's app context and gets its own db.session."""
+    return await asyncio.to_thread(_in_thread, fn, args)
+
+
+def get_async_engine(app=None):
+    """aiosqlite engine on the app's database, created on first use (per process, for the server's event loop)."""
+    app = app or current_app
+    engine = app.extensions.get('async_engine')
+    if engine is None:
+        from app import db
+        from app.compact_storage import watch_layout
+
+        # URL dari engine Flask-SQLAlchemy: path relatif sudah diarahkan ke folder instance
+        with app.app_context():
+            url = db.engine.url.set(drivername='sqlite+aiosqlite')
+        # Pool tetap: setiap koneksi aiosqlite punya thread sendiri, jadi tidak dibuka ulang per request
+        engine = create_async_engine(url, poolclass=AsyncAdaptedQueuePool,
+                                     pool_size=app.config.get('ASGI_DB_POOL_SIZE', 8), max_overflow=0,
+                                     pool_recycle=app.config.get('SQLALCHEMY_POOL_RECYCLE', -1))
+        watch_layout(engine.sync_engine)
+        engine = app.extensions.setdefault('async_engine', engine)
+    return engine
+
+
+def async_session():
+    """New AsyncSession on the aiosqlite engine; objects stay usable after commit."""
+    return AsyncSession(get_async_engine(), expire_on_commit=False)
+
+
+def _jwt_error(message, status):
+    return {current_app.config.get('JWT_ERROR_MESSAGE_KEY', 'msg'): message}, status
+
+
+def _find_token(request, locations):
+    # Urutan dan pesan seperti flask_jwt_extended: header lalu query string
+    config = current_app.config
+    missing = []
+    if 'headers' in locations:
+        header_name = config.get('JWT_HEADER_NAME', 'Authorization')
+        header_type = config.get('JWT_HEADER_TYPE', 'Bearer')
+        header = request.headers.get(header_name.lower())
+        if header:
+            parts = header.split()
+            if header_type and (len(parts) != 2 or parts[0] != header_type):
+                raise HTTPError(422, f"Bad {header_name} header. Expected '{header_name}: {header_type} <JWT>'")
+            return parts[-1]
+        missing.append(f'Missing {header_name} Header')
+    if 'query_string' in locations:
+        name = config.get('JWT_QUERY_STRING_NAME', 'jwt')
+        token = request.args.get(name)
+        if token:
+            return token
+        missing.append(f"Missing '{name}' query paramater")
+    if len(missing) == 1:
+        raise HTTPError(401, missing[0])
+    raise HTTPError(401, f"Missing JWT in {' or '.join(locations)} ({'; '.join(missing)})")
+
+
+async def authenticate(request, locations):
+    """@jwt_required() for async handlers: sets request.identity, or returns the (payload, status) error."""
+    from flask_jwt_extended import decode_token
+    from jwt import ExpiredSignatureError, PyJWTError
+
+    from app.revocation import get_revocation_list
+
+    try:
+        token = _find_token(request, locations)
+    except HTTPError as e:
+        return _jwt_error(e.message, e.status)
+    try:
+        claims = decode_token(token)
+    except ExpiredSignatureError:
+        return _jwt_error('Token has expired', 401)
+    except PyJWTError as e:
+        return _jwt_error(str(e), 422)
+    if claims.get('type') != 'access':
+        return _jwt_error('Only non-refresh tokens are allowed', 422)
+    # Jalur normal tanpa I/O, tetapi sinkron revocation sesekali membaca database
+    if await run_sync(get_revocation_list().is_revoked, claims.get('jti')):
+        return _jwt_error('Token has been revoked', 401)
+    request.identity = claims[current_app.config.get('JWT_IDENTITY_CLAIM', 'sub')]
+    return None
+
+
+class WsgiBridge:
+    """Runs the Flask app for ASGI requests on a fixed pool of threads."""
+
+    def __init__(self, wsgi_app, threads):
+        self.wsgi_app = wsgi_app
+        self.executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix='wsgi')
+
+    async def __call__(self, scope, receive, send):
+        body = io.BytesIO()
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                return
+            body.write(message.get('body', b''))
+            if not message.get('more_body'):
+                break
+        body.seek(0)
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self.executor, self._run, _environ(scope, body), send, loop)
+
+    def _run(self, environ, send, loop):
+        response = {}
+
+        def emit(message):
+            asyncio.run_coroutine_threadsafe(send(message), loop).result()
+
+        def start_head():
+            if not response.get('started'):
+                response['started'] = True
+                emit({'type': 'http.response.start', 'status': response['status'], 'headers': response['headers']})
+
+        def write(data):
+            start_head()
+            emit({'type': 'http.response.body', 'body': data, 'more_body': True})
+
+        def start_response(status, headers, exc_info=None):
+            if exc_info and response.get('started'):
+                raise exc_info[1].with_traceback(exc_info[2])
+            response['status'] = int(status.split(' ', 1)[0])
+            response['headers'] = [(name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in headers]
+            return write
+
+        iterable = self.wsgi_app(environ, start_response)
+        try:
+            for chunk in iterable:
+                if chunk:
+                    write(chunk)
+            start_head()
+            emit({'type': 'http.response.body', 'body': b''})
+        finally:
+            close = getattr(iterable, 'close', None)
+            if close:
+                close()
+
+
+def _environ(scope, body):
+    root_path = scope.get('root_path', '')
+    path = scope['path']
+    if root_path and path.startswith(root_path):
+        path = path[len(root_path):]
+    server = scope.get('server') or ('localhost', 80)
+    client = scope.get('client') or ('', 0)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': root_path.encode('utf-8').decode('latin-1'),
+        'PATH_INFO': path.encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'REMOTE_ADDR': client[0],
+        'REMOTE_PORT': str(client[1]),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': body,
+        'wsgi.input_terminated': True,
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    for name, value in scope.get('headers', []):
+        key = name.decode('latin-1').upper().replace('-', '_')
+        if key not in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+            key = 'HTTP_' + key
+        value = value.decode('latin-1')
+        environ[key] = f'{environ[key]},{value}' if key in environ else value
+    return environ
+
+
+def _route_path(scope):
+    root_path = scope.get('root_path', '')
+    path = scope['path']
+    return path[len(root_path):] if root_path and path.startswith(root_path) else path
+
+
+class AsgiApp:
+    def __init__(self, flask_app, routes):
+        self.flask_app = flask_app
+        self.routes = routes
+        self.wsgi = WsgiBridge(flask_app, flask_app.config.get('ASGI_WSGI_THREADS', 16))
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+            return
+        if scope['type'] != 'http':
+            raise ValueError(f"Unsupported ASGI scope type {scope['type']}")
+        route = self.routes.get((scope['method'], _route_path(scope)))
+        if route is None:
+            await self.wsgi(scope, receive, send)
+            return
+        with self.flask_app.app_context():
+            await self._dispatch(*route, scope, receive, send)
+
+    async def _dispatch(self, endpoint, handler, jwt_locations, scope, receive, send):
+        from app.admission import classify, get_admission_controller
+
+        config = self.flask_app.config
+        # Admission control dulu, lalu JWT (urutan before_request lalu @jwt_required di jalur Flask)
+        name = None
+        if config.get('ADMISSION_CONTROL_ENABLED', True):
+            name = classify(endpoint, endpoint.partition('.')[0])
+        if name is not None:
+            admitted, outcome = await get_admission_controller().acquire_async(name, LoopEvent)
+            if not admitted:
+                logging.warning(f"Request to {endpoint} shed ({name}: {outcome})")
+                retry_after = config['ADMISSION_CLASSES'][name].get('retry_after', 1)
+                await send_json(send, {'status': 'error', 'message': 'Server sedang sibuk, coba lagi sebentar lagi.'},
+                                503, {'Retry-After': retry_after})
+                return
+        try:
+            request = AsyncRequest(scope, receive)
+            error = await authenticate(request, jwt_locations)
+            if error:
+                await send_json(send, *error)
+                return
+            try:
+                response = await handler(request)
+            except HTTPError as e:
+                response = {'status': 'error', 'message': e.message}, e.status
+            if isinstance(response, StreamingResponse):
+                await response(send, receive)
+            else:
+                await send_json(send, *response)
+        except ClientDisconnected:
+            logging.info(f"Client disconnected from {endpoint}")
+        finally:
+            if name is not None:
+                get_admission_controller().release(name)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                from app.jobs import start_job_workers
+
+                start_job_workers(self.flask_app)  # Handler async tidak melewati before_request Flask
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await self.close()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def close(self):
+        engine = self.flask_app.extensions.pop('async_engine', None)
+        if engine is not None:
+            await engine.dispose()
+        self.wsgi.executor.shutdown(wait=False)
+
+
+def _async_unavailable(app):
+    """Why the async handlers cannot be used, or None."""
+    if not app.config.get('ASGI_ASYNC_ENDPOINTS', True):
+        return 'ASGI_ASYNC_ENDPOINTS is off'
+    if aiosqlite is None:
+        return 'aiosqlite is not installed'
+    if app.config.get('ATTENDANCE_SHARDS', 0) > 0:
+        return 'attendance is sharded'
+    from app import db
+    with app.app_context():
+        backend = db.engine.url.get_backend_name()
+    if backend != 'sqlite':
+        return f'the database is {backend}'
+    return None
+
+
+def create_asgi_app(app=None):
+    """ASGI application for app (default: a new create_app()) with async handlers where they can be used."""
+    if app is None:
+        from app import create_app
+        app = create_app()
+    routes = {}
+    reason = _async_unavailable(app)
+    if reason:
+        logging.warning(f"ASGI: every request is served by the Flask app ({reason}).")
+    else:
+        from app.routes.async_routes import routes as async_routes
+        routes = async_routes.table
+        logging.info(f"ASGI: {len(routes)} endpoints served by async handlers.")
+    return AsgiApp(app, routes)
@@ -0,0 +1,135 @@
+import base64
+import logging
+from datetime import date, timedelta
+
+import numpy as np
+from sqlalchemy import select
+
+from app import db
+from app.models import Attendance, Employee, AttendanceStatus, STATUS_CODES
+from app.attendance_shards import fan_out, sharding_enabled
+from app.cold_storage import read_archived_arrays
+from app.work_calendar import get_calendar
+
+# Kode untuk sel tanpa data (hari libur atau hari yang belum terjadi)
+NO_DATA = 0
+
+# Legenda kode yang dikirim ke klien bersama matriks
+CODE_LABELS = {str(NO_DATA): 'LIBUR'}
+CODE_LABELS.update({str(code): status.value for status, code in STATUS_CODES.items()})
+
+MATRIX_ENCODINGS = ('base64', 'rle')
+
+
+def _baseline_row(start, days, today, site_id=None):
+    """Baris default: ALPHA untuk hari kerja yang sudah lewat, NO_DATA untuk sisanya."""
+    row = np.full(days, NO_DATA, dtype=np.uint8)
+    working = get_calendar().working_mask(start, start + timedelta(days=days - 1), site_id)
+    past = max(0, min(days, (today - start).days + 1))
+    row[:past][working[:past]] = STATUS_CODES[AttendanceStatus.ALPHA]
+    return row
+
+
+def _scatter(grid, employee_ids, record_ids, offsets, codes):
+    """Write codes into grid at (row of record_ids, offsets); unknown employees are skipped."""
+    if not len(employee_ids):
+        return
+    rows = np.searchsorted(employee_ids, record_ids)
+    rows_clipped = np.minimum(rows, len(employee_ids) - 1)
+    valid = (rows < len(employee_ids)) & (employee_ids[rows_clipped] == record_ids)
+
+    # Jika ada beberapa catatan di hari yang sama, kode terbesar yang dipakai
+    np.maximum.at(grid, (rows[valid], offsets[valid]), codes[valid])
+
+
+def build_attendance_matrix(start, end, today=None):
+    """Build the employees x days status grid for the inclusive range [start, end].
+
+    Returns (employees, grid) where employees is a list of (user_id, name) rows
+    in grid order and grid is a uint8 array of shape (len(employees), days).
+    """
+    today = today or date.today()
+    days = (end - start).days + 1
+
+    employees = db.session.execute(
+        select(Employee.user_id, Employee.name, Employee.site_id).order_by(Employee.user_id)
+    ).all()
+    employee_ids = np.fromiter((row.user_id for row in employees), dtype=np.int64, count=len(employees))
+
+    # Baseline dari kalender kerja, satu baris per site
+    baselines = {}
+    grid = np.empty((len(employees), days), dtype=np.uint8)
+    for index, row in enumerate(employees):
+        if row.site_id not in baselines:
+            baselines[row.site_id] = _baseline_row(start, days, today, row.site_id)
+        grid[index] = baselines[row.site_id]
+
+    # Satu query rentang tanggal (per shard jika attendance di-shard), lalu scatter ke grid
+    if sharding_enabled():
+        records = list(fan_out(
+            select(Attendance.id, Attendance.employee_id, Attendance.date, Attendance.status)
+            .where(Attendance.date >= start, Attendance.date <= end)
+        ))
+    else:
+        records = db.session.execute(
+            select(Attendance.employee_id, Attendance.date, Attendance.status)
+            .where(Attendance.date >= start, Attendance.date <= end)
+        ).all()
+
+    start_ordinal = start.toordinal()
+    if records:
+        count = len(records)
+        _scatter(
+            grid, employee_ids,
+            np.fromiter((r.employee_id for r in records), dtype=np.int64, count=count),
+            np.fromiter((r.date.toordinal() - start_ordinal for r in records), dtype=np.int64, count=count),
+            np.fromiter((STATUS_CODES.get(r.status, NO_DATA) for r in records), dtype=np.uint8, count=count),
+        )
+
+    # Bulan yang sudah diarsipkan: kolom segment langsung di-scatter tanpa konversi per baris
+    archived = read_archived_arrays(('employee_id', 'date', 'status'), start, end)
+    if len(archived['employee_id']):
+        _scatter(grid, employee_ids, archived['employee_id'],
+                 archived['date'].astype(np.int64) - start_ordinal, archived['status'])
+
+    logging.info(f"Attendance matrix built: {len(employees)} employees x {days} days from {len(records)} records.")
+    return employees, grid
+
+
+def summarize_matrix(employees, grid, start, end, today=None):
+    """Per-employee totals from a matrix: working days so far and days per status (ALPHA = missing working day)."""
+    today = today or date.today()
+    calendar = get_calendar()
+    last = min(end, today)
+    working = {}
+    summary = []
+    for row, codes in zip(employees, grid):
+        if row.site_id not in working:
+            working[row.site_id] = calendar.working_days(start, last, row.site_id)
+        counts = np.bincount(codes, minlength=max(STATUS_CODES.values()) + 1)
+        item = {'employee_id': row.user_id, 'employee_name': row.name, 'working_days': working[row.site_id]}
+        item.update({status.name.lower(): int(counts[code]) for status, code in STATUS_CODES.items()})
+        summary.append(item)
+    return summary
+
+
+def encode_base64(grid):
+    """Encode the grid row-major as base64 of the raw uint8 bytes."""
+    return base64.b64encode(np.ascontiguousarray(grid).tobytes()).decode('ascii')
+
+
+def encode_rle(grid):
+    """Encode each row as a flat [code, run_length, code, run_length, ...] list."""
+    encoded = []
+    for row in grid:
+        if not len(row):
+            encoded.append([])
+            continue
+        boundaries = np.flatnonzero(np.diff(row)) + 1
+        starts = np.concatenate(([0], boundaries))
+        lengths = np.diff(np.concatenate((starts, [len(row)])))
+        pairs = np.empty(len(starts) * 2, dtype=np.int64)
+        pairs[0::2] = row[starts]
+        pairs[1::2] = lengths
+        encoded.append(pairs.tolist())
+    return encoded
@@ -0,0 +1,369 @@
+"""Optional hash-sharded attendance storage.
+
+SQLite allows one writer per database file, which caps clock-in
+throughput. With ATTENDANCE_SHARDS = N (> 0) attendance rows live in N
+SQLite files (<ATTENDANCE_SHARD_FOLDER>/attendance-<i>.db), each with its
+own engine, and an employee's rows always go to shard
+crc32(employee_id) % N:
+
+- per-employee reads and writes (recap, attendance status, today's
+  attendance, clock-in/out, full sync) use a session on that one shard;
+- date-range reads across employees (admin report, attendance matrix) run
+  on every shard in parallel threads and are merged while they stream in,
+  ordered by (date, id).
+
+Ids stay unique across shards: shard i hands out ids from its own counter
+starting at (i + 1) * SHARD_ID_SPAN, above every id of the unsharded table.
+Each shard also keeps the attendance:<employee_id> version stamps of its
+employees; employees and every other table stay in the main database.
+After changing the shard count (or to move rows out of the main table when
+turning sharding on) run `flask attendance-shards-rebalance`; drained shard
+files are kept because their counters must not start over.
+
+Offboarding, the photo duplicate lookup and the travel / photo reuse
+indexes read every database that can hold attendance rows (the main table,
+then each shard file). They pull new rows per id counter: the rows of
+counter k (0 for the main table, i + 1 for shard i) are read by
+"id > last id seen of k" in the database that owns the counter, so rows a
+rebalance moved in are not read twice.
+
+Not shard-aware yet: the delta change log (sync sends a full copy in
+sharded mode) and cold storage, which only read the main table.
+"""
+import glob
+import heapq
+import logging
+import os
+import queue
+import re
+import threading
+import zlib
+from contextlib import contextmanager
+
+from flask import current_app
+from sqlalchemy import create_engine, delete, event, func, insert, select, text
+from sqlalchemy.orm import Session
+
+from app import db
+from app.models import Attendance, VersionStamp
+
+SHARD_ID_SPAN = 1 << 40
+FAN_OUT_CHUNK = 1000  # Baris per potongan yang dikirim thread shard ke penggabung
+FAN_OUT_BUFFER = 4  # Potongan yang boleh menunggu per shard
+REBALANCE_BATCH_SIZE = 1000
+
+_SHARD_FILE = re.compile(r'attendance-(\d+)\.db$')
+
+
+def shard_index(employee_id, count):
+    """Shard of an employee's rows (stable across processes and restarts)."""
+    return zlib.crc32(str(employee_id).encode()) % count
+
+
+def _configure_connection(dbapi_connection, connection_record):
+    # WAL: laporan yang membaca semua shard tidak menahan clock-in
+    dbapi_connection.execute('PRAGMA journal_mode=WAL')
+    dbapi_connection.execute('PRAGMA synchronous=NORMAL')
+
+
+def open_shard(path, index):
+    """Engine for one shard file, creating the table and its id counter on first use."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    engine = create_engine('sqlite:///' + path, connect_args={'timeout': 60})
+    event.listen(engine, 'connect', _configure_connection)
+    with engine.connect() as connection:
+        # Worker lain yang membuka shard yang sama bersamaan menunggu di sini, tidak ikut membuat tabel
+        connection.exec_driver_sql('BEGIN IMMEDIATE')
+        Attendance.__table__.create(connection, checkfirst=True)
+        VersionStamp.__table__.create(connection, checkfirst=True)  # Stamp ETag attendance:<employee_id> shard ini
+        connection.exec_driver_sql('CREATE TABLE IF NOT EXISTS shard_sequence (next_id INTEGER NOT NULL)')
+        connection.exec_driver_sql('INSERT INTO shard_sequence (next_id) SELECT ? '
+                                   'WHERE NOT EXISTS (SELECT 1 FROM shard_sequence)', ((index + 1) * SHARD_ID_SPAN,))
+        connection.commit()
+    return engine
+
+
+class AttendanceShards:
+    """The shard files of one app, engines opened on first use."""
+
+    def __init__(self, folder, count):
+        self.folder = folder
+        self.count = count
+        self._engines = {}
+        self._lock = threading.Lock()
+
+    def path(self, index):
+        return os.path.join(self.folder, f'attendance-{index}.db')
+
+    def shard_for(self, employee_id):
+        return shard_index(employee_id, self.count)
+
+    def engine(self, index):
+        engine = self._engines.get(index)
+        if engine is None:
+            with self._lock:
+                engine = self._engines.get(index)
+                if engine is None:
+                    engine = self._engines[index] = open_shard(self.path(index), index)
+        return engine
+
+    def session(self, employee_id):
+        """New session on the employee's shard (objects stay usable after commit and close)."""
+        return self.session_at(self.shard_for(employee_id))
+
+    def session_at(self, index):
+        return Session(bind=self.engine(index), expire_on_commit=False, info={'attendance_shard': index})
+
+    def existing(self):
+        """Indexes of the shard files on disk, including ones beyond the current count."""
+        indexes = set()
+        for path in glob.glob(os.path.join(self.folder, 'attendance-*.db')):
+            match = _SHARD_FILE.search(path)
+            if match:
+                indexes.add(int(match.group(1)))
+        return sorted(indexes)
+
+    def dispose(self):
+        with self._lock:
+            for engine in self._engines.values():
+                engine.dispose()
+            self._engines.clear()
+
+
+def get_shards(app=None):
+    app = app or current_app
+    shards = app.extensions.get('attendance_shards')
+    if shards is None:
+        folder = app.config.get('ATTENDANCE_SHARD_FOLDER') or os.path.join(app.instance_path, 'shards')
+        shards = app.extensions.setdefault('attendance_shards',
+                                           AttendanceShards(folder, app.config.get('ATTENDANCE_SHARDS', 0)))
+    return shards
+
+
+def sharding_enabled(app=None):
+    return (app or current_app).config.get('ATTENDANCE_SHARDS', 0) > 0
+
+
+@contextmanager
+def attendance_session(employee_id):
+    """Session holding employee_id's attendance: db.session, or a session on its shard closed afterwards."""
+    if not sharding_enabled():
+        yield db.session
+        return
+    with get_shards().session(employee_id) as session:
+        yield session
+
+
+def _next_id(session):
+    # UPDATE mengambil write lock shard; id dan baris ditulis dalam transaksi yang sama
+    return session.execute(text('UPDATE shard_sequence SET next_id = next_id + 1 RETURNING next_id')).scalar()
+
+
+def save_attendance(attendance):
+    """Insert or update an attendance row in the database (or shard) it lives in."""
+    if not sharding_enabled():
+        db.session.add(attendance)
+        db.session.commit()
+        return attendance
+
+    # Version stamp ikut ditulis di transaksi shard yang sama (after_flush di app.version_stamps)
+    with get_shards().session(attendance.employee_id) as session:
+        session.add(attendance)
+        if attendance.id is None:
+            attendance.id = _next_id(session)
+        session.commit()
+    return attendance
+
+
+def attendance_sources(app=None):
+    """Databases that can hold attendance rows: None (the main table), then every shard index on disk or configured."""
+    if not sharding_enabled(app):
+        return [None]
+    shards = get_shards(app)
+    return [None] + sorted(set(shards.existing()) | set(range(shards.count)))
+
+
+def read_source(index, stmt):
+    """All rows of stmt from the main table (index None) or one shard."""
+    if index is None:
+        return db.session.execute(stmt).all()
+    with get_shards().engine(index).connect() as connection:
+        return connection.execute(stmt).all()
+
+
+def read_everywhere(stmt):
+    """Rows of stmt from every database in attendance_sources(), one after another (not merged)."""
+    return [row for index in attendance_sources() for row in read_source(index, stmt)]
+
+
+def id_counter(attendance_id):
+    """Counter that handed out an attendance id: 0 for the main table, i + 1 for shard i."""
+    return attendance_id // SHARD_ID_SPAN
+
+
+def _own_ids(index):
+    # Rentang id dari counter milik database ini sendiri
+    counter = 0 if index is None else index + 1
+    return counter, counter * SHARD_ID_SPAN, (counter + 1) * SHARD_ID_SPAN
+
+
+def latest_ids():
+    """{counter: highest id it handed out so far}, a starting point for read_new()."""
+    last_ids = {}
+    for index in attendance_sources():
+        counter, start, end = _own_ids(index)
+        last_id = read_source(index, select(func.max(Attendance.id))
+                              .where(Attendance.id >= start, Attendance.id < end))[0][0]
+        last_ids[counter] = last_id or start
+    return last_ids
+
+
+def read_new(stmt, last_ids):
+    """Rows of stmt (selecting Attendance.id) added since last_ids, and last_ids advanced past them.
+
+    last_ids maps a counter (see id_counter) to the last id seen from it;
+    rows come in id order per database.
+    """
+    rows, last_ids = [], dict(last_ids)
+    for index in attendance_sources():
+        counter, start, end = _own_ids(index)
+        found = read_source(index, stmt.where(Attendance.id > last_ids.get(counter, start), Attendance.id < end)
+                            .order_by(Attendance.id))
+        if found:
+            last_ids[counter] = found[-1].id
+        rows += found
+    return rows, last_ids
+
+
+def get_attendance(attendance_id):
+    """An attendance row by id from whichever database holds it, or None (detached in sharded mode)."""
+    attendance = db.session.get(Attendance, attendance_id)
+    if attendance is not None or not sharding_enabled():
+        return attendance
+    shards = get_shards()
+    # Shard yang menerbitkan id dicoba dulu; setelah rebalance barisnya bisa ada di shard lain
+    origin = id_counter(attendance_id) - 1
+    for index in sorted(attendance_sources()[1:], key=lambda index: index != origin):
+        with shards.session_at(index) as session:
+            attendance = session.get(Attendance, attendance_id)
+        if attendance is not None:
+            return attendance
+    return None
+
+
+def _put(rows_queue, item, stop):
+    while not stop.is_set():
+        try:
+            rows_queue.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def _stream_shard(engine, stmt, rows_queue, stop):
+    try:
+        with engine.connect() as connection:
+            result = connection.execution_options(stream_results=True, yield_per=FAN_OUT_CHUNK).execute(stmt)
+            for chunk in result.partitions():
+                if not _put(rows_queue, chunk, stop):
+                    return  # Pembaca berhenti lebih awal
+        _put(rows_queue, None, stop)
+    except Exception as e:
+        logging.error(f"Attendance shard query failed: {e}")
+        _put(rows_queue, e, stop)
+
+
+def _drain(rows_queue):
+    while True:
+        chunk = rows_queue.get()
+        if chunk is None:
+            return
+        if isinstance(chunk, Exception):
+            raise chunk
+        yield from chunk
+
+
+def fan_out(stmt):
+    """Rows of stmt (which must select Attendance.date and Attendance.id) from every shard, in (date, id) order.
+
+    Each shard is read by its own thread; rows are merged as the shards
+    produce them, so memory stays at a few chunks per shard.
+    """
+    shards = get_shards()
+    stmt = stmt.order_by(Attendance.date, Attendance.id)
+    stop = threading.Event()
+    queues = []
+    for index in range(shards.count):
+        rows_queue = queue.Queue(maxsize=FAN_OUT_BUFFER)
+        threading.Thread(target=_stream_shard, args=(shards.engine(index), stmt, rows_queue, stop),
+                         name=f'attendance-shard-{index}', daemon=True).start()
+        queues.append(rows_queue)
+    try:
+        yield from heapq.merge(*(_drain(rows_queue) for rows_queue in queues), key=lambda row: (row.date, row.id))
+    finally:
+        stop.set()
+
+
+def _move_rows(source, shards, batch_size):
+    """Move the rows of one source that hash to another shard; returns how many moved."""
+    from app.version_stamps import attendance_key, carry_stamps
+
+    table = Attendance.__table__
+    stamps = VersionStamp.__table__
+    moved = 0
+    last_id = 0
+    while True:
+        with source['engine'].connect() as connection:
+            rows = connection.execute(
+                select(table).where(table.c.id > last_id).order_by(table.c.id).limit(batch_size)
+            ).mappings().all()
+        if not rows:
+            return moved
+        last_id = rows[-1]['id']
+
+        targets = {}
+        for row in rows:
+            index = shards.shard_for(row['employee_id'])
+            if index != source['index']:
+                targets.setdefault(index, []).append(dict(row))
+        # Salin dulu lalu hapus dari sumber: dijalankan ulang setelah terputus tidak menggandakan baris.
+        # Stamp ETag di shard tujuan dinaikkan melewati stamp sumber agar klien tidak mendapat 304 basi.
+        for index, batch in targets.items():
+            keys = {attendance_key(row['employee_id']) for row in batch}
+            with source['engine'].connect() as connection:
+                versions = dict(connection.execute(
+                    select(stamps.c.key, stamps.c.version).where(stamps.c.key.in_(keys))
+                ).tuples().all())
+            with shards.engine(index).begin() as connection:
+                connection.execute(insert(table).prefix_with('OR IGNORE'), batch)
+                carry_stamps(connection, {key: versions.get(key, 0) for key in keys})
+        moved_ids = [row['id'] for batch in targets.values() for row in batch]
+        if moved_ids:
+            with source['engine'].begin() as connection:
+                connection.execute(delete(table).where(table.c.id.in_(moved_ids)))
+        moved += len(moved_ids)
+
+
+def rebalance(batch_size=None, app=None):
+    """Move every attendance row to the shard it hashes to under the current count.
+
+    Sources are the main attendance table and every shard file on disk,
+    so this both turns sharding on and follows a change of the count.
+    Returns {source: rows moved}.
+    """
+    app = app or current_app
+    if not sharding_enabled(app):
+        raise RuntimeError('ATTENDANCE_SHARDS is 0; set the shard count before rebalancing')
+    shards = get_shards(app)
+    batch_size = batch_size or REBALANCE_BATCH_SIZE
+
+    sources = [{'name': 'main', 'index': None, 'engine': db.engine}]
+    for index in attendance_sources(app)[1:]:
+        sources.append({'name': f'shard {index}', 'index': index, 'engine': shards.engine(index)})
+
+    moved = {}
+    for source in sources:
+        moved[source['name']] = _move_rows(source, shards, batch_size)
+        logging.info(f"Attendance rebalance: {moved[source['name']]} rows moved out of {source['name']}.")
+    return moved
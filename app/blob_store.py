@@ -0,0 +1,157 @@
+import base64
+import binascii
+import hashlib
+import logging
+import os
+import re
+import tempfile
+
+from flask import current_app, url_for
+from werkzeug.utils import secure_filename
+
+# Tanda tangan (magic bytes) format gambar yang diterima
+IMAGE_SIGNATURES = (
+    (b'\xff\xd8\xff', 'jpg', 'image/jpeg'),
+    (b'\x89PNG\r\n\x1a\n', 'png', 'image/png'),
+    (b'GIF87a', 'gif', 'image/gif'),
+    (b'GIF89a', 'gif', 'image/gif'),
+)
+
+CONTENT_TYPES = {ext: content_type for _, ext, content_type in IMAGE_SIGNATURES}
+CONTENT_TYPES['webp'] = 'image/webp'
+
+# Kunci blob: sha256 hex + ekstensi, contoh 'ab12...ef.jpg'
+KEY_PATTERN = re.compile(r'^[0-9a-f]{64}\.(jpg|png|gif|webp)$')
+
+
+def blob_folder():
+    return current_app.config.get('BLOB_FOLDER') or os.path.join(current_app.instance_path, 'blobs')
+
+
+def sniff_image(data):
+    """Return the file extension for image bytes, or None if not a known image format."""
+    for signature, ext, _ in IMAGE_SIGNATURES:
+        if data.startswith(signature):
+            return ext
+    if data[:4] == b'RIFF' and data[8:12] == b'WEBP':
+        return 'webp'
+    return None
+
+
+def decode_image_payload(payload):
+    """Decode a base64 string or data URL (data:image/...;base64,...) into image bytes.
+
+    Raises ValueError if the payload is not a base64-encoded image.
+    """
+    if isinstance(payload, bytes):
+        payload = payload.decode('ascii', errors='ignore')
+    if payload.startswith('data:'):
+        payload = payload.partition(',')[2]
+    try:
+        data = base64.b64decode(payload, validate=False)
+    except (binascii.Error, ValueError):
+        raise ValueError('Photo is not valid base64 data')
+    if not sniff_image(data):
+        raise ValueError('Photo is not a JPEG, PNG, GIF or WebP image')
+    return data
+
+
+def blob_path(key):
+    if not KEY_PATTERN.match(key):
+        raise ValueError(f'Invalid blob key: {key}')
+    return os.path.join(blob_folder(), key[:2], key)
+
+
+def put_blob(data):
+    """Store image bytes content-addressed and return the blob key. Identical images are stored once."""
+    ext = sniff_image(data)
+    if not ext:
+        raise ValueError('Blob is not a known image format')
+    key = f'{hashlib.sha256(data).hexdigest()}.{ext}'
+    path = blob_path(key)
+    if os.path.exists(path):
+        return key
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # Tulis ke file sementara lalu rename, supaya pembaca tidak melihat file setengah jadi
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except Exception:
+        os.unlink(tmp_path)
+        raise
+    logging.info(f"Stored blob {key} ({len(data)} bytes)")
+    return key
+
+
+def read_blob(key):
+    with open(blob_path(key), 'rb') as f:
+        return f.read()
+
+
+def _read_uploaded_file(filename):
+    """Bytes of a file already in static/uploads (older clients send only a file name), or None."""
+    path = os.path.join(current_app.root_path, 'static', 'uploads', secure_filename(filename))
+    if not filename or not os.path.isfile(path):
+        return None
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def photo_payload_bytes(payload):
+    """Image bytes of a client photo payload.
+
+    The payload is either base64 / a data URL, or the name of a file in
+    static/uploads. Raises ValueError if neither yields an image.
+    """
+    try:
+        return decode_image_payload(payload)
+    except ValueError:
+        data = _read_uploaded_file(payload) if len(payload) < 256 else None
+        if data is None or not sniff_image(data):
+            raise
+        return data
+
+
+def store_profile_photo(payload):
+    """Store a client photo payload and return the blob key (None if no photo).
+
+    Raises ValueError if the payload does not yield an image.
+    """
+    if not payload:
+        return None
+    return put_blob(photo_payload_bytes(payload))
+
+
+def store_attendance_photo(payload):
+    """Store an attendance photo payload: (value for attendance.photo, image bytes or None).
+
+    Base64 / data URL images go to the blob store and the value is their
+    key. Anything else is taken as a file name in static/uploads (older
+    clients), kept as it was. Raises ValueError for a payload that is
+    neither an image nor a usable file name.
+    """
+    if not payload:
+        return None, None
+    try:
+        data = decode_image_payload(payload)
+    except ValueError:
+        filename = secure_filename(payload)
+        if len(payload) >= 256 or not filename:
+            raise  # Bukan gambar, dan terlalu panjang untuk nama file
+        path = os.path.join(current_app.root_path, 'static', 'uploads', filename)
+        if not os.path.isfile(path):
+            with open(path, 'wb') as f:
+                f.write(payload.encode('utf-8'))
+        data = _read_uploaded_file(filename)
+        return filename, (data if data and sniff_image(data) else None)
+    return put_blob(data), data
+
+
+def photo_url(key):
+    """Public URL of a profile photo blob, or None."""
+    if not key:
+        return None
+    return url_for('employee.profile_photo', key=key, _external=True)
@@ -0,0 +1,115 @@
+"""Attendance change log for delta sync.
+
+SQLite triggers on the attendance table append one attendance_changes row
+per insert, update (of a column clients see) and delete, inside the same
+transaction as the change itself, so every write path (ORM, bulk core
+statements, raw SQL) is covered. The change's seq is the sync cursor: a
+client that has seen everything up to seq N asks for changes with seq > N,
+which is an index range scan on (employee_id, seq).
+
+Deletes that do not remove a record from the employee's history (moving old
+months to cold storage) or that remove the employee altogether
+(offboarding) run inside change_log_suppressed(), which holds a marker row
+the triggers check for.
+
+The log is pruned after CHANGE_LOG_RETENTION_DAYS; a client whose cursor is
+older than the oldest retained change gets a full snapshot again.
+"""
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import DDL, delete, event, func, insert, select
+
+from app import db
+from app.models import AttendanceChange, ChangeLogSuppression
+
+# Hanya kolom yang dikirim ke klien; perubahan kolom internal (photo_hash, dll.) tidak dicatat
+SYNCED_COLUMNS = 'employee_id, status, date, time, time_out, photo, latitude, longitude, reason'
+
+_NOT_SUPPRESSED = 'NOT EXISTS (SELECT 1 FROM change_log_suppressions)'
+
+TRIGGERS = {
+    'attendance_changes_insert': f"""
+CREATE TRIGGER attendance_changes_insert AFTER INSERT ON attendance
+WHEN {_NOT_SUPPRESSED}
+BEGIN
+    INSERT INTO attendance_changes (attendance_id, employee_id, op, changed_at)
+    VALUES (NEW.id, NEW.employee_id, 'I', CURRENT_TIMESTAMP);
+END""",
+    'attendance_changes_update': f"""
+CREATE TRIGGER attendance_changes_update AFTER UPDATE OF {SYNCED_COLUMNS} ON attendance
+WHEN {_NOT_SUPPRESSED}
+BEGIN
+    INSERT INTO attendance_changes (attendance_id, employee_id, op, changed_at)
+    SELECT OLD.id, OLD.employee_id, 'D', CURRENT_TIMESTAMP WHERE OLD.employee_id IS NOT NEW.employee_id;
+    INSERT INTO attendance_changes (attendance_id, employee_id, op, changed_at)
+    VALUES (NEW.id, NEW.employee_id, 'U', CURRENT_TIMESTAMP);
+END""",
+    'attendance_changes_delete': f"""
+CREATE TRIGGER attendance_changes_delete AFTER DELETE ON attendance
+WHEN {_NOT_SUPPRESSED}
+BEGIN
+    INSERT INTO attendance_changes (attendance_id, employee_id, op, changed_at)
+    VALUES (OLD.id, OLD.employee_id, 'D', CURRENT_TIMESTAMP);
+END""",
+}
+
+# db.create_all() (tes, instalasi baru) ikut membuat trigger; database lama lewat migrasi
+for _name, _sql in TRIGGERS.items():
+    event.listen(db.metadata, 'after_create', DDL(_sql.strip()).execute_if(dialect='sqlite'))
+
+
+@contextmanager
+def change_log_suppressed(reason):
+    """Run the block's attendance writes without logging them (same transaction only)."""
+    connection = db.session.connection()
+    marker = connection.execute(
+        insert(ChangeLogSuppression).values(reason=reason).returning(ChangeLogSuppression.id)
+    ).scalar()
+    try:
+        yield
+    finally:
+        connection.execute(delete(ChangeLogSuppression).where(ChangeLogSuppression.id == marker))
+
+
+def current_cursor():
+    return db.session.execute(select(func.max(AttendanceChange.seq))).scalar() or 0
+
+
+def cursor_is_valid(since):
+    """True when no change after since has been pruned (and since is not from the future)."""
+    oldest, newest = db.session.execute(
+        select(func.min(AttendanceChange.seq), func.max(AttendanceChange.seq))
+    ).one()
+    if newest is None:
+        return since == 0
+    return oldest - 1 <= since <= newest
+
+
+def changes_since(employee_id, since):
+    """(changed attendance ids, deleted attendance ids) of one employee after cursor since."""
+    latest = {}
+    for attendance_id, op in db.session.execute(
+        select(AttendanceChange.attendance_id, AttendanceChange.op)
+        .where(AttendanceChange.employee_id == employee_id, AttendanceChange.seq > since)
+        .order_by(AttendanceChange.seq)
+    ):
+        latest[attendance_id] = op  # Hanya operasi terakhir per baris yang relevan
+    changed = [attendance_id for attendance_id, op in latest.items() if op != 'D']
+    deleted = [attendance_id for attendance_id, op in latest.items() if op == 'D']
+    return changed, deleted
+
+
+def prune_change_log(retention_days=None):
+    """Delete changes older than the retention window, always keeping the newest. Returns rows deleted."""
+    if retention_days is None:
+        retention_days = current_app.config.get('CHANGE_LOG_RETENTION_DAYS', 90)
+    cutoff = datetime.utcnow() - timedelta(days=retention_days)
+    newest = current_cursor()
+    # Baris terbaru dipertahankan agar min(seq) - 1 tetap menandai batas cursor yang masih valid
+    deleted = db.session.execute(
+        delete(AttendanceChange).where(AttendanceChange.changed_at < cutoff, AttendanceChange.seq < newest)
+    ).rowcount
+    db.session.commit()
+    return deleted
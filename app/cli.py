@@ -0,0 +1,135 @@
+import time
+
+import click
+
+
+def init_migrate(app):
+    """Set up Flask-Migrate on app. Imports alembic, so only `flask db` and migration scripts call it."""
+    if 'migrate' not in app.extensions:
+        from flask_migrate import Migrate
+        from app import db
+
+        Migrate(app, db)
+    return app.extensions['migrate']
+
+
+class _MigrateGroup(click.Group):
+    """`flask db`: Flask-Migrate's commands, imported the first time the group is used."""
+
+    def __init__(self, app):
+        super().__init__('db', help='Perform database migrations.')
+        self.app = app
+
+    def _commands(self):
+        init_migrate(self.app)
+        from flask_migrate.cli import db
+
+        return db
+
+    def list_commands(self, ctx):
+        return self._commands().list_commands(ctx)
+
+    def get_command(self, ctx, name):
+        return self._commands().get_command(ctx, name)
+
+
+def init_cli(app):
+    """Register the maintenance commands on `flask`."""
+    app.cli.add_command(_MigrateGroup(app))
+
+    @app.cli.command('offboard')
+    @click.argument('user_ids', nargs=-1, type=int)
+    @click.option('--archive', is_flag=True, help='Copy attendance to attendance_archive before deleting.')
+    @click.option('--resume', 'resume_job', type=int, default=None, help='Resume an interrupted job by id.')
+    @click.option('--batch-size', type=int, default=None, help='Attendance rows per transaction.')
+    def offboard(user_ids, archive, resume_job, batch_size):
+        """Offboard employees by user id, deleting their attendance in batches."""
+        from app.offboarding import create_offboarding_job, run_offboarding_job
+
+        if resume_job is None:
+            if not user_ids:
+                raise click.UsageError('Give one or more user ids, or --resume JOB_ID.')
+            resume_job = create_offboarding_job(user_ids, archive=archive).id
+        job = run_offboarding_job(resume_job, batch_size=batch_size)
+        click.echo(f"Job {job.id}: {job.status}, {job.deleted_rows}/{job.total_rows} rows deleted, "
+                   f"{job.archived_rows} archived.")
+
+    @app.cli.command('archive-attendance')
+    @click.option('--retention-months', type=int, default=None,
+                  help='Months kept in the hot table (default: ATTENDANCE_RETENTION_MONTHS).')
+    def archive_attendance(retention_months):
+        """Move closed months older than the retention window into segment files."""
+        from app.cold_storage import archive_closed_months
+
+        archived = archive_closed_months(retention_months)
+        if not archived:
+            click.echo('Nothing to archive.')
+        for month, rows in archived.items():
+            click.echo(f'{month}: {rows} rows archived')
+
+    @app.cli.command('jobs-worker')
+    @click.option('--workers', type=int, default=None, help='Worker threads (default: JOB_WORKERS).')
+    def jobs_worker(workers):
+        """Run job workers in the foreground until interrupted."""
+        from app.jobs import JobWorkerPool
+
+        pool = JobWorkerPool(app, workers or app.config.get('JOB_WORKERS', 2) or 1).start()
+        click.echo(f'{pool.workers} job workers running, Ctrl+C to stop.')
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            pool.stop(timeout=30)
+
+    @app.cli.command('jobs-retry-dead')
+    @click.option('--kind', default=None, help='Only re-queue dead jobs of this kind.')
+    def jobs_retry_dead(kind):
+        """Move dead-lettered jobs back into the queue with a fresh attempt budget."""
+        from app.jobs import retry_dead_jobs
+
+        click.echo(f'{retry_dead_jobs(kind)} jobs re-queued.')
+
+    @app.cli.command('travel-backfill')
+    @click.option('--days', type=int, default=None, help='Only replay the last N days (default: all history).')
+    def travel_backfill(days):
+        """Replay attendance history and flag impossible travel that is not flagged yet."""
+        from app.travel import backfill_travel_flags
+
+        click.echo(f'{backfill_travel_flags(days)} attendance flags written.')
+
+    @app.cli.command('change-log-prune')
+    @click.option('--retention-days', type=int, default=None,
+                  help='Days of changes kept for delta sync (default: CHANGE_LOG_RETENTION_DAYS).')
+    def change_log_prune(retention_days):
+        """Delete old attendance_changes rows; clients with older cursors get a full sync."""
+        from app.change_log import prune_change_log
+
+        click.echo(f'{prune_change_log(retention_days)} change log rows deleted.')
+
+    @app.cli.command('attendance-shards-rebalance')
+    @click.option('--batch-size', type=int, default=None, help='Rows read per batch from each source.')
+    def attendance_shards_rebalance(batch_size):
+        """Move attendance rows to the shard they hash to under ATTENDANCE_SHARDS."""
+        from app.attendance_shards import rebalance
+
+        try:
+            moved = rebalance(batch_size)
+        except RuntimeError as e:
+            raise click.ClickException(str(e))
+        for source, rows in moved.items():
+            click.echo(f'{source}: {rows} rows moved')
+
+    @app.cli.command('employee-search-rebuild')
+    def employee_search_rebuild():
+        """Re-index all employees for /admin/employees/search."""
+        from app.employee_search import rebuild_search_index
+
+        rebuild_search_index()
+        click.echo('Employee search index rebuilt.')
+
+    @app.cli.command('employee-counts-rebuild')
+    def employee_counts_rebuild():
+        """Recount employees per gender and status for /admin/list_employees totals."""
+        from app.employee_counts import recount_employees
+
+        click.echo(f'{recount_employees()} employees counted.')
@@ -0,0 +1,397 @@
+"""Cold storage for old attendance: one immutable, compressed, columnar segment file per month.
+
+Segment layout::
+
+    b'ATTSEG1\\n' | uint32 header length | JSON header | column blobs
+
+The header lists each column's dtype, offset and length. Every column blob is
+zlib-compressed independently. Readers memory-map the file and decompress
+only the columns a query needs.
+"""
+import json
+import logging
+import mmap
+import os
+import re
+import struct
+import tempfile
+import zlib
+from collections import OrderedDict
+from datetime import date, time, datetime, timedelta
+
+import numpy as np
+from flask import current_app
+from sqlalchemy import delete, func, select
+
+from app import db
+from app.models import Attendance, STATUS_CODES
+
+MAGIC = b'ATTSEG1\n'
+SEGMENT_PATTERN = re.compile(r'^attendance-(\d{4})-(\d{2})\.seg$')
+
+# Kolom segment dalam urutan yang sama dengan read_models.ATTENDANCE_COLUMNS
+NUMERIC_COLUMNS = OrderedDict([
+    ('id', '<i8'),
+    ('employee_id', '<i8'),
+    ('status', 'u1'),  # STATUS_CODES
+    ('date', '<i4'),  # date.toordinal()
+    ('time', '<i4'),  # detik sejak tengah malam
+    ('time_out', '<i4'),  # -1 = NULL
+    ('latitude', '<f8'),  # NaN = NULL
+    ('longitude', '<f8'),
+])
+TEXT_COLUMNS = ('photo', 'reason')
+COLUMN_ORDER = ('id', 'employee_id', 'status', 'date', 'time', 'time_out', 'photo', 'latitude', 'longitude', 'reason')
+
+CODE_TO_STATUS = {code: status for status, code in STATUS_CODES.items()}
+
+_segment_cache = OrderedDict()
+_SEGMENT_CACHE_SIZE = 24
+
+
+def segment_folder():
+    return current_app.config.get('ARCHIVE_FOLDER') or os.path.join(current_app.instance_path, 'segments')
+
+
+def month_start(day):
+    return day.replace(day=1)
+
+
+def next_month(day):
+    return (day.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+def segment_path(month):
+    return os.path.join(segment_folder(), f'attendance-{month.year:04d}-{month.month:02d}.seg')
+
+
+def archived_months():
+    """Sorted list of months (first day) that have a segment file."""
+    folder = segment_folder()
+    if not os.path.isdir(folder):
+        return []
+    months = []
+    for name in os.listdir(folder):
+        match = SEGMENT_PATTERN.match(name)
+        if match:
+            months.append(date(int(match.group(1)), int(match.group(2)), 1))
+    return sorted(months)
+
+
+def _seconds(value):
+    return value.hour * 3600 + value.minute * 60 + value.second
+
+
+def _time_from_seconds(seconds):
+    return time(seconds // 3600, (seconds // 60) % 60, seconds % 60)
+
+
+# ---------------------------------------------------------------------------
+# Menulis segment
+# ---------------------------------------------------------------------------
+
+def _rows_to_columns(rows):
+    """Convert attendance tuples (COLUMN_ORDER) into column arrays / lists."""
+    count = len(rows)
+    columns = {
+        'id': np.fromiter((r[0] for r in rows), dtype='<i8', count=count),
+        'employee_id': np.fromiter((r[1] for r in rows), dtype='<i8', count=count),
+        'status': np.fromiter((STATUS_CODES[r[2]] for r in rows), dtype='u1', count=count),
+        'date': np.fromiter((r[3].toordinal() for r in rows), dtype='<i4', count=count),
+        'time': np.fromiter((_seconds(r[4]) for r in rows), dtype='<i4', count=count),
+        'time_out': np.fromiter((_seconds(r[5]) if r[5] else -1 for r in rows), dtype='<i4', count=count),
+        'latitude': np.fromiter((np.nan if r[7] is None else r[7] for r in rows), dtype='<f8', count=count),
+        'longitude': np.fromiter((np.nan if r[8] is None else r[8] for r in rows), dtype='<f8', count=count),
+        'photo': [r[6] for r in rows],
+        'reason': [r[9] for r in rows],
+    }
+    return columns
+
+
+def _sort_columns(columns):
+    # Urut (date, id) supaya laporan bisa digabung tanpa sort ulang
+    order = np.lexsort((columns['id'], columns['date']))
+    for name in NUMERIC_COLUMNS:
+        columns[name] = columns[name][order]
+    for name in TEXT_COLUMNS:
+        columns[name] = [columns[name][i] for i in order]
+    return columns
+
+
+def write_segment(month, columns):
+    """Atomically write the segment file for month and make it read-only."""
+    columns = _sort_columns(columns)
+    blobs = []
+    header = {'month': month.strftime('%Y-%m'), 'rows': int(len(columns['id'])), 'columns': {},
+              'created_at': datetime.utcnow().isoformat(timespec='seconds')}
+    offset = 0
+    for name in COLUMN_ORDER:
+        if name in NUMERIC_COLUMNS:
+            raw = np.ascontiguousarray(columns[name], dtype=NUMERIC_COLUMNS[name]).tobytes()
+            dtype = NUMERIC_COLUMNS[name]
+        else:
+            raw = json.dumps(columns[name], separators=(',', ':')).encode('utf-8')
+            dtype = 'json'
+        blob = zlib.compress(raw, 6)
+        header['columns'][name] = {'dtype': dtype, 'offset': offset, 'length': len(blob)}
+        blobs.append(blob)
+        offset += len(blob)
+
+    header_bytes = json.dumps(header, separators=(',', ':')).encode('utf-8')
+    path = segment_path(month)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(MAGIC)
+            f.write(struct.pack('<I', len(header_bytes)))
+            f.write(header_bytes)
+            for blob in blobs:
+                f.write(blob)
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(tmp_path, 0o444)
+        os.replace(tmp_path, path)
+    except Exception:
+        os.unlink(tmp_path)
+        raise
+    _segment_cache.pop(path, None)
+    logging.info(f"Wrote attendance segment {path} ({header['rows']} rows, {offset} bytes of column data)")
+    return path
+
+
+# ---------------------------------------------------------------------------
+# Membaca segment (memory-mapped)
+# ---------------------------------------------------------------------------
+
+class Segment:
+    """A memory-mapped segment file. Columns are decompressed on first access and cached."""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mmap[:len(MAGIC)] != MAGIC:
+            raise ValueError(f'{path} is not an attendance segment')
+        header_length = struct.unpack_from('<I', self._mmap, len(MAGIC))[0]
+        start = len(MAGIC) + 4
+        self.header = json.loads(self._mmap[start:start + header_length])
+        self._data_start = start + header_length
+        self._columns = {}
+
+    @property
+    def rows(self):
+        return self.header['rows']
+
+    def column(self, name):
+        if name not in self._columns:
+            meta = self.header['columns'][name]
+            begin = self._data_start + meta['offset']
+            raw = zlib.decompress(self._mmap[begin:begin + meta['length']])
+            if meta['dtype'] == 'json':
+                self._columns[name] = json.loads(raw)
+            else:
+                self._columns[name] = np.frombuffer(raw, dtype=meta['dtype'])
+        return self._columns[name]
+
+
+def open_segment(path):
+    """Open a segment through a small per-process LRU cache keyed by path and mtime."""
+    mtime = os.stat(path).st_mtime_ns
+    cached = _segment_cache.get(path)
+    if cached and cached[0] == mtime:
+        _segment_cache.move_to_end(path)
+        return cached[1]
+    segment = Segment(path)
+    _segment_cache[path] = (mtime, segment)
+    _segment_cache.move_to_end(path)
+    while len(_segment_cache) > _SEGMENT_CACHE_SIZE:
+        _segment_cache.popitem(last=False)
+    return segment
+
+
+def segments_for_range(start=None, end=None):
+    """Segments whose month overlaps [start, end] (None = unbounded)."""
+    segments = []
+    for month in archived_months():
+        if start and next_month(month) <= start:
+            continue
+        if end and month > end:
+            continue
+        segments.append(open_segment(segment_path(month)))
+    return segments
+
+
+def _selection(segment, start, end, employee_id):
+    """Boolean mask (or None for all rows) for the filters, computed on the numeric columns."""
+    mask = None
+    if start or end:
+        dates = segment.column('date')
+        mask = np.ones(len(dates), dtype=bool)
+        if start:
+            mask &= dates >= start.toordinal()
+        if end:
+            mask &= dates <= end.toordinal()
+    if employee_id is not None:
+        employee_mask = segment.column('employee_id') == int(employee_id)
+        mask = employee_mask if mask is None else (mask & employee_mask)
+    return mask
+
+
+def read_archived_arrays(columns, start=None, end=None, employee_id=None):
+    """Numeric columns of archived rows matching the filters, concatenated across segments."""
+    parts = {name: [] for name in columns}
+    for segment in segments_for_range(start, end):
+        mask = _selection(segment, start, end, employee_id)
+        for name in columns:
+            values = segment.column(name)
+            parts[name].append(values if mask is None else values[mask])
+    return {name: (np.concatenate(values) if values else np.empty(0, dtype=NUMERIC_COLUMNS[name]))
+            for name, values in parts.items()}
+
+
+def read_archived_rows(start=None, end=None, employee_id=None):
+    """Archived attendance as tuples in COLUMN_ORDER (same shape as the read-model queries)."""
+    rows = []
+    for segment in segments_for_range(start, end):
+        mask = _selection(segment, start, end, employee_id)
+        indexes = np.arange(segment.rows) if mask is None else np.flatnonzero(mask)
+        if len(indexes):
+            rows.extend(_segment_rows(segment, indexes))
+    return rows
+
+
+def _segment_rows(segment, indexes):
+    rows = []
+    ids = segment.column('id')[indexes].tolist()
+    employee_ids = segment.column('employee_id')[indexes].tolist()
+    statuses = segment.column('status')[indexes].tolist()
+    dates = segment.column('date')[indexes].tolist()
+    times = segment.column('time')[indexes].tolist()
+    times_out = segment.column('time_out')[indexes].tolist()
+    latitudes = segment.column('latitude')[indexes].tolist()
+    longitudes = segment.column('longitude')[indexes].tolist()
+    photos = segment.column('photo')
+    reasons = segment.column('reason')
+    for position, index in enumerate(indexes.tolist()):
+        latitude = latitudes[position]
+        longitude = longitudes[position]
+        rows.append((
+            ids[position],
+            employee_ids[position],
+            CODE_TO_STATUS[statuses[position]],
+            date.fromordinal(dates[position]),
+            _time_from_seconds(times[position]),
+            _time_from_seconds(times_out[position]) if times_out[position] >= 0 else None,
+            photos[index],
+            None if latitude != latitude else latitude,  # NaN -> None
+            None if longitude != longitude else longitude,
+            reasons[index],
+        ))
+    return rows
+
+
+# ---------------------------------------------------------------------------
+# Pengarsipan
+# ---------------------------------------------------------------------------
+
+def archive_cutoff(retention_months, today=None):
+    """First day of the oldest month that stays in the hot table."""
+    cutoff = month_start(today or date.today())
+    for _ in range(retention_months):
+        cutoff = (cutoff - timedelta(days=1)).replace(day=1)
+    return cutoff
+
+
+def archive_closed_months(retention_months=None, batch_size=None, today=None):
+    """Move every closed month older than the retention window into segment files.
+
+    Rows of a month that already has a segment are merged into a new version
+    of that segment. Hot rows are deleted in short batches only after the
+    segment has been written. Returns {month 'YYYY-MM': rows archived}.
+    """
+    from app.read_models import ATTENDANCE_COLUMNS
+    from app.change_log import change_log_suppressed
+
+    if retention_months is None:
+        retention_months = current_app.config.get('ATTENDANCE_RETENTION_MONTHS', 12)
+    batch_size = batch_size or current_app.config.get('OFFBOARDING_BATCH_SIZE', 500)
+    cutoff = archive_cutoff(retention_months, today)
+
+    oldest = db.session.execute(select(func.min(Attendance.date)).where(Attendance.date < cutoff)).scalar()
+    archived = {}
+    month = month_start(oldest) if oldest else cutoff
+    while month < cutoff:
+        following = next_month(month)
+        rows = db.session.execute(
+            select(*ATTENDANCE_COLUMNS).where(Attendance.date >= month, Attendance.date < following)
+        ).tuples().all()
+        if rows:
+            path = segment_path(month)
+            if os.path.exists(path):
+                # Gabungkan dengan segment lama (misal baris telat masuk), id baru menggantikan id lama
+                existing = {row[0]: row for row in read_archived_rows(month, following - timedelta(days=1))}
+                existing.update({row[0]: row for row in rows})
+                merged = list(existing.values())
+            else:
+                merged = rows
+            write_segment(month, _rows_to_columns(merged))
+
+            ids = [row[0] for row in rows]
+            for position in range(0, len(ids), batch_size):
+                # Baris pindah ke segment, bukan hilang dari riwayat: jangan dicatat sebagai delete untuk sinkron
+                with change_log_suppressed('archive'):
+                    db.session.execute(
+                        delete(Attendance).where(Attendance.id.in_(ids[position:position + batch_size]))
+                        .execution_options(synchronize_session=False)
+                    )
+                db.session.commit()  # Transaksi pendek per batch
+            archived[month.strftime('%Y-%m')] = len(rows)
+            logging.info(f"Archived {len(rows)} attendance rows of {month.strftime('%Y-%m')}.")
+        month = following
+    return archived
+
+
+# ---------------------------------------------------------------------------
+# Offboarding
+# ---------------------------------------------------------------------------
+
+def _employee_rows(segment, employee_ids):
+    return np.flatnonzero(np.isin(segment.column('employee_id'), np.asarray(employee_ids, dtype='<i8')))
+
+
+def count_employee_rows(employee_ids):
+    """Archived rows of the given employees across all segments."""
+    return sum(len(_employee_rows(open_segment(segment_path(month)), employee_ids)) for month in archived_months())
+
+
+def remove_employee_rows(employee_ids, on_removed=None):
+    """Rewrite every segment holding rows of employee_ids without them; returns the number of rows removed.
+
+    on_removed, if given, receives the removed rows of a segment (tuples in
+    COLUMN_ORDER) before the segment is rewritten. A segment left without
+    rows is deleted.
+    """
+    removed = 0
+    for month in archived_months():
+        path = segment_path(month)
+        segment = open_segment(path)
+        indexes = _employee_rows(segment, employee_ids)
+        if not len(indexes):
+            continue
+        if on_removed is not None:
+            on_removed(_segment_rows(segment, indexes))
+        keep = np.ones(segment.rows, dtype=bool)
+        keep[indexes] = False
+        if keep.any():
+            # Kolom disaring langsung, tanpa dekode ke tuple dan kembali
+            positions = np.flatnonzero(keep).tolist()
+            columns = {name: segment.column(name)[keep] for name in NUMERIC_COLUMNS}
+            columns.update({name: [segment.column(name)[i] for i in positions] for name in TEXT_COLUMNS})
+            write_segment(month, columns)
+        else:
+            os.remove(path)
+            _segment_cache.pop(path, None)
+        removed += len(indexes)
+        logging.info(f"Removed {len(indexes)} rows of employees {list(employee_ids)} from segment {path}.")
+    return removed
@@ -0,0 +1,185 @@
+"""Compact storage encoding for attendance columns.
+
+Attendance used to store its status as the enum name ('TIDAK_HADIR'), the
+date and times as ISO text ('2024-12-18', '08:00:00.000000') and 'N/A' as
+the reason of most rows. The compact encoding stores
+
+- status as a small integer (STATUS_CODES),
+- date as a day number (days since 1970-01-01),
+- time and time_out as seconds since midnight,
+- NULL instead of the 'N/A' placeholder (read back as 'N/A'),
+
+which makes rows and the (employee_id, date) index smaller and turns date
+and time range filters into integer comparisons. The column types below
+keep the Python side unchanged: Attendance.status is still an
+AttendanceStatus, date a date and time a time (to the second).
+
+Databases are converted online by migration f6b2d8e41a93. Until it has run
+the attendance table still has the old layout, so every pooled connection
+detects the layout of its database (re-checked at checkout whenever the
+schema changed) and the types bind values in the layout of the connection
+executing the statement. The main database, attendance shards and the
+aiosqlite engine can therefore have different layouts at the same time.
+Reading accepts both, so rows written by a process that had not yet
+noticed the switch still load.
+"""
+import sqlite3
+from contextvars import ContextVar
+from datetime import date, time
+from functools import lru_cache
+
+from sqlalchemy import Integer, SmallInteger, Text, event
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import Pool
+from sqlalchemy.types import TypeDecorator
+
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+NOT_AVAILABLE = 'N/A'
+
+# Layout koneksi yang sedang mengeksekusi statement (per thread / task); default ringkas (database baru dari create_all)
+_compact = ContextVar('attendance_compact', default=True)
+
+
+def day_number(value):
+    """Days since 1970-01-01 of a date (or datetime)."""
+    return value.toordinal() - EPOCH_ORDINAL
+
+
+@lru_cache(maxsize=1 << 16)  # Objek date/time immutable; nilai yang sama berulang di setiap laporan
+def from_day_number(value):
+    return date.fromordinal(value + EPOCH_ORDINAL)
+
+
+def seconds_of_day(value):
+    """Seconds since midnight of a time (or datetime); microseconds are dropped."""
+    return value.hour * 3600 + value.minute * 60 + value.second
+
+
+@lru_cache(maxsize=1 << 17)
+def from_seconds_of_day(value):
+    return time(value // 3600, value // 60 % 60, value % 60)
+
+
+class StatusCode(TypeDecorator):
+    """An Enum member stored as its integer code (legacy layout: the member name)."""
+
+    impl = SmallInteger
+    cache_ok = True
+
+    def __init__(self, enum_class, codes):
+        super().__init__()
+        self.enum_class = enum_class
+        self._codes = dict(codes)
+        self._members = {code: member for member, code in self._codes.items()}
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        if not isinstance(value, self.enum_class):
+            value = self.enum_class[value]  # Seperti db.Enum: string berisi nama member
+        return self._codes[value] if _compact.get() else value.name
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        if isinstance(value, int):
+            return self._members[value]
+        return self.enum_class[value]
+
+
+class DayNumber(TypeDecorator):
+    """A date stored as days since 1970-01-01 (legacy layout: 'YYYY-MM-DD')."""
+
+    impl = Integer
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        if _compact.get():
+            return day_number(value)
+        return f'{value.year:04d}-{value.month:02d}-{value.day:02d}'
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        if isinstance(value, int):
+            return from_day_number(value)
+        return date.fromisoformat(value[:10])
+
+
+class SecondsOfDay(TypeDecorator):
+    """A time of day stored as seconds since midnight (legacy layout: 'HH:MM:SS.ffffff')."""
+
+    impl = Integer
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        if _compact.get():
+            return seconds_of_day(value)
+        return f'{value.hour:02d}:{value.minute:02d}:{value.second:02d}.{value.microsecond:06d}'
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        if isinstance(value, int):
+            return from_seconds_of_day(value)
+        return time.fromisoformat(value)
+
+
+class OptionalText(TypeDecorator):
+    """Text where the 'N/A' placeholder is stored as NULL and read back as 'N/A'."""
+
+    impl = Text
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        return None if value == NOT_AVAILABLE else value
+
+    def process_result_value(self, value, dialect):
+        return NOT_AVAILABLE if value is None else value
+
+
+def _query(dbapi_connection, sql):
+    # Lewat cursor: juga berlaku untuk koneksi aiosqlite yang diadaptasi SQLAlchemy
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute(sql)
+        return cursor.fetchall()
+    finally:
+        cursor.close()
+
+
+def _attendance_is_compact(dbapi_connection):
+    columns = {row[1]: row[2] for row in _query(dbapi_connection, 'PRAGMA table_info(attendance)')}
+    if not columns:
+        return None  # Belum ada tabel attendance (create_all belum jalan)
+    return columns.get('date', '').upper() == 'INTEGER'
+
+
+def _check_layout(dbapi_connection, connection_record, connection_proxy=None):
+    # schema_version berubah setiap kali skema diubah (termasuk saat migrasi menukar tabel)
+    version = _query(dbapi_connection, 'PRAGMA schema_version')[0][0]
+    if connection_record.info.get('schema_version') != version:
+        connection_record.info['schema_version'] = version
+        connection_record.info['attendance_compact'] = _attendance_is_compact(dbapi_connection)
+
+
+@event.listens_for(Engine, 'before_execute')
+def _bind_layout(conn, clauseelement, multiparams, params, execution_options):
+    # Dipanggil sebelum parameter di-bind; None (belum ada tabel attendance) berarti create_all, jadi ringkas
+    compact = conn.connection.info.get('attendance_compact')
+    _compact.set(compact is not False)
+
+
+@event.listens_for(Pool, 'checkout')
+def _detect_layout(dbapi_connection, connection_record, connection_proxy):
+    if isinstance(dbapi_connection, sqlite3.Connection):
+        _check_layout(dbapi_connection, connection_record)
+
+
+def watch_layout(engine):
+    """Also detect the layout on connections of an engine whose driver is not sqlite3 (aiosqlite)."""
+    event.listen(engine, 'checkout', _check_layout)
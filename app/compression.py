@@ -0,0 +1,129 @@
+import gzip
+import logging
+import zlib
+
+from flask import request
+from werkzeug.http import parse_accept_header
+
+try:
+    import brotli  # Opsional: dipakai jika terpasang dan diminta klien
+except ImportError:
+    brotli = None
+
+DEFAULT_MIMETYPES = (
+    'application/json',
+    'text/html',
+    'text/plain',
+    'text/csv',
+)
+
+
+def _supported_encodings():
+    return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def _negotiate():
+    """Pick the best encoding the client accepts (q > 0), or None."""
+    return request.accept_encodings.best_match(_supported_encodings())
+
+
+def negotiate_encoding(accept_encoding):
+    """_negotiate() for a raw Accept-Encoding header (async handlers in app.asgi have no Flask request)."""
+    return parse_accept_header(accept_encoding).best_match(_supported_encodings())
+
+
+def compress_level(app, encoding):
+    return app.config.get('COMPRESS_BR_LEVEL', 4) if encoding == 'br' else app.config.get('COMPRESS_LEVEL', 6)
+
+
+def _should_compress(app, response):
+    if request.method == 'HEAD' or response.direct_passthrough:
+        return False
+    if response.status_code < 200 or response.status_code in (204, 304):
+        return False
+    if 'Content-Encoding' in response.headers or response.cache_control.no_transform:
+        return False
+    if response.mimetype not in app.config.get('COMPRESS_MIMETYPES', DEFAULT_MIMETYPES):
+        return False
+    if not response.is_streamed and response.calculate_content_length() < app.config.get('COMPRESS_MIN_SIZE', 1024):
+        return False
+    return True
+
+
+def _compress_bytes(data, encoding, level):
+    if encoding == 'br':
+        return brotli.compress(data, quality=level)
+    return gzip.compress(data, compresslevel=level, mtime=0)
+
+
+def _compressor(encoding, level):
+    # (compress, finish) untuk satu aliran
+    if encoding == 'br':
+        compressor = brotli.Compressor(quality=level)
+        return compressor.process, compressor.finish
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)  # wbits 16+: format gzip
+    return compressor.compress, compressor.flush
+
+
+def _compress_stream(chunks, encoding, level):
+    """Compress an iterable of chunks lazily, so streamed responses stay streamed."""
+    compress, finish = _compressor(encoding, level)
+    try:
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode('utf-8')
+            data = compress(chunk)
+            if data:
+                yield data
+        yield finish()
+    finally:
+        close = getattr(chunks, 'close', None)
+        if close:
+            close()
+
+
+async def compress_stream_async(chunks, encoding, level):
+    """_compress_stream for an async iterable of bytes."""
+    compress, finish = _compressor(encoding, level)
+    try:
+        async for chunk in chunks:
+            data = compress(chunk)
+            if data:
+                yield data
+        yield finish()
+    finally:
+        await chunks.aclose()
+
+
+def init_compression(app):
+    """Register negotiated gzip/brotli compression for responses above COMPRESS_MIN_SIZE."""
+
+    @app.after_request
+    def compress_response(response):
+        if not _should_compress(app, response):
+            return response
+
+        encoding = _negotiate()
+        response.vary.add('Accept-Encoding')
+        if not encoding:
+            return response
+
+        level = compress_level(app, encoding)
+
+        if response.is_streamed:
+            response.response = _compress_stream(response.response, encoding, level)
+            response.headers.pop('Content-Length', None)
+        else:
+            data = response.get_data()
+            response.set_data(_compress_bytes(data, encoding, level))
+            logging.debug(f"Compressed {request.path} with {encoding}: {len(data)} -> {response.content_length} bytes")
+
+        response.headers['Content-Encoding'] = encoding
+
+        # Representasi berubah, jadi ETag kuat diturunkan menjadi ETag lemah
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            response.set_etag(etag, weak=True)
+        return response
+
+    return compress_response
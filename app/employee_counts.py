@@ -0,0 +1,93 @@
+"""Maintained employee counts for /admin/list_employees totals.
+
+employee_counts holds one row per (gender, user status) with the number of
+employees in it. SQLite triggers on employees and users keep it current in
+the same transaction as every write, so a total is a read of a handful of
+rows instead of COUNT(*) over the table (and the join to users for the
+status filter). An employee whose user does not exist is counted under
+status -1.
+
+recount_employees() rebuilds the table from scratch, e.g. after restoring
+a backup taken before the triggers existed.
+"""
+from sqlalchemy import DDL, delete, event, func, insert, select
+
+from app import db
+from app.models import Employee, EmployeeCount, User
+
+_STATUS_OF = "COALESCE((SELECT status FROM users WHERE id = {user_id}), -1)"
+
+_INCREMENT = f"""
+    INSERT INTO employee_counts (gender, status, count) VALUES (NEW.gender, {_STATUS_OF.format(user_id='NEW.user_id')}, 1)
+    ON CONFLICT (gender, status) DO UPDATE SET count = count + 1;"""
+
+_DECREMENT = f"""
+    UPDATE employee_counts SET count = count - 1
+    WHERE gender = OLD.gender AND status = {_STATUS_OF.format(user_id='OLD.user_id')};"""
+
+
+def _move(old_status, new_status, user_id):
+    # Pindahkan semua employee milik satu user dari satu status ke status lain
+    return f"""
+    UPDATE employee_counts
+    SET count = count - (SELECT count(*) FROM employees WHERE user_id = {user_id} AND gender = employee_counts.gender)
+    WHERE status = {old_status};
+    INSERT INTO employee_counts (gender, status, count)
+    SELECT gender, {new_status}, count(*) FROM employees WHERE user_id = {user_id} GROUP BY gender
+    ON CONFLICT (gender, status) DO UPDATE SET count = count + excluded.count;"""
+
+
+TRIGGERS = {
+    'employee_counts_insert': f"""
+CREATE TRIGGER employee_counts_insert AFTER INSERT ON employees
+BEGIN{_INCREMENT}
+END""",
+    'employee_counts_update': f"""
+CREATE TRIGGER employee_counts_update AFTER UPDATE OF gender, user_id ON employees
+BEGIN{_DECREMENT}{_INCREMENT}
+END""",
+    'employee_counts_delete': f"""
+CREATE TRIGGER employee_counts_delete AFTER DELETE ON employees
+BEGIN{_DECREMENT}
+END""",
+    'employee_counts_user_status': f"""
+CREATE TRIGGER employee_counts_user_status AFTER UPDATE OF status ON users
+WHEN OLD.status IS NOT NEW.status
+BEGIN{_move('COALESCE(OLD.status, -1)', 'COALESCE(NEW.status, -1)', 'NEW.id')}
+END""",
+    'employee_counts_user_insert': f"""
+CREATE TRIGGER employee_counts_user_insert AFTER INSERT ON users
+BEGIN{_move('-1', 'COALESCE(NEW.status, -1)', 'NEW.id')}
+END""",
+    'employee_counts_user_delete': f"""
+CREATE TRIGGER employee_counts_user_delete AFTER DELETE ON users
+BEGIN{_move('COALESCE(OLD.status, -1)', '-1', 'OLD.id')}
+END""",
+}
+
+# db.create_all() ikut membuat trigger; database lama lewat migrasi
+for _name, _sql in TRIGGERS.items():
+    event.listen(db.metadata, 'after_create', DDL(_sql.strip()).execute_if(dialect='sqlite'))
+
+
+def employee_total(gender=None, status=None):
+    """Number of employees with the given gender and/or user status, from the maintained counts."""
+    stmt = select(func.coalesce(func.sum(EmployeeCount.count), 0))
+    if gender is not None:
+        stmt = stmt.where(EmployeeCount.gender == gender)
+    if status is not None:
+        stmt = stmt.where(EmployeeCount.status == status)
+    return db.session.execute(stmt).scalar()
+
+
+def recount_employees():
+    """Rebuild employee_counts with COUNT(*). Returns the total."""
+    db.session.execute(delete(EmployeeCount))
+    db.session.execute(insert(EmployeeCount).from_select(
+        ['gender', 'status', 'count'],
+        select(Employee.gender, func.coalesce(User.status, -1), func.count())
+        .select_from(Employee).outerjoin(User, User.id == Employee.user_id)
+        .group_by(Employee.gender, func.coalesce(User.status, -1)),
+    ))
+    db.session.commit()
+    return employee_total()
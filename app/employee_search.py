@@ -0,0 +1,263 @@
+"""Employee search by name, email and phone number.
+
+An FTS5 table with the trigram tokenizer indexes the three columns of
+employees; triggers on employees keep it in sync with every insert, update
+and delete, whatever the write path. A trigram index answers substring
+queries of three or more characters straight from the index, so prefix and
+"contains" matches cost one index lookup each.
+
+Typos are handled in two steps. Candidates are the employees sharing
+enough of the query's trigrams, taken from the rarest trigrams first (the
+fts5vocab table gives document counts) so a common trigram such as "an "
+does not pull in half the table. One typo in a short query leaves few
+trigrams intact ("alcie" shares none with "alice"), so queries shorter than
+SHORT_QUERY also look up the trigrams of the query with two adjacent
+letters swapped and accept any shared trigram. Candidates are then scored
+by the better of trigram similarity and Damerau-Levenshtein distance to the
+name, a name word or the email's local part (at most 1 edit up to five
+letters, 2 beyond). Scoring is done in Python (exact > prefix > word
+prefix > substring > fuzzy similarity) rather than with bm25, which would score every match and costs tens of milliseconds on a
+common name at 100k employees. The typo phase only runs when the query
+has fewer than EMPLOYEE_SEARCH_FUZZY_BELOW direct matches; each phase reads
+at most EMPLOYEE_SEARCH_CANDIDATES rows and at most
+EMPLOYEE_SEARCH_MAX_RESULTS results are ranked and paginated.
+
+Queries shorter than three characters only match name prefixes, through
+the NOCASE index on employees.name.
+"""
+import math
+import re
+from functools import lru_cache
+
+from flask import current_app
+from sqlalchemy import DDL, event, select, text
+
+from app import db
+from app.models import Employee
+from app.blob_store import photo_url
+
+FTS_TABLE = 'employee_search'
+
+DDL_STATEMENTS = [
+    f"""
+CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5(
+    name, email, phone_number, content='employees', content_rowid='id', tokenize='trigram'
+)""",
+    f"CREATE VIRTUAL TABLE {FTS_TABLE}_vocab USING fts5vocab({FTS_TABLE}, 'row')",
+    f"""
+CREATE TRIGGER employee_search_insert AFTER INSERT ON employees
+BEGIN
+    INSERT INTO {FTS_TABLE} (rowid, name, email, phone_number)
+    VALUES (NEW.id, NEW.name, NEW.email, NEW.phone_number);
+END""",
+    f"""
+CREATE TRIGGER employee_search_update AFTER UPDATE OF name, email, phone_number ON employees
+BEGIN
+    INSERT INTO {FTS_TABLE} ({FTS_TABLE}, rowid, name, email, phone_number)
+    VALUES ('delete', OLD.id, OLD.name, OLD.email, OLD.phone_number);
+    INSERT INTO {FTS_TABLE} (rowid, name, email, phone_number)
+    VALUES (NEW.id, NEW.name, NEW.email, NEW.phone_number);
+END""",
+    f"""
+CREATE TRIGGER employee_search_delete AFTER DELETE ON employees
+BEGIN
+    INSERT INTO {FTS_TABLE} ({FTS_TABLE}, rowid, name, email, phone_number)
+    VALUES ('delete', OLD.id, OLD.name, OLD.email, OLD.phone_number);
+END""",
+]
+
+# db.create_all() ikut membuat index FTS dan trigger; database lama lewat migrasi
+for _sql in DDL_STATEMENTS:
+    event.listen(db.metadata, 'after_create', DDL(_sql.strip()).execute_if(dialect='sqlite'))
+
+MATCH_EXACT = 4.0
+MATCH_PREFIX = 3.0
+MATCH_WORD_PREFIX = 2.0
+MATCH_SUBSTRING = 1.0
+
+SHORT_QUERY = 8  # Di bawah ini satu salah ketik bisa menghapus separuh trigram query
+
+_WORD_SPLIT = re.compile(r'[\s.@_+-]+')
+_LETTERS = re.compile(r'[^\W\d_]+')
+
+
+def normalize_query(query):
+    return ' '.join((query or '').split()).lower()
+
+
+def _phrase(value):
+    return '"' + value.replace('"', '""') + '"'
+
+
+@lru_cache(maxsize=16384)
+def _word_trigrams(word):
+    padded = f'  {word} '
+    return frozenset(padded[i:i + 3] for i in range(len(padded) - 2))
+
+
+def _trigrams(value):
+    """Padded trigrams of every word (as pg_trgm does; digits ignored), for similarity scoring."""
+    # Nama sangat berulang antar karyawan, jadi trigram per kata di-cache
+    return set().union(*map(_word_trigrams, _LETTERS.findall(value)))
+
+
+def similarity(query_grams, value):
+    """Share of the query's trigrams (from _trigrams) found in value (0..1)."""
+    return len(query_grams & _trigrams(value)) / len(query_grams) if query_grams else 0.0
+
+
+def _transposed(query):
+    """The query with each pair of adjacent characters swapped ("alcie" -> "laice", "aclie", "alice", "alcei")."""
+    return [query[:i] + query[i + 1] + query[i] + query[i + 2:]
+            for i in range(len(query) - 1) if query[i] != query[i + 1]]
+
+
+@lru_cache(maxsize=16384)  # Nama dan kata nama sangat berulang antar karyawan
+def edit_distance(a, b, limit):
+    """Damerau-Levenshtein distance (optimal string alignment) of a and b, capped at limit + 1."""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    before, previous = None, list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (a[i - 1] != b[j - 1]))
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], before[j - 2] + 1)  # Dua huruf bersebelahan tertukar
+        if min(current) > limit:
+            return limit + 1
+        before, previous = previous, current
+    return min(previous[-1], limit + 1)
+
+
+def _edit_similarity(query, name, email):
+    # 1 - edits / panjang query terhadap nama, kata nama atau bagian lokal email; 0 jika lebih dari batas edit
+    limit = 1 if len(query) <= 5 else 2
+    name = name.lower()
+    targets = [name, email.lower().split('@')[0], *_WORD_SPLIT.split(name)]
+    edits = min(edit_distance(query, target, limit) for target in targets)
+    return 1 - edits / len(query) if edits <= limit else 0.0
+
+
+def _score(query, name, email, phone_number):
+    """(score, match kind) of an employee that contains the normalized query."""
+    fields = (name.lower(), email.lower(), phone_number)
+    if query in fields:
+        return MATCH_EXACT, 'exact'
+    if any(field.startswith(query) for field in fields):
+        return MATCH_PREFIX, 'prefix'
+    if any(word.startswith(query) for field in fields[:2] for word in _WORD_SPLIT.split(field)):
+        return MATCH_WORD_PREFIX, 'prefix'
+    return MATCH_SUBSTRING, 'substring'
+
+
+def _fuzzy_score(query, query_grams, name, email):
+    # Salah ketik: dibandingkan dengan nama dan bagian lokal email
+    return max(similarity(query_grams, name.lower()), similarity(query_grams, email.lower().split('@')[0]),
+               _edit_similarity(query, name, email))
+
+
+_COLUMNS = 'e.id, e.name, e.gender, e.email, e.phone_number, e.photo_key'
+
+
+def _match_rows(match, limit):
+    return db.session.execute(text(
+        f"SELECT {_COLUMNS} FROM {FTS_TABLE} JOIN employees e ON e.id = {FTS_TABLE}.rowid "
+        f"WHERE {FTS_TABLE} MATCH :match LIMIT :limit"
+    ), {'match': match, 'limit': limit}).all()
+
+
+def _substring_candidates(query, limit):
+    """Employees containing the query (name prefixes first), at most limit rows."""
+    if len(query) < 3:
+        # Trigram tidak bisa mencari < 3 karakter: awalan nama lewat index NOCASE
+        pattern = query.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+        return db.session.execute(
+            select(Employee.id, Employee.name, Employee.gender, Employee.email, Employee.phone_number,
+                   Employee.photo_key)
+            .where(Employee.name.like(pattern, escape='\\'))
+            .order_by(Employee.name.collate('NOCASE')).limit(limit)
+        ).all()
+    # Awalan nama dulu, agar tidak terpotong batas kandidat saat kecocokan substring sangat banyak
+    rows = _match_rows(f'name : ^ {_phrase(query)}', limit)
+    if len(rows) < limit:
+        seen = {row[0] for row in rows}
+        rows += [row for row in _match_rows(_phrase(query), limit) if row[0] not in seen][:limit - len(rows)]
+    return rows
+
+
+def _fuzzy_candidates(query, limit, max_trigrams, max_postings):
+    """Employees sharing enough trigrams with the query, most shared first."""
+    short = len(query) < SHORT_QUERY
+    grams = sorted({variant[i:i + 3] for variant in [query] + (_transposed(query) if short else [])
+                    for i in range(len(variant) - 2)})
+    if not grams:
+        return []
+    bind = {f't{i}': gram for i, gram in enumerate(grams)}
+    counts = dict(db.session.execute(
+        text(f"SELECT term, doc FROM {FTS_TABLE}_vocab WHERE term IN ({', '.join(':' + name for name in bind)})"),
+        bind,
+    ).tuples().all())
+    # Trigram paling jarang dulu; trigram yang tidak ada di index (biasanya bagian yang salah ketik) dilewati
+    kept, postings = [], 0
+    for gram in sorted(counts, key=counts.get):
+        if kept and (len(kept) >= max_trigrams or postings + counts[gram] > max_postings):
+            break
+        kept.append(gram)
+        postings += counts[gram]
+    if not kept:
+        return []
+    union = ' UNION ALL '.join(
+        f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH :m{i}" for i in range(len(kept))
+    )
+    return db.session.execute(text(
+        f"SELECT {_COLUMNS} FROM (SELECT rowid, count(*) AS shared FROM ({union}) GROUP BY rowid "
+        f"HAVING shared >= :shared ORDER BY shared DESC, rowid LIMIT :limit) m JOIN employees e ON e.id = m.rowid"
+    ), {'shared': 1 if short else math.ceil(len(kept) / 2), 'limit': limit,
+        **{f'm{i}': _phrase(gram) for i, gram in enumerate(kept)}}).all()
+
+
+def search_employees(query, page=1, per_page=20):
+    """Ranked page of employees matching query: (rows, total, truncated)."""
+    config = current_app.config
+    query = normalize_query(query)
+    candidates = config.get('EMPLOYEE_SEARCH_CANDIDATES', 200)
+    max_results = config.get('EMPLOYEE_SEARCH_MAX_RESULTS', 100)
+    min_similarity = config.get('EMPLOYEE_SEARCH_MIN_SIMILARITY', 0.4)
+
+    rows = _substring_candidates(query, candidates)
+    truncated = len(rows) >= candidates
+    ranked = [(*_score(query, row[1], row[3], row[4]), row) for row in rows]
+
+    # Toleransi salah ketik hanya jika kecocokan langsung sedikit
+    if len(ranked) < config.get('EMPLOYEE_SEARCH_FUZZY_BELOW', 20) and len(query) >= 3:
+        seen = {row[0] for row in rows}
+        query_grams = _trigrams(query)
+        for row in _fuzzy_candidates(query, max_results, config.get('EMPLOYEE_SEARCH_FUZZY_TRIGRAMS', 8),
+                                     config.get('EMPLOYEE_SEARCH_FUZZY_POSTINGS', 5000)):
+            if row[0] not in seen:
+                score = _fuzzy_score(query, query_grams, row[1], row[3])
+                if score >= min_similarity:
+                    ranked.append((score, 'fuzzy', row))
+
+    ranked.sort(key=lambda item: (-item[0], item[2][1].lower(), item[2][0]))
+    if len(ranked) > max_results:
+        ranked, truncated = ranked[:max_results], True
+    start = (page - 1) * per_page
+    page_rows = [{
+        'id': id,
+        'name': name,
+        'gender': gender,
+        'email': email,
+        'phone_number': phone_number,
+        'photo_profile': photo_url(photo_key),
+        'match': kind,
+        'score': round(score, 3),
+    } for score, kind, (id, name, gender, email, phone_number, photo_key) in ranked[start:start + per_page]]
+    return page_rows, len(ranked), truncated
+
+
+def rebuild_search_index():
+    """Re-index every employee (after restoring a backup or bulk loading with triggers off)."""
+    db.session.execute(text(f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}) VALUES ('rebuild')"))
+    db.session.commit()
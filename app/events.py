@@ -0,0 +1,190 @@
+"""In-process pub/sub bus for attendance activity, served as Server-Sent Events.
+
+Routes publish small events after they commit. Every event gets an id
+'<epoch>-<seq>' and is kept in a ring buffer of the last EVENT_RING_SIZE
+events, so a reconnecting dashboard can resume with Last-Event-ID. Each
+subscriber has its own bounded buffer; a subscriber that falls behind is
+replayed from the ring, or told to reload ('reset') when the ring no longer
+has its position. Idle subscribers block on an Event and only wake for
+heartbeats; in ASGI mode (app.asgi) they await it on the event loop
+instead, so an open dashboard does not hold a thread.
+
+The bus is per process: dashboards see the events of the worker they are
+connected to.
+"""
+import itertools
+import json
+import os
+import threading
+import time
+from collections import deque
+
+from flask import current_app
+
+
+class Subscriber:
+    __slots__ = ('queue', 'wakeup', 'overflowed', 'start_seq')
+
+    def __init__(self, size, wakeup=None):
+        self.queue = deque(maxlen=size)
+        self.wakeup = wakeup or threading.Event()  # Async: event yang bisa di-set dari thread lain (app.asgi)
+        self.overflowed = False
+        self.start_seq = 0  # seq event terakhir saat berlangganan
+
+    def push(self, event):
+        if len(self.queue) == self.queue.maxlen:
+            self.overflowed = True  # Event tertua hilang; generator akan replay dari ring
+        self.queue.append(event)
+        self.wakeup.set()
+
+
+class EventBus:
+    def __init__(self, ring_size=1000, subscriber_buffer=100):
+        # epoch membedakan id dari proses/restart lain, supaya Last-Event-ID lama tidak salah dicocokkan
+        self.epoch = f'{os.getpid():x}{int(time.time()):x}'
+        self.subscriber_buffer = subscriber_buffer
+        self._seq = itertools.count(1)
+        self._ring = deque(maxlen=ring_size)
+        self._subscribers = set()
+        self._lock = threading.Lock()
+
+    def publish(self, event_type, data):
+        """Publish an event to every subscriber; returns its id."""
+        with self._lock:
+            seq = next(self._seq)
+            event_id = f'{self.epoch}-{seq}'
+            event = (event_id, event_type, json.dumps(data, default=str, separators=(',', ':')), seq)
+            self._ring.append(event)
+            for subscriber in self._subscribers:
+                subscriber.push(event)
+        return event_id
+
+    def subscribe(self, wakeup=None):
+        subscriber = Subscriber(self.subscriber_buffer, wakeup)
+        with self._lock:
+            subscriber.start_seq = self._ring[-1][3] if self._ring else 0
+            self._subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    @property
+    def subscriber_count(self):
+        return len(self._subscribers)
+
+    def since(self, last_event_id):
+        """Events after last_event_id from the ring, or None if it cannot be resumed."""
+        with self._lock:
+            ring = list(self._ring)
+        if not last_event_id:
+            return []
+        epoch, _, seq = last_event_id.rpartition('-')
+        if epoch != self.epoch or not seq.isdigit():
+            return None
+        seq = int(seq)
+        oldest = ring[0][3] if ring else seq + 1
+        if seq + 1 < oldest:
+            return None  # Sudah keluar dari ring
+        return [event for event in ring if event[3] > seq]
+
+
+def format_event(event):
+    event_id, event_type, data, _ = event
+    return f'id: {event_id}\nevent: {event_type}\ndata: {data}\n\n'
+
+
+WAIT = object()  # _frames menunggu event berikutnya atau heartbeat
+
+
+def _frames(bus, subscriber, last_event_id, retry_ms):
+    """SSE text for one subscriber, yielding WAIT where the caller waits on subscriber.wakeup."""
+    yield f'retry: {retry_ms}\n\n'
+    backlog = bus.since(last_event_id)
+    if backlog is None:
+        yield 'event: reset\ndata: {}\n\n'
+        backlog = []
+        last_seq = 0
+    else:
+        # Event yang masuk antrean selama backlog dikirim tidak dikirim dua kali
+        last_seq = int(last_event_id.rpartition('-')[2]) if last_event_id else subscriber.start_seq
+    for event in backlog:
+        last_seq = event[3]
+        yield format_event(event)
+
+    while True:
+        yield WAIT
+        if not subscriber.wakeup.is_set():
+            yield ': heartbeat\n\n'
+            continue
+        subscriber.wakeup.clear()
+
+        if subscriber.overflowed:
+            # Terlalu lambat: ambil ulang dari ring berdasarkan event terakhir yang terkirim
+            subscriber.overflowed = False
+            subscriber.queue.clear()
+            backlog = bus.since(f'{bus.epoch}-{last_seq}')
+            if backlog is None:
+                yield 'event: reset\ndata: {}\n\n'
+                backlog = []
+            for event in backlog:
+                last_seq = event[3]
+                yield format_event(event)
+            continue
+
+        while subscriber.queue:
+            event = subscriber.queue.popleft()
+            if event[3] <= last_seq:
+                continue
+            last_seq = event[3]
+            yield format_event(event)
+
+
+def stream_events(bus, last_event_id=None, heartbeat=15.0, retry_ms=3000):
+    """Generator of SSE text for one subscriber; runs without an app context."""
+    subscriber = bus.subscribe()
+    try:
+        for frame in _frames(bus, subscriber, last_event_id, retry_ms):
+            if frame is WAIT:
+                subscriber.wakeup.wait(heartbeat)
+            else:
+                yield frame
+    finally:
+        bus.unsubscribe(subscriber)
+
+
+async def stream_events_async(bus, wakeup, last_event_id=None, heartbeat=15.0, retry_ms=3000):
+    """stream_events for the event loop: wakeup is set by publishing threads and awaited here (app.asgi.LoopEvent)."""
+    subscriber = bus.subscribe(wakeup)
+    try:
+        for frame in _frames(bus, subscriber, last_event_id, retry_ms):
+            if frame is WAIT:
+                await wakeup.wait(heartbeat)
+            else:
+                yield frame
+    finally:
+        bus.unsubscribe(subscriber)
+
+
+def get_event_bus(app=None):
+    app = app or current_app
+    bus = app.extensions.get('event_bus')
+    if bus is None:
+        bus = app.extensions.setdefault('event_bus', EventBus(
+            app.config.get('EVENT_RING_SIZE', 1000), app.config.get('EVENT_SUBSCRIBER_BUFFER', 100)
+        ))
+    return bus
+
+
+def publish_attendance(event_type, attendance):
+    """Publish an attendance change ('clock_in', 'clock_out', 'leave') after commit."""
+    get_event_bus().publish(event_type, {
+        'id': attendance.id,
+        'employee_id': attendance.employee_id,
+        'status': attendance.status.value if attendance.status else None,
+        'date': attendance.date,
+        'time': attendance.time,
+        'time_out': attendance.time_out,
+        'late_minutes': attendance.late_minutes,
+    })
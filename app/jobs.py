@@ -0,0 +1,231 @@
+"""Durable background job queue stored in the `jobs` table.
+
+Requests only enqueue; a pool of worker threads claims due jobs, runs the
+registered handler and deletes the row on success. Failures are retried
+with exponential backoff. After max_attempts the job is dead-lettered
+(status 'dead') and kept for inspection. Jobs left 'running' by a crashed
+worker are re-queued once their lease expires.
+"""
+import json
+import logging
+import os
+import random
+import socket
+import threading
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import delete, select, update
+
+from app import db
+from app.models import Job
+
+_handlers = {}
+_idle_hooks = []
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def job_handler(kind):
+    """Register a function(payload) as the handler for jobs of this kind."""
+    def decorator(fn):
+        _handlers[kind] = fn
+        return fn
+    return decorator
+
+
+def on_worker_idle(fn):
+    """Register a function called on a worker thread when it finds no due jobs."""
+    _idle_hooks.append(fn)
+    return fn
+
+
+def enqueue(kind, payload=None, max_attempts=None, delay=0, commit=True):
+    """Persist a job and wake the local worker pool. Returns the Job."""
+    job = Job(
+        kind=kind,
+        payload=json.dumps(payload or {}),
+        max_attempts=max_attempts or current_app.config.get('JOB_MAX_ATTEMPTS', 5),
+        run_at=datetime.utcnow() + timedelta(seconds=delay),
+    )
+    db.session.add(job)
+    if commit:
+        db.session.commit()
+        ensure_worker_pool().wake()
+    return job
+
+
+def backoff_seconds(attempts, base=None, cap=None):
+    """Exponential backoff with jitter: base * 2^(attempts-1), capped."""
+    base = current_app.config.get('JOB_BACKOFF_BASE', 2.0) if base is None else base
+    cap = current_app.config.get('JOB_BACKOFF_MAX', 600) if cap is None else cap
+    delay = min(cap, base * (2 ** max(attempts - 1, 0)))
+    return delay * random.uniform(0.8, 1.2)
+
+
+def requeue_expired(lease_seconds=None):
+    """Put jobs whose worker lease expired back in the queue."""
+    lease_seconds = lease_seconds or current_app.config.get('JOB_LEASE', 300)
+    expired = datetime.utcnow() - timedelta(seconds=lease_seconds)
+    count = db.session.execute(
+        update(Job).where(Job.status == 'running', Job.locked_at < expired)
+        .values(status='queued', locked_by=None, locked_at=None)
+    ).rowcount
+    db.session.commit()
+    if count:
+        logging.warning(f"Re-queued {count} jobs with an expired lease.")
+    return count
+
+
+def retry_dead_jobs(kind=None):
+    """Re-queue dead-lettered jobs (optionally of one kind) with their attempt counter reset."""
+    stmt = update(Job).where(Job.status == 'dead')
+    if kind:
+        stmt = stmt.where(Job.kind == kind)
+    count = db.session.execute(
+        stmt.values(status='queued', attempts=0, run_at=datetime.utcnow(), last_error=None)
+    ).rowcount
+    db.session.commit()
+    return count
+
+
+def claim_jobs(worker, limit):
+    """Atomically mark up to limit due jobs as running for this worker and return them."""
+    now = datetime.utcnow()
+    due = (
+        select(Job.id).where(Job.status == 'queued', Job.run_at <= now)
+        .order_by(Job.run_at, Job.id).limit(limit)
+    )
+    rows = db.session.execute(
+        update(Job).where(Job.id.in_(due), Job.status == 'queued')
+        .values(status='running', locked_by=worker, locked_at=now, attempts=Job.attempts + 1)
+        .returning(Job.id, Job.kind, Job.payload, Job.attempts, Job.max_attempts)
+    ).all()
+    db.session.commit()
+    return rows
+
+
+def run_job(job):
+    """Run one claimed job row (id, kind, payload, attempts, max_attempts) and record the outcome."""
+    try:
+        handler = _handlers.get(job.kind)
+        if handler is None:
+            raise LookupError(f'No handler registered for job kind {job.kind!r}')
+        handler(json.loads(job.payload))
+    except Exception as e:
+        db.session.rollback()
+        error = f'{type(e).__name__}: {e}'
+        if job.attempts >= job.max_attempts:
+            # Dead-letter: disimpan untuk diperiksa, tidak dicoba lagi
+            db.session.execute(update(Job).where(Job.id == job.id).values(
+                status='dead', locked_by=None, locked_at=None, last_error=error))
+            logging.error(f"Job {job.id} ({job.kind}) dead after {job.attempts} attempts: {error}")
+        else:
+            delay = backoff_seconds(job.attempts)
+            db.session.execute(update(Job).where(Job.id == job.id).values(
+                status='queued', locked_by=None, locked_at=None, last_error=error,
+                run_at=datetime.utcnow() + timedelta(seconds=delay)))
+            logging.warning(f"Job {job.id} ({job.kind}) failed, retry in {delay:.1f}s: {error}")
+        db.session.commit()
+        return False
+
+    db.session.execute(delete(Job).where(Job.id == job.id))
+    db.session.commit()
+    return True
+
+
+class JobWorkerPool:
+    """Worker threads that poll the jobs table; wake() skips the poll interval after an enqueue."""
+
+    def __init__(self, app, workers):
+        self.app = app
+        self.workers = workers
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._threads = []
+
+    def start(self):
+        prefix = f'{socket.gethostname()}:{os.getpid()}'
+        for number in range(self.workers):
+            thread = threading.Thread(target=self._run, args=(f'{prefix}:{number}',),
+                                      name=f'job-worker-{number}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        logging.info(f"Started {self.workers} job workers.")
+        return self
+
+    def wake(self):
+        self._wake.set()
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        self._wake.set()
+        for thread in self._threads:
+            thread.join(timeout)
+
+    def _run(self, worker):
+        config = self.app.config
+        poll_interval = config.get('JOB_POLL_INTERVAL', 1.0)
+        batch_size = config.get('JOB_BATCH_SIZE', 20)
+        lease_check_every = config.get('JOB_LEASE', 300) / 2
+        last_lease_check = 0.0
+
+        with self.app.app_context():
+            while not self._stop.is_set():
+                try:
+                    now = datetime.utcnow().timestamp()
+                    if now - last_lease_check > lease_check_every:
+                        requeue_expired()
+                        last_lease_check = now
+
+                    jobs = claim_jobs(worker, batch_size)
+                    for job in jobs:
+                        run_job(job)
+                    if jobs:
+                        continue
+
+                    for hook in _idle_hooks:
+                        hook()
+                except Exception as e:
+                    db.session.rollback()
+                    logging.error(f"Job worker {worker} error: {e}")
+                finally:
+                    db.session.remove()
+
+                self._wake.wait(poll_interval)
+                self._wake.clear()
+
+            for hook in _idle_hooks:
+                hook()
+
+
+def start_job_workers(app):
+    """Start this process's pool now unless JOB_WORKERS is 0 (first request, ASGI startup)."""
+    if _pool is None and app.config.get('JOB_WORKERS', 2):
+        ensure_worker_pool(app)
+
+
+def init_jobs(app):
+    """Start the worker pool with the first request, not only on enqueue.
+
+    Jobs queued or backing off before a restart then run without waiting
+    for a new job to be enqueued. create_app() itself starts no threads.
+    """
+    @app.before_request
+    def _start_job_workers():
+        start_job_workers(app)
+
+
+def ensure_worker_pool(app=None):
+    """Start this process's worker pool on first use (JOB_WORKERS threads; 0 disables it)."""
+    global _pool
+    app = app or current_app._get_current_object()
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                workers = app.config.get('JOB_WORKERS', 2)
+                _pool = JobWorkerPool(app, workers)
+                if workers:
+                    _pool.start()
+    return _pool
@@ -0,0 +1,58 @@
+import json
+from datetime import date, datetime, time
+from enum import Enum
+
+from flask.json.provider import DefaultJSONProvider, _default as flask_default
+
+try:
+    import orjson  # Serializer native (opsional), jauh lebih cepat dari modul json standar
+except ImportError:
+    orjson = None
+
+
+def _default(o):
+    """Encode dates, times and enums directly; everything else as Flask does.
+
+    Dates and datetimes become ISO-8601 strings and times 'HH:MM:SS', so the
+    output matches the orjson path below.
+    """
+    if isinstance(o, datetime):
+        return o.isoformat(timespec='seconds')
+    if isinstance(o, date):
+        return o.isoformat()
+    if isinstance(o, time):
+        return o.isoformat(timespec='seconds')
+    if isinstance(o, Enum):
+        return o.value
+    return flask_default(o)
+
+
+def _orjson_dumps(obj, indent=False):
+    options = orjson.OPT_OMIT_MICROSECONDS | orjson.OPT_NON_STR_KEYS | orjson.OPT_SORT_KEYS
+    if indent:
+        options |= orjson.OPT_INDENT_2
+    return orjson.dumps(obj, default=_default, option=options)
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """JSON provider that uses orjson when installed and the stdlib otherwise."""
+
+    default = staticmethod(_default)
+
+    def dumps(self, obj, **kwargs):
+        # Argumen khusus modul json (cls, ensure_ascii, dll.) tetap lewat jalur standar
+        if orjson is None or set(kwargs) - {'indent', 'separators'}:
+            kwargs.setdefault('default', self.default)
+            kwargs.setdefault('ensure_ascii', self.ensure_ascii)
+            kwargs.setdefault('sort_keys', self.sort_keys)
+            return json.dumps(obj, **kwargs)
+        return _orjson_dumps(obj, indent=bool(kwargs.get('indent'))).decode('utf-8')
+
+    def response(self, *args, **kwargs):
+        if orjson is None:
+            return super().response(*args, **kwargs)
+
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        # Langsung bytes, tanpa decode/encode ulang
+        return self._app.response_class(_orjson_dumps(obj, indent) + b'\n', mimetype=self.mimetype)
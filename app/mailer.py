@@ -0,0 +1,92 @@
+import logging
+import smtplib
+import threading
+import time
+
+from flask import current_app
+
+from app.jobs import enqueue, job_handler, on_worker_idle
+
+# Satu koneksi SMTP per worker thread, dipakai ulang untuk banyak email
+_local = threading.local()
+
+
+def get_mail(app=None):
+    """The app's Flask-Mail state, set up on first use so flask_mail is not imported at startup."""
+    app = app or current_app
+    state = app.extensions.get('mail')
+    if state is None:
+        from flask_mail import Mail
+        state = Mail().init_app(app)
+    return state
+
+
+def _close_connection():
+    connection = getattr(_local, 'connection', None)
+    _local.connection = None
+    if connection is not None:
+        try:
+            connection.__exit__(None, None, None)
+        except Exception:
+            pass  # Server mungkin sudah memutus koneksi
+
+
+def _get_connection():
+    connection = getattr(_local, 'connection', None)
+    if connection is None:
+        connection = get_mail().connect().__enter__()
+        _local.connection = connection
+    _local.last_used = time.monotonic()
+    return connection
+
+
+@on_worker_idle
+def close_idle_connection():
+    """Close this thread's SMTP connection once it has been idle for MAIL_IDLE_TIMEOUT."""
+    if getattr(_local, 'connection', None) is None:
+        return
+    idle = time.monotonic() - getattr(_local, 'last_used', 0)
+    if idle >= current_app.config.get('MAIL_IDLE_TIMEOUT', 30):
+        _close_connection()
+
+
+@job_handler('send_email')
+def deliver_email(payload):
+    """Job handler: send one message over the thread's reused SMTP connection."""
+    from flask_mail import Message
+
+    mail = get_mail()  # Message() membaca app.extensions['mail'] untuk pengirim default
+    message = Message(
+        subject=payload['subject'],
+        recipients=payload['recipients'],
+        body=payload.get('body'),
+        html=payload.get('html'),
+        sender=payload.get('sender') or mail.default_sender,
+    )
+    try:
+        _get_connection().send(message)
+    except smtplib.SMTPResponseException:
+        raise  # Server menolak pesan ini saja (sudah RSET), koneksi masih bisa dipakai
+    except (smtplib.SMTPException, OSError):
+        # Koneksi bisa rusak; buang supaya retry membuka koneksi baru
+        _close_connection()
+        raise
+    logging.info(f"Email '{message.subject}' sent to {message.recipients}")
+
+
+def send_email_async(subject, recipients, body, html=None, sender=None):
+    """Queue an email for delivery by the job workers and return the job.
+
+    Raises RuntimeError when there is no sender (neither sender nor
+    MAIL_DEFAULT_SENDER), instead of queueing a job that can only fail.
+    """
+    sender = sender or current_app.config.get('MAIL_DEFAULT_SENDER')
+    if not sender:
+        raise RuntimeError('No email sender configured: set MAIL_DEFAULT_SENDER (or MAIL_USERNAME)')
+    return enqueue('send_email', {
+        'subject': subject,
+        'recipients': list(recipients),
+        'body': body,
+        'html': html,
+        'sender': sender,
+    })
@@ -1,3 +1,4 @@
+import json
 import logging
 from flask import current_app
 import jwt
@@ -7,9 +8,9 @@ from sqlalchemy import Column, Integer, DateTime, Text, Float, Time, ForeignKey
 from sqlalchemy.ext.declarative import declarative_base
 from enum import Enum
 from sqlalchemy import Enum as SQLAlchemyEnum
-from logging.handlers import RotatingFileHandler
 from flask_sqlalchemy import SQLAlchemy
 from werkzeug.utils import secure_filename
+from app.compact_storage import DayNumber, OptionalText, SecondsOfDay, StatusCode
 
 
 Base = declarative_base()
@@ -17,14 +18,6 @@ Base = declarative_base()
 # Impor db di bagian bawah file
 from . import db
 
-# Konfigurasi Logging
-logging.basicConfig(level=logging.INFO,
-                    format='%(asctime)s - %(levelname)s - %(message)s',
-                    handlers=[
-                        logging.StreamHandler(),
-                        RotatingFileHandler('app.log', maxBytes=1000000, backupCount=5)
-                    ])
-
 # Model User
 class User(db.Model, UserMixin):
     __tablename__ = 'users'
@@ -57,11 +50,25 @@ class Employee(db.Model):
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     name = db.Column(db.String(255), nullable=False)
     gender = db.Column(db.String(6), nullable=False)
-    photo_profile = db.Column(db.Text)
+    photo_profile = db.deferred(db.Column(db.Text))  # Data foto inline lama; foto baru disimpan di blob store
+    photo_key = db.Column(db.String(80))  # Referensi blob foto profil (lihat app/blob_store.py)
     email = db.Column(db.String(255), nullable=False, unique=True)
     phone_number = db.Column(db.String(15), nullable=False)
     password = db.Column(db.String(255), nullable=False)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    site_id = db.Column(db.Integer, db.ForeignKey('location_settings.id'), default=None)  # Lokasi kerja (kalender per site)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)  # NULL untuk karyawan yang dibuat sebelum kolom ini ada
+
+    __table_args__ = (
+        # Pencarian awalan nama (LIKE 'ab%') tanpa membedakan huruf besar/kecil, lihat app/employee_search.py;
+        # juga urutan sort=name di /admin/list_employees (rowid ikut di index sebagai pemecah seri)
+        db.Index('ix_employees_name_nocase', db.text('name COLLATE NOCASE')),
+        # Filter + urutan keyset /admin/list_employees
+        db.Index('ix_employees_gender_name', 'gender', db.text('name COLLATE NOCASE')),
+        db.Index('ix_employees_gender_id', 'gender', 'id'),
+        db.Index('ix_employees_created_at', 'created_at'),
+        db.Index('ix_employees_user_id', 'user_id'),
+    )
 
     # Relasi ke User
     user = db.relationship('User', back_populates='employees')
@@ -76,20 +83,40 @@ class AttendanceStatus(Enum):
     TIDAK_HADIR = "TIDAK HADIR"
     HADIR = "HADIR"
 
+# Kode numerik status attendance (uint8); 0 dicadangkan untuk hari libur / tanpa data.
+# Urutan kode naik sesuai "kehadiran", sehingga nilai terbesar menang jika ada beberapa catatan di hari yang sama.
+STATUS_CODES = {
+    AttendanceStatus.ALPHA: 1,
+    AttendanceStatus.TIDAK_HADIR: 2,
+    AttendanceStatus.IJIN: 3,
+    AttendanceStatus.HADIR: 4,
+}
+
 # Model Attendance
 class Attendance(db.Model):
     __tablename__ = 'attendance'
 
     id = db.Column(db.Integer, primary_key=True)
     employee_id = db.Column(db.Integer, db.ForeignKey('employees.user_id'), nullable=False)  # Foreign key ke employees
-    status = db.Column(db.Enum(AttendanceStatus), nullable=False, default=AttendanceStatus.ALPHA)
-    date = db.Column(db.Date, nullable=False)  # Menyimpan tanggal presensi
-    time = db.Column(db.Time, nullable=False)  # Waktu masuk
-    time_out = db.Column(db.Time, default=None)  # Waktu keluar
+    # Penyimpanan ringkas (app.compact_storage): kode status, nomor hari, detik sejak tengah malam
+    status = db.Column(StatusCode(AttendanceStatus, STATUS_CODES), nullable=False, default=AttendanceStatus.ALPHA)
+    date = db.Column(DayNumber, nullable=False)  # Menyimpan tanggal presensi
+    time = db.Column(SecondsOfDay, nullable=False)  # Waktu masuk
+    time_out = db.Column(SecondsOfDay, default=None)  # Waktu keluar
     photo = db.Column(db.Text, default=None)  # Lokasi file foto
     latitude = db.Column(db.Float, default=None)
     longitude = db.Column(db.Float, default=None)
-    reason = db.Column(db.Text, default="N/A")  # Alasan jika 'IJIN' atau lainnya
+    reason = db.Column(OptionalText, default=None)  # Alasan jika 'IJIN' atau lainnya ('N/A' disimpan sebagai NULL, dibaca kembali 'N/A')
+    shift_id = db.Column(db.Integer, db.ForeignKey('shift_templates.id'), default=None)  # Shift yang cocok saat clock-in
+    late_minutes = db.Column(db.Integer, default=None)  # Menit terlambat setelah masa toleransi shift
+    photo_hash = db.Column(db.BigInteger, default=None)  # dHash 64-bit foto (signed), untuk deteksi foto dipakai ulang
+
+    # Index untuk query per employee (recap, status hari ini, penghapusan bertahap), date berupa nomor hari.
+    # AUTOINCREMENT: id tidak dipakai ulang setelah baris lama dipindah ke cold storage.
+    __table_args__ = (
+        db.Index('ix_attendance_employee_id_day', 'employee_id', 'date'),
+        {'sqlite_autoincrement': True},
+    )
 
     # Relasi ke Employee
     employee = db.relationship('Employee', back_populates='attendances', lazy=True)
@@ -101,8 +128,8 @@ class Attendance(db.Model):
                 logging.info(f"Creating new attendance record for employee ID: {self.employee_id}")
             else:
                 logging.info(f"Updating attendance record ID: {self.id} for employee ID: {self.employee_id}")
-            db.session.add(self)
-            db.session.commit()
+            from app.attendance_shards import save_attendance  # Ke database utama atau shard employee
+            save_attendance(self)
         except Exception as e:
             db.session.rollback()
             logging.error(f"Error saving attendance: {e}")
@@ -129,7 +156,7 @@ class Attendance(db.Model):
                 photo=secure_filename(photo) if photo else None,
                 latitude=latitude,
                 longitude=longitude,
-                reason=reason or "N/A"
+                reason=reason or None
             )
             new_attendance.save()
             return new_attendance
@@ -140,7 +167,10 @@ class Attendance(db.Model):
     @classmethod
     def get_attendance_by_date(cls, employee_id, date):
         """Get attendance for a specific date"""
-        return cls.query.filter_by(employee_id=employee_id, date=date).first()
+        from app.attendance_shards import attendance_session
+
+        with attendance_session(employee_id) as session:
+            return session.execute(db.select(cls).filter_by(employee_id=employee_id, date=date).limit(1)).scalar()
 
     @property
     def formatted_status(self):
@@ -184,3 +214,268 @@ class LocationSetting(db.Model):
         db.session.add(self)
         db.session.commit()
 
+
+
+# Model VersionStamp: penanda versi per tabel / per employee untuk validasi cache (ETag)
+class VersionStamp(db.Model):
+    __tablename__ = 'version_stamps'
+
+    key = db.Column(db.String(64), primary_key=True)  # contoh: 'employees', 'attendance:12'
+    version = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<VersionStamp {self.key} v{self.version}>"
+
+
+# Model AttendanceArchive: salinan attendance karyawan yang sudah di-offboard
+class AttendanceArchive(db.Model):
+    __tablename__ = 'attendance_archive'
+
+    id = db.Column(db.Integer, primary_key=True)  # Sama dengan id attendance asli
+    employee_id = db.Column(db.Integer, nullable=False, index=True)
+    status = db.Column(db.Enum(AttendanceStatus), nullable=False)
+    date = db.Column(db.Date, nullable=False)
+    time = db.Column(db.Time, nullable=False)
+    time_out = db.Column(db.Time, default=None)
+    photo = db.Column(db.Text, default=None)
+    latitude = db.Column(db.Float, default=None)
+    longitude = db.Column(db.Float, default=None)
+    reason = db.Column(db.Text, default=None)
+    archived_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+
+# Model OffboardingJob: progres penghapusan/pengarsipan bertahap, bisa dilanjutkan jika terputus
+class OffboardingJob(db.Model):
+    __tablename__ = 'offboarding_jobs'
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_ids = db.Column(db.Text, nullable=False)  # JSON list user_id yang akan di-offboard
+    completed_user_ids = db.Column(db.Text, nullable=False, default='[]')  # JSON list user_id yang sudah selesai
+    archive = db.Column(db.Boolean, nullable=False, default=False)
+    status = db.Column(db.String(16), nullable=False, default='pending')  # pending, running, done, failed
+    total_rows = db.Column(db.Integer, nullable=False, default=0)
+    deleted_rows = db.Column(db.Integer, nullable=False, default=0)
+    archived_rows = db.Column(db.Integer, nullable=False, default=0)
+    error = db.Column(db.Text, default=None)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'user_ids': json.loads(self.user_ids),
+            'completed_user_ids': json.loads(self.completed_user_ids),
+            'archive': self.archive,
+            'status': self.status,
+            'total_rows': self.total_rows,
+            'deleted_rows': self.deleted_rows,
+            'archived_rows': self.archived_rows,
+            'progress': round(self.deleted_rows / self.total_rows, 4) if self.total_rows else (1.0 if self.status == 'done' else 0.0),
+            'error': self.error,
+            'created_at': self.created_at,
+            'updated_at': self.updated_at
+        }
+
+    def __repr__(self):
+        return f"<OffboardingJob {self.id} {self.status} {self.deleted_rows}/{self.total_rows}>"
+
+
+# Model Job: antrean pekerjaan latar belakang (email, tugas lambat) yang tersimpan di SQLite
+class Job(db.Model):
+    __tablename__ = 'jobs'
+
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(64), nullable=False)  # Nama handler, contoh: 'send_email'
+    payload = db.Column(db.Text, nullable=False, default='{}')  # JSON
+    status = db.Column(db.String(16), nullable=False, default='queued')  # queued, running, dead
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False, default=5)
+    run_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)  # Jadwal percobaan berikutnya
+    locked_by = db.Column(db.String(64), default=None)
+    locked_at = db.Column(db.DateTime, default=None)
+    last_error = db.Column(db.Text, default=None)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    __table_args__ = (db.Index('ix_jobs_status_run_at', 'status', 'run_at'),)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'kind': self.kind,
+            'payload': json.loads(self.payload),
+            'status': self.status,
+            'attempts': self.attempts,
+            'max_attempts': self.max_attempts,
+            'run_at': self.run_at,
+            'last_error': self.last_error,
+            'created_at': self.created_at
+        }
+
+    def __repr__(self):
+        return f"<Job {self.id} {self.kind} {self.status} attempt {self.attempts}/{self.max_attempts}>"
+
+
+# Model RevokedToken: jti token JWT yang dicabut (logout); id naik terus agar worker lain bisa sinkron "id > terakhir"
+class RevokedToken(db.Model):
+    __tablename__ = 'revoked_tokens'
+
+    id = db.Column(db.Integer, primary_key=True)
+    jti = db.Column(db.String(64), nullable=False, unique=True)
+    user_id = db.Column(db.Integer, default=None)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)  # Setelah ini baris boleh dihapus
+    revoked_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    __table_args__ = ({'sqlite_autoincrement': True},)
+
+    def __repr__(self):
+        return f"<RevokedToken {self.jti} until {self.expires_at}>"
+
+
+# Model ShiftTemplate: jam kerja yang bisa dipakai ulang; end_time <= start_time berarti shift malam (lewat tengah malam)
+class ShiftTemplate(db.Model):
+    __tablename__ = 'shift_templates'
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(64), nullable=False, unique=True)
+    start_time = db.Column(db.Time, nullable=False)
+    end_time = db.Column(db.Time, nullable=False)
+    grace_minutes = db.Column(db.Integer, nullable=False, default=0)  # Toleransi keterlambatan
+    weekdays = db.Column(db.Integer, nullable=False, default=0b1111111)  # Bit 0 = Senin ... bit 6 = Minggu
+
+    @property
+    def overnight(self):
+        return self.end_time <= self.start_time
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'name': self.name,
+            'start_time': self.start_time.strftime('%H:%M:%S'),
+            'end_time': self.end_time.strftime('%H:%M:%S'),
+            'grace_minutes': self.grace_minutes,
+            'weekdays': [day for day in range(7) if self.weekdays >> day & 1],
+            'overnight': self.overnight
+        }
+
+    def __repr__(self):
+        return f"<ShiftTemplate {self.name} {self.start_time}-{self.end_time}>"
+
+
+# Model ShiftAssignment: employee memakai template shift pada rentang tanggal (end_date None = tanpa batas)
+class ShiftAssignment(db.Model):
+    __tablename__ = 'shift_assignments'
+
+    id = db.Column(db.Integer, primary_key=True)
+    employee_id = db.Column(db.Integer, db.ForeignKey('employees.user_id'), nullable=False, index=True)
+    template_id = db.Column(db.Integer, db.ForeignKey('shift_templates.id'), nullable=False, index=True)
+    start_date = db.Column(db.Date, nullable=False)
+    end_date = db.Column(db.Date, default=None)
+
+    template = db.relationship('ShiftTemplate', lazy='joined')
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'employee_id': self.employee_id,
+            'template_id': self.template_id,
+            'template': self.template.name if self.template else None,
+            'start_date': self.start_date.strftime('%Y-%m-%d'),
+            'end_date': self.end_date.strftime('%Y-%m-%d') if self.end_date else None
+        }
+
+    def __repr__(self):
+        return f"<ShiftAssignment employee {self.employee_id} template {self.template_id} from {self.start_date}>"
+
+
+# Model Holiday: libur nasional, libur perusahaan, dan pengecualian per site (is_working=True = hari kerja pengganti)
+class Holiday(db.Model):
+    __tablename__ = 'holidays'
+
+    id = db.Column(db.Integer, primary_key=True)
+    date = db.Column(db.Date, nullable=False, index=True)
+    name = db.Column(db.String(120), nullable=False)
+    scope = db.Column(db.String(16), nullable=False, default='national')  # national, company, site
+    site_id = db.Column(db.Integer, db.ForeignKey('location_settings.id'), default=None)  # Wajib untuk scope 'site'
+    is_working = db.Column(db.Boolean, nullable=False, default=False)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'date': self.date.strftime('%Y-%m-%d'),
+            'name': self.name,
+            'scope': self.scope,
+            'site_id': self.site_id,
+            'is_working': self.is_working
+        }
+
+    def __repr__(self):
+        return f"<Holiday {self.date} {self.name} ({self.scope})>"
+
+
+# Model AttendanceFlag: catatan presensi yang mencurigakan (foto dipakai ulang, dll.) untuk ditinjau admin
+class AttendanceFlag(db.Model):
+    __tablename__ = 'attendance_flags'
+
+    id = db.Column(db.Integer, primary_key=True)
+    attendance_id = db.Column(db.Integer, db.ForeignKey('attendance.id'), nullable=False, index=True)
+    employee_id = db.Column(db.Integer, nullable=False, index=True)
+    kind = db.Column(db.String(32), nullable=False)  # photo_reuse, ...
+    related_attendance_id = db.Column(db.Integer, default=None)  # Presensi lain yang menjadi pembanding
+    score = db.Column(db.Float, default=None)  # Arti tergantung kind (photo_reuse: jarak hamming)
+    detail = db.Column(db.String(255), default=None)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'attendance_id': self.attendance_id,
+            'employee_id': self.employee_id,
+            'kind': self.kind,
+            'related_attendance_id': self.related_attendance_id,
+            'score': self.score,
+            'detail': self.detail,
+            'created_at': self.created_at.strftime('%Y-%m-%d %H:%M:%S')
+        }
+
+    def __repr__(self):
+        return f"<AttendanceFlag {self.kind} attendance {self.attendance_id}>"
+
+
+# Model AttendanceChange: log perubahan attendance (diisi trigger SQLite, lihat app/change_log.py) untuk sinkron delta
+class AttendanceChange(db.Model):
+    __tablename__ = 'attendance_changes'
+
+    seq = db.Column(db.Integer, primary_key=True)  # Cursor sinkron; naik terus (AUTOINCREMENT)
+    attendance_id = db.Column(db.Integer, nullable=False)
+    employee_id = db.Column(db.Integer, nullable=False)
+    op = db.Column(db.String(1), nullable=False)  # I(nsert), U(pdate), D(elete)
+    changed_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('ix_attendance_changes_employee_id_seq', 'employee_id', 'seq'),
+        {'sqlite_autoincrement': True},
+    )
+
+    def __repr__(self):
+        return f"<AttendanceChange {self.seq} {self.op} attendance {self.attendance_id}>"
+
+
+# Model ChangeLogSuppression: selama ada baris di sini (dalam satu transaksi), trigger tidak mencatat perubahan
+class ChangeLogSuppression(db.Model):
+    __tablename__ = 'change_log_suppressions'
+
+    id = db.Column(db.Integer, primary_key=True)
+    reason = db.Column(db.String(32), nullable=False)  # archive, offboarding
+
+
+# Model EmployeeCount: jumlah karyawan per (gender, status user), dijaga trigger SQLite (lihat app/employee_counts.py)
+class EmployeeCount(db.Model):
+    __tablename__ = 'employee_counts'
+
+    gender = db.Column(db.String(6), primary_key=True)
+    status = db.Column(db.Integer, primary_key=True)  # User.status; -1 jika user tidak ada
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<EmployeeCount {self.gender}/{self.status}: {self.count}>"
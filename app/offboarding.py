@@ -0,0 +1,201 @@
+import json
+import logging
+import threading
+import time
+from datetime import datetime
+
+from flask import current_app
+from sqlalchemy import delete, func, insert, select
+
+from app import db
+from app.attendance_shards import attendance_sources, get_shards, read_everywhere, read_source
+from app.models import Attendance, AttendanceArchive, AttendanceFlag, Employee, OffboardingJob, User, ShiftAssignment
+from app.version_stamps import bump_stamps, attendance_key, ATTENDANCE_KEY
+from app.change_log import change_log_suppressed
+
+ARCHIVE_COLUMNS = ('id', 'employee_id', 'status', 'date', 'time', 'time_out', 'photo', 'latitude', 'longitude', 'reason')
+
+
+def create_offboarding_job(user_ids, archive=False):
+    """Register an offboarding job for one or many users and return it (not started)."""
+    from app.cold_storage import count_employee_rows  # numpy dimuat saat dipakai
+
+    user_ids = sorted({int(user_id) for user_id in user_ids})
+    # Attendance.employee_id mereferensikan employees.user_id, jadi filter memakai user_id
+    total = sum(count for count, in read_everywhere(
+        select(func.count()).select_from(Attendance).where(Attendance.employee_id.in_(user_ids))
+    )) + count_employee_rows(user_ids)
+    job = OffboardingJob(user_ids=json.dumps(user_ids), archive=archive, total_rows=total)
+    db.session.add(job)
+    db.session.commit()
+    logging.info(f"Offboarding job {job.id} created for users {user_ids} ({total} attendance rows, archive={archive}).")
+    return job
+
+
+def _archive_rows(session, ids):
+    # Lewat Python, bukan INSERT ... SELECT: attendance memakai encoding ringkas, arsip encoding lama
+    columns = [getattr(Attendance, name) for name in ARCHIVE_COLUMNS]
+    rows = session.execute(select(*columns).where(Attendance.id.in_(ids))).all()
+    # OR IGNORE: batch shard yang diulang setelah terputus menemukan arsipnya sudah ada (id sama)
+    db.session.execute(insert(AttendanceArchive).prefix_with('OR IGNORE'), [dict(zip(ARCHIVE_COLUMNS, row)) for row in rows])
+    return len(rows)
+
+
+def _delete_batch(user_id, batch_size, archive):
+    """Delete (and optionally archive) at most batch_size attendance rows of one user in one short transaction.
+
+    With sharded attendance the rows are taken from the main table first
+    (rows not rebalanced yet), then from the shards. A shard batch commits
+    the archive and flag deletes in the main database before deleting from
+    the shard, so an interrupted batch is redone without losing rows.
+    """
+    for index in attendance_sources():
+        ids = [row.id for row in read_source(
+            index, select(Attendance.id).where(Attendance.employee_id == user_id).limit(batch_size)
+        )]
+        if ids:
+            break
+    else:
+        return 0, 0
+
+    if index is None:
+        archived = _archive_rows(db.session, ids) if archive else 0
+        db.session.execute(
+            delete(AttendanceFlag).where(AttendanceFlag.attendance_id.in_(ids)).execution_options(synchronize_session=False)
+        )
+        # Employee ikut dihapus, jadi tidak ada klien yang perlu menerima delete ini lewat sinkron
+        with change_log_suppressed('offboarding'):
+            deleted = db.session.execute(
+                delete(Attendance).where(Attendance.id.in_(ids)).execution_options(synchronize_session=False)
+            ).rowcount
+        bump_stamps(db.session.connection(), [ATTENDANCE_KEY, attendance_key(user_id)])
+        return deleted, archived
+
+    with get_shards().session_at(index) as session:
+        archived = _archive_rows(session, ids) if archive else 0
+        db.session.execute(
+            delete(AttendanceFlag).where(AttendanceFlag.attendance_id.in_(ids)).execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+        # Shard tidak punya trigger change log; stamp attendance:<employee_id> ada di shard-nya
+        deleted = session.execute(
+            delete(Attendance).where(Attendance.id.in_(ids)).execution_options(synchronize_session=False)
+        ).rowcount
+        bump_stamps(session.connection(), [attendance_key(user_id)])
+        session.commit()
+    bump_stamps(db.session.connection(), [ATTENDANCE_KEY])
+    return deleted, archived
+
+
+def _remove_cold_rows(user_id, archive):
+    """Remove the user's rows from the cold-storage segments (copied to attendance_archive first when archive)."""
+    from app.cold_storage import remove_employee_rows
+
+    archived = []
+
+    def keep(rows):
+        # Di-commit sebelum segment ditulis ulang; diulang setelah terputus, OR IGNORE melewati yang sudah ada
+        db.session.execute(insert(AttendanceArchive).prefix_with('OR IGNORE'),
+                           [dict(zip(ARCHIVE_COLUMNS, row)) for row in rows])
+        db.session.commit()
+        archived.append(len(rows))
+
+    removed = remove_employee_rows([user_id], keep if archive else None)
+    if removed:
+        bump_stamps(db.session.connection(), [ATTENDANCE_KEY])  # Laporan membaca segment juga
+    return removed, sum(archived)
+
+
+def _remove_employee_and_user(user_id):
+    for assignment in ShiftAssignment.query.filter_by(employee_id=user_id).all():
+        db.session.delete(assignment)
+    employee = Employee.query.filter_by(user_id=user_id).first()
+    if employee:
+        db.session.delete(employee)
+        logging.info(f"Deleted employee with ID: {employee.id}")
+    user = db.session.get(User, user_id)
+    if user:
+        db.session.delete(user)
+        logging.info(f"Deleted user with ID: {user.id}")
+
+
+def run_offboarding_job(job_id, batch_size=None, pause=None):
+    """Run (or resume) an offboarding job to completion.
+
+    Attendance is removed in batches of batch_size rows, each in its own short
+    transaction, sleeping pause seconds between batches so clock-ins can take
+    the SQLite write lock. Progress is committed with every batch, so an
+    interrupted job resumes where it stopped. Rows already moved to
+    cold-storage segments are removed by rewriting those segments (and
+    archived like the others when the job archives).
+    """
+    batch_size = batch_size or current_app.config.get('OFFBOARDING_BATCH_SIZE', 500)
+    pause = current_app.config.get('OFFBOARDING_PAUSE', 0.05) if pause is None else pause
+
+    job = db.session.get(OffboardingJob, job_id)
+    if job is None:
+        raise ValueError(f'Offboarding job {job_id} not found')
+    if job.status == 'done':
+        return job
+
+    job.status = 'running'
+    job.error = None
+    job.updated_at = datetime.utcnow()
+    db.session.commit()
+
+    try:
+        completed = json.loads(job.completed_user_ids)
+        for user_id in json.loads(job.user_ids):
+            if user_id in completed:
+                continue
+
+            while True:
+                deleted, archived = _delete_batch(user_id, batch_size, job.archive)
+                if not deleted:
+                    break
+                job.deleted_rows += deleted
+                job.archived_rows += archived
+                job.updated_at = datetime.utcnow()
+                db.session.commit()  # Transaksi pendek per batch
+                time.sleep(pause)
+
+            deleted, archived = _remove_cold_rows(user_id, job.archive)
+            job.deleted_rows += deleted
+            job.archived_rows += archived
+            _remove_employee_and_user(user_id)
+            completed.append(user_id)
+            job.completed_user_ids = json.dumps(completed)
+            job.updated_at = datetime.utcnow()
+            db.session.commit()
+            logging.info(f"Offboarding job {job.id}: user {user_id} done ({job.deleted_rows}/{job.total_rows} rows).")
+
+        job.status = 'done'
+        job.updated_at = datetime.utcnow()
+        db.session.commit()
+        logging.info(f"Offboarding job {job.id} finished.")
+    except Exception as e:
+        db.session.rollback()
+        job = db.session.get(OffboardingJob, job_id)
+        job.status = 'failed'
+        job.error = str(e)
+        job.updated_at = datetime.utcnow()
+        db.session.commit()
+        logging.error(f"Offboarding job {job_id} failed: {e}")
+        raise
+    return job
+
+
+def start_offboarding_job(job_id):
+    """Run an offboarding job on a background thread and return immediately."""
+    app = current_app._get_current_object()
+
+    def target():
+        with app.app_context():
+            try:
+                run_offboarding_job(job_id)
+            except Exception:
+                pass  # Sudah dicatat dan disimpan di job.error
+
+    thread = threading.Thread(target=target, name=f'offboarding-{job_id}', daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,316 @@
+"""Perceptual hashes of attendance photos and a near-duplicate index.
+
+Each clock-in photo gets a 64-bit difference hash (dHash: grayscale 9x8
+thumbnail, one bit per horizontally adjacent pixel pair), stored in
+attendance.photo_hash. Re-encoding, resizing or light edits of the same photo
+change only a few bits, so a reused photo is one within a small Hamming
+distance of an earlier hash.
+
+The in-memory index uses multi-index hashing: the hash is split into four
+16-bit chunks, and each chunk has its own bucket table (a sorted permutation
+plus bucket offsets, built with numpy). By the pigeonhole principle, two
+hashes within distance d agree within d // 4 bits on at least one chunk, so
+a query probes a few dozen buckets per chunk and verifies only those
+candidates with a vectorized popcount, instead of scanning every stored hash.
+
+New hashes (this process's inserts and rows synced from the table by
+"id > last seen", like app.revocation; per id counter with sharded
+attendance, see app.attendance_shards.read_new) go into a small tail that is
+scanned linearly and merged into the buckets every PHOTO_HASH_MERGE_EVERY
+entries. The merged index is snapshotted to <instance>/photo_hashes.npz so a
+restart only loads rows added since the snapshot.
+
+Decoding photos needs Pillow (in requirements.txt); without it photos are
+not hashed and the check is skipped, and create_app logs an error while
+PHOTO_HASH_ENABLED is on.
+"""
+import io
+import logging
+import os
+import threading
+import time
+
+import numpy as np
+from flask import current_app
+from sqlalchemy import select
+
+from app import db
+from app.attendance_shards import id_counter, read_everywhere, read_new
+from app.blob_store import photo_payload_bytes
+from app.models import Attendance, AttendanceFlag
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+CHUNKS = 4
+CHUNK_BITS = 16
+CHUNK_VALUES = 1 << CHUNK_BITS
+CHUNK_MASK = CHUNK_VALUES - 1
+
+# Semua nilai 16-bit dengan popcount <= r, per radius r, untuk probe bucket
+_popcounts = np.bitwise_count(np.arange(CHUNK_VALUES, dtype=np.uint16))
+PROBE_MASKS = [np.flatnonzero(_popcounts <= r).astype(np.uint16) for r in range(CHUNK_BITS + 1)]
+
+
+def _synced(last_ids, attendance_id):
+    # Sudah tercakup "id > last id" counter-nya (0 = belum ada yang tersinkron dari counter itu)
+    return attendance_id <= last_ids.get(id_counter(attendance_id), 0)
+
+
+def to_signed(value):
+    """uint64 hash -> signed 64-bit value for the SQLite INTEGER column."""
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+
+def to_unsigned(value):
+    return value + (1 << 64) if value < 0 else value
+
+
+def dhash(data):
+    """64-bit difference hash of image bytes (requires Pillow)."""
+    image = Image.open(io.BytesIO(data))
+    image.draft('L', (64, 64))  # JPEG: decode langsung dalam ukuran kecil
+    pixels = np.asarray(image.convert('L').resize((9, 8), Image.Resampling.BOX), dtype=np.int16)
+    bits = np.packbits((pixels[:, 1:] > pixels[:, :-1]).ravel())
+    return int.from_bytes(bits.tobytes(), 'big')
+
+
+def hash_photo_payload(payload):
+    """dHash of a clock-in photo payload, or None (no photo, not an image, or no Pillow)."""
+    if not payload or Image is None or not current_app.config.get('PHOTO_HASH_ENABLED', True):
+        return None
+    try:
+        return hash_photo_bytes(photo_payload_bytes(payload))
+    except ValueError as e:
+        logging.warning(f"Could not hash attendance photo: {e}")
+        return None
+
+
+def hash_photo_bytes(data):
+    """dHash of decoded photo bytes, or None (no image, undecodable, or no Pillow)."""
+    if not data or Image is None or not current_app.config.get('PHOTO_HASH_ENABLED', True):
+        return None
+    try:
+        return dhash(data)
+    except Exception as e:
+        logging.warning(f"Could not hash attendance photo: {e}")
+        return None
+
+
+class MultiIndexHash:
+    """Near-duplicate search over 64-bit hashes keyed by attendance id."""
+
+    def __init__(self, merge_every=1024):
+        self.merge_every = merge_every
+        self._lock = threading.Lock()
+        self._set_base(np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.uint64))
+        self._tail = {}  # attendance_id -> hash, belum masuk bucket
+
+    def _set_base(self, ids, hashes):
+        # Satu array permutasi untuk keempat chunk; starts[chunk][v] = awal bucket v di dalamnya
+        orders, starts = [], []
+        for chunk in range(CHUNKS):
+            values = ((hashes >> np.uint64(chunk * CHUNK_BITS)) & np.uint64(CHUNK_MASK)).astype(np.uint16)
+            orders.append(np.argsort(values, kind='stable').astype(np.int32))
+            counts = np.cumsum(np.bincount(values, minlength=CHUNK_VALUES))
+            starts.append(np.concatenate(([0], counts)) + chunk * len(ids))
+        self._ids, self._hashes = ids, hashes
+        self._order = np.concatenate(orders) if len(ids) else np.zeros(0, dtype=np.int32)
+        self._starts = starts
+
+    def __len__(self):
+        return len(self._ids) + len(self._tail)
+
+    def add(self, attendance_id, value):
+        with self._lock:
+            self._tail[attendance_id] = value
+
+    def merge(self, last_ids=None):
+        """Move tail entries (already covered by last_ids, if given) into the buckets."""
+        with self._lock:
+            moved = {attendance_id: value for attendance_id, value in self._tail.items()
+                     if last_ids is None or _synced(last_ids, attendance_id)}
+            if not moved:
+                return
+            for attendance_id in moved:
+                del self._tail[attendance_id]
+            ids = np.concatenate((self._ids, np.fromiter(moved.keys(), dtype=np.int64, count=len(moved))))
+            hashes = np.concatenate((self._hashes, np.fromiter(moved.values(), dtype=np.uint64, count=len(moved))))
+            self._set_base(ids, hashes)
+
+    @property
+    def tail_size(self):
+        return len(self._tail)
+
+    def search(self, value, distance):
+        """[(attendance_id, hamming distance)] within distance of value, closest first."""
+        with self._lock:
+            ids, hashes, order, starts = self._ids, self._hashes, self._order, self._starts
+            tail = list(self._tail.items())
+        masks = PROBE_MASKS[min(distance // CHUNKS, CHUNK_BITS)].astype(np.int32)
+        lo, hi = [], []
+        for chunk in range(CHUNKS):
+            probes = (value >> (chunk * CHUNK_BITS) & CHUNK_MASK) ^ masks
+            lo.append(starts[chunk][probes])
+            hi.append(starts[chunk][probes + 1])
+        lo, hi = np.concatenate(lo), np.concatenate(hi)
+
+        results = []
+        lengths = hi - lo
+        total = int(lengths.sum())
+        if total:
+            # Gabungan semua rentang bucket [lo, hi) tanpa loop Python
+            offsets = np.repeat(lo - (np.cumsum(lengths) - lengths), lengths)
+            candidates = order[offsets + np.arange(total)]
+            distances = np.bitwise_count(hashes[candidates] ^ np.uint64(value))
+            # Hash yang cocok di beberapa chunk muncul lebih dari sekali; dedup setelah filter (jauh lebih sedikit)
+            hits = np.unique(candidates[distances <= distance])
+            results = list(zip(ids[hits].tolist(), np.bitwise_count(hashes[hits] ^ np.uint64(value)).tolist()))
+        results.extend((attendance_id, (value ^ other).bit_count()) for attendance_id, other in tail
+                       if (value ^ other).bit_count() <= distance)
+        results.sort(key=lambda item: (item[1], item[0]))
+        return results
+
+    def save(self, path, last_ids):
+        """Write the merged part of the index (ids covered by last_ids) to an .npz snapshot."""
+        with self._lock:
+            ids, hashes = self._ids, self._hashes
+        tmp = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp.npz'
+        counters = sorted(last_ids)
+        np.savez(tmp, ids=ids, hashes=hashes, counters=np.array(counters, dtype=np.int64),
+                 last_ids=np.array([last_ids[counter] for counter in counters], dtype=np.int64))
+        os.replace(tmp, path)
+
+    def load(self, path):
+        """Load a snapshot; returns its {counter: last id} ({} when there is none or it is unreadable)."""
+        try:
+            with np.load(path) as snapshot:
+                ids, hashes = snapshot['ids'], snapshot['hashes']
+                if 'counters' in snapshot.files:
+                    last_ids = dict(zip(snapshot['counters'].tolist(), snapshot['last_ids'].tolist()))
+                else:
+                    last_ids = {0: int(snapshot['last_id'])}  # Snapshot lama: satu counter (tabel utama)
+        except (OSError, KeyError, ValueError) as e:
+            if os.path.exists(path):
+                logging.error(f"Photo hash snapshot {path} unreadable, rebuilding: {e}")
+            return {}
+        with self._lock:
+            self._set_base(ids.astype(np.int64), hashes.astype(np.uint64))
+            self._tail = {}
+        return last_ids
+
+
+class PhotoHashIndex:
+    """MultiIndexHash kept in sync with attendance.photo_hash across processes."""
+
+    def __init__(self, path, sync_interval=5.0, merge_every=1024, snapshot_interval=300.0):
+        self.path = path
+        self.sync_interval = sync_interval
+        self.snapshot_interval = snapshot_interval
+        self.index = MultiIndexHash(merge_every)
+        self._last_ids = {}
+        self._next_sync = 0.0
+        self._next_snapshot = 0.0
+        self._sync_lock = threading.Lock()
+
+    def load(self):
+        started = time.perf_counter()
+        self._last_ids = self.index.load(self.path)
+        self.sync(force=True)
+        logging.info(f"Photo hash index loaded: {len(self.index)} hashes in {time.perf_counter() - started:.2f}s.")
+
+    def add(self, attendance_id, value):
+        if not _synced(self._last_ids, attendance_id):  # Yang sudah tersinkron sudah ada di index
+            self.index.add(attendance_id, to_unsigned(value))
+
+    def sync(self, force=False):
+        """Pull hashes stored by any process since the last sync; merge and snapshot when due."""
+        if not force and time.monotonic() < self._next_sync:
+            return
+        if not self._sync_lock.acquire(blocking=False):
+            return  # Thread lain sedang sinkron
+        try:
+            self._next_sync = time.monotonic() + self.sync_interval
+            rows, last_ids = read_new(
+                select(Attendance.id, Attendance.photo_hash).where(Attendance.photo_hash.isnot(None)), self._last_ids
+            )
+            for row in rows:
+                self.index.add(row.id, to_unsigned(row.photo_hash))
+            self._last_ids = last_ids
+            if self.index.tail_size >= self.index.merge_every or (force and rows):
+                # Hanya id yang sudah tersinkron yang digabung, agar snapshot konsisten dengan "id > last_id"
+                self.index.merge(self._last_ids)
+                if force or time.monotonic() >= self._next_snapshot:
+                    self._next_snapshot = time.monotonic() + self.snapshot_interval
+                    self.index.save(self.path, self._last_ids)
+        except Exception as e:
+            db.session.rollback()
+            logging.error(f"Photo hash sync failed: {e}")
+        finally:
+            self._sync_lock.release()
+
+    def search(self, value, distance):
+        self.sync()
+        return self.index.search(to_unsigned(value), distance)
+
+
+def get_photo_index(app=None):
+    """The app's photo hash index, loaded on first use."""
+    app = app or current_app
+    index = app.extensions.get('photo_hash_index')
+    if index is None:
+        config = app.config
+        path = config.get('PHOTO_HASH_INDEX_PATH') or os.path.join(app.instance_path, 'photo_hashes.npz')
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        index = PhotoHashIndex(path, config.get('PHOTO_HASH_SYNC_INTERVAL', 5.0),
+                               config.get('PHOTO_HASH_MERGE_EVERY', 1024),
+                               config.get('PHOTO_HASH_SNAPSHOT_INTERVAL', 300.0))
+        index.load()
+        index = app.extensions.setdefault('photo_hash_index', index)
+    return index
+
+
+def find_photo_matches(attendance_id, value, distance=None):
+    """Earlier/later attendance records whose photo is within distance of value, as dicts."""
+    if distance is None:
+        distance = current_app.config.get('PHOTO_HASH_MAX_DISTANCE', 6)
+    matches = [(match_id, d) for match_id, d in get_photo_index().search(value, distance) if match_id != attendance_id]
+    if not matches:
+        return []
+    limit = current_app.config.get('PHOTO_HASH_MAX_MATCHES', 20)
+    rows = {row.id: row for row in read_everywhere(
+        select(Attendance.id, Attendance.employee_id, Attendance.date)
+        .where(Attendance.id.in_([match_id for match_id, _ in matches[:limit * 2]]))
+    )}
+    # Baris yang sudah dihapus/diarsipkan masih bisa ada di index; lewati
+    return [{'attendance_id': match_id, 'employee_id': rows[match_id].employee_id,
+             'date': rows[match_id].date.strftime('%Y-%m-%d'), 'distance': d}
+            for match_id, d in matches if match_id in rows][:limit]
+
+
+def check_photo_reuse(attendance):
+    """Index a new clock-in photo and flag it when it matches earlier photos. Never raises."""
+    if attendance.photo_hash is None:
+        return []
+    try:
+        index = get_photo_index()
+        matches = find_photo_matches(attendance.id, attendance.photo_hash)
+        index.add(attendance.id, attendance.photo_hash)
+        for match in matches[:current_app.config.get('PHOTO_HASH_MAX_FLAGS', 5)]:
+            same = match['employee_id'] == attendance.employee_id
+            db.session.add(AttendanceFlag(
+                attendance_id=attendance.id, employee_id=attendance.employee_id, kind='photo_reuse',
+                related_attendance_id=match['attendance_id'], score=match['distance'],
+                detail=f"Foto mirip presensi {match['date']} " + ('milik sendiri' if same else f"employee {match['employee_id']}")
+            ))
+        if matches:
+            db.session.commit()
+            logging.warning(f"Attendance {attendance.id} of employee {attendance.employee_id} flagged: "
+                            f"photo matches {len(matches)} earlier record(s).")
+        return matches
+    except Exception as e:
+        db.session.rollback()
+        logging.error(f"Photo reuse check failed for attendance {attendance.id}: {e}")
+        return []
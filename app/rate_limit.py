@@ -0,0 +1,182 @@
+"""Token-bucket rate limiting for expensive unauthenticated endpoints.
+
+Each bucket holds at most `limit` tokens and refills at limit/period tokens
+per second; a request takes one token or is rejected with 429 and a
+Retry-After header. Buckets are keyed per route by client IP and by the
+submitted email, with limits taken from RATE_LIMITS[endpoint].
+
+Two backends:
+- 'memory': a lock-striped dict, per process (a few microseconds).
+- 'sqlite': one UPSERT ... RETURNING against a small WAL database shared by
+  every worker process on the host, so limits hold across processes.
+"""
+import logging
+import math
+import os
+import sqlite3
+import threading
+import time
+from functools import wraps
+
+from flask import current_app, jsonify, request
+
+PERIODS = {'second': 1, 'minute': 60, 'hour': 3600, 'day': 86400}
+
+
+def parse_limit(value):
+    """'5/minute' -> (capacity, refill tokens per second)."""
+    count, _, period = value.partition('/')
+    count = int(count)
+    period = period.strip().lower().rstrip('s') or 'second'
+    if period not in PERIODS:
+        raise ValueError(f'Unknown rate limit period in {value!r}')
+    return count, count / PERIODS[period]
+
+
+def _refill(tokens, updated, capacity, rate, now):
+    return min(capacity, tokens + (now - updated) * rate)
+
+
+class MemoryBackend:
+    """Per-process buckets spread over `stripes` dicts, each guarded by its own lock."""
+
+    def __init__(self, stripes=64, max_keys=10000):
+        self._stripes = [({}, threading.Lock()) for _ in range(stripes)]
+        self._max_keys = max_keys
+
+    def consume(self, key, capacity, rate, now=None):
+        """Take one token. Returns 0 if allowed, otherwise seconds until a token is available."""
+        now = time.time() if now is None else now
+        buckets, lock = self._stripes[hash(key) % len(self._stripes)]
+        with lock:
+            state = buckets.get(key)
+            tokens = capacity if state is None else _refill(state[0], state[1], capacity, rate, now)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            # Simpan juga waktu bucket penuh kembali, untuk membuang bucket lama
+            buckets[key] = (tokens, now, now + (capacity - tokens) / rate)
+            if len(buckets) > self._max_keys:
+                for stale in [k for k, v in buckets.items() if v[2] <= now]:
+                    del buckets[stale]
+        return 0 if allowed else (1 - tokens) / rate
+
+    def reset(self):
+        for buckets, lock in self._stripes:
+            with lock:
+                buckets.clear()
+
+
+class SQLiteBackend:
+    """Buckets in a shared SQLite file; each check is a single atomic UPSERT."""
+
+    CONSUME_SQL = """
+        INSERT INTO buckets (key, tokens, updated, full_at, allowed)
+        VALUES (:key, :capacity - 1, :now, :now + 1 / :rate, 1)
+        ON CONFLICT (key) DO UPDATE SET
+            tokens = min(:capacity, tokens + (:now - updated) * :rate)
+                     - (min(:capacity, tokens + (:now - updated) * :rate) >= 1),
+            allowed = min(:capacity, tokens + (:now - updated) * :rate) >= 1,
+            full_at = :now + (:capacity - min(:capacity, tokens + (:now - updated) * :rate)
+                     + (min(:capacity, tokens + (:now - updated) * :rate) >= 1)) / :rate,
+            updated = :now
+        RETURNING tokens, allowed
+    """
+
+    def __init__(self, path, cleanup_every=1000):
+        self.path = path
+        self._local = threading.local()
+        self._cleanup_every = cleanup_every
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self._connect().execute(
+            'CREATE TABLE IF NOT EXISTS buckets ('
+            'key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL, '
+            'full_at REAL NOT NULL, allowed INTEGER NOT NULL) WITHOUT ROWID'
+        )
+
+    def _connect(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            # Autocommit; state rate limit boleh hilang saat crash, jadi synchronous=OFF
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=OFF')
+            self._local.connection = connection
+            self._local.calls = 0
+        return connection
+
+    def consume(self, key, capacity, rate, now=None):
+        """Take one token. Returns 0 if allowed, otherwise seconds until a token is available."""
+        now = time.time() if now is None else now
+        connection = self._connect()
+        tokens, allowed = connection.execute(
+            self.CONSUME_SQL, {'key': key, 'capacity': capacity, 'rate': rate, 'now': now}
+        ).fetchone()
+
+        self._local.calls += 1
+        if self._local.calls % self._cleanup_every == 0:
+            connection.execute('DELETE FROM buckets WHERE full_at <= ?', (now,))
+        return 0 if allowed else (1 - tokens) / rate
+
+    def reset(self):
+        self._connect().execute('DELETE FROM buckets')
+
+
+def get_limiter(app=None):
+    """The app's rate limit backend, created on first use from RATE_LIMIT_BACKEND."""
+    app = app or current_app
+    backend = app.extensions.get('rate_limiter')
+    if backend is None:
+        if app.config.get('RATE_LIMIT_BACKEND', 'sqlite') == 'memory':
+            backend = MemoryBackend()
+        else:
+            path = app.config.get('RATE_LIMIT_STORAGE') or os.path.join(app.instance_path, 'ratelimit.db')
+            backend = SQLiteBackend(path)
+        backend = app.extensions.setdefault('rate_limiter', backend)
+    return backend
+
+
+def _request_email():
+    data = request.get_json(silent=True) if request.is_json else request.form
+    email = (data or {}).get('email')
+    return email.strip().lower() if isinstance(email, str) and email.strip() else None
+
+
+def rate_limit(fn):
+    """Apply the token buckets configured in RATE_LIMITS for this endpoint.
+
+    RATE_LIMITS maps an endpoint name to {'ip': '20/minute', 'email': '5/minute'};
+    either key may be omitted. Endpoints without an entry are not limited.
+    """
+    parsed = {}
+
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        config = current_app.config
+        limits = config.get('RATE_LIMITS', {}).get(request.endpoint)
+        if not limits or not config.get('RATE_LIMIT_ENABLED', True):
+            return fn(*args, **kwargs)
+
+        keys = {'ip': request.remote_addr or 'unknown'}
+        if 'email' in limits:
+            keys['email'] = _request_email()
+
+        backend = get_limiter()
+        retry_after = 0
+        for scope, limit in limits.items():
+            subject = keys.get(scope)
+            if subject is None:
+                continue
+            if limit not in parsed:
+                parsed[limit] = parse_limit(limit)
+            capacity, rate = parsed[limit]
+            retry_after = max(retry_after, backend.consume(f'{request.endpoint}:{scope}:{subject}', capacity, rate))
+
+        if retry_after:
+            logging.warning(f"Rate limit hit on {request.endpoint} from {keys['ip']}")
+            response = jsonify({'status': 'error', 'message': 'Terlalu banyak permintaan, coba lagi nanti.'})
+            response.headers['Retry-After'] = str(math.ceil(retry_after))
+            return response, 429
+        return fn(*args, **kwargs)
+
+    return wrapper
@@ -0,0 +1,276 @@
+"""Read-model layer for list endpoints.
+
+The queries here project only the columns an endpoint returns, so no ORM
+entities are built and nothing enters the session's identity map. Rows come
+back as plain tuples, or as __slots__ objects when a template needs
+attribute access.
+
+Months moved to cold storage (app.cold_storage) are read back from their
+segment files whenever the requested date range reaches into them. With
+sharded attendance (app.attendance_shards) per-employee queries run on the
+employee's shard and the admin report is merged from all shards.
+"""
+import base64
+import itertools
+import json
+
+from sqlalchemy import or_, select
+
+from app import db
+from app.models import Attendance, Employee, AttendanceStatus, User
+from app.attendance_shards import attendance_session, fan_out, sharding_enabled
+from app.blob_store import photo_url
+
+# Label status untuk laporan admin (selain HADIR/IJIN dianggap Alpha)
+REPORT_STATUS_LABELS = {
+    AttendanceStatus.HADIR: 'Hadir',
+    AttendanceStatus.IJIN: 'Izin',
+}
+
+
+# Formatter bersama (isoformat jauh lebih cepat dari strftime)
+def format_date(value, default='N/A'):
+    return value.isoformat() if value else default
+
+
+def format_time(value, default='N/A'):
+    return value.isoformat(timespec='seconds') if value else default
+
+
+def format_status(value):
+    return value.value if value else 'UNKNOWN'
+
+
+def report_status(value):
+    return REPORT_STATUS_LABELS.get(value, 'Alpha')
+
+
+class AttendanceRow:
+    """Lightweight, read-only attendance row with the same attribute names as Attendance."""
+
+    __slots__ = ('id', 'employee_id', 'status', 'date', 'time', 'time_out', 'photo', 'latitude', 'longitude', 'reason')
+
+    def __init__(self, id, employee_id, status, date, time, time_out, photo, latitude, longitude, reason):
+        self.id = id
+        self.employee_id = employee_id
+        self.status = status
+        self.date = date
+        self.time = time
+        self.time_out = time_out
+        self.photo = photo
+        self.latitude = latitude
+        self.longitude = longitude
+        self.reason = reason
+
+    @property
+    def formatted_status(self):
+        return format_status(self.status)
+
+    @property
+    def formatted_time_in(self):
+        return format_time(self.time)
+
+    @property
+    def formatted_time_out(self):
+        return format_time(self.time_out)
+
+    def __repr__(self):
+        return f"<AttendanceRow {self.id} - Employee {self.employee_id} - Status {format_status(self.status)}>"
+
+
+ATTENDANCE_COLUMNS = (
+    Attendance.id, Attendance.employee_id, Attendance.status, Attendance.date, Attendance.time,
+    Attendance.time_out, Attendance.photo, Attendance.latitude, Attendance.longitude, Attendance.reason,
+)
+
+
+def _date_range(stmt, start, end):
+    if start:
+        stmt = stmt.where(Attendance.date >= start)
+    if end:
+        stmt = stmt.where(Attendance.date <= end)
+    return stmt
+
+
+def attendance_report_stmt(start=None, end=None):
+    return _date_range(
+        select(Attendance.employee_id, Employee.name, Attendance.status, Attendance.date,
+               Attendance.time, Attendance.time_out)
+        .join(Employee, Attendance.employee_id == Employee.user_id),
+        start, end
+    )
+
+
+def employee_attendance_stmt(employee_id, start=None, end=None):
+    return _date_range(select(*ATTENDANCE_COLUMNS).where(Attendance.employee_id == employee_id), start, end)
+
+
+EMPLOYEE_SORT_KEYS = {
+    'id': Employee.id,
+    'name': Employee.name.collate('NOCASE'),  # Sama dengan ix_employees_name_nocase / ix_employees_gender_name
+}
+
+
+def employee_list_stmt(gender=None, status=None, created_after=None, sort='id', descending=False, after=None):
+    """Employees in keyset order; after is the (sort value, id) of the last row of the previous page."""
+    key = EMPLOYEE_SORT_KEYS[sort]
+    stmt = select(Employee.id, Employee.name, Employee.gender, Employee.email, Employee.phone_number,
+                  Employee.photo_key, Employee.created_at)
+    if status is not None:
+        stmt = stmt.join(User, User.id == Employee.user_id).where(User.status == status)
+    if gender is not None:
+        stmt = stmt.where(Employee.gender == gender)
+    if created_after is not None:
+        stmt = stmt.where(Employee.created_at > created_after)
+    if after is not None:
+        # Keyset: lanjut setelah baris terakhir, jadi halaman ke-N sama murahnya dengan halaman pertama
+        value, last_id = after
+        if sort == 'id':
+            stmt = stmt.where(Employee.id < last_id if descending else Employee.id > last_id)
+        elif descending:
+            # key <= value memberi batas range index; (key, id) < (value, id) saja tidak dipakai SQLite sebagai range
+            stmt = stmt.where(key <= value, or_(key < value, Employee.id < last_id))
+        else:
+            stmt = stmt.where(key >= value, or_(key > value, Employee.id > last_id))
+    if sort == 'id':
+        return stmt.order_by(Employee.id.desc() if descending else Employee.id)
+    return stmt.order_by(*((key.desc(), Employee.id.desc()) if descending else (key, Employee.id)))
+
+
+def encode_cursor(sort, descending, value, id):
+    """Opaque page cursor (the client only echoes it back)."""
+    payload = json.dumps([sort, descending, value, id], separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(payload).rstrip(b'=').decode()
+
+
+def decode_cursor(cursor, sort, descending):
+    """(sort value, id) from a cursor made for the same sort; ValueError otherwise."""
+    try:
+        payload = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        cursor_sort, cursor_descending, value, id = json.loads(payload)
+    except (ValueError, TypeError) as e:
+        raise ValueError('malformed cursor') from e
+    if (cursor_sort, cursor_descending) != (sort, descending) or not isinstance(id, int):
+        raise ValueError('cursor belongs to a different sort order')
+    return value, id
+
+
+def archived_report_rows(start, end):
+    """Report tuples of the archived months in the range (employee_id, name, status, date, time, time_out)."""
+    from app.cold_storage import read_archived_rows  # numpy dimuat saat laporan pertama
+
+    archived = read_archived_rows(start, end)
+    if not archived:
+        return []
+    names = dict(db.session.execute(select(Employee.user_id, Employee.name)).tuples().all())
+    # Sama seperti join di query tabel aktif: baris tanpa employee dilewati
+    return [(row[1], names[row[1]], row[2], row[3], row[4], row[5]) for row in archived if row[1] in names]
+
+
+def _sharded_report_rows(start, end):
+    # Tabel employees ada di database utama: nama digabung di sini, bukan lewat join
+    names = dict(db.session.execute(select(Employee.user_id, Employee.name)).tuples().all())
+    stmt = _date_range(select(Attendance.id, Attendance.employee_id, Attendance.status, Attendance.date,
+                              Attendance.time, Attendance.time_out), start, end)
+    for _, employee_id, status, date, time, time_out in fan_out(stmt):
+        if employee_id in names:
+            yield employee_id, names[employee_id], status, date, time, time_out
+
+
+def report_row(employee_id, name, status, date, time, time_out):
+    """One /admin/attendance_report entry."""
+    return {
+        'employee_id': employee_id,
+        'employee_name': name,
+        'status': report_status(status),
+        'date': format_date(date),
+        'time': format_time(time),
+        'time_out': format_time(time_out),
+    }
+
+
+def attendance_report_rows(start=None, end=None):
+    """Rows for /admin/attendance_report, archived months first (sharded: then by date and id)."""
+    if sharding_enabled():
+        hot = _sharded_report_rows(start, end)
+    else:
+        hot = db.session.execute(attendance_report_stmt(start, end)).tuples().all()
+    rows = itertools.chain(archived_report_rows(start, end), hot)
+    return [report_row(*row) for row in rows]
+
+
+def employee_attendance_rows(employee_id, start=None, end=None):
+    """All attendance tuples of one employee (ATTENDANCE_COLUMNS order), archived and hot."""
+    from app.cold_storage import read_archived_rows
+
+    with attendance_session(employee_id) as session:
+        hot = session.execute(employee_attendance_stmt(employee_id, start, end)).tuples().all()
+    return read_archived_rows(start, end, employee_id=employee_id) + hot
+
+
+def employee_recap_rows(employee_id, start=None, end=None):
+    """Rows for /employee/recap."""
+    rows = employee_attendance_rows(employee_id, start, end)
+    return [{
+        'employee_id': employee_id,
+        'status': format_status(status),
+        'date': format_date(date),
+        'time': format_time(time),
+        'time_out': format_time(time_out, 'Belum Clock Out'),
+        'photo': photo,
+        'latitude': latitude,
+        'longitude': longitude,
+        'reason': reason,
+    } for _, employee_id, status, date, time, time_out, photo, latitude, longitude, reason in rows]
+
+
+def employee_sync_rows(employee_id, ids=None):
+    """Rows for /employee/sync: all of the employee's attendance, or only the given ids (hot table)."""
+    if ids is None:
+        rows = employee_attendance_rows(employee_id)
+    else:
+        rows = []
+        with attendance_session(employee_id) as session:
+            for position in range(0, len(ids), 500):
+                rows += session.execute(
+                    select(*ATTENDANCE_COLUMNS)
+                    .where(Attendance.employee_id == employee_id, Attendance.id.in_(ids[position:position + 500]))
+                ).tuples().all()
+    return [{
+        'id': id,
+        'status': format_status(status),
+        'date': format_date(date),
+        'time': format_time(time),
+        'time_out': format_time(time_out, None),
+        'photo': photo,
+        'latitude': latitude,
+        'longitude': longitude,
+        'reason': reason,
+    } for id, _, status, date, time, time_out, photo, latitude, longitude, reason in rows]
+
+
+def employee_list_rows(limit, sort='id', descending=False, after=None, **filters):
+    """One page of /admin/list_employees: (rows, next cursor or None)."""
+    # Satu baris ekstra untuk tahu apakah masih ada halaman berikutnya
+    rows = db.session.execute(
+        employee_list_stmt(sort=sort, descending=descending, after=after, **filters).limit(limit + 1)
+    ).tuples().all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(sort, descending, last[0] if sort == 'id' else last[1], last[0])
+    return [{
+        'id': id,
+        'name': name,
+        'gender': gender,
+        'email': email,
+        'phone_number': phone_number,
+        'photo_profile': photo_url(photo_key),
+        'created_at': created_at.isoformat() if created_at else None,
+    } for id, name, gender, email, phone_number, photo_key, created_at in rows], next_cursor
+
+
+def attendance_records(employee_id):
+    """Attendance of one employee as AttendanceRow objects (for templates)."""
+    return [AttendanceRow(*row) for row in employee_attendance_rows(employee_id)]
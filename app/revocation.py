@@ -0,0 +1,307 @@
+"""JWT revocation by jti (logout) with a lock-free fast path.
+
+The revoked_tokens table is the shared source of truth. Each process keeps a
+replica of it in memory (jti -> expiry, synced every REVOCATION_SYNC_INTERVAL
+seconds) in front of which sits a Bloom filter. The filter lives in a small
+mmap'ed file shared by all workers on the host, so a logout in one worker is
+visible to the others immediately; a token that is not revoked (the normal
+case) is answered from the filter alone, without any I/O. A filter hit is
+confirmed against the replica and, when the replica has not seen the jti yet,
+with a single primary-key lookup.
+
+Expired entries are dropped from the replica and the table, and the filter is
+rebuilt from the live entries once it has absorbed more than its capacity.
+Platforms without fcntl get a per-process filter fed by the periodic sync.
+"""
+import hashlib
+import logging
+import math
+import mmap
+import os
+import struct
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+from flask import current_app
+from sqlalchemy import delete, select
+
+from app import db
+from app.models import RevokedToken
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+EPOCH = datetime(1970, 1, 1)
+
+# magic, stale, k, jumlah bit, jumlah key yang ditambahkan
+HEADER = struct.Struct('<4sB3xIQQ')
+HEADER_SIZE = 32
+MAGIC = b'RVBF'
+
+
+def bloom_parameters(capacity, error_rate):
+    """(bits, hash count) for a Bloom filter holding capacity keys at error_rate."""
+    bits = math.ceil(-capacity * math.log(error_rate) / (math.log(2) ** 2))
+    return bits, max(1, round(bits / capacity * math.log(2)))
+
+
+def _to_epoch(value):
+    return (value - EPOCH).total_seconds()
+
+
+class BloomFilter:
+    """Bloom filter over a writable buffer (bytearray or mmap), starting at offset."""
+
+    def __init__(self, buffer, bits, hashes, offset=0):
+        self.buffer = buffer
+        self.bits = bits
+        self.hashes = hashes
+        self.offset = offset
+
+    def _positions(self, key):
+        # Double hashing: posisi ke-i = h1 + i*h2 (mod bits)
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        bits = self.bits
+        return [(h1 + i * h2) % bits for i in range(self.hashes)]
+
+    def add(self, key):
+        buffer, offset = self.buffer, self.offset
+        for position in self._positions(key):
+            buffer[offset + (position >> 3)] |= 1 << (position & 7)
+
+    def __contains__(self, key):
+        buffer, offset = self.buffer, self.offset
+        for position in self._positions(key):
+            if not buffer[offset + (position >> 3)] & (1 << (position & 7)):
+                return False
+        return True
+
+
+class LocalBloom:
+    """Per-process Bloom filter with the same interface as SharedBloom."""
+
+    def __init__(self, capacity, error_rate):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.count = 0
+        self._reset()
+
+    def _reset(self):
+        bits, hashes = bloom_parameters(self.capacity, self.error_rate)
+        self._filter = BloomFilter(bytearray((bits + 7) // 8), bits, hashes)
+        self.count = 0
+
+    def __contains__(self, key):
+        return key in self._filter
+
+    def add(self, key):
+        self._filter.add(key)
+        self.count += 1
+
+    def rebuild(self, live_keys):
+        keys = live_keys()
+        self._reset()
+        for key in keys:
+            self.add(key)
+
+
+class SharedBloom:
+    """Bloom filter in an mmap'ed file shared by processes; writers serialize with flock.
+
+    rebuild() writes a fresh file, swaps it in with os.replace and marks the
+    old one stale; readers notice the stale flag and reopen the path.
+    """
+
+    def __init__(self, path, capacity, error_rate):
+        self.path = path
+        self.capacity = capacity
+        self.error_rate = error_rate
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self._file = None
+        self._open()
+
+    def _write_new(self, keys=()):
+        bits, hashes = bloom_parameters(self.capacity, self.error_rate)
+        data = bytearray(HEADER_SIZE + (bits + 7) // 8)
+        bloom = BloomFilter(data, bits, hashes, HEADER_SIZE)
+        count = 0
+        for key in keys:
+            bloom.add(key)
+            count += 1
+        HEADER.pack_into(data, 0, MAGIC, 0, hashes, bits, count)
+        tmp = f'{self.path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with open(tmp, 'wb') as f:
+            f.write(data)
+        return tmp
+
+    def _open(self):
+        if not os.path.exists(self.path):
+            tmp = self._write_new()
+            try:
+                os.link(tmp, self.path)  # Gagal jika proses lain sudah membuatnya
+            except FileExistsError:
+                pass
+            finally:
+                os.remove(tmp)
+        if self._file is not None:
+            self._mm.close()
+            self._file.close()
+        self._file = open(self.path, 'r+b')
+        self._mm = mmap.mmap(self._file.fileno(), 0)
+        magic, _, hashes, bits, _ = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC:
+            raise ValueError(f'{self.path} is not a revocation Bloom filter')
+        self._filter = BloomFilter(self._mm, bits, hashes, HEADER_SIZE)
+
+    @property
+    def count(self):
+        return HEADER.unpack_from(self._mm, 0)[4]
+
+    def __contains__(self, key):
+        if self._mm[4]:
+            self._open()
+        return key in self._filter
+
+    def add(self, key):
+        while True:
+            fcntl.flock(self._file, fcntl.LOCK_EX)
+            try:
+                if not self._mm[4]:
+                    self._filter.add(key)
+                    magic, stale, hashes, bits, count = HEADER.unpack_from(self._mm, 0)
+                    HEADER.pack_into(self._mm, 0, magic, stale, hashes, bits, count + 1)
+                    return
+            finally:
+                fcntl.flock(self._file, fcntl.LOCK_UN)
+            self._open()  # File sudah diganti oleh rebuild
+
+    def rebuild(self, live_keys):
+        """Replace the filter with one holding live_keys(), read while writers are blocked."""
+        fcntl.flock(self._file, fcntl.LOCK_EX)
+        try:
+            if self._mm[4]:
+                return  # Proses lain baru saja membangun ulang
+            tmp = self._write_new(live_keys())
+            os.replace(tmp, self.path)
+            self._mm[4] = 1
+        finally:
+            fcntl.flock(self._file, fcntl.LOCK_UN)
+        self._open()
+
+
+class RevocationList:
+    def __init__(self, bloom, sync_interval=5.0, negative_cache=4096):
+        self.bloom = bloom
+        self.sync_interval = sync_interval
+        self._revoked = {}  # jti -> expiry (epoch detik)
+        self._last_id = 0
+        self._next_sync = 0.0
+        self._sync_lock = threading.Lock()
+        # jti yang pernah menjadi false positive Bloom, agar tidak dicek ke database berulang
+        self._not_revoked = OrderedDict()
+        self._negative_cache = negative_cache
+
+    def revoke(self, jti, expires_at, user_id=None):
+        """Revoke a token until expires_at (epoch seconds); visible to all workers at once."""
+        if expires_at is None:
+            expires_at = time.time() + current_app.config['JWT_ACCESS_TOKEN_EXPIRES'].total_seconds()
+        if jti not in self._revoked:
+            db.session.add(RevokedToken(jti=jti, user_id=user_id, expires_at=datetime.utcfromtimestamp(expires_at)))
+            db.session.commit()
+        self._revoked[jti] = expires_at
+        self._not_revoked.pop(jti, None)
+        self.bloom.add(jti)
+
+    def is_revoked(self, jti):
+        if time.monotonic() >= self._next_sync:
+            self.sync()
+        if jti is None or jti not in self.bloom:
+            return False  # Jalur normal: tanpa I/O
+
+        expires_at = self._revoked.get(jti)
+        if expires_at is None:
+            if jti in self._not_revoked:
+                return False
+            # Dicabut oleh worker lain sejak sync terakhir, atau false positive
+            row = db.session.execute(select(RevokedToken.expires_at).where(RevokedToken.jti == jti)).first()
+            if row is None:
+                self._not_revoked[jti] = True
+                if len(self._not_revoked) > self._negative_cache:
+                    self._not_revoked.popitem(last=False)
+                return False
+            expires_at = self._revoked[jti] = _to_epoch(row.expires_at)
+        return expires_at > time.time()
+
+    def sync(self):
+        """Pull revocations added since the last sync, drop expired ones, rebuild the filter if full."""
+        if not self._sync_lock.acquire(blocking=False):
+            return  # Thread lain sedang sinkron
+        try:
+            self._next_sync = time.monotonic() + self.sync_interval
+            rows = db.session.execute(
+                select(RevokedToken.id, RevokedToken.jti, RevokedToken.expires_at)
+                .where(RevokedToken.id > self._last_id).order_by(RevokedToken.id)
+            ).all()
+            shared = isinstance(self.bloom, SharedBloom)
+            for row in rows:
+                self._revoked[row.jti] = _to_epoch(row.expires_at)
+                self._not_revoked.pop(row.jti, None)
+                if not shared:
+                    self.bloom.add(row.jti)
+                self._last_id = row.id
+
+            now = time.time()
+            expired = [jti for jti, expires_at in self._revoked.items() if expires_at <= now]
+            for jti in expired:
+                self._revoked.pop(jti, None)
+            if expired:
+                db.session.execute(delete(RevokedToken).where(RevokedToken.expires_at <= datetime.utcfromtimestamp(now)))
+                db.session.commit()
+
+            if self.bloom.count > self.bloom.capacity:
+                self.bloom.rebuild(lambda: [jti for jti, expires_at in self._revoked.items() if expires_at > now])
+                logging.info(f"Revocation Bloom filter rebuilt with {len(self._revoked)} live entries.")
+        except Exception as e:
+            db.session.rollback()
+            logging.error(f"Revocation sync failed: {e}")
+        finally:
+            self._sync_lock.release()
+
+
+_create_lock = threading.Lock()
+
+
+def _create_revocation_list(app):
+    capacity = app.config.get('REVOCATION_BLOOM_CAPACITY', 100000)
+    error_rate = app.config.get('REVOCATION_BLOOM_ERROR_RATE', 0.001)
+    if fcntl is not None:
+        path = app.config.get('REVOCATION_BLOOM_PATH') or os.path.join(app.instance_path, 'revoked.bloom')
+        bloom = SharedBloom(path, capacity, error_rate)
+    else:
+        bloom = LocalBloom(capacity, error_rate)
+    return RevocationList(bloom, app.config.get('REVOCATION_SYNC_INTERVAL', 5.0))
+
+
+def get_revocation_list(app=None):
+    """The app's revocation list; the Bloom filter file is created and mapped on first use, not at startup."""
+    app = app or current_app
+    revocation = app.extensions.get('revocation')
+    if revocation is None:
+        with _create_lock:
+            revocation = app.extensions.get('revocation')
+            if revocation is None:
+                revocation = app.extensions['revocation'] = _create_revocation_list(app)
+    return revocation
+
+
+def init_revocation(app, jwt):
+    """Hook the revocation list into flask_jwt_extended's blocklist check."""
+    @jwt.token_in_blocklist_loader
+    def check_if_token_revoked(jwt_header, jwt_payload):
+        return get_revocation_list(app).is_revoked(jwt_payload.get('jti'))
@@ -1,25 +1,29 @@
 import logging
 import datetime
-from datetime import datetime, time
+from datetime import datetime, time, timedelta
 from functools import wraps
 import re
 import os
-from flask import Blueprint, render_template, request, redirect, url_for, flash, current_app, jsonify
+from flask import Blueprint, render_template, request, redirect, url_for, flash, current_app, jsonify, Response
 from flask_login import login_required, current_user
-from app.models import User, Attendance, Employee, LocationSetting, AttendanceStatus
+from app.models import User, Employee, LocationSetting, OffboardingJob, ShiftTemplate, ShiftAssignment, Holiday, AttendanceFlag
 from flask_bcrypt import Bcrypt
 from app import db
 import uuid
 from werkzeug.utils import secure_filename
 from flask_jwt_extended import jwt_required, get_jwt_identity
-
-# Konfigurasi Logging
-logging.basicConfig(level=logging.INFO,  # Atur level log yang diinginkan (INFO, ERROR, DEBUG, dsb)
-                    format='%(asctime)s - %(levelname)s - %(message)s',
-                    handlers=[
-                        logging.StreamHandler(),  # Output log ke konsol
-                        logging.FileHandler('app.log')  # Simpan log ke file app.log
-                    ])
+from app.version_stamps import conditional_get, EMPLOYEES_KEY
+from app.blob_store import store_profile_photo
+from app.read_models import attendance_report_rows, decode_cursor, employee_list_rows, EMPLOYEE_SORT_KEYS
+from app.employee_counts import employee_total
+from app.offboarding import create_offboarding_job, run_offboarding_job, start_offboarding_job
+from app.attendance_shards import get_attendance
+from app.utils import admin_required, parse_date_range, MATRIX_MAX_DAYS
+from app.admission import get_admission_controller, prometheus_text
+from app.shifts import get_shift_index
+from app.events import get_event_bus, stream_events
+from app.shared_cache import location_setting
+from app.employee_search import normalize_query, search_employees as employee_search
 
 admin_bp = Blueprint('admin_bp', __name__)
 bcrypt = Bcrypt()
@@ -50,6 +54,12 @@ def add_employee():
     if existing_user:
         return jsonify({'status': 'error', 'message': 'Email already exists!'}), 400
 
+    # Simpan foto ke blob store, baris employee hanya menyimpan referensinya
+    try:
+        photo_key = store_profile_photo(photo)
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+
     # Hash password
     hashed_password = bcrypt.generate_password_hash(password).decode('utf-8')
 
@@ -65,7 +75,7 @@ def add_employee():
             email=email,
             phone_number=phone_number,
             password=hashed_password,
-            photo_profile=photo,  # Foto yang diambil, pastikan sudah diproses dengan benar
+            photo_key=photo_key,
             user_id=new_user.id
         )
         db.session.add(new_employee)
@@ -108,6 +118,8 @@ def edit_employee(id):
         # Update data pegawai
         employee.name = data['name']
         employee.email = email
+        if 'site_id' in data:
+            employee.site_id = data['site_id']  # Lokasi kerja untuk kalender per site (None = umum)
         db.session.commit()
 
         logging.info(f'Employee with ID {id} updated successfully.')
@@ -130,11 +142,9 @@ def delete_employee(id):
         return jsonify({'status': 'error', 'message': 'Employee not found!'}), 404
 
     try:
-        Attendance.query.filter_by(employee_id=employee.id).delete()
-        db.session.delete(employee)
-        user = User.query.get_or_404(id)
-        db.session.delete(user)
-        db.session.commit()
+        # Attendance dihapus bertahap dalam transaksi pendek agar tidak menahan write lock SQLite
+        job = create_offboarding_job([id])
+        run_offboarding_job(job.id)
 
         return jsonify({'status': 'success', 'message': 'User and all related records deleted successfully!'}), 200
 
@@ -145,28 +155,164 @@ def delete_employee(id):
 
 
 
+# Endpoint offboarding satu atau banyak employee (berjalan di background, bisa dilanjutkan)
+@admin_bp.route('/offboard', methods=['POST'])
+@jwt_required()
+@admin_required
+def offboard_employees():
+    data = request.get_json() or {}
+    user_ids = data.get('user_ids')
+    if not user_ids or not isinstance(user_ids, list):
+        return jsonify({'status': 'error', 'message': "'user_ids' must be a non-empty list"}), 400
+
+    try:
+        job = create_offboarding_job(user_ids, archive=bool(data.get('archive', False)))
+        start_offboarding_job(job.id)
+        return jsonify({'status': 'success', 'job': job.to_dict()}), 202
+    except (TypeError, ValueError):
+        return jsonify({'status': 'error', 'message': "'user_ids' must contain integers"}), 400
+    except Exception as e:
+        db.session.rollback()
+        logging.error(f"Error starting offboarding job: {e}")
+        return jsonify({'status': 'error', 'message': 'Failed to start offboarding'}), 500
+
+
+@admin_bp.route('/offboard/<int:job_id>', methods=['GET'])
+@jwt_required()
+@admin_required
+def offboarding_progress(job_id):
+    job = db.session.get(OffboardingJob, job_id)
+    if not job:
+        return jsonify({'status': 'error', 'message': 'Offboarding job not found'}), 404
+    return jsonify({'status': 'success', 'job': job.to_dict()}), 200
+
+
+@admin_bp.route('/offboard/<int:job_id>/resume', methods=['POST'])
+@jwt_required()
+@admin_required
+def resume_offboarding(job_id):
+    job = db.session.get(OffboardingJob, job_id)
+    if not job:
+        return jsonify({'status': 'error', 'message': 'Offboarding job not found'}), 404
+    if job.status == 'done':
+        return jsonify({'status': 'success', 'job': job.to_dict()}), 200
+
+    # Job 'running' hanya boleh dilanjutkan jika sudah lama tidak ada progres (proses sebelumnya mati)
+    stale_after = timedelta(seconds=current_app.config.get('OFFBOARDING_STALE_AFTER', 300))
+    if job.status == 'running' and datetime.utcnow() - job.updated_at < stale_after:
+        return jsonify({'status': 'error', 'message': 'Offboarding job is still running'}), 409
+
+    start_offboarding_job(job.id)
+    return jsonify({'status': 'success', 'job': job.to_dict()}), 202
+
+
+@admin_bp.route('/metrics', methods=['GET'])
+@jwt_required()
+@admin_required
+def metrics():
+    # Metrik admission control proses ini; ?format=prometheus untuk format teks Prometheus
+    snapshot = get_admission_controller().snapshot()
+    if request.args.get('format') == 'prometheus':
+        return Response(prometheus_text(snapshot), mimetype='text/plain; version=0.0.4')
+    return jsonify({'status': 'success', 'admission': snapshot}), 200
+
+
+@admin_bp.route('/stream', methods=['GET'])
+@jwt_required(locations=['headers', 'query_string'])  # EventSource tidak bisa mengirim header Authorization
+@admin_required
+def stream():
+    # Feed Server-Sent Events aktivitas presensi; Last-Event-ID untuk melanjutkan setelah reconnect
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+    config = current_app.config
+    # Generator berjalan di luar app context, jadi semua yang dibutuhkan diambil sekarang
+    events = stream_events(get_event_bus(), last_event_id,
+                           config.get('EVENT_HEARTBEAT', 15.0), config.get('EVENT_RETRY_MS', 3000))
+    return Response(events, mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+
+EMPLOYEE_ROLES = {'employee': 0, 'admin': 1}  # Nilai User.status
+
+
 @admin_bp.route('/list_employees', methods=['GET'])
 @jwt_required()
+@conditional_get(lambda identity: [EMPLOYEES_KEY])
 def list_employee():
-    # Ambil semua employee dari database
+    # Satu halaman employee; filter opsional gender, status/role, created_after; sort id|name; cursor keyset
+    args = request.args
+    sort = args.get('sort', 'id')
+    order = args.get('order', 'asc')
+    if sort not in EMPLOYEE_SORT_KEYS or order not in ('asc', 'desc'):
+        return jsonify({'status': 'error', 'message': "'sort' must be id or name and 'order' asc or desc"}), 400
+    status = args.get('status', type=int)
+    if 'role' in args:
+        if args['role'] not in EMPLOYEE_ROLES:
+            return jsonify({'status': 'error', 'message': f"'role' must be one of {', '.join(EMPLOYEE_ROLES)}"}), 400
+        status = EMPLOYEE_ROLES[args['role']]
+    try:
+        created_after = datetime.fromisoformat(args['created_after']) if args.get('created_after') else None
+    except ValueError:
+        return jsonify({'status': 'error', 'message': "'created_after' must be an ISO date or datetime"}), 400
+    max_limit = current_app.config.get('EMPLOYEE_LIST_MAX_LIMIT', 1000)
+    limit = args.get('limit', current_app.config.get('EMPLOYEE_LIST_PAGE_SIZE', 100), type=int)
+    if not 1 <= limit <= max_limit:
+        return jsonify({'status': 'error', 'message': f"'limit' must be between 1 and {max_limit}"}), 400
     try:
-        employees = Employee.query.all()
-        employees_data = [{
-            'id': employee.id,
-            'name': employee.name,
-            'gender': employee.gender,
-            'email': employee.email,
-            'phone_number': employee.phone_number,
-            'photo_profile': employee.photo_profile
-        } for employee in employees]
-
-        logging.info(f'{len(employees)} employees listed.')
-        return jsonify({'status': 'success', 'employees': employees_data}), 200
+        after = decode_cursor(args['cursor'], sort, order == 'desc') if args.get('cursor') else None
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': f'Invalid cursor: {e}'}), 400
+    gender = args.get('gender') or None
+
+    try:
+        # Hanya kolom yang dikirim; photo_profile berisi URL, bukan isi foto
+        employees_data, next_cursor = employee_list_rows(
+            limit, sort, order == 'desc', after, gender=gender, status=status, created_after=created_after
+        )
+        # Perkiraan dari employee_counts (dijaga trigger), bukan COUNT(*); created_after tidak ikut dihitung
+        total = employee_total(gender, status)
+
+        logging.info(f'{len(employees_data)} employees listed.')
+        return jsonify({
+            'status': 'success',
+            'employees': employees_data,
+            'next_cursor': next_cursor,  # None: halaman terakhir
+            'total': total
+        }), 200
     except Exception as e:
         logging.error(f"Error fetching employees: {e}")
         return jsonify({'status': 'error', 'message': 'Failed to retrieve employees'}), 500
 
 
+@admin_bp.route('/employees/search', methods=['GET'])
+@jwt_required()
+@admin_required
+@conditional_get(lambda identity: [EMPLOYEES_KEY])
+def search_employees():
+    # Cari karyawan berdasarkan nama, email atau nomor telepon (awalan, substring, salah ketik)
+    query = normalize_query(request.args.get('q'))
+    min_chars = current_app.config.get('EMPLOYEE_SEARCH_MIN_CHARS', 2)
+    if len(query) < min_chars:
+        return jsonify({'status': 'error', 'message': f"'q' must be at least {min_chars} characters"}), 400
+    if len(query) > 100:
+        return jsonify({'status': 'error', 'message': "'q' must be at most 100 characters"}), 400
+    page = request.args.get('page', 1, type=int)
+    per_page = request.args.get('per_page', 20, type=int)
+    max_per_page = current_app.config.get('EMPLOYEE_SEARCH_MAX_PER_PAGE', 100)
+    if page < 1 or not 1 <= per_page <= max_per_page:
+        return jsonify({'status': 'error', 'message': f"'page' must be >= 1 and 'per_page' between 1 and {max_per_page}"}), 400
+
+    employees, total, truncated = employee_search(query, page, per_page)
+    return jsonify({
+        'status': 'success',
+        'query': query,
+        'page': page,
+        'per_page': per_page,
+        'total': total,
+        'truncated': truncated,  # True: hasil dibatasi EMPLOYEE_SEARCH_MAX_RESULTS, perjelas kata kunci
+        'employees': employees
+    }), 200
+
+
 
 
 # @admin_bp.route('/attendance_report', methods=['GET'])
@@ -226,47 +372,101 @@ def attendance_report():
         logging.warning(f"Access denied for user {user_email}. Not an admin.")
         return jsonify({'status': 'error', 'message': 'Access denied'}), 403
 
+    # Rentang tanggal opsional (?start=YYYY-MM-DD&end=YYYY-MM-DD); bulan yang diarsipkan ikut dibaca
     try:
-        # Query join Attendance dan Employee
-        attendances = db.session.query(Attendance, Employee.name).join(
-            Employee, Attendance.employee_id == Employee.user_id
-        ).all()
-
-        # Format hasil query ke JSON
-        attendance_data = []
-        for attendance, name in attendances:
-            # Tentukan status absensi (Alpha jika tidak ada absensi, Hadir atau Izin sesuai status)
-            if attendance.status == AttendanceStatus.HADIR:
-                status = 'Hadir'
-            elif attendance.status == AttendanceStatus.IJIN:
-                status = 'Izin'
-            else:
-                status = 'Alpha'  # Jika tidak ada absensi, dianggap Alpha
-
-            attendance_data.append({
-                'employee_id': attendance.employee_id,
-                'employee_name': name,  # Nama karyawan dari tabel Employee
-                'status': status,  # Status absensi
-                'date': attendance.date.strftime('%Y-%m-%d') if attendance.date else 'N/A',  # Tanggal tanpa waktu
-                'time': attendance.time.strftime('%H:%M:%S') if attendance.time else 'N/A',  # Hanya jam:menit:detik
-                'time_out': attendance.time_out.strftime('%H:%M:%S') if attendance.time_out else 'N/A'  # Hanya jam:menit:detik
-            })
+        start, end = parse_date_range(request.args)
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': f'Invalid date range: {e}'}), 400
+
+    try:
+        # Proyeksi kolom Attendance + nama Employee (tanpa entity ORM), status Hadir/Izin/Alpha
+        attendance_data = attendance_report_rows(start, end)
+        response = {'status': 'success', 'attendance': attendance_data}
+
+        # Dengan rentang lengkap: ringkasan per employee, hari kerja tanpa absensi dihitung ALPHA (libur tidak).
+        # Rentang lebih dari MATRIX_MAX_DAYS hari tanpa ringkasan: matriksnya employee x hari di memori
+        if start and end and (end - start).days < MATRIX_MAX_DAYS:
+            from app.attendance_matrix import build_attendance_matrix, summarize_matrix  # numpy dimuat saat dipakai
+            employees, grid = build_attendance_matrix(start, end)
+            response['summary'] = summarize_matrix(employees, grid, start, end)
 
         logging.info(f"{len(attendance_data)} attendance records fetched.")
-        return jsonify({'status': 'success', 'attendance': attendance_data}), 200
+        return jsonify(response), 200
 
     except Exception as e:
         logging.error(f"Error fetching attendance report: {str(e)}")
         return jsonify({'status': 'error', 'message': 'Failed to retrieve attendance report'}), 500
 
 
+@admin_bp.route('/attendance_matrix', methods=['GET'])
+@jwt_required()
+def attendance_matrix():
+    # Ambil email pengguna dari token JWT
+    user_data = get_jwt_identity()
+    user_email = user_data.get('email')
+
+    # Validasi admin
+    user = User.query.filter_by(email=user_email).first()
+    if not user:
+        logging.warning(f"User with email {user_email} not found.")
+        return jsonify({'status': 'error', 'message': 'User not found'}), 404
+
+    if user.status != 1:
+        logging.warning(f"Access denied for user {user_email}. Not an admin.")
+        return jsonify({'status': 'error', 'message': 'Access denied'}), 403
+
+    # Rentang tanggal: ?month=YYYY-MM atau ?start=YYYY-MM-DD&end=YYYY-MM-DD
+    try:
+        month = request.args.get('month')
+        if month:
+            start = datetime.strptime(month, '%Y-%m').date()
+            next_month = (start.replace(day=28) + timedelta(days=4)).replace(day=1)
+            end = next_month - timedelta(days=1)
+        else:
+            start = datetime.strptime(request.args['start'], '%Y-%m-%d').date()
+            end = datetime.strptime(request.args['end'], '%Y-%m-%d').date()
+    except (KeyError, ValueError):
+        return jsonify({'status': 'error', 'message': "Provide 'month' (YYYY-MM) or 'start' and 'end' (YYYY-MM-DD)"}), 400
+
+    if end < start or (end - start).days >= MATRIX_MAX_DAYS:
+        return jsonify({'status': 'error', 'message': f'Date range must be between 1 and {MATRIX_MAX_DAYS} days'}), 400
+
+    from app.attendance_matrix import build_attendance_matrix, encode_base64, encode_rle, CODE_LABELS, MATRIX_ENCODINGS
+
+    encoding = request.args.get('encoding', 'base64')
+    if encoding not in MATRIX_ENCODINGS:
+        return jsonify({'status': 'error', 'message': f"Encoding must be one of {', '.join(MATRIX_ENCODINGS)}"}), 400
+
+    try:
+        employees, grid = build_attendance_matrix(start, end)
+        data = encode_base64(grid) if encoding == 'base64' else encode_rle(grid)
+
+        return jsonify({
+            'status': 'success',
+            'start': start.strftime('%Y-%m-%d'),
+            'end': end.strftime('%Y-%m-%d'),
+            'shape': list(grid.shape),
+            'encoding': encoding,
+            'codes': CODE_LABELS,
+            'employees': {
+                'ids': [employee.user_id for employee in employees],
+                'names': [employee.name for employee in employees]
+            },
+            'data': data
+        }), 200
+
+    except Exception as e:
+        logging.error(f"Error building attendance matrix: {str(e)}")
+        return jsonify({'status': 'error', 'message': 'Failed to build attendance matrix'}), 500
+
+
 
 @admin_bp.route('/location_settings', methods=['GET', 'POST'])
 @jwt_required()
 def location_settings():
     if request.method == 'GET':
         # Mengambil pengaturan lokasi
-        settings = LocationSetting.query.first()  # Ambil pengaturan lokasi pertama
+        settings = location_setting()  # Ambil pengaturan lokasi pertama (shared cache)
         if settings:
             return jsonify({
                 'latitude': settings.latitude,
@@ -304,3 +504,226 @@ def location_settings():
         db.session.commit()
 
         return jsonify({'status': 'success', 'message': 'Location settings saved successfully!'}), 201
+
+
+def _parse_shift_template(data, template):
+    """Apply JSON fields to a ShiftTemplate; raises ValueError on bad input."""
+    if 'name' in data:
+        template.name = data['name']
+    if 'start_time' in data:
+        template.start_time = datetime.strptime(data['start_time'], '%H:%M:%S').time()
+    if 'end_time' in data:
+        template.end_time = datetime.strptime(data['end_time'], '%H:%M:%S').time()
+    if 'grace_minutes' in data:
+        template.grace_minutes = int(data['grace_minutes'])
+    if 'weekdays' in data:
+        # Daftar hari 0 (Senin) .. 6 (Minggu)
+        template.weekdays = sum(1 << int(day) for day in set(data['weekdays']) if 0 <= int(day) <= 6)
+    if not template.name or template.start_time is None or template.end_time is None:
+        raise ValueError("'name', 'start_time' and 'end_time' are required")
+
+
+@admin_bp.route('/shift_templates', methods=['GET', 'POST'])
+@jwt_required()
+@admin_required
+def shift_templates():
+    if request.method == 'GET':
+        templates = ShiftTemplate.query.order_by(ShiftTemplate.name).all()
+        return jsonify({'status': 'success', 'shift_templates': [t.to_dict() for t in templates]}), 200
+
+    try:
+        template = ShiftTemplate()
+        _parse_shift_template(request.get_json() or {}, template)
+        db.session.add(template)
+        db.session.commit()
+        logging.info(f"Shift template {template.name} created.")
+        return jsonify({'status': 'success', 'shift_template': template.to_dict()}), 201
+    except (ValueError, TypeError) as e:
+        db.session.rollback()
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+    except Exception as e:
+        db.session.rollback()
+        logging.error(f"Error creating shift template: {e}")
+        return jsonify({'status': 'error', 'message': 'Failed to create shift template'}), 500
+
+
+@admin_bp.route('/shift_templates/<int:id>', methods=['POST'])
+@jwt_required()
+@admin_required
+def edit_shift_template(id):
+    template = db.session.get(ShiftTemplate, id)
+    if not template:
+        return jsonify({'status': 'error', 'message': 'Shift template not found'}), 404
+    try:
+        _parse_shift_template(request.get_json() or {}, template)
+        db.session.commit()
+        get_shift_index().refresh_template(id)  # Proses lain menyusul lewat version stamp
+        return jsonify({'status': 'success', 'shift_template': template.to_dict()}), 200
+    except (ValueError, TypeError) as e:
+        db.session.rollback()
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+
+
+@admin_bp.route('/shift_assignments', methods=['GET', 'POST'])
+@jwt_required()
+@admin_required
+def shift_assignments():
+    if request.method == 'GET':
+        query = ShiftAssignment.query
+        if request.args.get('employee_id'):
+            query = query.filter_by(employee_id=request.args.get('employee_id', type=int))
+        assignments = query.order_by(ShiftAssignment.employee_id, ShiftAssignment.start_date).all()
+        return jsonify({'status': 'success', 'shift_assignments': [a.to_dict() for a in assignments]}), 200
+
+    data = request.get_json() or {}
+    try:
+        # employee_id = user_id employee, sama seperti Attendance.employee_id
+        employee_id = int(data['employee_id'])
+        template_id = int(data['template_id'])
+        start_date = datetime.strptime(data['start_date'], '%Y-%m-%d').date()
+        end_date = datetime.strptime(data['end_date'], '%Y-%m-%d').date() if data.get('end_date') else None
+    except (KeyError, ValueError, TypeError):
+        return jsonify({'status': 'error', 'message': "'employee_id', 'template_id' and 'start_date' (YYYY-MM-DD) are required"}), 400
+    if end_date and end_date < start_date:
+        return jsonify({'status': 'error', 'message': "'end_date' is before 'start_date'"}), 400
+    if not Employee.query.filter_by(user_id=employee_id).first() or not db.session.get(ShiftTemplate, template_id):
+        return jsonify({'status': 'error', 'message': 'Employee or shift template not found'}), 404
+
+    assignment = ShiftAssignment(employee_id=employee_id, template_id=template_id, start_date=start_date, end_date=end_date)
+    db.session.add(assignment)
+    db.session.commit()
+    get_shift_index().refresh_employee(employee_id)
+    logging.info(f"Shift assignment {assignment.id} created for employee {employee_id}.")
+    return jsonify({'status': 'success', 'shift_assignment': assignment.to_dict()}), 201
+
+
+@admin_bp.route('/shift_assignments/<int:id>/delete', methods=['POST'])
+@jwt_required()
+@admin_required
+def delete_shift_assignment(id):
+    assignment = db.session.get(ShiftAssignment, id)
+    if not assignment:
+        return jsonify({'status': 'error', 'message': 'Shift assignment not found'}), 404
+    employee_id = assignment.employee_id
+    db.session.delete(assignment)
+    db.session.commit()
+    get_shift_index().refresh_employee(employee_id)
+    return jsonify({'status': 'success', 'message': 'Shift assignment deleted'}), 200
+
+
+HOLIDAY_SCOPES = ('national', 'company', 'site')
+
+
+@admin_bp.route('/holidays', methods=['GET', 'POST'])
+@jwt_required()
+@admin_required
+def holidays():
+    if request.method == 'GET':
+        query = Holiday.query
+        year = request.args.get('year', type=int)
+        if year:
+            query = query.filter(Holiday.date >= datetime(year, 1, 1).date(), Holiday.date < datetime(year + 1, 1, 1).date())
+        entries = query.order_by(Holiday.date).all()
+        return jsonify({'status': 'success', 'holidays': [h.to_dict() for h in entries]}), 200
+
+    data = request.get_json() or {}
+    try:
+        holiday_date = datetime.strptime(data['date'], '%Y-%m-%d').date()
+        name = data['name']
+    except (KeyError, ValueError, TypeError):
+        return jsonify({'status': 'error', 'message': "'date' (YYYY-MM-DD) and 'name' are required"}), 400
+    scope = data.get('scope', 'national')
+    site_id = data.get('site_id')
+    if scope not in HOLIDAY_SCOPES:
+        return jsonify({'status': 'error', 'message': f"'scope' must be one of {', '.join(HOLIDAY_SCOPES)}"}), 400
+    if (scope == 'site') != (site_id is not None):
+        return jsonify({'status': 'error', 'message': "'site_id' is required for, and only for, scope 'site'"}), 400
+
+    holiday = Holiday(date=holiday_date, name=name, scope=scope, site_id=site_id, is_working=bool(data.get('is_working')))
+    db.session.add(holiday)
+    db.session.commit()
+    from app.work_calendar import get_calendar
+    get_calendar().invalidate()  # Proses lain menyusul lewat version stamp
+    logging.info(f"Holiday {holiday.name} on {holiday.date} ({holiday.scope}) added.")
+    return jsonify({'status': 'success', 'holiday': holiday.to_dict()}), 201
+
+
+@admin_bp.route('/holidays/<int:id>/delete', methods=['POST'])
+@jwt_required()
+@admin_required
+def delete_holiday(id):
+    holiday = db.session.get(Holiday, id)
+    if not holiday:
+        return jsonify({'status': 'error', 'message': 'Holiday not found'}), 404
+    db.session.delete(holiday)
+    db.session.commit()
+    from app.work_calendar import get_calendar
+    get_calendar().invalidate()
+    return jsonify({'status': 'success', 'message': 'Holiday deleted'}), 200
+
+
+@admin_bp.route('/working_days', methods=['GET'])
+@jwt_required()
+@admin_required
+def working_days():
+    # Jumlah hari kerja dalam rentang (inklusif), opsional per site
+    try:
+        start, end = parse_date_range(request.args)
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': f'Invalid date range: {e}'}), 400
+    if not start or not end:
+        return jsonify({'status': 'error', 'message': "'start' and 'end' are required"}), 400
+    site_id = request.args.get('site_id', type=int)
+    from app.work_calendar import get_calendar
+    return jsonify({
+        'status': 'success',
+        'start': start.isoformat(),
+        'end': end.isoformat(),
+        'site_id': site_id,
+        'working_days': get_calendar().working_days(start, end, site_id)
+    }), 200
+
+
+@admin_bp.route('/attendance_flags', methods=['GET'])
+@jwt_required()
+@admin_required
+def attendance_flags():
+    # Presensi yang ditandai mencurigakan, terbaru dulu; filter opsional kind, employee_id, start/end
+    try:
+        start, end = parse_date_range(request.args)
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': f'Invalid date range: {e}'}), 400
+    query = AttendanceFlag.query
+    if request.args.get('kind'):
+        query = query.filter(AttendanceFlag.kind == request.args['kind'])
+    employee_id = request.args.get('employee_id', type=int)
+    if employee_id:
+        query = query.filter(AttendanceFlag.employee_id == employee_id)
+    if start:
+        query = query.filter(AttendanceFlag.created_at >= datetime.combine(start, time.min))
+    if end:
+        query = query.filter(AttendanceFlag.created_at < datetime.combine(end + timedelta(days=1), time.min))
+    limit = min(request.args.get('limit', 100, type=int), 1000)
+    flags = query.order_by(AttendanceFlag.id.desc()).limit(limit).all()
+    return jsonify({'status': 'success', 'flags': [flag.to_dict() for flag in flags]}), 200
+
+
+@admin_bp.route('/photo_duplicates/<int:attendance_id>', methods=['GET'])
+@jwt_required()
+@admin_required
+def photo_duplicates(attendance_id):
+    # Presensi lain dengan foto mirip (jarak hamming <= distance) dari index hash foto
+    attendance = get_attendance(attendance_id)
+    if not attendance:
+        return jsonify({'status': 'error', 'message': 'Attendance not found'}), 404
+    if attendance.photo_hash is None:
+        return jsonify({'status': 'error', 'message': 'Attendance has no photo hash'}), 404
+    distance = request.args.get('distance', type=int)
+    if distance is not None and not 0 <= distance <= 32:
+        return jsonify({'status': 'error', 'message': "'distance' must be between 0 and 32"}), 400
+    from app.photo_hash import find_photo_matches
+    return jsonify({
+        'status': 'success',
+        'attendance_id': attendance_id,
+        'matches': find_photo_matches(attendance_id, attendance.photo_hash, distance)
+    }), 200
@@ -0,0 +1,284 @@
+"""Async versions of the I/O-bound endpoints, served in ASGI mode (app.asgi).
+
+Same URLs, checks and responses as the Flask views they stand in for in
+employee_routes and admin_routes; the sync-only pieces of those views
+(photo storage, shift rules, photo hash, calendar, photo reuse and travel
+checks) are shared helpers run through run_sync.
+"""
+import logging
+from datetime import datetime
+
+from flask import current_app
+from sqlalchemy import select
+
+from app.asgi import AsyncRoutes, LoopEvent, StreamingResponse, async_session, run_sync
+from app.blob_store import store_attendance_photo
+from app.compression import compress_level, compress_stream_async, negotiate_encoding
+from app.events import get_event_bus, publish_attendance, stream_events_async
+from app.models import Attendance, AttendanceStatus, Employee, User
+from app.read_models import archived_report_rows, attendance_report_stmt, report_row
+from app.routes.employee_routes import absence_status, clock_in_rules
+from app.utils import parse_date_range, MATRIX_MAX_DAYS
+
+routes = AsyncRoutes()
+
+
+def _clock_in_checks(photo_data, employee_id, date_obj, time_obj):
+    # Bagian sinkron record_attendance sebelum insert: hash foto (numpy/Pillow) dan aturan shift
+    from app.photo_hash import hash_photo_bytes, to_signed
+
+    photo_hash = hash_photo_bytes(photo_data)
+    return (to_signed(photo_hash) if photo_hash is not None else None), clock_in_rules(employee_id, date_obj, time_obj)
+
+
+def _after_clock_in(attendance):
+    from app.photo_hash import check_photo_reuse
+    from app.travel import check_travel
+
+    check_photo_reuse(attendance)  # Menandai presensi jika fotonya mirip foto lama
+    check_travel(attendance)  # Menandai perpindahan lokasi yang mustahil sejak presensi sebelumnya
+
+
+async def _insert(attendance):
+    # Version stamp dan change log ikut transaksi yang sama (event after_flush / trigger), seperti save_attendance
+    async with async_session() as session:
+        session.add(attendance)
+        await session.commit()
+    return attendance
+
+
+async def _admin_error(identity):
+    # Seperti admin_required: user dicari berdasarkan email dari JWT
+    user_email = (identity or {}).get('email')
+    async with async_session() as session:
+        status = (await session.execute(select(User.status).where(User.email == user_email).limit(1))).first()
+    if status is None:
+        logging.warning(f"User with email {user_email} not found.")
+        return {'status': 'error', 'message': 'User not found'}, 404
+    if status[0] != 1:
+        logging.warning(f"Access denied for user {user_email}. Not an admin.")
+        return {'status': 'error', 'message': 'Access denied'}, 403
+    return None
+
+
+@routes.route('POST', '/employee/attendance', 'employee.record_attendance')
+async def record_attendance(request):
+    try:
+        data = await request.get_json()
+
+        date = data.get('date')
+        time = data.get('time')  # Waktu masuk
+        time_out = data.get('time_out')  # Waktu keluar (opsional)
+        photo = data.get('photo')  # Foto absensi (opsional)
+        latitude = data.get('latitude')
+        longitude = data.get('longitude')
+
+        if not date or not time:
+            return {'status': 'error', 'message': 'Date and time are required'}, 400
+        if latitude is None or longitude is None:
+            return {'status': 'error', 'message': 'Latitude and longitude are required'}, 400
+
+        date_obj = datetime.strptime(date, '%Y-%m-%d')
+        time_obj = datetime.strptime(time, '%H:%M:%S').time()
+        time_out_obj = datetime.strptime(time_out, '%H:%M:%S').time() if time_out else None
+
+        try:
+            photo_filename, photo_data = await run_sync(store_attendance_photo, photo)
+        except ValueError as e:
+            return {'status': 'error', 'message': str(e)}, 400
+        employee_id = request.identity['id']
+        photo_hash, (status, shift, attendance_date, late_minutes) = await run_sync(
+            _clock_in_checks, photo_data, employee_id, date_obj, time_obj)
+
+        attendance = await _insert(Attendance(
+            employee_id=employee_id,
+            status=status,
+            date=attendance_date,
+            time=time_obj,
+            time_out=time_out_obj,
+            reason=None,
+            photo=photo_filename,
+            latitude=latitude,
+            longitude=longitude,
+            shift_id=shift.template_id if shift else None,
+            late_minutes=late_minutes,
+            photo_hash=photo_hash
+        ))
+        publish_attendance('clock_out' if time_out_obj else 'clock_in', attendance)
+        await run_sync(_after_clock_in, attendance)
+
+        return {
+            'status': 'success',
+            'message': 'Attendance recorded successfully',
+            'attendance_status': status.value,
+            'shift': shift.name if shift else None,
+            'late_minutes': late_minutes
+        }, 200
+
+    except Exception as e:
+        logging.error(f"Error while recording attendance: {e}")
+        return {'status': 'error', 'message': 'Internal Server Error'}, 500
+
+
+@routes.route('POST', '/employee/leave', 'employee.submit_leave')
+async def submit_leave(request):
+    try:
+        data = await request.get_json()
+
+        date = data.get('date')
+        time = data.get('time')  # Waktu permohonan izin
+        reason = data.get('reason', 'N/A')  # Alasan izin (default 'N/A' jika kosong)
+        photo = data.get('photo')  # Foto pendukung (opsional)
+
+        if not date or not time:
+            return {'status': 'error', 'message': 'Date and time are required'}, 400
+        if not reason:
+            return {'status': 'error', 'message': 'Reason is required'}, 400
+
+        date_obj = datetime.strptime(date, '%Y-%m-%d')
+        time_obj = datetime.strptime(time, '%H:%M:%S').time()
+
+        try:
+            photo_filename, _ = await run_sync(store_attendance_photo, photo)
+        except ValueError as e:
+            return {'status': 'error', 'message': str(e)}, 400
+        attendance = await _insert(Attendance(
+            employee_id=request.identity['id'],
+            status=AttendanceStatus.IJIN,
+            date=date_obj,
+            time=time_obj,
+            time_out=None,
+            reason=reason,
+            photo=photo_filename,
+            latitude=None,
+            longitude=None
+        ))
+        publish_attendance('leave', attendance)
+
+        return {'status': 'success', 'message': 'Leave request submitted successfully'}, 200
+
+    except Exception as e:
+        logging.error(f"Error while submitting leave: {e}")
+        return {'status': 'error', 'message': 'Internal Server Error'}, 500
+
+
+@routes.route('GET', '/employee/attendance_status', 'employee.check_attendance_status')
+async def check_attendance_status(request):
+    try:
+        date = request.args.get('date')
+        if not date:
+            return {'status': 'error', 'message': 'Date is required'}, 400
+
+        date_obj = datetime.strptime(date, '%Y-%m-%d').date()
+        employee_id = request.identity['id']
+
+        async with async_session() as session:
+            status = (await session.execute(
+                select(Attendance.status).where(Attendance.employee_id == employee_id, Attendance.date == date_obj)
+                .limit(1)
+            )).first()
+            if status is not None:
+                return {
+                    'status': 'success',
+                    'message': f'Attendance status: {status[0]}',
+                    'attendance_status': status[0]
+                }, 200
+            site_id = (await session.execute(
+                select(Employee.site_id).where(Employee.user_id == employee_id)
+            )).scalar()
+
+        # Kalender kerja bisa memuat ulang hari libur dari database
+        return await run_sync(absence_status, date_obj, site_id), 200
+
+    except Exception as e:
+        logging.error(f"Error while checking attendance status: {e}")
+        return {'status': 'error', 'message': 'Internal Server Error'}, 500
+
+
+def _report_summary(start, end):
+    from app.attendance_matrix import build_attendance_matrix, summarize_matrix  # numpy dimuat saat dipakai
+
+    employees, grid = build_attendance_matrix(start, end)
+    return summarize_matrix(employees, grid, start, end)
+
+
+async def _hot_report_chunks(start, end, chunk_size):
+    # Potongan keyset, masing-masing transaksi baca pendek: klien yang lambat membaca tidak menahan
+    # shared lock database (yang akan menghalangi commit clock-in) selama laporan dikirim
+    stmt = attendance_report_stmt(start, end).add_columns(Attendance.id).order_by(Attendance.id).limit(chunk_size)
+    last_id = None
+    while True:
+        async with async_session() as session:
+            rows = (await session.execute(stmt if last_id is None else stmt.where(Attendance.id > last_id))).all()
+        if rows:
+            yield [row[:-1] for row in rows]
+        if len(rows) < chunk_size:
+            return
+        last_id = rows[-1][-1]
+
+
+async def _report_chunks(app, start, end):
+    # JSON yang sama dengan /admin/attendance_report versi Flask, dikirim per potongan sambil dibaca
+    dumps = app.json.dumps
+    chunk_size = app.config.get('ASGI_REPORT_CHUNK', 1000)
+    opening = b'{"attendance":['  # Kunci terurut seperti jsonify
+    count = 0
+    archived = await run_sync(archived_report_rows, start, end)
+    for offset in range(0, len(archived), chunk_size):
+        rows = archived[offset:offset + chunk_size]
+        yield (b',' if count else opening) + ','.join(dumps(report_row(*row)) for row in rows).encode('utf-8')
+        count += len(rows)
+    async for rows in _hot_report_chunks(start, end, chunk_size):
+        yield (b',' if count else opening) + ','.join(dumps(report_row(*row)) for row in rows).encode('utf-8')
+        count += len(rows)
+
+    summary = b''
+    if start and end and (end - start).days < MATRIX_MAX_DAYS:
+        summary = b',"summary":' + dumps(await run_sync(_report_summary, start, end)).encode('utf-8')
+    yield (b'' if count else opening) + b'],"status":"success"' + summary + b'}\n'
+    logging.info(f"{count} attendance records fetched.")
+
+
+@routes.route('GET', '/admin/attendance_report', 'admin_bp.attendance_report')
+async def attendance_report(request):
+    error = await _admin_error(request.identity)
+    if error:
+        return error
+
+    try:
+        start, end = parse_date_range(request.args)
+    except ValueError as e:
+        return {'status': 'error', 'message': f'Invalid date range: {e}'}, 400
+
+    app = current_app._get_current_object()
+    chunks = _report_chunks(app, start, end)
+    headers = {'Vary': 'Accept-Encoding'}
+    encoding = negotiate_encoding(request.headers.get('accept-encoding', ''))
+    if encoding:
+        chunks = compress_stream_async(chunks, encoding, compress_level(app, encoding))
+        headers['Content-Encoding'] = encoding
+    return StreamingResponse(chunks, 'application/json', headers,
+                             error_message='Failed to retrieve attendance report')
+
+
+@routes.route('GET', '/admin/stream', 'admin_bp.stream', jwt_locations=('headers', 'query_string'))
+async def stream(request):
+    error = await _admin_error(request.identity)
+    if error:
+        return error
+
+    # Feed SSE tanpa thread per koneksi: subscriber dibangunkan lewat event loop
+    last_event_id = request.headers.get('last-event-id') or request.args.get('last_event_id')
+    config = current_app.config
+    events = stream_events_async(get_event_bus(), LoopEvent(), last_event_id,
+                                 config.get('EVENT_HEARTBEAT', 15.0), config.get('EVENT_RETRY_MS', 3000))
+
+    async def frames():
+        try:
+            async for frame in events:
+                yield frame.encode('utf-8')
+        finally:
+            await events.aclose()  # Subscriber dilepas dari bus
+
+    return StreamingResponse(frames(), 'text/event-stream; charset=utf-8',
+                             {'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
@@ -2,18 +2,11 @@ import os
 import logging
 from flask import Blueprint, render_template, request, session, redirect, url_for, flash, current_app, jsonify
 from app import db
-from app.models import Attendance, AttendanceStatus
+from app.models import AttendanceStatus
 from datetime import datetime
 from werkzeug.utils import secure_filename
 from flask_jwt_extended import jwt_required, get_jwt_identity
-
-# Konfigurasi Logging
-logging.basicConfig(level=logging.INFO,  # Atur level log yang diinginkan (INFO, ERROR, DEBUG, dsb)
-                    format='%(asctime)s - %(levelname)s - %(message)s',
-                    handlers=[
-                        logging.StreamHandler(),  # Output log ke konsol
-                        logging.FileHandler('app.log')  # Simpan log ke file app.log
-                    ])
+from app.read_models import attendance_records
 
 attendance_bp = Blueprint('attendance', __name__)
 
@@ -21,7 +14,7 @@ attendance_bp = Blueprint('attendance', __name__)
 @jwt_required()  # Menggunakan @jwt_required untuk memeriksa otentikasi JWT
 def recap():
     # Mendapatkan user_id dari token JWT yang sudah diverifikasi
-    user_id = get_jwt_identity()
+    user_id = get_jwt_identity().get('id')  # Identity berupa dictionary (email, status, id)
     
     if request.method == 'POST':
         try:
@@ -38,9 +31,9 @@ def recap():
 
     elif request.method == 'GET':
         # Mengambil catatan absensi berdasarkan user_id yang didapat dari JWT
-        attendance_records = Attendance.query.filter_by(employee_id=user_id).all()
-        logging.info(f"Recap page accessed by user: {user_id}, Found {len(attendance_records)} attendance records")
+        records = attendance_records(user_id)
+        logging.info(f"Recap page accessed by user: {user_id}, Found {len(records)} attendance records")
 
         # Return halaman recap untuk karyawan atau pengguna
-        return render_template('employee/recap.html', attendance_records=attendance_records, AttendanceStatus=AttendanceStatus)
+        return render_template('employee/recap.html', attendance_records=records, AttendanceStatus=AttendanceStatus)
 
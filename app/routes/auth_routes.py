@@ -1,10 +1,13 @@
 import logging, jwt
 from flask import Blueprint, request, jsonify, url_for, render_template, redirect, session
 from flask_login import login_user, logout_user, current_user
-from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity
+from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity, get_jwt
 from werkzeug.security import check_password_hash, generate_password_hash
 from app.models import User
 from app.utils import generate_jwt_token, generate_reset_token, verify_reset_token
+from app.mailer import send_email_async
+from app.rate_limit import rate_limit
+from app.revocation import get_revocation_list
 from flask_bcrypt import Bcrypt
 from app import db
 
@@ -12,16 +15,9 @@ from app import db
 auth_bp = Blueprint('auth_bp', __name__)
 bcrypt = Bcrypt()
 
-# Konfigurasi Logging
-logging.basicConfig(level=logging.INFO,
-                    format='%(asctime)s - %(levelname)s - %(message)s',
-                    handlers=[
-                        logging.StreamHandler(),
-                        logging.FileHandler('app.log')
-                    ])
-
 
 @auth_bp.route('/login', methods=['POST'])
+@rate_limit
 def login():
         try:
             if request.is_json:
@@ -69,6 +65,10 @@ def logout():
         identity = get_jwt_identity()
         logging.info(f"User {identity} attempting to log out.")
 
+        # Cabut token ini (berdasarkan jti) sampai waktu kedaluwarsanya
+        claims = get_jwt()
+        get_revocation_list().revoke(claims['jti'], claims.get('exp'), identity.get('id'))
+
         # Respons logout sukses
         return jsonify({'status': 'success', 'message': 'Logout berhasil!'}), 200
     except Exception as e:
@@ -78,6 +78,7 @@ def logout():
 
 # Route untuk forgot-password
 @auth_bp.route('/forgot-password', methods=['POST'])
+@rate_limit
 def forgot_password():
     
     # Jika POST request, proses email
@@ -90,12 +91,21 @@ def forgot_password():
     if user:
         token = generate_reset_token(user.id)
         reset_url = url_for('auth_bp.reset_password', token=token, _external=True)
-        return jsonify({'status': 'success', 'message': 'Token berhasil dibuat', 'reset_url': reset_url}), 200
+        # Email dikirim oleh worker antrean, request tidak menunggu SMTP.
+        # Tautan hanya dikirim lewat email: siapa pun yang tahu alamatnya tidak boleh menerimanya di respons
+        try:
+            send_email_async('Reset Password', [user.email],
+                             f'Gunakan tautan berikut untuk mengatur ulang password Anda:\n{reset_url}')
+        except RuntimeError as e:
+            logging.error(f"Reset password email for {user.email} not queued: {e}")
+            return jsonify({'status': 'error', 'message': 'Email reset password tidak dapat dikirim.'}), 500
+        return jsonify({'status': 'success', 'message': 'Tautan reset password telah dikirim ke email Anda.'}), 200
     else:
         return jsonify({'status': 'error', 'message': 'Email tidak ditemukan.'}), 404
 
 
 @auth_bp.route('/reset-password/<token>', methods=['GET', 'POST'])
+@rate_limit
 def reset_password(token):
     if request.method == 'GET':
         # Tampilkan halaman reset password (HTML)
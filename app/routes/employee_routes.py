@@ -1,20 +1,20 @@
 import os
 import logging
-from flask import Blueprint, render_template, request, flash, redirect, url_for, current_app, jsonify
+from flask import Blueprint, render_template, request, flash, redirect, url_for, current_app, jsonify, send_file, abort
 from flask_login import login_required, current_user
 from app import db
 from app.models import Attendance, AttendanceStatus, Employee, User
-from werkzeug.utils import secure_filename
 from datetime import datetime
 from flask_jwt_extended import jwt_required, get_jwt_identity
-
-# Konfigurasi Logging
-logging.basicConfig(level=logging.INFO,  # Atur level log yang diinginkan (INFO, ERROR, DEBUG, dsb)
-                    format='%(asctime)s - %(levelname)s - %(message)s',
-                    handlers=[
-                        logging.StreamHandler(),  # Output log ke konsol
-                        logging.FileHandler('app.log')  # Simpan log ke file app.log
-                    ])
+from app.version_stamps import conditional_get, attendance_key, employee_key
+from app.blob_store import blob_path, photo_url, store_attendance_photo, CONTENT_TYPES
+from app.read_models import employee_recap_rows, employee_sync_rows
+from app.utils import parse_date_range
+from app.shifts import get_shift_index, lateness_minutes
+from app.events import publish_attendance
+from app.change_log import changes_since, current_cursor, cursor_is_valid
+from app.shared_cache import employee_by_user_id
+from app.attendance_shards import attendance_session, save_attendance, sharding_enabled
 
 home_bp = Blueprint('home_bp', __name__)
 
@@ -32,6 +32,42 @@ def index():
 employee_bp = Blueprint('employee', __name__)
 
 
+# Dipakai juga oleh versi async endpoint di app.routes.async_routes
+def clock_in_rules(employee_id, date_obj, time_obj):
+    """(status, shift, attendance date, late minutes) of a clock-in from the shift it falls in."""
+    # Cari shift yang berlaku untuk waktu clock-in (tanpa query) untuk status dan keterlambatan
+    status = AttendanceStatus.HADIR  # Default HADIR
+    late_minutes = None
+    clock_in_at = datetime.combine(date_obj.date(), time_obj)
+    shift = get_shift_index().shift_for(employee_id, clock_in_at)
+    if shift:
+        late_minutes = lateness_minutes(shift, clock_in_at)
+        date_obj = shift.start  # Shift malam dicatat pada tanggal mulai shift
+        absent_after = current_app.config.get('SHIFT_ABSENT_AFTER_MINUTES')
+        if absent_after is not None and late_minutes >= absent_after:
+            status = AttendanceStatus.TIDAK_HADIR
+    return status, shift, date_obj.date(), late_minutes
+
+
+def absence_status(date_obj, site_id):
+    """Status response for a day without attendance: Libur on holidays and weekends, otherwise Alpha."""
+    from app.work_calendar import get_calendar
+    calendar = get_calendar()
+    if not calendar.is_working_day(date_obj, site_id):
+        holiday = calendar.holiday_name(date_obj, site_id)
+        return {
+            'status': 'success',
+            'message': f'Attendance status: Libur ({holiday or "Akhir pekan"})',
+            'attendance_status': 'Libur'
+        }
+    # Jika tidak ditemukan absensi di hari kerja, berarti Alpha (tidak hadir)
+    return {
+        'status': 'success',
+        'message': 'Attendance status: Alpha (Tidak Hadir)',
+        'attendance_status': 'Alpha'
+    }
+
+
 @employee_bp.route('/user_dashboard', methods=['GET'])
 @jwt_required()
 def user_dashboard():
@@ -39,8 +75,9 @@ def user_dashboard():
     user_id = user_data.get('id')  # Pastikan 'id' ada dalam identity saat login
 
     # Ambil data Employee dan Attendance
-    employee = Employee.query.filter_by(user_id=user_id).first()
-    attendances = Attendance.query.filter_by(employee_id=user_id).all()
+    employee = employee_by_user_id(user_id)  # Dari shared cache
+    with attendance_session(user_id) as session:  # Database utama atau shard employee
+        attendances = session.execute(db.select(Attendance).filter_by(employee_id=user_id)).scalars().all()
 
     logging.info(f"User {user_id} accessed their dashboard.")
     
@@ -65,6 +102,7 @@ def user_dashboard():
 
 @employee_bp.route('/profile', methods=['GET', 'POST'])
 @jwt_required()  # Menggunakan @jwt_required untuk memeriksa otentikasi JWT
+@conditional_get(lambda identity: [employee_key(identity.get('id'))])
 def profile():
     user_data = get_jwt_identity()  # Ini akan mengembalikan data dalam format dictionary
     user_id = user_data.get('id')  # Pastikan untuk mendapatkan 'id' jika hasilnya dictionary
@@ -73,7 +111,7 @@ def profile():
 
     # Untuk permintaan GET, tampilkan data profil dalam format JSON
     if request.method == 'GET':
-        employee = Employee.query.filter_by(user_id=user_id).first()  # Mencari employee berdasarkan user_id
+        employee = employee_by_user_id(user_id)  # Mencari employee berdasarkan user_id (shared cache)
         if employee:
             # Return data profil dalam format JSON
             employee_data = {
@@ -82,7 +120,7 @@ def profile():
                 'gender': employee.gender,
                 'email': employee.email,
                 'phone_number': employee.phone_number,
-                'photo_profile': employee.photo_profile
+                'photo_profile': photo_url(employee.photo_key)  # URL, bukan isi foto
             }
             return jsonify({'status': 'success', 'employee': employee_data}), 200
         else:
@@ -91,8 +129,23 @@ def profile():
 
 
 
+@employee_bp.route('/photo/<key>', methods=['GET'])
+def profile_photo(key):
+    # Blob dialamatkan berdasarkan isi (sha256), jadi aman di-cache selamanya
+    try:
+        path = blob_path(key)
+    except ValueError:
+        abort(404)
+    if not os.path.exists(path):
+        abort(404)
+    response = send_file(path, mimetype=CONTENT_TYPES[key.rsplit('.', 1)[1]], max_age=31536000, conditional=True)
+    response.cache_control.immutable = True
+    return response
+
+
 @employee_bp.route('/recap', methods=['GET'])
 @jwt_required()
+@conditional_get(lambda identity: [attendance_key(identity.get('id'))])
 def attendance_report():
     # Ambil email pengguna dari token JWT
     user_data = get_jwt_identity()  # Ini akan mengembalikan dictionary
@@ -109,22 +162,17 @@ def attendance_report():
         logging.warning(f'User with email {user_email} not found.')
         return jsonify({'status': 'error', 'message': 'User not found'}), 404
 
+    # Rentang tanggal opsional (?start=YYYY-MM-DD&end=YYYY-MM-DD); bulan yang diarsipkan ikut dibaca
     try:
-        # Mengambil semua catatan absensi untuk pengguna yang sedang login
-        attendances = Attendance.query.filter_by(employee_id=user.id).all()  # Filter berdasarkan employee_id
-        attendance_data = [{
-            'employee_id': attendance.employee_id,
-            'status': attendance.status.value if hasattr(attendance.status, 'value') else str(attendance.status),
-            'date': attendance.date.strftime('%Y-%m-%d') if attendance.date else 'N/A',  # Tanggal tanpa waktu
-            'time': attendance.time.strftime('%H:%M:%S') if attendance.time else 'N/A',  # Hanya jam:menit:detik
-            'time_out': attendance.time_out.strftime('%H:%M:%S') if attendance.time_out else 'Belum Clock Out',  # Hanya jam:menit:detik
-            'photo': attendance.photo,
-            'latitude': attendance.latitude,
-            'longitude': attendance.longitude,
-            'reason': attendance.reason
-        } for attendance in attendances]
-
-        logging.info(f'{len(attendances)} attendance records fetched for user {user.email}.')
+        start, end = parse_date_range(request.args)
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': f'Invalid date range: {e}'}), 400
+
+    try:
+        # Mengambil catatan absensi untuk pengguna yang sedang login
+        attendance_data = employee_recap_rows(user.id, start, end)  # Filter berdasarkan employee_id
+
+        logging.info(f'{len(attendance_data)} attendance records fetched for user {user.email}.')
 
         return jsonify({'status': 'success', 'attendance': attendance_data}), 200
 
@@ -133,6 +181,40 @@ def attendance_report():
         return jsonify({'status': 'error', 'message': 'Failed to retrieve attendance report'}), 500
 
     
+@employee_bp.route('/sync', methods=['GET'])
+@jwt_required()
+def sync_attendance():
+    # Sinkron delta untuk aplikasi mobile: ?since=<cursor> hanya mengembalikan baris yang berubah.
+    # Tanpa since (atau cursor terlalu lama) dikirim salinan lengkap; simpan 'cursor' untuk permintaan berikutnya.
+    employee_id = get_jwt_identity()['id']
+    since = request.args.get('since')
+    if since is not None and not since.isdigit():
+        return jsonify({'status': 'error', 'message': "'since' must be a cursor returned by a previous sync"}), 400
+
+    try:
+        cursor = current_cursor()  # Dibaca dulu: perubahan sesudahnya ikut sinkron berikutnya
+        # Log perubahan hanya mencatat tabel di database utama: attendance yang di-shard selalu disalin lengkap
+        if since is not None and not sharding_enabled() and cursor_is_valid(int(since)):
+            changed, deleted = changes_since(employee_id, int(since))
+            response = {'status': 'success', 'cursor': cursor, 'full': False}
+            if changed:
+                response['attendance'] = employee_sync_rows(employee_id, changed)
+            if deleted:
+                response['deleted'] = deleted
+            return jsonify(response), 200
+
+        return jsonify({
+            'status': 'success',
+            'cursor': cursor,
+            'full': True,
+            'attendance': employee_sync_rows(employee_id)
+        }), 200
+
+    except Exception as e:
+        logging.error(f"Error while syncing attendance: {e}")
+        return jsonify({'status': 'error', 'message': 'Failed to sync attendance'}), 500
+
+
 @employee_bp.route('/attendance', methods=['POST'])
 @jwt_required()
 def record_attendance():
@@ -161,33 +243,50 @@ def record_attendance():
         if time_out:
             time_out_obj = datetime.strptime(time_out, '%H:%M:%S').time()
 
-        # Simpan foto jika ada
-        photo_filename = None
-        if photo:
-            photo_filename = secure_filename(photo)
-            with open(os.path.join(current_app.root_path, 'static', 'uploads', photo_filename), 'wb') as f:
-                f.write(photo.encode('utf-8'))
+        # Simpan foto jika ada (gambar ke blob store dengan nama dari isinya)
+        try:
+            photo_filename, photo_data = store_attendance_photo(photo)
+        except ValueError as e:
+            return jsonify({'status': 'error', 'message': str(e)}), 400
+        # Hash perseptual foto untuk mendeteksi foto yang dipakai ulang (None jika tidak bisa dihitung)
+        from app.photo_hash import check_photo_reuse, hash_photo_bytes, to_signed  # numpy dimuat saat dipakai
+        from app.travel import check_travel
+        photo_hash = hash_photo_bytes(photo_data)
 
         # Ambil employee_id dari JWT
         user_identity = get_jwt_identity()
         employee_id = user_identity['id']  # Ambil ID user dari JWT
 
+        # Status dan keterlambatan dari shift yang berlaku untuk waktu clock-in
+        status, shift, attendance_date, late_minutes = clock_in_rules(employee_id, date_obj, time_obj)
+
         # Simpan presensi ke database
         attendance = Attendance(
             employee_id=employee_id,
-            status=AttendanceStatus.HADIR,  # Default HADIR
-            date=date_obj,
+            status=status,
+            date=attendance_date,
             time=time_obj,
             time_out=time_out_obj,
             reason=None,  # Tidak ada alasan untuk absensi
             photo=photo_filename,
             latitude=latitude,
-            longitude=longitude
+            longitude=longitude,
+            shift_id=shift.template_id if shift else None,
+            late_minutes=late_minutes,
+            photo_hash=to_signed(photo_hash) if photo_hash is not None else None
         )
-        db.session.add(attendance)
-        db.session.commit()
-
-        return jsonify({'status': 'success', 'message': 'Attendance recorded successfully'}), 200
+        save_attendance(attendance)
+        publish_attendance('clock_out' if time_out_obj else 'clock_in', attendance)
+        check_photo_reuse(attendance)  # Menandai presensi jika fotonya mirip foto lama
+        check_travel(attendance)  # Menandai perpindahan lokasi yang mustahil sejak presensi sebelumnya
+
+        return jsonify({
+            'status': 'success',
+            'message': 'Attendance recorded successfully',
+            'attendance_status': status.value,
+            'shift': shift.name if shift else None,
+            'late_minutes': late_minutes
+        }), 200
 
     except Exception as e:
         logging.error(f"Error while recording attendance: {e}")
@@ -223,11 +322,10 @@ def submit_leave():
         time_obj = datetime.strptime(time, '%H:%M:%S').time()
 
         # Simpan foto jika ada
-        photo_filename = None
-        if photo:
-            photo_filename = secure_filename(photo)
-            with open(os.path.join(current_app.root_path, 'static', 'uploads', photo_filename), 'wb') as f:
-                f.write(photo.encode('utf-8'))
+        try:
+            photo_filename, _ = store_attendance_photo(photo)
+        except ValueError as e:
+            return jsonify({'status': 'error', 'message': str(e)}), 400
 
         # Ambil employee_id dari JWT
         user_identity = get_jwt_identity()
@@ -245,8 +343,8 @@ def submit_leave():
             latitude=None,
             longitude=None
         )
-        db.session.add(attendance)
-        db.session.commit()
+        save_attendance(attendance)
+        publish_attendance('leave', attendance)
 
         return jsonify({'status': 'success', 'message': 'Leave request submitted successfully'}), 200
 
@@ -264,15 +362,15 @@ def check_attendance_status():
         if not date:
             return jsonify({'status': 'error', 'message': 'Date is required'}), 400
 
-        # Konversi tanggal dari string ke datetime
-        date_obj = datetime.strptime(date, '%Y-%m-%d')
+        # Konversi tanggal dari string ke date (kolom Attendance.date bertipe Date)
+        date_obj = datetime.strptime(date, '%Y-%m-%d').date()
 
         # Ambil employee_id dari JWT
         user_identity = get_jwt_identity()
         employee_id = user_identity['id']
 
         # Cari absensi berdasarkan employee_id dan date
-        attendance = Attendance.query.filter_by(employee_id=employee_id, date=date_obj).first()
+        attendance = Attendance.get_attendance_by_date(employee_id, date_obj)
 
         if attendance:
             # Jika ditemukan absensi, tampilkan status
@@ -281,13 +379,12 @@ def check_attendance_status():
                 'message': f'Attendance status: {attendance.status}',
                 'attendance_status': attendance.status
             }), 200
-        else:
-            # Jika tidak ditemukan absensi, berarti Alpha (tidak hadir)
-            return jsonify({
-                'status': 'success',
-                'message': 'Attendance status: Alpha (Tidak Hadir)',
-                'attendance_status': 'Alpha'
-            }), 200
+
+        # Tanpa absensi di hari libur / akhir pekan bukan Alpha
+        site_id = db.session.execute(
+            db.select(Employee.site_id).where(Employee.user_id == employee_id)
+        ).scalar()
+        return jsonify(absence_status(date_obj, site_id)), 200
 
     except Exception as e:
         logging.error(f"Error while checking attendance status: {e}")
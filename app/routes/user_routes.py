@@ -4,25 +4,20 @@ from flask import Blueprint, render_template, redirect, url_for, flash, request,
 from flask_login import login_required, current_user
 from app import db
 from app.models import Attendance, AttendanceStatus, Employee
+from app.events import publish_attendance
+from app.attendance_shards import attendance_session, save_attendance
 from werkzeug.utils import secure_filename
 from datetime import datetime
 import pytz
 
-# Konfigurasi Logging
-logging.basicConfig(level=logging.INFO,  # Atur level log yang diinginkan (INFO, ERROR, DEBUG, dsb)
-                    format='%(asctime)s - %(levelname)s - %(message)s',
-                    handlers=[
-                        logging.StreamHandler(),  # Output log ke konsol
-                        logging.FileHandler('app.log')  # Simpan log ke file app.log
-                    ])
-
 user_bp = Blueprint('user_bp', __name__)
 
 @user_bp.route('/user_dashboard')
 @login_required
 def user_dashboard():
     employee = Employee.query.filter_by(user_id=current_user.id).first()
-    attendances = Attendance.query.filter_by(employee_id=current_user.id).all()
+    with attendance_session(current_user.id) as session:  # Database utama atau shard employee
+        attendances = session.execute(db.select(Attendance).filter_by(employee_id=current_user.id)).scalars().all()
     
     logging.info(f"User {current_user.id} accessed their dashboard.")  # Logging saat pengguna mengakses dashboard
     
@@ -66,8 +61,8 @@ def clock_in():
             latitude=float(lat),  # Konversi lat dan long ke float
             longitude=float(long)
         )
-        db.session.add(attendance)
-        db.session.commit()
+        save_attendance(attendance)
+        publish_attendance('clock_in', attendance)
         flash('Clock In berhasil!', 'success')
         logging.info(f"User {current_user.id} successfully clocked in at {lat}, {long} with photo {photo_filename}.")  # Logging jika clock-in berhasil
         return redirect(url_for('user_bp.user_dashboard'))
@@ -79,10 +74,11 @@ def clock_in():
 def clock_out():
     if request.method == 'POST':
         # Cari data clock-in terakhir
-        attendance = Attendance.query.filter_by(
-            employee_id=current_user.id,
-            status=AttendanceStatus.CLOCK_IN
-        ).order_by(Attendance.id.desc()).first()
+        with attendance_session(current_user.id) as session:
+            attendance = session.execute(db.select(Attendance).filter_by(
+                employee_id=current_user.id,
+                status=AttendanceStatus.CLOCK_IN
+            ).order_by(Attendance.id.desc()).limit(1)).scalar()
 
         if not attendance:
             flash('Tidak ada data Clock In sebelumnya untuk Clock Out!', 'danger')
@@ -92,7 +88,8 @@ def clock_out():
         # Update data clock-out
         attendance.time_out = datetime.now()  # Simpan waktu clock out
         attendance.status = AttendanceStatus.CLOCK_OUT
-        db.session.commit()
+        save_attendance(attendance)
+        publish_attendance('clock_out', attendance)
         flash('Clock Out berhasil!', 'success')
         logging.info(f"User {current_user.id} successfully clocked out.")  # Logging jika clock-out berhasil
         return redirect(url_for('user_bp.user_dashboard'))
@@ -103,7 +100,10 @@ def clock_out():
 @login_required
 def recap():
     # Ambil semua catatan absensi untuk karyawan yang sedang login
-    attendance_records = Attendance.query.filter_by(employee_id=current_user.id).all()
+    with attendance_session(current_user.id) as session:
+        attendance_records = session.execute(
+            db.select(Attendance).filter_by(employee_id=current_user.id)
+        ).scalars().all()
     logging.info(f"User {current_user.id} accessed their attendance recap. Found {len(attendance_records)} records.")  # Logging saat mengakses recap
     return render_template('employee/recap.html', attendance_records=attendance_records, AttendanceStatus=AttendanceStatus)
 
@@ -136,8 +136,8 @@ def leave():
             reason=reason,
             photo=photo_filename  # Simpan nama file foto
         )
-        db.session.add(attendance)
-        db.session.commit()
+        save_attendance(attendance)
+        publish_attendance('leave', attendance)
         flash('Pengajuan izin berhasil!', 'success')
         logging.info(f"User {current_user.id} successfully submitted a leave request for {date}.")  # Logging pengajuan izin berhasil
         return redirect(url_for('user_bp.user_dashboard'))
@@ -0,0 +1,400 @@
+"""Node-wide cache of employee and settings lookups shared by all workers.
+
+Entries live in an mmap'ed file under <instance>/cache, so every worker
+process on the host reads the same single copy. The file is a
+set-associative table of fixed-size slots: a key hashes to one set of
+`ways` slots, and when the set is full the least recently used slot is
+replaced. Readers are lock-free: each slot carries a sequence counter that
+writers make odd while they rewrite it (a seqlock), and a reader that sees
+it change retries. Writers serialize with flock.
+
+Entries are versioned. Invalidating a key leaves a tombstone with the
+version incremented, and a value loaded from the database is only stored
+if the key's version is still the one seen before the load (reserve ->
+load -> put). A worker that read a row just before another worker changed
+it therefore cannot put the stale row back. Invalidation happens after
+commit for every Employee / LocationSetting change made through the ORM,
+and is visible to all workers at once because they share the file.
+SHARED_CACHE_TTL bounds staleness for changes made on other hosts.
+
+Values are pickled; the file is private to the application instance.
+Platforms without fcntl get a per-process LRU with the same interface.
+"""
+import hashlib
+import logging
+import mmap
+import os
+import pickle
+import struct
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+from flask import current_app
+from sqlalchemy import event, inspect, select
+from sqlalchemy.orm import Session
+
+from app import db
+from app.models import Employee, LocationSetting
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+MISS = object()
+
+# magic, slot, ukuran slot, ways, jam LRU
+HEADER = struct.Struct('<4sIIIQ')
+HEADER_SIZE = 64
+MAGIC = b'SHC1'
+CLOCK = struct.Struct('<Q')
+CLOCK_OFFSET = 16
+
+# seq, panjang value, hash key, versi, last_used, stored_at, panjang key, flags
+SLOT = struct.Struct('<IIQQQIHH')
+SEQ = struct.Struct('<I')
+KEY_HASH = struct.Struct('<Q')
+LAST_USED = struct.Struct('<Q')
+LAST_USED_OFFSET = 24
+HAS_VALUE = 1
+
+EmployeeRecord = namedtuple('EmployeeRecord', 'id user_id name gender email phone_number photo_key site_id')
+SettingRecord = namedtuple('SettingRecord', 'id latitude longitude radius clock_in clock_out')
+
+
+def _key_hash(key):
+    # 0 menandai slot kosong
+    return int.from_bytes(hashlib.blake2b(key, digest_size=8).digest(), 'little') or 1
+
+
+class SharedCache:
+    """Set-associative LRU cache in a file mapped by every process of the host."""
+
+    def __init__(self, path, slots=4096, slot_size=1024, ways=8, ttl=300.0):
+        self.ways = ways
+        self.sets = max(1, slots // ways)
+        self.slots = self.sets * ways
+        self.slot_size = slot_size
+        self.ttl = ttl
+        root, ext = os.path.splitext(path)
+        # Geometri di nama file: konfigurasi lain = file lain, tidak pernah salah baca
+        self.path = f'{root}-{self.slots}x{slot_size}{ext}'
+        self._lock = threading.Lock()  # flock tidak mengecualikan thread dalam proses yang sama
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        self._open()
+
+    def _open(self):
+        size = HEADER_SIZE + self.slots * self.slot_size
+        if not os.path.exists(self.path):
+            tmp = f'{self.path}.{os.getpid()}.{threading.get_ident()}.tmp'
+            with open(tmp, 'wb') as f:
+                f.write(HEADER.pack(MAGIC, self.slots, self.slot_size, self.ways, 0))
+                f.truncate(size)  # Sparse: halaman baru dipakai saat slot terisi
+            try:
+                os.link(tmp, self.path)  # Gagal jika proses lain sudah membuatnya
+            except FileExistsError:
+                pass
+            finally:
+                os.remove(tmp)
+        self._file = open(self.path, 'r+b')
+        self._mm = mmap.mmap(self._file.fileno(), size)
+        magic, slots, slot_size, ways, _ = HEADER.unpack_from(self._mm, 0)
+        if (magic, slots, slot_size, ways) != (MAGIC, self.slots, self.slot_size, self.ways):
+            raise ValueError(f'{self.path} is not a shared cache file with this geometry')
+
+    def _offsets(self, key_hash):
+        first = key_hash % self.sets * self.ways
+        return [HEADER_SIZE + (first + way) * self.slot_size for way in range(self.ways)]
+
+    def _tick(self):
+        # Jam LRU bersama; kenaikan yang balapan antar proses tidak masalah (LRU perkiraan)
+        clock = CLOCK.unpack_from(self._mm, CLOCK_OFFSET)[0] + 1
+        CLOCK.pack_into(self._mm, CLOCK_OFFSET, clock)
+        return clock
+
+    def _read(self, offset, key):
+        """(header, value bytes) of the slot if it holds key, else None; retries torn reads."""
+        mm = self._mm
+        for _ in range(8):
+            seq = SEQ.unpack_from(mm, offset)[0]
+            if seq & 1:
+                continue  # Sedang ditulis
+            header = SLOT.unpack_from(mm, offset)
+            _, value_len, _, _, _, _, key_len, _ = header
+            if SLOT.size + key_len + value_len > self.slot_size:
+                continue
+            data = mm[offset + SLOT.size:offset + SLOT.size + key_len + value_len]
+            if SEQ.unpack_from(mm, offset)[0] != seq:
+                continue
+            if data[:key_len] != key:
+                return None
+            return header, data[key_len:]
+        return None
+
+    def _find(self, key, key_hash):
+        for offset in self._offsets(key_hash):
+            if KEY_HASH.unpack_from(self._mm, offset + 8)[0] == key_hash:
+                found = self._read(offset, key)
+                if found is not None:
+                    return offset, found[0], found[1]
+        return None, None, None
+
+    def get(self, key):
+        """Cached value of key, or MISS."""
+        key = key.encode()
+        offset, header, value = self._find(key, _key_hash(key))
+        if offset is None or not header[7] & HAS_VALUE:
+            return MISS
+        if self.ttl and time.time() - header[5] > self.ttl:
+            return MISS
+        LAST_USED.pack_into(self._mm, offset + LAST_USED_OFFSET, self._tick())
+        return pickle.loads(value)
+
+    def reserve(self, key):
+        """Version token to pass to put() after loading key from the database."""
+        key = key.encode()
+        offset, header, _ = self._find(key, _key_hash(key))
+        return header[3] if offset is not None else 0
+
+    def _write(self, offset, key, key_hash, version, value=None):
+        mm = self._mm
+        seq = SEQ.unpack_from(mm, offset)[0]
+        SEQ.pack_into(mm, offset, seq + 1)  # Ganjil: pembaca mengulang
+        payload = key + (value or b'')
+        mm[offset + SLOT.size:offset + SLOT.size + len(payload)] = payload
+        SLOT.pack_into(mm, offset, seq + 1, len(value or b''), key_hash, version, self._tick(),
+                       int(time.time()), len(key), HAS_VALUE if value is not None else 0)
+        SEQ.pack_into(mm, offset, seq + 2)
+
+    def _victim(self, key_hash):
+        """Slot for a key that is not cached: an empty one, else the least recently used of its set."""
+        best, best_used = None, None
+        for offset in self._offsets(key_hash):
+            if KEY_HASH.unpack_from(self._mm, offset + 8)[0] == 0:
+                return offset
+            used = LAST_USED.unpack_from(self._mm, offset + LAST_USED_OFFSET)[0]
+            if best is None or used < best_used:
+                best, best_used = offset, used
+        return best
+
+    def _locked(self):
+        return _FileLock(self._lock, self._file)
+
+    def put(self, key, value, token=0):
+        """Store value unless key was invalidated since reserve() returned token. Returns True if stored."""
+        key = key.encode()
+        data = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        if SLOT.size + len(key) + len(data) > self.slot_size:
+            return False  # Terlalu besar untuk slot
+        key_hash = _key_hash(key)
+        with self._locked():
+            offset, header, _ = self._find(key, key_hash)
+            if offset is not None:
+                if header[3] != token:
+                    return False  # Diinvalidasi (atau diisi ulang) sejak reserve
+                self._write(offset, key, key_hash, token, data)
+            else:
+                self._write(self._victim(key_hash), key, key_hash, token, data)
+        return True
+
+    def invalidate(self, key):
+        """Drop key for every process; loads that started before this are not stored."""
+        key = key.encode()
+        key_hash = _key_hash(key)
+        with self._locked():
+            offset, header, _ = self._find(key, key_hash)
+            if offset is not None:
+                self._write(offset, key, key_hash, header[3] + 1)
+            else:
+                # Tombstone, agar pemuat yang reserve() sebelum invalidasi (token 0) ditolak
+                self._write(self._victim(key_hash), key, key_hash, 1)
+
+    def clear(self):
+        with self._locked():
+            self._mm[HEADER_SIZE:] = bytes(len(self._mm) - HEADER_SIZE)
+
+
+class _FileLock:
+    def __init__(self, lock, file):
+        self.lock = lock
+        self.file = file
+
+    def __enter__(self):
+        self.lock.acquire()
+        fcntl.flock(self.file, fcntl.LOCK_EX)
+
+    def __exit__(self, *exc):
+        fcntl.flock(self.file, fcntl.LOCK_UN)
+        self.lock.release()
+
+
+class LocalCache:
+    """Per-process LRU with the same interface as SharedCache (no fcntl)."""
+
+    def __init__(self, slots=4096, ttl=300.0):
+        self.slots = slots
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (version, stored_at, value or MISS)
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[2] is MISS or (self.ttl and time.time() - entry[1] > self.ttl):
+                return MISS
+            self._entries.move_to_end(key)
+            return entry[2]
+
+    def reserve(self, key):
+        entry = self._entries.get(key)
+        return entry[0] if entry else 0
+
+    def _store(self, key, entry):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.slots:
+            self._entries.popitem(last=False)
+
+    def put(self, key, value, token=0):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] != token:
+                return False
+            self._store(key, (token, time.time(), value))
+        return True
+
+    def invalidate(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            self._store(key, ((entry[0] if entry else 0) + 1, time.time(), MISS))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+_create_lock = threading.Lock()
+
+
+def _create_caches(app):
+    """The record cache (single rows) and the list cache (whole lists) for this app."""
+    config = app.config
+    folder = config.get('SHARED_CACHE_PATH') or os.path.join(app.instance_path, 'cache')
+    ttl = config.get('SHARED_CACHE_TTL', 300.0)
+    caches = {}
+    for name, slots, slot_size in (
+        ('records', config.get('SHARED_CACHE_SLOTS', 4096), config.get('SHARED_CACHE_SLOT_SIZE', 1024)),
+        ('lists', config.get('SHARED_CACHE_LIST_SLOTS', 16), config.get('SHARED_CACHE_LIST_SLOT_SIZE', 524288)),
+    ):
+        if fcntl is not None:
+            ways = min(8, slots)
+            caches[name] = SharedCache(os.path.join(folder, f'{name}.cache'), slots, slot_size, ways, ttl)
+        else:
+            caches[name] = LocalCache(slots, ttl)
+    return caches
+
+
+def get_cache(name='records', app=None):
+    """One of the app's caches; the cache files are created and mapped on first use, not at startup."""
+    app = app or current_app
+    caches = app.extensions.get('shared_cache')
+    if caches is None:
+        with _create_lock:
+            caches = app.extensions.get('shared_cache')
+            if caches is None:
+                caches = app.extensions['shared_cache'] = _create_caches(app)
+    return caches[name]
+
+
+def cached(name, key, load):
+    """Value of key from the shared cache, loading (and storing) it with load() on a miss."""
+    if not current_app.config.get('SHARED_CACHE_ENABLED', True):
+        return load()
+    cache = get_cache(name)
+    value = cache.get(key)
+    if value is MISS:
+        token = cache.reserve(key)
+        value = load()
+        cache.put(key, value, token)
+    return value
+
+
+# -- Lookup --------------------------------------------------------------------
+
+EMPLOYEE_COLUMNS = (Employee.id, Employee.user_id, Employee.name, Employee.gender, Employee.email,
+                    Employee.phone_number, Employee.photo_key, Employee.site_id)
+
+
+def _employee_record(row):
+    return EmployeeRecord(*row) if row else None
+
+
+def employee_by_user_id(user_id):
+    """EmployeeRecord of a user (read-only), or None."""
+    return cached('records', f'employee:{user_id}', lambda: _employee_record(
+        db.session.execute(select(*EMPLOYEE_COLUMNS).where(Employee.user_id == user_id)).first()
+    ))
+
+
+def employee_by_id(employee_id):
+    """EmployeeRecord by employees.id (read-only), or None."""
+    return cached('records', f'employee_id:{employee_id}', lambda: _employee_record(
+        db.session.execute(select(*EMPLOYEE_COLUMNS).where(Employee.id == employee_id)).first()
+    ))
+
+
+def all_employees():
+    """Every EmployeeRecord (read-only), ordered by id."""
+    return cached('lists', 'employees', lambda: [
+        EmployeeRecord(*row) for row in db.session.execute(select(*EMPLOYEE_COLUMNS).order_by(Employee.id))
+    ])
+
+
+def location_setting():
+    """The (first) LocationSetting as a SettingRecord, or None."""
+    def load():
+        row = db.session.execute(
+            select(LocationSetting.id, LocationSetting.latitude, LocationSetting.longitude, LocationSetting.radius,
+                   LocationSetting.clock_in, LocationSetting.clock_out).order_by(LocationSetting.id).limit(1)
+        ).first()
+        return SettingRecord(*row) if row else None
+    return cached('records', 'location_setting', load)
+
+
+# -- Invalidasi setelah commit ------------------------------------------------
+
+def _cache_keys_for(obj):
+    if isinstance(obj, Employee):
+        keys = [('lists', 'employees'), ('records', f'employee:{obj.user_id}'), ('records', f'employee_id:{obj.id}')]
+        # user_id bisa berubah: kunci lama juga harus hilang
+        history = inspect(obj).attrs.user_id.history
+        keys += [('records', f'employee:{old}') for old in history.deleted or ()]
+        return keys
+    if isinstance(obj, LocationSetting):
+        return [('records', 'location_setting')]
+    return []
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_cache_keys(session, flush_context):
+    keys = session.info.setdefault('shared_cache_keys', set())
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        keys.update(_cache_keys_for(obj))
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_after_commit(session):
+    keys = session.info.pop('shared_cache_keys', None)
+    if not keys:
+        return
+    try:
+        for name, key in keys:
+            get_cache(name).invalidate(key)
+    except Exception as e:
+        logging.error(f"Shared cache invalidation failed: {e}")
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_cache_keys(session):
+    session.info.pop('shared_cache_keys', None)
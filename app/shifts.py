@@ -0,0 +1,239 @@
+"""In-memory shift schedule index.
+
+Shift assignments (employee + template + date range) are expanded into
+concrete shift windows per employee for a rolling horizon around today and
+kept as sorted lists, so "which shift does this clock-in belong to" is a
+bisect, O(log n), without a query. A window opens SHIFT_EARLY_MINUTES before
+the shift starts and closes when it ends; overnight shifts end on the next
+day and belong to the day they start.
+
+Schedule changes bump version stamps (shift:<employee_id>,
+shift_template:<id>, location_settings). Every SHIFT_REFRESH_INTERVAL
+seconds the index reads the stamps and re-expands only the affected
+employees. Employees without assignments fall back to the global
+LocationSetting clock_in/clock_out.
+"""
+import bisect
+import logging
+import threading
+import time
+from collections import defaultdict, namedtuple
+from datetime import date, datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import select
+
+from app import db
+from app.models import ShiftAssignment, ShiftTemplate, VersionStamp
+from app.shared_cache import location_setting
+from app.version_stamps import SHIFTS_KEY
+
+Template = namedtuple('Template', 'id name start_time end_time grace_minutes weekdays')
+Assignment = namedtuple('Assignment', 'start_date end_date template_id')
+ShiftWindow = namedtuple('ShiftWindow', 'opens start end template_id name grace_minutes')
+
+ALL_DAYS = 0b1111111
+
+
+def _template(row):
+    return Template(row.id, row.name, row.start_time, row.end_time, row.grace_minutes, row.weekdays)
+
+
+def _window(template, day, early):
+    start = datetime.combine(day, template.start_time)
+    end = datetime.combine(day, template.end_time)
+    if end <= start:
+        end += timedelta(days=1)  # Shift malam
+    return ShiftWindow(start - early, start, end, template.id, template.name, template.grace_minutes)
+
+
+def expand(assignments, templates, first_day, last_day, early):
+    """Shift windows of the assignments for shifts starting in [first_day, last_day], sorted by opening time."""
+    windows = []
+    for assignment in assignments:
+        template = templates.get(assignment.template_id)
+        if template is None:
+            continue
+        day = max(first_day, assignment.start_date)
+        last = min(last_day, assignment.end_date) if assignment.end_date else last_day
+        while day <= last:
+            if template.weekdays >> day.weekday() & 1:
+                windows.append(_window(template, day, early))
+            day += timedelta(days=1)
+    windows.sort()
+    return windows
+
+
+class EmployeeSchedule:
+    """Sorted shift windows of one employee; opens[i] is windows[i].opens for bisect."""
+    __slots__ = ('opens', 'windows')
+
+    def __init__(self, windows):
+        self.windows = windows
+        self.opens = [window.opens for window in windows]
+
+    def find(self, moment):
+        index = bisect.bisect_right(self.opens, moment) - 1
+        # Jendela bisa bertumpuk (jendela awal shift berikutnya); yang terakhir dibuka dan belum selesai menang
+        for candidate in (index, index - 1):
+            if candidate >= 0 and moment < self.windows[candidate].end:
+                return self.windows[candidate]
+        return None
+
+
+class ShiftIndex:
+    def __init__(self, early_minutes=120, days_back=7, days_ahead=35, refresh_interval=30.0):
+        self.early = timedelta(minutes=early_minutes)
+        self.days_back = days_back
+        self.days_ahead = days_ahead
+        self.refresh_interval = refresh_interval
+        self._lock = threading.RLock()
+        self._templates = {}
+        self._assignments = defaultdict(list)
+        self._schedules = {}
+        self._default = None
+        self._horizon = (date.min, date.min)
+        self._stamps = {}
+        self._next_refresh = 0.0
+
+    # -- Memuat dari database ------------------------------------------------
+
+    def load(self):
+        """Load every template and assignment and expand all schedules (startup, or once a day)."""
+        with self._lock:
+            self._templates = {row.id: _template(row) for row in db.session.execute(select(ShiftTemplate)).scalars()}
+            assignments = defaultdict(list)
+            for row in db.session.execute(
+                select(ShiftAssignment.employee_id, ShiftAssignment.start_date,
+                       ShiftAssignment.end_date, ShiftAssignment.template_id)
+            ):
+                assignments[row.employee_id].append(Assignment(row.start_date, row.end_date, row.template_id))
+            self._assignments = assignments
+            self._load_default()
+            self._stamps = self._read_stamps()
+            self._set_horizon(date.today())
+            logging.info(f"Shift index loaded: {len(self._templates)} templates, {len(assignments)} employees.")
+
+    def _load_default(self):
+        setting = location_setting()
+        self._default = (Template(None, 'default', setting.clock_in, setting.clock_out,
+                                  current_app.config.get('SHIFT_DEFAULT_GRACE_MINUTES', 0), ALL_DAYS)
+                         if setting else None)
+
+    def _set_horizon(self, today):
+        first, last = today - timedelta(days=self.days_back), today + timedelta(days=self.days_ahead)
+        self._horizon = (first, last)
+        self._schedules = {employee_id: self._expand(assignments, first, last)
+                           for employee_id, assignments in self._assignments.items()}
+
+    def _expand(self, assignments, first, last):
+        # Mulai sehari lebih awal agar shift malam kemarin ikut tercakup
+        return EmployeeSchedule(expand(assignments, self._templates, first - timedelta(days=1), last, self.early))
+
+    def refresh_employee(self, employee_id):
+        """Reload and re-expand one employee's assignments."""
+        rows = db.session.execute(
+            select(ShiftAssignment.start_date, ShiftAssignment.end_date, ShiftAssignment.template_id)
+            .where(ShiftAssignment.employee_id == employee_id)
+        ).all()
+        with self._lock:
+            assignments = [Assignment(*row) for row in rows]
+            # shift_for membaca tanpa lock: jadwal ditulis sebelum assignment dan dihapus sesudahnya
+            if assignments:
+                self._schedules[employee_id] = self._expand(assignments, *self._horizon)
+                self._assignments[employee_id] = assignments
+            else:
+                self._assignments.pop(employee_id, None)
+                self._schedules.pop(employee_id, None)
+
+    def refresh_template(self, template_id):
+        """Reload one template and re-expand only the employees that use it."""
+        row = db.session.get(ShiftTemplate, template_id)
+        with self._lock:
+            if row is None:
+                self._templates.pop(template_id, None)
+            else:
+                self._templates[template_id] = _template(row)
+            for employee_id, assignments in self._assignments.items():
+                if any(assignment.template_id == template_id for assignment in assignments):
+                    self._schedules[employee_id] = self._expand(assignments, *self._horizon)
+
+    def _read_stamps(self):
+        rows = db.session.execute(
+            select(VersionStamp.key, VersionStamp.version)
+            .where((VersionStamp.key == SHIFTS_KEY) | VersionStamp.key.like('shift%:%')
+                   | (VersionStamp.key == 'location_settings'))
+        ).all()
+        return {row.key: row.version for row in rows}
+
+    def refresh(self):
+        """Apply schedule changes made by any process since the last refresh."""
+        stamps = self._read_stamps()
+        if stamps.get(SHIFTS_KEY) == self._stamps.get(SHIFTS_KEY):
+            return
+        changed = [key for key, version in stamps.items() if self._stamps.get(key) != version]
+        for key in changed:
+            kind, _, ident = key.partition(':')
+            if kind == 'shift':
+                self.refresh_employee(int(ident))
+            elif kind == 'shift_template':
+                self.refresh_template(int(ident))
+            elif key == 'location_settings':
+                with self._lock:
+                    self._load_default()
+        self._stamps = stamps
+
+    # -- Lookup --------------------------------------------------------------
+
+    def _maybe_refresh(self, moment):
+        now = time.monotonic()
+        if now >= self._next_refresh:
+            self._next_refresh = now + self.refresh_interval
+            try:
+                self.refresh()
+            except Exception as e:
+                db.session.rollback()
+                logging.error(f"Shift index refresh failed: {e}")
+        today = date.today()
+        if today - timedelta(days=self.days_back) != self._horizon[0]:
+            with self._lock:
+                self._set_horizon(today)
+
+    def shift_for(self, employee_id, moment):
+        """The ShiftWindow a clock-in at moment (naive local datetime) belongs to, or None."""
+        self._maybe_refresh(moment)
+        assignments = self._assignments.get(employee_id)
+        if not assignments:
+            if self._default is None:
+                return None
+            # Shift default dari LocationSetting: cukup cek hari ini dan kemarin (shift malam)
+            windows = [_window(self._default, moment.date() - timedelta(days=offset), self.early) for offset in (0, 1)]
+            return EmployeeSchedule(sorted(windows)).find(moment)
+
+        first, last = self._horizon
+        schedule = self._schedules.get(employee_id)
+        if schedule is not None and first <= moment.date() <= last:
+            return schedule.find(moment)
+        # Di luar horizon (misal input tanggal lama) atau jadwal sedang dimuat ulang:
+        # ekspansi kecil sekali pakai, tetap tanpa query
+        day = moment.date()
+        return self._expand(assignments, day, day).find(moment)
+
+
+def lateness_minutes(window, moment):
+    """Whole minutes late beyond the shift's grace period (0 if on time or early)."""
+    late = (moment - window.start).total_seconds() / 60 - window.grace_minutes
+    return int(late) if late > 0 else 0
+
+
+def get_shift_index(app=None):
+    """The app's shift index, loaded on first use."""
+    app = app or current_app
+    index = app.extensions.get('shift_index')
+    if index is None:
+        config = app.config
+        index = ShiftIndex(config.get('SHIFT_EARLY_MINUTES', 120), config.get('SHIFT_INDEX_DAYS_BACK', 7),
+                           config.get('SHIFT_INDEX_DAYS_AHEAD', 35), config.get('SHIFT_REFRESH_INTERVAL', 30.0))
+        index.load()
+        index = app.extensions.setdefault('shift_index', index)
+    return index
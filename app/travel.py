@@ -0,0 +1,318 @@
+"""Impossible-travel detection on clock-in coordinates.
+
+The detector keeps the last clock-in position of every employee in memory
+(coordinates, time, nearest site, attendance id) and judges each new
+clock-in against it in O(1):
+
+- impossible_travel: the straight-line (haversine) speed between the two
+  clock-ins exceeds TRAVEL_MAX_SPEED_KMH. Moves shorter than
+  TRAVEL_MIN_DISTANCE_KM are GPS jitter and are ignored.
+- site_jump: the clock-ins are at two different sites (LocationSetting
+  geofences, radius in meters) less than TRAVEL_SITE_SWITCH_MINUTES apart.
+
+Findings are written to attendance_flags. At startup the state is seeded by
+replaying the last TRAVEL_SEED_DAYS of attendance with numpy, one pass over
+all rows instead of one evaluation per row; `flask travel-backfill` uses the
+same replay to flag history. Clock-ins recorded by other processes are
+pulled by "id > last seen" (per id counter with sharded attendance, see
+app.attendance_shards.read_new) every TRAVEL_SYNC_INTERVAL seconds so the
+state stays current across workers (only the process that recorded a
+clock-in flags it).
+"""
+import logging
+import math
+import threading
+import time
+from collections import namedtuple
+from datetime import date, datetime, timedelta
+
+import numpy as np
+from flask import current_app
+from sqlalchemy import Integer, case, func, select, type_coerce
+
+from app import db
+from app.attendance_shards import latest_ids, read_everywhere, read_new
+from app.models import Attendance, AttendanceFlag, LocationSetting
+
+EARTH_RADIUS_KM = 6371.0088
+EPOCH = datetime(1970, 1, 1)
+MIN_INTERVAL_SECONDS = 60.0  # Selisih waktu lebih kecil dihitung satu menit (hindari kecepatan tak hingga)
+
+Position = namedtuple('Position', 'latitude longitude at site_id attendance_id')
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """Great-circle distance in km; accepts floats or numpy arrays."""
+    lat1, lon1, lat2, lon2 = (np.radians(value) for value in (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def _distance_km(lat1, lon1, lat2, lon2):
+    # Versi skalar (math) untuk jalur per event; numpy terlalu mahal untuk satu pasang titik
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(min(a, 1.0)))
+
+
+def epoch_seconds(day, at):
+    """Clock-in date + time as seconds, on the same (naive local) scale as the replay query."""
+    return (datetime.combine(day, at) - EPOCH).total_seconds()
+
+
+class TravelDetector:
+    def __init__(self, sites=(), max_speed_kmh=250.0, min_distance_km=2.0, site_switch_minutes=30):
+        self.sites = list(sites)  # [(site_id, latitude, longitude, radius_km)]
+        self.max_speed_kmh = max_speed_kmh
+        self.min_distance_km = min_distance_km
+        self.site_switch_seconds = site_switch_minutes * 60
+        self._state = {}  # employee_id -> Position
+        self._lock = threading.Lock()
+
+    def site_for(self, latitude, longitude):
+        """Nearest site whose geofence contains the point, or None."""
+        best, best_distance = None, None
+        for site_id, site_lat, site_lon, radius_km in self.sites:
+            distance = _distance_km(latitude, longitude, site_lat, site_lon)
+            if distance <= radius_km and (best_distance is None or distance < best_distance):
+                best, best_distance = site_id, distance
+        return best
+
+    def _judge(self, last, latitude, longitude, at, site_id):
+        distance = _distance_km(last.latitude, last.longitude, latitude, longitude)
+        seconds = abs(at - last.at)
+        if distance >= self.min_distance_km:
+            speed = distance / (max(seconds, MIN_INTERVAL_SECONDS) / 3600)
+            if speed > self.max_speed_kmh:
+                return ('impossible_travel', round(speed, 1),
+                        f'{distance:.1f} km dalam {seconds / 60:.0f} menit ({speed:.0f} km/jam)')
+        if (site_id is not None and last.site_id is not None and site_id != last.site_id
+                and seconds < self.site_switch_seconds):
+            return ('site_jump', round(distance, 3),
+                    f'Site {last.site_id} -> {site_id} dalam {seconds / 60:.0f} menit')
+        return None
+
+    def evaluate(self, employee_id, latitude, longitude, at, attendance_id=None):
+        """Judge a clock-in (at = epoch seconds) against the last one and update the state.
+
+        Returns (kind, score, detail, previous attendance id) or None.
+        """
+        site_id = self.site_for(latitude, longitude)
+        with self._lock:
+            last = self._state.get(employee_id)
+            if last is None or at >= last.at:
+                self._state[employee_id] = Position(latitude, longitude, at, site_id, attendance_id)
+        if last is None:
+            return None
+        finding = self._judge(last, latitude, longitude, at, site_id)
+        return finding + (last.attendance_id,) if finding else None
+
+    def observe(self, employee_id, latitude, longitude, at, attendance_id=None):
+        """Update the state without judging (clock-ins recorded by another process)."""
+        with self._lock:
+            last = self._state.get(employee_id)
+            if last is None or at >= last.at:
+                self._state[employee_id] = Position(latitude, longitude, at, self.site_for(latitude, longitude),
+                                                    attendance_id)
+
+    def site_ids(self, latitudes, longitudes):
+        """Vectorized site_for: site id per point, -1 outside every geofence."""
+        sites = np.full(len(latitudes), -1, dtype=np.int64)
+        best = np.full(len(latitudes), np.inf)
+        for site_id, site_lat, site_lon, radius_km in self.sites:
+            distance = haversine_km(latitudes, longitudes, site_lat, site_lon)
+            closer = (distance <= radius_km) & (distance < best)
+            sites[closer] = site_id
+            best[closer] = distance[closer]
+        return sites
+
+    def replay(self, ids, employee_ids, latitudes, longitudes, times):
+        """Replay clock-ins sorted by (employee, time) in one vectorized pass.
+
+        Seeds the state with each employee's last clock-in and returns the
+        findings as a list of (row index, kind, score, previous row index).
+        """
+        if len(ids) == 0:
+            return []
+        sites = self.site_ids(latitudes, longitudes)
+        same = employee_ids[1:] == employee_ids[:-1]
+        distance = haversine_km(latitudes[:-1], longitudes[:-1], latitudes[1:], longitudes[1:])
+        seconds = np.abs(times[1:] - times[:-1])
+        speed = distance / (np.maximum(seconds, MIN_INTERVAL_SECONDS) / 3600)
+        impossible = same & (distance >= self.min_distance_km) & (speed > self.max_speed_kmh)
+        jump = (same & ~impossible & (sites[1:] >= 0) & (sites[:-1] >= 0) & (sites[1:] != sites[:-1])
+                & (seconds < self.site_switch_seconds))
+
+        # Baris terakhir tiap employee menjadi state
+        last = np.flatnonzero(np.append(~same, True))
+        state = {
+            employee_id: Position(lat, lon, at, site if site >= 0 else None, attendance_id)
+            for employee_id, lat, lon, at, site, attendance_id in zip(
+                employee_ids[last].tolist(), latitudes[last].tolist(), longitudes[last].tolist(),
+                times[last].tolist(), sites[last].tolist(), ids[last].tolist())
+        }
+        with self._lock:
+            for employee_id, position in state.items():
+                current = self._state.get(employee_id)
+                if current is None or position.at >= current.at:
+                    self._state[employee_id] = position
+
+        findings = [(i + 1, 'impossible_travel', round(float(speed[i]), 1), i) for i in np.flatnonzero(impossible).tolist()]
+        findings += [(i + 1, 'site_jump', round(float(distance[i]), 3), i) for i in np.flatnonzero(jump).tolist()]
+        return findings
+
+    def __len__(self):
+        return len(self._state)
+
+
+def _seconds_column():
+    # date + time sebagai detik sejak 1970 dihitung di SQLite, agar replay tidak membuat objek datetime per baris.
+    # Per baris menurut tipenya: database utama dan shard bisa berbeda layout (app.compact_storage)
+    return case(
+        (func.typeof(Attendance.date) == 'integer',
+         type_coerce(Attendance.date, Integer) * 86400 + type_coerce(Attendance.time, Integer)),
+        else_=((func.julianday(Attendance.date) - 2440587.5) * 86400.0
+               + (func.julianday(Attendance.time) - func.julianday('00:00:00')) * 86400.0),
+    )
+
+
+def _history_query():
+    return (select(Attendance.id, Attendance.employee_id, Attendance.latitude, Attendance.longitude, _seconds_column())
+            .where(Attendance.latitude.isnot(None), Attendance.longitude.isnot(None)))
+
+
+def load_history(since=None):
+    """Clock-ins with coordinates as numpy arrays sorted by (employee, time)."""
+    query = _history_query()
+    if since is not None:
+        query = query.where(Attendance.date >= since)
+    return _history_arrays(read_everywhere(query))
+
+
+def load_new_history(last_ids):
+    """Clock-ins added since last_ids (see app.attendance_shards.read_new) as load_history arrays, and the new last_ids."""
+    rows, last_ids = read_new(_history_query(), last_ids)
+    return _history_arrays(rows), last_ids
+
+
+def _history_arrays(rows):
+    columns = list(zip(*rows)) if rows else [(), (), (), (), ()]
+    ids = np.array(columns[0], dtype=np.int64)
+    employee_ids = np.array(columns[1], dtype=np.int64)
+    latitudes = np.array(columns[2], dtype=np.float64)
+    longitudes = np.array(columns[3], dtype=np.float64)
+    times = np.array(columns[4], dtype=np.float64)
+    order = np.lexsort((ids, times, employee_ids))
+    return ids[order], employee_ids[order], latitudes[order], longitudes[order], times[order]
+
+
+def load_sites():
+    return [(row.id, row.latitude, row.longitude, row.radius / 1000.0)
+            for row in db.session.execute(select(LocationSetting.id, LocationSetting.latitude,
+                                                 LocationSetting.longitude, LocationSetting.radius))]
+
+
+class TravelMonitor:
+    """TravelDetector kept in sync with clock-ins recorded by any process."""
+
+    def __init__(self, detector, sync_interval=5.0):
+        self.detector = detector
+        self.sync_interval = sync_interval
+        self._last_ids = {}
+        self._next_sync = 0.0
+        self._sync_lock = threading.Lock()
+
+    def seed(self, days):
+        started = time.perf_counter()
+        # Dibaca sebelum replay: baris yang masuk selama replay ikut sync berikutnya (observe idempoten)
+        self._last_ids = latest_ids()
+        history = load_history(since=date.today() - timedelta(days=days))
+        self.detector.replay(*history)
+        self._next_sync = time.monotonic() + self.sync_interval
+        logging.info(f"Travel detector seeded from {len(history[0])} clock-ins ({len(self.detector)} employees) "
+                     f"in {time.perf_counter() - started:.2f}s.")
+
+    def sync(self, exclude_id=None):
+        """Observe clock-ins recorded since the last sync (except exclude_id, which is being evaluated)."""
+        if time.monotonic() < self._next_sync or not self._sync_lock.acquire(blocking=False):
+            return
+        try:
+            self._next_sync = time.monotonic() + self.sync_interval
+            (ids, employee_ids, latitudes, longitudes, times), last_ids = load_new_history(self._last_ids)
+            for row in zip(employee_ids.tolist(), latitudes.tolist(), longitudes.tolist(), times.tolist(), ids.tolist()):
+                if row[4] != exclude_id:
+                    self.detector.observe(*row)
+            self._last_ids = last_ids
+        except Exception as e:
+            db.session.rollback()
+            logging.error(f"Travel detector sync failed: {e}")
+        finally:
+            self._sync_lock.release()
+
+    def check(self, attendance):
+        """Evaluate a committed clock-in and write a flag if it is implausible. Never raises."""
+        if attendance.latitude is None or attendance.longitude is None:
+            return None
+        try:
+            self.sync(exclude_id=attendance.id)
+            finding = self.detector.evaluate(attendance.employee_id, attendance.latitude, attendance.longitude,
+                                             epoch_seconds(attendance.date, attendance.time), attendance.id)
+            if finding is None:
+                return None
+            kind, score, detail, previous_id = finding
+            db.session.add(AttendanceFlag(attendance_id=attendance.id, employee_id=attendance.employee_id, kind=kind,
+                                          related_attendance_id=previous_id, score=score, detail=detail))
+            db.session.commit()
+            logging.warning(f"Attendance {attendance.id} of employee {attendance.employee_id} flagged {kind}: {detail}")
+            return finding
+        except Exception as e:
+            db.session.rollback()
+            logging.error(f"Travel check failed for attendance {attendance.id}: {e}")
+            return None
+
+
+def get_travel_monitor(app=None):
+    """The app's travel monitor, seeded on first use."""
+    app = app or current_app
+    monitor = app.extensions.get('travel_monitor')
+    if monitor is None:
+        config = app.config
+        detector = TravelDetector(load_sites(), config.get('TRAVEL_MAX_SPEED_KMH', 250.0),
+                                  config.get('TRAVEL_MIN_DISTANCE_KM', 2.0), config.get('TRAVEL_SITE_SWITCH_MINUTES', 30))
+        monitor = TravelMonitor(detector, config.get('TRAVEL_SYNC_INTERVAL', 5.0))
+        monitor.seed(config.get('TRAVEL_SEED_DAYS', 30))
+        monitor = app.extensions.setdefault('travel_monitor', monitor)
+    return monitor
+
+
+def check_travel(attendance):
+    """Impossible-travel check for a committed clock-in (no-op when disabled)."""
+    if not current_app.config.get('TRAVEL_CHECK_ENABLED', True):
+        return None
+    return get_travel_monitor().check(attendance)
+
+
+def backfill_travel_flags(days=None):
+    """Replay history and flag implausible clock-ins that are not flagged yet. Returns the number written."""
+    since = date.today() - timedelta(days=days) if days else None
+    ids, employee_ids, latitudes, longitudes, times = load_history(since=since)
+    config = current_app.config
+    detector = TravelDetector(load_sites(), config.get('TRAVEL_MAX_SPEED_KMH', 250.0),
+                              config.get('TRAVEL_MIN_DISTANCE_KM', 2.0), config.get('TRAVEL_SITE_SWITCH_MINUTES', 30))
+    findings = detector.replay(ids, employee_ids, latitudes, longitudes, times)
+    flagged = {(row.attendance_id, row.kind) for row in db.session.execute(
+        select(AttendanceFlag.attendance_id, AttendanceFlag.kind)
+        .where(AttendanceFlag.kind.in_(('impossible_travel', 'site_jump')))
+    )}
+    written = 0
+    for index, kind, score, previous in findings:
+        attendance_id = int(ids[index])
+        if (attendance_id, kind) in flagged:
+            continue
+        detail = (f'{score:.0f} km/jam (replay)' if kind == 'impossible_travel'
+                  else f'{score:.1f} km antar site (replay)')
+        db.session.add(AttendanceFlag(attendance_id=attendance_id, employee_id=int(employee_ids[index]), kind=kind,
+                                      related_attendance_id=int(ids[previous]), score=score, detail=detail))
+        written += 1
+    db.session.commit()
+    return written
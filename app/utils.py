@@ -1,32 +1,29 @@
 import logging
 from flask import current_app, request, jsonify
 from datetime import datetime, timedelta
-from flask_mail import Message
 from flask_login import current_user
-from app.models import Attendance, User, Employee  # Pastikan untuk mengimpor model EmailConfig
-from app import mail
+from flask_jwt_extended import get_jwt_identity
+from app.revocation import get_revocation_list
+from app.shared_cache import all_employees, employee_by_id
+from app.models import Attendance, User  # Pastikan untuk mengimpor model EmailConfig
+from app.attendance_shards import attendance_session
 import jwt
+import uuid
 from jwt import ExpiredSignatureError, InvalidTokenError
 from app import db
 from functools import wraps
-from logging.handlers import RotatingFileHandler
 from app.models import User  # Pastikan model User diimpor
 
-# Konfigurasi Logging
-logging.basicConfig(level=logging.INFO,
-                    format='%(asctime)s - %(levelname)s - %(message)s',
-                    handlers=[
-                        logging.StreamHandler(),
-                        RotatingFileHandler('app.log', maxBytes=1000000, backupCount=5)  # Rotate log
-                    ])
-
 
 def generate_jwt_token(user_id):
-    """Menghasilkan token JWT untuk pengguna tanpa kadaluarsa."""
-    logging.info(f"Generating JWT token for user ID: {user_id} (no expiration)")
+    """Menghasilkan token JWT untuk pengguna dengan kadaluarsa dan jti (bisa dicabut)."""
+    logging.info(f"Generating JWT token for user ID: {user_id}")
+    now = datetime.utcnow()
     token = jwt.encode({
         'sub': user_id,
-        # Tidak ada 'exp', sehingga token tidak memiliki waktu kadaluarsa
+        'iat': now,
+        'exp': now + current_app.config['JWT_ACCESS_TOKEN_EXPIRES'],
+        'jti': uuid.uuid4().hex,
     }, current_app.config['JWT_SECRET_KEY'], algorithm='HS256')
     return token
 
@@ -35,6 +32,9 @@ def verify_jwt_token(token):
     """Memverifikasi token JWT dan mengembalikan user_id jika valid."""
     try:
         payload = jwt.decode(token, current_app.config['JWT_SECRET_KEY'], algorithms=['HS256'])
+        if get_revocation_list().is_revoked(payload.get('jti')):
+            logging.error("Token has been revoked")
+            return None
         logging.info(f"Token verified for user ID: {payload['sub']}")
         return payload['sub']
     except jwt.ExpiredSignatureError:
@@ -54,56 +54,74 @@ def get_user_from_token(token):
     return None
 
 
+def admin_required(view):
+    """Decorator (dipasang di bawah @jwt_required) yang hanya mengizinkan admin (status 1)."""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        user_email = (get_jwt_identity() or {}).get('email')
+        user = User.query.filter_by(email=user_email).first()
+        if not user:
+            logging.warning(f"User with email {user_email} not found.")
+            return jsonify({'status': 'error', 'message': 'User not found'}), 404
+        if user.status != 1:
+            logging.warning(f"Access denied for user {user_email}. Not an admin.")
+            return jsonify({'status': 'error', 'message': 'Access denied'}), 403
+        return view(*args, **kwargs)
+    return wrapper
+
+
+MATRIX_MAX_DAYS = 366  # Rentang terpanjang matriks employee x hari (/admin/attendance_matrix, ringkasan laporan)
+
+
+def parse_date_range(args):
+    """Membaca parameter opsional 'start' dan 'end' (YYYY-MM-DD) dari query string.
+
+    Mengembalikan (start, end) berupa date atau None; ValueError jika format salah.
+    """
+    start = datetime.strptime(args['start'], '%Y-%m-%d').date() if args.get('start') else None
+    end = datetime.strptime(args['end'], '%Y-%m-%d').date() if args.get('end') else None
+    if start and end and end < start:
+        raise ValueError("'end' must not be before 'start'")
+    return start, end
+
+
 def get_attendance_for_today(employee_id):
     today = datetime.now().date()  # Get today's date
-    attendance_records = Attendance.query.filter_by(employee_id=employee_id, date=today).all()
+    with attendance_session(employee_id) as session:  # Database utama atau shard employee
+        attendance_records = session.execute(
+            db.select(Attendance).filter_by(employee_id=employee_id, date=today)
+        ).scalars().all()
     logging.info(f"Attendance records for employee {employee_id} on {today}: {attendance_records}")
     return attendance_records
 
 
 def get_all_employees():
+    """Semua karyawan sebagai EmployeeRecord read-only dari shared cache (lihat app/shared_cache.py)."""
     logging.info("Fetching all employees")  # Log saat mengambil data semua karyawan
-    employees = Employee.query.all()
+    employees = all_employees()
     logging.info(f"Found {len(employees)} employees")  # Log jumlah karyawan yang ditemukan
     return employees
 
 def get_employee_by_id(employee_id):
+    """EmployeeRecord read-only dari shared cache; pakai db.session.get(Employee, id) untuk mengubah data."""
     logging.info(f"Fetching employee with ID: {employee_id}")  # Log saat mengambil data karyawan berdasarkan ID
-    employee = Employee.query.get(employee_id)
+    employee = employee_by_id(employee_id)
     logging.info(f"Employee details: {employee}")  # Log data karyawan
     return employee
 
-def delete_employee_and_related_data(user_id):
+def delete_employee_and_related_data(user_id, archive=False):
+    """Menghapus employee, user, dan attendance-nya secara bertahap (lihat app/offboarding.py)."""
+    from app.offboarding import create_offboarding_job, run_offboarding_job
     logging.info(f"Deleting employee and related data for user ID: {user_id}")
     try:
-        employee = Employee.query.filter_by(user_id=user_id).first()
-        if employee:
-            deleted_attendance_count = Attendance.query.filter_by(employee_id=employee.id).delete()
-            logging.info(f"Deleted {deleted_attendance_count} attendance records for employee {employee.id}")
-            db.session.delete(employee)
-            logging.info(f"Deleted employee with ID: {employee.id}")
-
-        user = User.query.get(user_id)
-        if user:
-            db.session.delete(user)
-            logging.info(f"Deleted user with ID: {user.id}")
-
-        db.session.commit()
-        logging.info(f"Changes committed to the database for user ID: {user_id}")
+        job = create_offboarding_job([user_id], archive=archive)
+        run_offboarding_job(job.id)
+        logging.info(f"Deleted {job.deleted_rows} attendance records and employee data for user ID: {user_id}")
+        return job
     except Exception as e:
         db.session.rollback()
         logging.error(f"Error while deleting data for user ID {user_id}: {e}")
-
-    
-    # Menghapus data user
-    user = User.query.get(user_id)
-    if user:
-        db.session.delete(user)
-        logging.info(f"Deleted user with ID: {user.id}")  # Log saat data user dihapus
-
-    # Commit perubahan ke database
-    db.session.commit()
-    logging.info(f"Changes committed to the database for user ID: {user_id}")  # Log setelah commit perubahan
+        return None
 
 
 def generate_reset_token(user_id, expires_in=None):
@@ -0,0 +1,176 @@
+import hashlib
+import logging
+from datetime import datetime
+from functools import wraps
+
+from flask import request, make_response
+from flask_jwt_extended import get_jwt_identity
+from sqlalchemy import event, func, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from app import db
+from app.models import Attendance, Employee, User, VersionStamp, ShiftAssignment, ShiftTemplate, LocationSetting, Holiday
+from app.attendance_shards import attendance_session, sharding_enabled
+
+# Kunci stamp tingkat tabel
+EMPLOYEES_KEY = 'employees'
+ATTENDANCE_KEY = 'attendance'
+SHIFTS_KEY = 'shifts'  # Naik setiap kali jadwal shift / location setting berubah
+CALENDAR_KEY = 'calendar'  # Naik setiap kali hari libur berubah
+
+
+def employee_key(user_id):
+    return f'employee:{user_id}'
+
+
+def attendance_key(employee_id):
+    return f'attendance:{employee_id}'
+
+
+def shift_key(employee_id):
+    return f'shift:{employee_id}'
+
+
+def shift_template_key(template_id):
+    return f'shift_template:{template_id}'
+
+
+def _keys_for(obj):
+    """Stamp keys touched when obj is inserted, updated or deleted."""
+    if isinstance(obj, Attendance):
+        return (ATTENDANCE_KEY, attendance_key(obj.employee_id))
+    if isinstance(obj, Employee):
+        return (EMPLOYEES_KEY, employee_key(obj.user_id))
+    if isinstance(obj, User):
+        return (EMPLOYEES_KEY,)  # Filter status/role di /admin/list_employees
+    if isinstance(obj, ShiftAssignment):
+        return (SHIFTS_KEY, shift_key(obj.employee_id))
+    if isinstance(obj, ShiftTemplate):
+        return (SHIFTS_KEY, shift_template_key(obj.id))
+    if isinstance(obj, LocationSetting):
+        return (SHIFTS_KEY, 'location_settings')
+    if isinstance(obj, Holiday):
+        return (CALENDAR_KEY,)
+    return ()
+
+
+def bump_stamps(connection, keys):
+    """Increment the version of each key (creating it at 1) in the current transaction."""
+    keys = sorted(set(keys))
+    if not keys:
+        return
+    now = datetime.utcnow()
+    stmt = sqlite_insert(VersionStamp.__table__)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=['key'],
+        set_={'version': VersionStamp.__table__.c.version + 1, 'updated_at': stmt.excluded.updated_at}
+    )
+    connection.execute(stmt, [{'key': key, 'version': 1, 'updated_at': now} for key in keys])
+
+
+def carry_stamps(connection, versions):
+    """Bump each key past both its current version and versions[key] (stamps of rows moved from another database)."""
+    if not versions:
+        return
+    now = datetime.utcnow()
+    stmt = sqlite_insert(VersionStamp.__table__)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=['key'],
+        set_={'version': func.max(VersionStamp.__table__.c.version + 1, stmt.excluded.version),
+              'updated_at': stmt.excluded.updated_at}
+    )
+    connection.execute(stmt, [{'key': key, 'version': version + 1, 'updated_at': now}
+                              for key, version in sorted(versions.items())])
+
+
+@event.listens_for(Session, 'after_flush')
+def _bump_on_flush(session, flush_context):
+    # Stamp ditulis di transaksi yang sama dengan perubahan baris (attendance yang di-shard: di file shard-nya)
+    keys = set()
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        keys.update(_keys_for(obj))
+    if keys:
+        bump_stamps(session.connection(), keys)
+
+
+def _read_stamps(session, keys):
+    rows = session.execute(
+        select(VersionStamp.key, VersionStamp.version, VersionStamp.updated_at).where(VersionStamp.key.in_(keys))
+    ).all()
+    return {row.key: (row.version, row.updated_at) for row in rows}
+
+
+def get_stamps(keys):
+    """Return {key: (version, updated_at)} for the given keys with one primary-key lookup.
+
+    With sharded attendance the attendance:<employee_id> stamps live in the employee's shard.
+    """
+    if not sharding_enabled():
+        return _read_stamps(db.session, keys)
+    stamps = {}
+    main_keys = []
+    for key in keys:
+        prefix, _, employee_id = key.partition(':')
+        if prefix == ATTENDANCE_KEY and employee_id:
+            with attendance_session(int(employee_id)) as session:
+                stamps.update(_read_stamps(session, [key]))
+        else:
+            main_keys.append(key)
+    if main_keys:
+        stamps.update(_read_stamps(db.session, main_keys))
+    return stamps
+
+
+def compute_validators(keys, variant=''):
+    """Build a weak ETag and Last-Modified value from the current stamps of keys.
+
+    variant distinguishes representations of the same data (e.g. the query string).
+    """
+    stamps = get_stamps(keys)
+    parts = [f'{key}={stamps.get(key, (0, None))[0]}' for key in keys] + [variant]
+    etag = hashlib.sha1('|'.join(parts).encode('utf-8')).hexdigest()[:20]
+    modified = [updated_at for _, updated_at in stamps.values() if updated_at]
+    last_modified = max(modified).replace(microsecond=0) if modified else None
+    return etag, last_modified
+
+
+def _is_not_modified(etag, last_modified):
+    if request.if_none_match:
+        return request.if_none_match.contains_weak(etag)
+    if last_modified and request.if_modified_since:
+        return request.if_modified_since.replace(tzinfo=None) >= last_modified
+    return False
+
+
+def conditional_get(keys_for_identity):
+    """Answer GET requests with 304 when the version stamps have not changed.
+
+    keys_for_identity receives the JWT identity and returns the stamp keys the
+    response depends on. Must be applied below @jwt_required().
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if request.method != 'GET':
+                return view(*args, **kwargs)
+
+            keys = keys_for_identity(get_jwt_identity())
+            etag, last_modified = compute_validators(keys, request.query_string.decode('utf-8', 'replace'))
+
+            if _is_not_modified(etag, last_modified):
+                logging.info(f"Not modified for {request.path} ({', '.join(keys)}).")
+                response = make_response('', 304)
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+
+            response.set_etag(etag, weak=True)
+            if last_modified:
+                response.last_modified = last_modified
+            response.cache_control.private = True
+            response.cache_control.no_cache = True
+            return response
+        return wrapper
+    return decorator
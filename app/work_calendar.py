@@ -0,0 +1,181 @@
+"""Working-day calendar stored as one bitmap per (site, year).
+
+Bit i of a year's bitmap is set when day i of that year (0 = 1 January) is a
+working day: the WORKING_WEEKDAYS pattern, minus national and company
+holidays, plus company working-day overrides, then the site's own holidays
+and overrides on top. Counting working days in a range is a mask and a
+popcount per year touched, so it costs microseconds regardless of length.
+
+Bitmaps are built lazily (one query per year) and dropped whenever the
+'calendar' version stamp changes, which any process does by editing a
+Holiday row.
+"""
+import logging
+import threading
+import time
+from datetime import date, timedelta
+
+import numpy as np
+from flask import current_app
+from sqlalchemy import select
+
+from app import db
+from app.models import Holiday, VersionStamp
+from app.version_stamps import CALENDAR_KEY
+
+
+# Urutan scope dari yang paling umum; yang lebih spesifik menang (sama dengan urutan _build)
+SCOPE_RANK = {'national': 0, 'company': 1, 'site': 2}
+
+
+def _day_index(day):
+    return day.toordinal() - date(day.year, 1, 1).toordinal()
+
+
+def _days_in_year(year):
+    return date(year + 1, 1, 1).toordinal() - date(year, 1, 1).toordinal()
+
+
+def _range_mask(first, last):
+    """Bits first..last (inclusive) set."""
+    return ((1 << (last + 1)) - 1) ^ ((1 << first) - 1)
+
+
+class WorkCalendar:
+    def __init__(self, working_weekdays=(0, 1, 2, 3, 4), refresh_interval=30.0):
+        self.working_weekdays = frozenset(working_weekdays)
+        self.refresh_interval = refresh_interval
+        self._lock = threading.Lock()
+        self._bitmaps = {}  # (site_id, year) -> int
+        self._holidays = {}  # year -> {date: (name, scope, site_id, is_working)}
+        self._stamp = None
+        self._next_refresh = 0.0
+
+    def _weekday_bitmap(self, year):
+        bitmap = 0
+        first = date(year, 1, 1)
+        for offset in range(_days_in_year(year)):
+            if (first + timedelta(days=offset)).weekday() in self.working_weekdays:
+                bitmap |= 1 << offset
+        return bitmap
+
+    def _year_holidays(self, year):
+        entries = self._holidays.get(year)
+        if entries is None:
+            entries = db.session.execute(
+                select(Holiday.date, Holiday.name, Holiday.scope, Holiday.site_id, Holiday.is_working)
+                .where(Holiday.date >= date(year, 1, 1), Holiday.date < date(year + 1, 1, 1))
+                .order_by(Holiday.id)
+            ).all()
+            self._holidays[year] = entries
+        return entries
+
+    def _build(self, site_id, year):
+        bitmap = self._weekday_bitmap(year)
+        entries = self._year_holidays(year)
+
+        def apply(rows):
+            nonlocal bitmap
+            for row in rows:
+                bit = 1 << _day_index(row.date)
+                bitmap = (bitmap | bit) if row.is_working else (bitmap & ~bit)
+
+        # Urutan: nasional, perusahaan, lalu site (yang paling spesifik menang)
+        apply(row for row in entries if row.scope == 'national')
+        apply(row for row in entries if row.scope == 'company')
+        if site_id is not None:
+            apply(row for row in entries if row.scope == 'site' and row.site_id == site_id)
+        return bitmap
+
+    def bitmap(self, year, site_id=None):
+        """Working-day bitmap of a year for a site (None = company-wide)."""
+        self._maybe_refresh()
+        key = (site_id, year)
+        bitmap = self._bitmaps.get(key)
+        if bitmap is None:
+            with self._lock:
+                bitmap = self._bitmaps.get(key)
+                if bitmap is None:
+                    bitmap = self._bitmaps[key] = self._build(site_id, year)
+        return bitmap
+
+    def _maybe_refresh(self):
+        now = time.monotonic()
+        if now < self._next_refresh:
+            return
+        self._next_refresh = now + self.refresh_interval
+        try:
+            stamp = db.session.execute(
+                select(VersionStamp.version).where(VersionStamp.key == CALENDAR_KEY)
+            ).scalar()
+        except Exception as e:
+            db.session.rollback()
+            logging.error(f"Calendar refresh failed: {e}")
+            return
+        if stamp != self._stamp:
+            with self._lock:
+                self._bitmaps = {}
+                self._holidays = {}
+                self._stamp = stamp
+
+    def invalidate(self):
+        """Drop cached bitmaps now (used by the process that edited holidays)."""
+        with self._lock:
+            self._bitmaps = {}
+            self._holidays = {}
+            self._next_refresh = 0.0
+
+    # -- Query ---------------------------------------------------------------
+
+    def is_working_day(self, day, site_id=None):
+        return bool(self.bitmap(day.year, site_id) >> _day_index(day) & 1)
+
+    def working_days(self, start, end, site_id=None):
+        """Number of working days in [start, end] (inclusive)."""
+        if end < start:
+            return 0
+        total = 0
+        for year in range(start.year, end.year + 1):
+            first = _day_index(start) if year == start.year else 0
+            last = _day_index(end) if year == end.year else _days_in_year(year) - 1
+            total += (self.bitmap(year, site_id) & _range_mask(first, last)).bit_count()
+        return total
+
+    def working_mask(self, start, end, site_id=None):
+        """Boolean numpy array, one entry per day of [start, end], True on working days."""
+        parts = []
+        for year in range(start.year, end.year + 1):
+            first = _day_index(start) if year == start.year else 0
+            last = _day_index(end) if year == end.year else _days_in_year(year) - 1
+            bits = self.bitmap(year, site_id)
+            raw = np.frombuffer(bits.to_bytes((_days_in_year(year) + 7) // 8, 'little'), dtype=np.uint8)
+            parts.append(np.unpackbits(raw, bitorder='little')[first:last + 1].astype(bool))
+        return np.concatenate(parts) if parts else np.zeros(0, dtype=bool)
+
+    def holiday_name(self, day, site_id=None):
+        """Name of the most specific holiday entry that closes this day, if any."""
+        best = None
+        for row in self._year_holidays(day.year):
+            if row.date != day or row.is_working:
+                continue
+            if row.scope == 'site' and row.site_id != site_id:
+                continue
+            if best is None or SCOPE_RANK[row.scope] > SCOPE_RANK[best.scope]:
+                best = row
+        return best.name if best else None
+
+    def day_status(self, day, site_id=None):
+        """'working', 'holiday' or 'weekend' for a day."""
+        if self.is_working_day(day, site_id):
+            return 'working'
+        return 'holiday' if self.holiday_name(day, site_id) else 'weekend'
+
+
+def get_calendar(app=None):
+    app = app or current_app
+    calendar = app.extensions.get('work_calendar')
+    if calendar is None:
+        calendar = app.extensions.setdefault('work_calendar', WorkCalendar(
+            app.config.get('WORKING_WEEKDAYS', (0, 1, 2, 3, 4)), app.config.get('CALENDAR_REFRESH_INTERVAL', 30.0)
+        ))
+    return calendar
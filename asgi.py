@@ -0,0 +1,4 @@
+from app.asgi import create_asgi_app
+
+# Aplikasi ASGI, misal: uvicorn asgi:application --workers 4 (server WSGI tetap memakai wsgi.py / run.py)
+application = create_asgi_app()
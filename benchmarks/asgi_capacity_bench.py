@@ -0,0 +1,257 @@
+"""Benchmark: connections one server process holds, WSGI threads vs ASGI.
+
+Usage: python benchmarks/asgi_capacity_bench.py [streams ...]
+
+For each number of held SSE connections (default 0, 200 and 1000) starts
+a fresh server process in each mode:
+
+- werkzeug:   the threaded development server `python run.py` uses, one
+              thread per connection;
+- flask-pool: uvicorn with ASGI_ASYNC_ENDPOINTS = False, every request on
+              the Flask thread pool (ASGI_WSGI_THREADS), like a WSGI worker
+              with a fixed number of threads;
+- asgi:       uvicorn with asgi:application, the async endpoints on the
+              event loop.
+
+opens that many /admin/stream connections (admin dashboards), then sends
+300 requests from 32 concurrent clients, half status checks and half
+clock-ins (each one fanned out to every held stream), and reports how many
+streams were established, how many requests succeeded, their p50/p99
+latency, and the server's thread count and RSS (Linux /proc).
+
+Needs uvicorn and aiosqlite; everything else is plain asyncio.
+"""
+import asyncio
+import json
+import logging
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from config import Config  # noqa: E402
+
+WORKDIR = os.environ.get('ASGI_BENCH_WORKDIR') or tempfile.mkdtemp()
+Config.SQLALCHEMY_DATABASE_URI = 'sqlite:///' + os.path.join(WORKDIR, 'bench.db') + '?timeout=30'
+Config.JWT_SECRET_KEY = 'asgi-capacity-bench'  # Sama di proses benchmark dan proses server
+Config.JWT_ACCESS_TOKEN_EXPIRES = False
+Config.SHARED_CACHE_PATH = os.path.join(WORKDIR, 'cache')
+Config.RATE_LIMIT_STORAGE = os.path.join(WORKDIR, 'ratelimit.db')
+Config.REVOCATION_BLOOM_PATH = os.path.join(WORKDIR, 'revoked.bloom')
+Config.PHOTO_HASH_INDEX_PATH = os.path.join(WORKDIR, 'photo_hashes.npz')
+Config.JOB_WORKERS = 0
+Config.LOG_FILE = None
+Config.LOG_LEVEL = 'WARNING'
+
+from sqlalchemy import insert, select  # noqa: E402
+
+from app import create_app, db  # noqa: E402
+from app.models import Employee, User  # noqa: E402
+
+MODES = ('werkzeug', 'flask-pool', 'asgi')
+REQUESTS = 300
+CLIENTS = 32
+TIMEOUT = 10.0
+
+
+def serve(mode, port):
+    Config.ASGI_ASYNC_ENDPOINTS = mode == 'asgi'
+    app = create_app()
+    if mode == 'werkzeug':
+        from werkzeug.serving import make_server
+
+        logging.getLogger('werkzeug').setLevel(logging.WARNING)  # Tanpa log per request
+
+        make_server('127.0.0.1', port, app, threaded=True).serve_forever()
+        return
+
+    import uvicorn
+
+    from app.asgi import create_asgi_app
+
+    uvicorn.run(create_asgi_app(app), host='127.0.0.1', port=port, log_level='warning', backlog=4096)
+
+
+def prepare(employees):
+    from flask_jwt_extended import create_access_token
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        db.session.add(User(email='admin@example.com', password='x', status=1))
+        db.session.execute(insert(User), [
+            {'email': f'user{i}@example.com', 'password': 'x', 'status': 0} for i in range(employees)
+        ])
+        db.session.flush()
+        users = db.session.execute(select(User.id, User.email, User.status)).all()
+        db.session.execute(insert(Employee), [{
+            'name': f'Employee {user_id}', 'gender': 'L', 'password': 'x', 'user_id': user_id,
+            'email': email, 'phone_number': '0800',
+        } for user_id, email, status in users if status == 0])
+        db.session.commit()
+        tokens = {status: [] for status in (0, 1)}
+        for user_id, email, status in users:
+            tokens[status].append(create_access_token(identity={'email': email, 'status': status, 'id': user_id}))
+        db.engine.dispose()
+    return tokens[1][0], tokens[0]
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_server(mode):
+    port = free_port()
+    process = subprocess.Popen([sys.executable, __file__, '--serve', mode, str(port)],
+                               env={**os.environ, 'ASGI_BENCH_WORKDIR': WORKDIR})
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=1).close()
+            return process, port
+        except OSError:
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError(f'{mode} server did not start')
+
+
+def process_stats(pid):
+    # Jumlah thread dan RSS proses server dari /proc (Linux)
+    stats = {}
+    with open(f'/proc/{pid}/status') as status:
+        for line in status:
+            key, _, value = line.partition(':')
+            stats[key] = value.split()[0] if value.split() else ''
+    return int(stats['Threads']), int(stats['VmRSS']) / 1024
+
+
+def http_request(method, path, token, body=None):
+    payload = json.dumps(body).encode('utf-8') if body is not None else b''
+    head = (f'{method} {path} HTTP/1.1\r\nHost: 127.0.0.1\r\nAuthorization: Bearer {token}\r\n'
+            f'Connection: close\r\nContent-Length: {len(payload)}\r\n')
+    if body is not None:
+        head += 'Content-Type: application/json\r\n'
+    return head.encode('ascii') + b'\r\n' + payload
+
+
+async def call(port, method, path, token, body=None):
+    started = time.perf_counter()
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    try:
+        writer.write(http_request(method, path, token, body))
+        response = await reader.read()
+    finally:
+        writer.close()
+    return int(response.split(b' ', 2)[1]), time.perf_counter() - started
+
+
+async def hold_stream(port, token, ready, release):
+    try:
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    except OSError:
+        return
+    try:
+        writer.write(http_request('GET', '/admin/stream', token))
+        buffered = b''
+        while b'retry:' not in buffered:
+            chunk = await reader.read(4096)
+            if not chunk:
+                return
+            buffered += chunk
+        ready.append(True)
+        # Terus membaca supaya event yang di-fan-out tidak menumpuk di buffer socket
+        while not release.is_set() and await reader.read(65536):
+            pass
+    finally:
+        writer.close()
+
+
+async def load(port, tokens, rng):
+    requests = []
+    for i in range(REQUESTS):
+        day = f'2024-06-{rng.randint(1, 30):02d}'
+        if i % 2:
+            requests.append(('GET', f'/employee/attendance_status?date={day}', rng.choice(tokens), None))
+        else:
+            requests.append(('POST', '/employee/attendance', rng.choice(tokens), {
+                'date': day, 'time': f'0{rng.randint(7, 9)}:{rng.randrange(60):02d}:00',
+                'latitude': rng.uniform(-7, -6), 'longitude': rng.uniform(106, 107),
+            }))
+    pending = iter(requests)
+    latencies, failed = [], 0
+
+    async def client():
+        nonlocal failed
+        for method, path, token, body in pending:
+            try:
+                status, elapsed = await asyncio.wait_for(call(port, method, path, token, body), TIMEOUT)
+            except (OSError, IndexError, ValueError, asyncio.TimeoutError):
+                status, elapsed = None, TIMEOUT
+            if status == 200:
+                latencies.append(elapsed)
+            else:
+                failed += 1
+
+    await asyncio.gather(*(client() for _ in range(CLIENTS)))
+    latencies.sort()
+    return latencies, failed
+
+
+async def measure(port, pid, admin_token, tokens, streams):
+    ready, release, holders = [], asyncio.Event(), []
+    for offset in range(0, streams, 50):
+        # Bertahap, supaya antrean listen server tidak penuh
+        holders += [asyncio.create_task(hold_stream(port, admin_token, ready, release))
+                    for _ in range(min(50, streams - offset))]
+        await asyncio.sleep(0.05)
+    deadline = time.monotonic() + 10
+    while len(ready) < streams and time.monotonic() < deadline:
+        await asyncio.sleep(0.1)
+
+    latencies, failed = await load(port, tokens, random.Random(streams))
+    threads, rss = process_stats(pid)
+
+    release.set()
+    for holder in holders:
+        holder.cancel()
+    await asyncio.gather(*holders, return_exceptions=True)
+    return len(ready), latencies, failed, threads, rss
+
+
+def percentile(latencies, fraction):
+    if not latencies:
+        return '-'
+    return f'{latencies[min(len(latencies) - 1, int(len(latencies) * fraction))] * 1e3:.1f}ms'
+
+
+def main():
+    levels = [int(arg) for arg in sys.argv[1:]] or [0, 200, 1000]
+    admin_token, tokens = prepare(500)
+
+    print(f"{REQUESTS} requests (status checks + clock-ins) from {CLIENTS} clients while SSE streams are held")
+    print(f"{'mode':<11} {'streams':>8} {'held':>6} {'ok':>5} {'p50':>9} {'p99':>9} {'threads':>8} {'RSS':>8}")
+    for streams in levels:
+        for mode in MODES:
+            process, port = start_server(mode)
+            try:
+                held, latencies, failed, threads, rss = asyncio.run(
+                    measure(port, process.pid, admin_token, tokens, streams))
+            finally:
+                process.kill()
+                process.wait()
+            print(f"{mode:<11} {streams:>8} {held:>6} {REQUESTS - failed:>5} {percentile(latencies, 0.5):>9} "
+                  f"{percentile(latencies, 0.99):>9} {threads:>8} {rss:>6.0f}MB")
+
+
+if __name__ == '__main__':
+    if sys.argv[1:2] == ['--serve']:
+        serve(sys.argv[2], int(sys.argv[3]))
+    else:
+        main()
@@ -0,0 +1,123 @@
+"""Benchmark: clock-in throughput and report fan-out with 1, 4 and 8 attendance shards.
+
+Usage: python benchmarks/attendance_shards_bench.py [processes] [inserts_per_process] [employees]
+
+For each layout (the unsharded main table, then ATTENDANCE_SHARDS = 1, 4
+and 8) starts `processes` worker processes, like gunicorn workers, that all
+record attendance through app.attendance_shards.save_attendance at once,
+one transaction per clock-in, and reports rows/s and the slowest write.
+Then times a one-month admin report (read_models.attendance_report_rows),
+which on sharded layouts reads every shard in its own thread and merges
+the streams by (date, id).
+"""
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, time as clock
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from config import Config  # noqa: E402
+
+WORKDIR = tempfile.mkdtemp()
+Config.SHARED_CACHE_PATH = os.path.join(WORKDIR, 'cache')
+Config.JOB_WORKERS = 0
+Config.LOG_FILE = None
+Config.LOG_LEVEL = 'WARNING'
+
+from sqlalchemy import insert, select  # noqa: E402
+
+from app import create_app, db  # noqa: E402
+from app.attendance_shards import save_attendance  # noqa: E402
+from app.models import Attendance, AttendanceStatus, Employee, User  # noqa: E402
+from app.read_models import attendance_report_rows  # noqa: E402
+
+LAYOUTS = (0, 1, 4, 8)
+MONTH = (date(2024, 6, 1), date(2024, 6, 30))
+
+
+def configure(shards):
+    name = f'shards-{shards}'
+    Config.SQLALCHEMY_DATABASE_URI = 'sqlite:///' + os.path.join(WORKDIR, f'{name}.db') + '?timeout=60'
+    Config.ATTENDANCE_SHARDS = shards
+    Config.ATTENDANCE_SHARD_FOLDER = os.path.join(WORKDIR, name)
+
+
+def prepare(employees):
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        db.session.execute(insert(User), [
+            {'email': f'user{i}@example.com', 'password': 'x', 'status': 0} for i in range(employees)
+        ])
+        user_ids = db.session.execute(select(User.id)).scalars().all()
+        db.session.execute(insert(Employee), [{
+            'name': f'Employee {user_id}', 'gender': 'L', 'password': 'x', 'user_id': user_id,
+            'email': f'employee{user_id}@example.com', 'phone_number': '0800',
+        } for user_id in user_ids])
+        db.session.commit()
+        db.engine.dispose()
+    return app, user_ids
+
+
+def writer(seed, user_ids, inserts, barrier, results):
+    app = create_app()
+    rng = random.Random(seed)
+    slowest = 0.0
+    with app.app_context():
+        barrier.wait()
+        started = time.perf_counter()
+        for _ in range(inserts):
+            before = time.perf_counter()
+            save_attendance(Attendance(
+                employee_id=rng.choice(user_ids), status=AttendanceStatus.HADIR,
+                date=date(2024, 6, rng.randint(1, 30)), time=clock(7 + rng.randrange(3), rng.randrange(60)),
+                latitude=rng.uniform(-7, -6), longitude=rng.uniform(106, 107),
+            ))
+            db.session.remove()
+            slowest = max(slowest, time.perf_counter() - before)
+        results.put((time.perf_counter() - started, slowest))
+
+
+def run_layout(shards, processes, inserts, employees):
+    configure(shards)
+    app, user_ids = prepare(employees)
+
+    barrier = multiprocessing.Barrier(processes)
+    results = multiprocessing.Queue()
+    workers = [multiprocessing.Process(target=writer, args=(seed, user_ids, inserts, barrier, results))
+               for seed in range(processes)]
+    for worker in workers:
+        worker.start()
+    timings = [results.get(timeout=600) for _ in workers]  # Worker yang gagal tidak membuat benchmark menggantung
+    for worker in workers:
+        worker.join()
+    elapsed = max(duration for duration, _ in timings)
+    slowest = max(worst for _, worst in timings)
+
+    with app.app_context():
+        attendance_report_rows(*MONTH)
+        started = time.perf_counter()
+        rows = attendance_report_rows(*MONTH)
+        report_ms = (time.perf_counter() - started) * 1e3
+    return processes * inserts / elapsed, slowest * 1e3, len(rows), report_ms
+
+
+def main():
+    processes = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    inserts = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+    employees = int(sys.argv[3]) if len(sys.argv) > 3 else 1000
+
+    print(f"{processes} writer processes x {inserts} clock-ins, {employees} employees")
+    print(f"{'layout':<10} {'rows/s':>8} {'slowest write':>14} {'report rows':>12} {'report':>9}")
+    for shards in LAYOUTS:
+        throughput, slowest_ms, report_rows, report_ms = run_layout(shards, processes, inserts, employees)
+        label = f'{shards} shards' if shards else 'unsharded'
+        print(f"{label:<10} {throughput:>8.0f} {slowest_ms:>12.1f}ms {report_rows:>12} {report_ms:>7.1f}ms")
+
+
+if __name__ == '__main__':
+    main()
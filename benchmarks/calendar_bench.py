@@ -0,0 +1,77 @@
+"""Benchmark: working days between two dates, bitmap popcount vs a day-by-day loop.
+
+Usage: python benchmarks/calendar_bench.py [queries]
+
+Loads ten years of holidays into a temporary database and times random
+range queries (up to three years long) through app.work_calendar against
+a loop that checks every day of the range.
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from config import Config  # noqa: E402
+
+
+def main():
+    queries = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    workdir = tempfile.mkdtemp()
+    Config.SQLALCHEMY_DATABASE_URI = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+
+    from app import create_app, db
+    from app.models import Holiday
+    from app.work_calendar import get_calendar
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        random.seed(1)
+        first, last = date(2020, 1, 1), date(2029, 12, 31)
+        span = (last - first).days
+        db.session.execute(Holiday.__table__.insert(), [
+            {'date': first + timedelta(days=random.randrange(span)), 'name': f'Libur {i}', 'scope': 'national',
+             'is_working': False} for i in range(160)
+        ])
+        db.session.commit()
+
+        calendar = get_calendar()
+        holidays = {row.date for row in Holiday.query.all()}
+        ranges = []
+        for _ in range(queries):
+            start = first + timedelta(days=random.randrange(span - 1100))
+            ranges.append((start, start + timedelta(days=random.randrange(1, 1100))))
+
+        def loop(start, end):
+            count = 0
+            day = start
+            while day <= end:
+                if day.weekday() < 5 and day not in holidays:
+                    count += 1
+                day += timedelta(days=1)
+            return count
+
+        for start, end in ranges:  # Bitmap dibangun sekali per tahun
+            calendar.working_days(start, end)
+
+        started = time.perf_counter()
+        bitmap_counts = [calendar.working_days(start, end) for start, end in ranges]
+        bitmap_us = (time.perf_counter() - started) / queries * 1e6
+
+        sample = ranges[:max(1, queries // 20)]
+        started = time.perf_counter()
+        loop_counts = [loop(start, end) for start, end in sample]
+        loop_us = (time.perf_counter() - started) / len(sample) * 1e6
+
+        assert bitmap_counts[:len(sample)] == loop_counts
+        print(f"{queries} range queries (avg {sum((e - s).days for s, e in ranges) / queries:.0f} days)")
+        print(f"bitmap popcount  {bitmap_us:9.2f} us/query")
+        print(f"day-by-day loop  {loop_us:9.2f} us/query")
+
+
+if __name__ == '__main__':
+    main()
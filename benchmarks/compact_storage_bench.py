@@ -0,0 +1,159 @@
+"""Benchmark: attendance row size and range scans, legacy text encoding vs compact.
+
+Usage: python benchmarks/compact_storage_bench.py [rows] [employees]
+
+Builds two throwaway databases holding the same attendance rows: one with
+the legacy layout (status names, ISO date and time text, 'N/A' reasons;
+what migration f6b2d8e41a93 converts from) and one with the compact layout
+of app.compact_storage. Reports the table and (employee_id, date) index
+size per row, then times a one-month scan over all employees and
+per-employee month lookups through the index, in raw SQL and through the
+ORM (which also decodes every value back to Python objects).
+"""
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from config import Config  # noqa: E402
+
+WORKDIR = tempfile.mkdtemp()
+Config.SHARED_CACHE_PATH = os.path.join(WORKDIR, 'cache')
+
+from sqlalchemy import func, select  # noqa: E402
+
+from app import create_app, db  # noqa: E402
+from app.compact_storage import day_number  # noqa: E402
+from app.models import Attendance, STATUS_CODES  # noqa: E402
+
+LEGACY_TABLE = """
+CREATE TABLE attendance (
+    id INTEGER NOT NULL PRIMARY KEY AUTOINCREMENT,
+    employee_id INTEGER NOT NULL,
+    status VARCHAR(11) NOT NULL,
+    date DATE NOT NULL,
+    time TIME NOT NULL,
+    time_out TIME,
+    photo TEXT,
+    latitude FLOAT,
+    longitude FLOAT,
+    reason TEXT,
+    shift_id INTEGER,
+    late_minutes INTEGER,
+    photo_hash BIGINT
+)"""
+LEGACY_INDEX = "CREATE INDEX ix_attendance_employee_id_date ON attendance (employee_id, date)"
+
+START = date(2024, 1, 1)
+MONTH = (date(2024, 6, 1), date(2024, 7, 1))
+
+
+def generate(rows, employees):
+    rng = random.Random(1)
+    statuses = list(STATUS_CODES)
+    for i in range(rows):
+        day = START + timedelta(days=i // employees)
+        clock_in = 7 * 3600 + rng.randrange(7200)
+        clock_out = clock_in + 9 * 3600 if rng.random() < 0.9 else None
+        reason = 'N/A' if rng.random() < 0.95 else 'Sakit'
+        yield (i + 1, i % employees + 1, rng.choice(statuses), day, clock_in, clock_out, rng.uniform(-7, -6),
+               rng.uniform(106, 107), reason)
+
+
+def as_time(seconds):
+    return f'{seconds // 3600:02d}:{seconds // 60 % 60:02d}:{seconds % 60:02d}.000000'
+
+
+def fill(path, rows, employees, compact):
+    connection = sqlite3.connect(path)
+    if compact:
+        values = ((id, employee, STATUS_CODES[status], day_number(day), clock_in, clock_out, lat, lon,
+                   None if reason == 'N/A' else reason)
+                  for id, employee, status, day, clock_in, clock_out, lat, lon, reason in generate(rows, employees))
+    else:
+        values = ((id, employee, status.name, day.isoformat(), as_time(clock_in),
+                   as_time(clock_out) if clock_out is not None else None, lat, lon, reason)
+                  for id, employee, status, day, clock_in, clock_out, lat, lon, reason in generate(rows, employees))
+    connection.executemany(
+        "INSERT INTO attendance (id, employee_id, status, date, time, time_out, latitude, longitude, reason) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", values)
+    connection.commit()
+    connection.execute('VACUUM')
+    return connection
+
+
+def sizes(connection):
+    try:
+        return dict(connection.execute("SELECT name, sum(pgsize) FROM dbstat GROUP BY name").fetchall())
+    except sqlite3.OperationalError:
+        return {}  # SQLite tanpa dbstat
+
+
+def timed(fn, repeats=5):
+    fn()
+    started = time.perf_counter()
+    for _ in range(repeats):
+        fn()
+    return (time.perf_counter() - started) / repeats * 1e3
+
+
+def measure(app, connection, bounds, employees):
+    low, high = bounds
+    raw_scan = timed(lambda: connection.execute(
+        "SELECT id, employee_id, status, date, time, time_out FROM attendance WHERE date >= ? AND date < ?",
+        (low, high)).fetchall())
+    raw_lookup = timed(lambda: [connection.execute(
+        "SELECT id, status, date, time FROM attendance WHERE employee_id = ? AND date >= ? AND date < ?",
+        (employee, low, high)).fetchall() for employee in range(1, employees + 1)])
+    columns = (Attendance.id, Attendance.employee_id, Attendance.status, Attendance.date, Attendance.time,
+               Attendance.time_out)
+    with app.app_context():
+        orm_scan = timed(lambda: db.session.execute(
+            select(*columns).where(Attendance.date >= MONTH[0], Attendance.date < MONTH[1])).all())
+        orm_lookup = timed(lambda: [db.session.execute(
+            select(*columns).where(Attendance.employee_id == employee, Attendance.date >= MONTH[0],
+                                   Attendance.date < MONTH[1])).all() for employee in range(1, employees + 1)])
+        matched = db.session.execute(select(func.count()).select_from(Attendance).where(
+            Attendance.date >= MONTH[0], Attendance.date < MONTH[1])).scalar()
+    return matched, raw_scan, raw_lookup, orm_scan, orm_lookup
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 500_000
+    employees = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+
+    results = {}
+    for layout in ('legacy', 'compact'):
+        path = os.path.join(WORKDIR, f'{layout}.db')
+        Config.SQLALCHEMY_DATABASE_URI = 'sqlite:///' + path
+        app = create_app()
+        with app.app_context():
+            if layout == 'compact':
+                Attendance.__table__.create(db.engine)
+            else:
+                with db.engine.begin() as connection:
+                    connection.exec_driver_sql(LEGACY_TABLE)
+                    connection.exec_driver_sql(LEGACY_INDEX)
+            db.engine.dispose()
+        connection = fill(path, rows, employees, compact=layout == 'compact')
+        bounds = ((day_number(MONTH[0]), day_number(MONTH[1])) if layout == 'compact'
+                  else (MONTH[0].isoformat(), MONTH[1].isoformat()))
+        results[layout] = (sizes(connection), os.path.getsize(path), measure(app, connection, bounds, employees))
+
+    print(f"{rows} rows, {employees} employees, month {MONTH[0]:%Y-%m}")
+    print(f"{'layout':<8} {'table B/row':>11} {'index B/row':>11} {'file MB':>8} {'matched':>8} "
+          f"{'scan SQL':>9} {'scan ORM':>9} {'lookups SQL':>12} {'lookups ORM':>12}")
+    for layout, (pages, file_size, (matched, raw_scan, raw_lookup, orm_scan, orm_lookup)) in results.items():
+        index = next((size for name, size in pages.items() if name.startswith('ix_attendance')), 0)
+        print(f"{layout:<8} {pages.get('attendance', 0) / rows:>11.1f} {index / rows:>11.1f} "
+              f"{file_size / 1e6:>8.1f} {matched:>8} {raw_scan:>7.1f}ms {orm_scan:>7.1f}ms "
+              f"{raw_lookup:>10.1f}ms {orm_lookup:>10.1f}ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+"""Benchmark: /admin/list_employees pages, keyset cursor vs OFFSET, and counted totals.
+
+Usage: python benchmarks/employee_list_bench.py [employees] [page_size]
+
+Fills a throwaway SQLite database (employee counts maintained by the
+triggers from app.employee_counts), then times the first page and a page
+deep into the list for each sort/filter, once with the keyset query from
+app.read_models.employee_list_stmt and once with LIMIT/OFFSET, and compares
+employee_total() against COUNT(*).
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from config import Config  # noqa: E402
+
+WORKDIR = tempfile.mkdtemp()
+Config.SQLALCHEMY_DATABASE_URI = 'sqlite:///' + os.path.join(WORKDIR, 'bench.db')
+Config.SHARED_CACHE_PATH = os.path.join(WORKDIR, 'cache')
+
+from sqlalchemy import func, insert, select  # noqa: E402
+
+from app import create_app, db  # noqa: E402
+from app.employee_counts import employee_total  # noqa: E402
+from app.models import Employee, User  # noqa: E402
+from app.read_models import employee_list_rows, employee_list_stmt  # noqa: E402
+
+CASES = [
+    ('id', {}),
+    ('name', {}),
+    ('name', {'gender': 'P'}),
+    ('id', {'gender': 'L'}),
+    ('name', {'status': 0}),
+]
+
+
+def timed(fn, repeats=20):
+    fn()
+    started = time.perf_counter()
+    for _ in range(repeats):
+        fn()
+    return (time.perf_counter() - started) / repeats * 1e3
+
+
+def keyset_page(sort, filters, page_size, pages):
+    """Follow next cursors for pages, return the cursor position of the last one."""
+    after = None
+    for _ in range(pages):
+        rows, _ = employee_list_rows(page_size, sort, False, after, **filters)
+        last = rows[-1]
+        after = (last['id'] if sort == 'id' else last['name'], last['id'])
+    return after
+
+
+def main():
+    employees = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    page_size = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    rng = random.Random(1)
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        db.session.execute(insert(User), [
+            {'email': f'user{i}@example.com', 'password': 'x', 'status': int(rng.random() < 0.02)}
+            for i in range(employees)
+        ])
+        user_ids = db.session.execute(select(User.id)).scalars().all()
+        db.session.execute(insert(Employee), [{
+            'name': f'Employee {rng.randrange(10 ** 8):08d}', 'gender': rng.choice('LP'), 'password': 'x',
+            'user_id': user_id, 'email': f'employee{user_id}@example.com', 'phone_number': '0800',
+        } for user_id in user_ids])
+        db.session.commit()
+
+        deep = employees // page_size // 3  # Halaman di sepertiga daftar (filter gender/status: lebih jauh lagi)
+        print(f"{employees} employees, page size {page_size}, deep page = page {deep}")
+        print(f"{'sort':<5} {'filter':<14} {'first':>8} {'deep keyset':>12} {'deep OFFSET':>12}")
+        for sort, filters in CASES:
+            first_ms = timed(lambda: employee_list_rows(page_size, sort, False, None, **filters))
+            after = keyset_page(sort, filters, page_size, deep)
+            keyset_ms = timed(lambda: employee_list_rows(page_size, sort, False, after, **filters))
+            stmt = employee_list_stmt(sort=sort, **filters).limit(page_size).offset(deep * page_size)
+            offset_ms = timed(lambda: db.session.execute(stmt).all())
+            label = ','.join(f'{k}={v}' for k, v in filters.items()) or '-'
+            print(f"{sort:<5} {label:<14} {first_ms:>6.2f}ms {keyset_ms:>10.2f}ms {offset_ms:>10.2f}ms")
+
+        count_ms = timed(lambda: db.session.execute(
+            select(func.count()).select_from(Employee).join(User, User.id == Employee.user_id)
+            .where(Employee.gender == 'P', User.status == 0)
+        ).scalar())
+        counter_ms = timed(lambda: employee_total('P', 0))
+        assert employee_total('P', 0) == db.session.execute(
+            select(func.count()).select_from(Employee).join(User, User.id == Employee.user_id)
+            .where(Employee.gender == 'P', User.status == 0)
+        ).scalar()
+        print(f"total gender=P,status=0: COUNT(*) {count_ms:.2f}ms, employee_counts {counter_ms:.3f}ms")
+
+
+if __name__ == '__main__':
+    main()
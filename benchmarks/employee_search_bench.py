@@ -0,0 +1,94 @@
+"""Benchmark: /admin/employees/search latency at 100k employees.
+
+Usage: python benchmarks/employee_search_bench.py [employees] [repeats]
+
+Fills a throwaway SQLite database with generated Indonesian names (so
+common names and trigrams repeat as they do in a real company), then times
+app.employee_search.search_employees for prefix, substring, phone, short
+and misspelled queries, and a LIKE '%q%' scan for comparison.
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from config import Config  # noqa: E402
+
+WORKDIR = tempfile.mkdtemp()
+Config.SQLALCHEMY_DATABASE_URI = 'sqlite:///' + os.path.join(WORKDIR, 'bench.db')
+Config.SHARED_CACHE_PATH = os.path.join(WORKDIR, 'cache')
+
+from sqlalchemy import insert, or_, select  # noqa: E402
+
+from app import create_app, db  # noqa: E402
+from app.employee_search import search_employees  # noqa: E402
+from app.models import Employee, User  # noqa: E402
+
+FIRST = ['Budi', 'Siti', 'Agus', 'Dewi', 'Andi', 'Rina', 'Joko', 'Sri', 'Putri', 'Rudi', 'Ahmad', 'Nur', 'Indah',
+         'Eko', 'Wahyu', 'Fitri', 'Dian', 'Yusuf', 'Ratna', 'Hendra', 'Lestari', 'Bambang', 'Ayu', 'Fajar', 'Maya',
+         'Rizky', 'Sinta', 'Teguh', 'Wulan', 'Yoga', 'Kartika', 'Gilang', 'Nanda', 'Citra', 'Bayu', 'Intan']
+LAST = ['Santoso', 'Wijaya', 'Saputra', 'Hidayat', 'Pratama', 'Kusuma', 'Nugroho', 'Setiawan', 'Siregar',
+        'Nasution', 'Lubis', 'Harahap', 'Simanjuntak', 'Gunawan', 'Halim', 'Susanto', 'Purnomo', 'Utami',
+        'Rahayu', 'Permana', 'Firmansyah', 'Hakim', 'Ramadhan', 'Kurniawan', 'Sihombing', 'Tanjung', 'Wibowo']
+
+QUERIES = {
+    'common prefix': 'budi',
+    'full name': 'bambang kurniawan',
+    'surname substring': 'manjun',
+    'phone': '08123',
+    'email': 'gilang.tanjung',
+    'two characters': 'yo',
+    'typo': 'kurniawam',
+    'typo in full name': 'budi santsoo',
+    'short transposition': 'dwei',
+    'no match': 'zzxq',
+}
+
+
+def main():
+    employees = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    rng = random.Random(1)
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        started = time.perf_counter()
+        db.session.execute(insert(User), [
+            {'email': f'user{i}@example.com', 'password': 'x', 'status': 0} for i in range(employees)
+        ])
+        user_ids = db.session.execute(select(User.id).order_by(User.id)).scalars().all()
+        rows = []
+        for user_id in user_ids:
+            first, last, middle = rng.choice(FIRST), rng.choice(LAST), rng.choice(FIRST)
+            name = f'{first} {middle} {last}' if rng.random() < 0.5 else f'{first} {last}'
+            rows.append({'name': name, 'gender': 'L', 'password': 'x', 'user_id': user_id,
+                         'email': f"{first.lower()}.{last.lower()}{user_id}@example.com",
+                         'phone_number': f'08{rng.randrange(10 ** 9, 10 ** 10)}'})
+        db.session.execute(insert(Employee), rows)  # Trigger mengisi index pencarian
+        db.session.commit()
+        print(f"{employees} employees loaded and indexed in {time.perf_counter() - started:.1f}s")
+
+        print(f"{'query':<20} {'q':<18} {'total':>5} {'search':>10} {'LIKE scan':>10}")
+        for label, query in QUERIES.items():
+            search_employees(query)  # Hangatkan cache halaman SQLite
+            started = time.perf_counter()
+            for _ in range(repeats):
+                rows, total, _ = search_employees(query)
+            search_ms = (time.perf_counter() - started) / repeats * 1e3
+
+            pattern = f'%{query}%'
+            started = time.perf_counter()
+            for _ in range(max(1, repeats // 10)):
+                db.session.execute(select(Employee.id).where(or_(
+                    Employee.name.like(pattern), Employee.email.like(pattern), Employee.phone_number.like(pattern)
+                ))).all()
+            scan_ms = (time.perf_counter() - started) / max(1, repeats // 10) * 1e3
+            print(f"{label:<20} {query:<18} {total:>5} {search_ms:>8.2f}ms {scan_ms:>8.2f}ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,127 @@
+"""Demo: queue many emails and deliver them through the job workers.
+
+Usage: python benchmarks/mail_queue_demo.py [emails] [workers]
+
+Starts a minimal local SMTP stand-in (accepts and discards messages, counts
+connections), points flask_mail at it, enqueues the given number of emails
+(default 5000) via app.mailer.send_email_async and reports enqueue rate,
+delivery rate and how many SMTP connections were opened. A second pass
+makes the stand-in reject every third message to show retries.
+"""
+import os
+import socket
+import socketserver
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from config import Config  # noqa: E402
+
+
+class SMTPSink(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), SMTPHandler)
+        self.lock = threading.Lock()
+        self.connections = 0
+        self.messages = 0
+        self.reject_every = 0
+        self._seen = 0
+
+
+class SMTPHandler(socketserver.StreamRequestHandler):
+    # Cukup untuk smtplib: EHLO/HELO, MAIL, RCPT, DATA, RSET, NOOP, QUIT
+    def reply(self, line):
+        self.wfile.write(line.encode() + b'\r\n')
+
+    def handle(self):
+        server = self.server
+        with server.lock:
+            server.connections += 1
+        self.reply('220 sink ready')
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line[:4].upper()
+            if command == b'EHLO':
+                self.reply('250-sink')
+                self.reply('250 8BITMIME')
+            elif command in (b'HELO', b'MAIL', b'RCPT', b'RSET', b'NOOP'):
+                self.reply('250 OK')
+            elif command == b'DATA':
+                self.reply('354 end with .')
+                while self.rfile.readline() not in (b'.\r\n', b'.\n', b''):
+                    pass
+                with server.lock:
+                    server._seen += 1
+                    rejected = server.reject_every and server._seen % server.reject_every == 0
+                    if not rejected:
+                        server.messages += 1
+                self.reply('451 try again later' if rejected else '250 queued')
+            elif command == b'QUIT':
+                self.reply('221 bye')
+                return
+            else:
+                self.reply('502 not implemented')
+
+
+def run(app, db, Job, sink, emails, label):
+    from app.mailer import send_email_async
+
+    with app.app_context():
+        started = time.perf_counter()
+        for i in range(emails):
+            send_email_async('Reset Password', [f'user{i}@example.com'], f'Pesan nomor {i}')
+        enqueued = time.perf_counter() - started
+
+        while db.session.query(Job).filter(Job.status != 'dead').count():
+            time.sleep(0.05)
+            db.session.remove()
+        elapsed = time.perf_counter() - started
+        dead = db.session.query(Job).filter_by(status='dead').count()
+
+    print(f"{label:<14} {emails} emails  enqueue {emails / enqueued:8.0f}/s  "
+          f"delivered {sink.messages} in {elapsed:5.2f}s = {sink.messages / elapsed * 60:9.0f}/min  "
+          f"connections {sink.connections}  dead {dead}")
+
+
+def main():
+    emails = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+
+    sink = SMTPSink()
+    threading.Thread(target=sink.serve_forever, daemon=True).start()
+
+    workdir = tempfile.mkdtemp()
+    Config.SQLALCHEMY_DATABASE_URI = f"sqlite:///{os.path.join(workdir, 'bench.db')}?timeout=60"
+    Config.MAIL_SERVER, Config.MAIL_PORT = sink.server_address
+    Config.MAIL_USE_TLS = False
+    Config.MAIL_USERNAME = Config.MAIL_PASSWORD = None
+    Config.MAIL_DEFAULT_SENDER = 'noreply@example.com'
+    Config.JOB_WORKERS = workers
+    Config.JOB_POLL_INTERVAL = 0.05
+    Config.JOB_BACKOFF_BASE = 0.05
+
+    from app import create_app, db
+    from app.models import Job
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+
+    print(f"SMTP stand-in on {socket.gethostname()}:{sink.server_address[1]}, {workers} workers")
+    run(app, db, Job, sink, emails, 'clean')
+
+    sink.messages = sink.connections = 0
+    sink.reject_every = 3
+    run(app, db, Job, sink, emails, 'flaky (1 in 3)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+"""Benchmark: cost of one token-bucket check per backend.
+
+Usage: python benchmarks/rate_limit_bench.py [calls] [threads]
+
+Measures microseconds per consume() for the lock-striped memory backend and
+the shared SQLite backend, single-threaded and with several threads hitting
+distinct keys, and checks that two processes sharing the SQLite file
+together admit no more than the bucket capacity.
+"""
+import multiprocessing
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.rate_limit import MemoryBackend, SQLiteBackend  # noqa: E402
+
+
+def timed(backend, calls, threads):
+    def worker(number):
+        for i in range(calls):
+            backend.consume(f'login:ip:10.0.{number}.{i % 250}', 30, 0.5)
+
+    pool = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+    started = time.perf_counter()
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    return elapsed / (calls * threads) * 1e6
+
+
+def admitted(path, attempts, result):
+    backend = SQLiteBackend(path)
+    result.put(sum(1 for _ in range(attempts) if backend.consume('login:email:a@example.com', 10, 1 / 60) == 0))
+
+
+def main():
+    calls = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    threads = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    path = os.path.join(tempfile.mkdtemp(), 'ratelimit.db')
+
+    for label, backend in (('memory', MemoryBackend()), ('sqlite', SQLiteBackend(path))):
+        single = timed(backend, calls, 1)
+        multi = timed(backend, calls // threads, threads)
+        print(f"{label:<8} {single:7.2f} us/check single thread   {multi:7.2f} us/check with {threads} threads")
+
+    # Dua proses, satu bucket berkapasitas 10: total yang lolos harus tetap 10
+    result = multiprocessing.Queue()
+    processes = [multiprocessing.Process(target=admitted, args=(path, 50, result)) for _ in range(2)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+    print(f"2 processes x 50 attempts on a 10-token bucket: {result.get() + result.get()} admitted")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+"""Benchmark: ORM entity path vs read-model projections for the attendance report.
+
+Usage: python benchmarks/read_model_bench.py [rows]
+
+Builds a temporary SQLite database with the given number of attendance rows
+(default 100000) and compares wall time and peak Python memory
+(tracemalloc) of the old ORM path against app.read_models.
+"""
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date, time as dtime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from config import Config  # noqa: E402
+
+
+def orm_report(db, Attendance, Employee, AttendanceStatus):
+    # Jalur lama: entity ORM penuh + dict dibangun manual dengan strftime
+    attendances = db.session.query(Attendance, Employee.name).join(
+        Employee, Attendance.employee_id == Employee.user_id
+    ).all()
+    data = []
+    for attendance, name in attendances:
+        if attendance.status == AttendanceStatus.HADIR:
+            status = 'Hadir'
+        elif attendance.status == AttendanceStatus.IJIN:
+            status = 'Izin'
+        else:
+            status = 'Alpha'
+        data.append({
+            'employee_id': attendance.employee_id,
+            'employee_name': name,
+            'status': status,
+            'date': attendance.date.strftime('%Y-%m-%d') if attendance.date else 'N/A',
+            'time': attendance.time.strftime('%H:%M:%S') if attendance.time else 'N/A',
+            'time_out': attendance.time_out.strftime('%H:%M:%S') if attendance.time_out else 'N/A'
+        })
+    return data
+
+
+def measure(label, fn, db):
+    # Waktu diukur tanpa tracemalloc (overhead-nya besar), memori diukur pada run terpisah
+    started = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - started
+    del result
+    db.session.remove()
+
+    tracemalloc.start()
+    result = fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<12} {len(result):>8} rows  {elapsed * 1000:9.1f} ms  "
+          f"{len(result) / elapsed:>10.0f} rows/s  peak {peak / 1024 / 1024:7.1f} MiB")
+    db.session.remove()
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    workdir = tempfile.mkdtemp()
+    Config.SQLALCHEMY_DATABASE_URI = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+
+    from app import create_app, db
+    from app.models import Attendance, Employee, User, AttendanceStatus
+    from app.read_models import attendance_report_rows
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        employees = 500
+        db.session.execute(User.__table__.insert(), [
+            {'id': i, 'email': f'user{i}@example.com', 'password': 'x', 'status': 0} for i in range(1, employees + 1)
+        ])
+        db.session.execute(Employee.__table__.insert(), [
+            {'name': f'Employee {i}', 'gender': 'L', 'email': f'user{i}@example.com', 'phone_number': '0800',
+             'password': 'x', 'user_id': i} for i in range(1, employees + 1)
+        ])
+        statuses = list(AttendanceStatus)
+        start = date(2020, 1, 1)
+        db.session.execute(Attendance.__table__.insert(), [{
+            'employee_id': i % employees + 1,
+            'status': statuses[i % len(statuses)].name,
+            'date': start + timedelta(days=i // employees),
+            'time': dtime(8, i % 60, 0),
+            'time_out': dtime(17, 0, 0) if i % 3 else None,
+            'reason': 'N/A',
+        } for i in range(rows)])
+        db.session.commit()
+
+        print(f"{rows} attendance rows, {employees} employees")
+        measure('orm', lambda: orm_report(db, Attendance, Employee, AttendanceStatus), db)
+        measure('read-model', attendance_report_rows, db)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+"""Benchmark: per-request cost of the JWT revocation check.
+
+Usage: python benchmarks/revocation_bench.py [revoked] [checks]
+
+Fills revoked_tokens with the given number of revoked jtis (default 20000)
+and times, per check: the Bloom-fronted RevocationList for non-revoked and
+revoked tokens, and a plain primary-key lookup in the database as the
+baseline it replaces. A second process then revokes a token and the first
+process checks that the revocation is visible without waiting for a sync.
+"""
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+import uuid
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from config import Config  # noqa: E402
+
+
+def per_check(fn, jtis):
+    started = time.perf_counter()
+    for jti in jtis:
+        fn(jti)
+    return (time.perf_counter() - started) / len(jtis) * 1e6
+
+
+def revoke_in_child(jti, done):
+    from app import create_app
+    from app.revocation import get_revocation_list
+
+    app = create_app()
+    with app.app_context():
+        get_revocation_list().revoke(jti, time.time() + 3600)
+    done.set()
+
+
+def main():
+    revoked = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    checks = int(sys.argv[2]) if len(sys.argv) > 2 else 20000
+    workdir = tempfile.mkdtemp()
+    Config.SQLALCHEMY_DATABASE_URI = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    Config.REVOCATION_BLOOM_PATH = os.path.join(workdir, 'revoked.bloom')
+    Config.REVOCATION_SYNC_INTERVAL = 3600  # Tanpa sinkron berkala selama pengukuran
+
+    from datetime import datetime, timedelta
+    from sqlalchemy import select
+    from app import create_app, db
+    from app.models import RevokedToken
+    from app.revocation import get_revocation_list
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        expires = datetime.utcnow() + timedelta(hours=1)
+        revoked_jtis = [uuid.uuid4().hex for _ in range(revoked)]
+        db.session.execute(RevokedToken.__table__.insert(), [
+            {'jti': jti, 'expires_at': expires, 'revoked_at': datetime.utcnow()} for jti in revoked_jtis
+        ])
+        db.session.commit()
+
+        revocations = get_revocation_list()
+        revocations._next_sync = 0
+        revocations.sync()
+        for jti in revoked_jtis:
+            revocations.bloom.add(jti)
+
+        fresh = [uuid.uuid4().hex for _ in range(checks)]
+        sample = revoked_jtis[:checks]
+        false_positives = sum(1 for jti in fresh if jti in revocations.bloom)
+
+        def db_lookup(jti):
+            return db.session.execute(select(RevokedToken.id).where(RevokedToken.jti == jti)).first() is not None
+
+        print(f"{revoked} revoked tokens, {checks} checks, Bloom false positives: {false_positives}")
+        print(f"bloom, not revoked   {per_check(revocations.is_revoked, fresh):7.2f} us/check")
+        print(f"bloom, revoked       {per_check(revocations.is_revoked, sample):7.2f} us/check")
+        print(f"database lookup      {per_check(db_lookup, fresh):7.2f} us/check")
+        assert not any(revocations.is_revoked(jti) for jti in fresh)
+        assert all(revocations.is_revoked(jti) for jti in sample)
+
+        # Pencabutan di proses lain langsung terlihat lewat Bloom filter bersama
+        jti = uuid.uuid4().hex
+        done = multiprocessing.Event()
+        child = multiprocessing.get_context('fork').Process(target=revoke_in_child, args=(jti, done))
+        child.start()
+        child.join()
+        db.session.remove()
+        print(f"revoked in another process, seen here before next sync: {revocations.is_revoked(jti)}")
+
+
+if __name__ == '__main__':
+    main()
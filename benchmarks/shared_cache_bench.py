@@ -0,0 +1,88 @@
+"""Benchmark: employee lookup through the shared cache vs the database.
+
+Usage: python benchmarks/shared_cache_bench.py [employees] [lookups] [workers]
+
+Creates a throwaway SQLite database with the given number of employees and
+times employee_by_user_id() with the cache disabled (one SELECT per lookup)
+and enabled (warm cache). Then starts worker processes that read the same
+cache file and reports their hit rate, showing a single copy warmed by one
+process serves all of them.
+"""
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from config import Config  # noqa: E402
+
+WORKDIR = tempfile.mkdtemp()
+Config.SQLALCHEMY_DATABASE_URI = 'sqlite:///' + os.path.join(WORKDIR, 'bench.db')
+Config.SHARED_CACHE_PATH = os.path.join(WORKDIR, 'cache')
+
+from app import create_app, db  # noqa: E402
+from app.models import Employee, User  # noqa: E402
+from app.shared_cache import MISS, employee_by_user_id, get_cache  # noqa: E402
+
+
+def timed_lookups(app, user_ids):
+    with app.app_context():
+        started = time.perf_counter()
+        for user_id in user_ids:
+            employee_by_user_id(user_id)
+        return (time.perf_counter() - started) / len(user_ids) * 1e6
+
+
+def worker(user_ids, results):
+    # Proses baru: buka file cache yang sama, tanpa koneksi database
+    app = create_app()
+    with app.app_context():
+        cache = get_cache()
+        hits = sum(cache.get(f'employee:{user_id}') is not MISS for user_id in user_ids)
+    results.put(hits)
+
+
+def main():
+    employees = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    lookups = int(sys.argv[2]) if len(sys.argv) > 2 else 20000
+    workers = int(sys.argv[3]) if len(sys.argv) > 3 else 4
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        for i in range(employees):
+            user = User(email=f'bench{i}@example.com', password='x', status=0)
+            db.session.add(user)
+            db.session.flush()
+            db.session.add(Employee(name=f'Employee {i}', gender='L', email=user.email,
+                                    phone_number='0800', password='x', user_id=user.id))
+        db.session.commit()
+        user_ids = [user_id for (user_id,) in db.session.query(Employee.user_id)]
+    rng = random.Random(1)
+    sample = [rng.choice(user_ids) for _ in range(lookups)]
+
+    app.config['SHARED_CACHE_ENABLED'] = False
+    database_us = timed_lookups(app, sample)
+    app.config['SHARED_CACHE_ENABLED'] = True
+    timed_lookups(app, user_ids)  # Hangatkan cache
+    cache_us = timed_lookups(app, sample)
+
+    results = multiprocessing.Queue()
+    processes = [multiprocessing.Process(target=worker, args=(user_ids, results)) for _ in range(workers)]
+    for process in processes:
+        process.start()
+    hits = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+
+    print(f"{employees} employees, {lookups} lookups")
+    print(f"database     {database_us:8.1f} us/lookup")
+    print(f"shared cache {cache_us:8.1f} us/lookup")
+    print(f"{workers} other processes found {min(hits)}-{max(hits)} of {len(user_ids)} entries already cached")
+
+
+if __name__ == '__main__':
+    main()
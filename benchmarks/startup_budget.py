@@ -0,0 +1,88 @@
+"""Startup budget: fail if `from app import create_app; create_app()` gets slower.
+
+Usage: python benchmarks/startup_budget.py [budget_ms] [runs]
+
+Starts a fresh interpreter with `-X importtime` a few times (best run
+counts, so a busy machine does not fail the check), and exits non-zero if
+import + create_app() took longer than the budget (default 800 ms, or
+STARTUP_BUDGET_MS), if a module that should only load on first use was
+imported at startup, or if create_app() created files under instance/. Prints the heaviest top-level imports either way, so a
+regression shows where the time went.
+"""
+import os
+import re
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+DEFAULT_BUDGET_MS = 800
+
+# Dimuat saat fitur pertama kali dipakai, bukan saat startup
+LAZY_MODULES = ('numpy', 'alembic', 'flask_migrate', 'flask_mail')
+
+CHILD = """
+import os, sys, time
+def files():
+    return {{os.path.join(folder, name) for folder, _, names in os.walk({instance!r}) for name in names}}
+existing = files()
+started = time.perf_counter()
+from config import Config
+Config.LOG_FILE = None
+from app import create_app
+create_app()
+elapsed = round((time.perf_counter() - started) * 1e3, 1)
+print(elapsed, ','.join(m for m in {lazy!r} if m in sys.modules), ','.join(sorted(files() - existing)), sep='\\t')
+"""
+
+_LINE = re.compile(r'^import time:\s+(\d+) \|\s+\d+ \| *(\S+)$')
+
+
+def profile_startup(workdir):
+    """(startup ms, lazily-loaded modules that were imported, files created in instance/, {package: import us})."""
+    child = CHILD.format(instance=os.path.join(ROOT, 'instance'), lazy=LAZY_MODULES)
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', child],
+        cwd=workdir, env={**os.environ, 'PYTHONPATH': ROOT}, capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        sys.exit(f"create_app() failed:\n{result.stderr[-3000:]}")
+    elapsed, loaded, created = result.stdout.splitlines()[-1].split('\t')
+    packages = {}
+    for line in result.stderr.splitlines():
+        match = _LINE.match(line)
+        if match:
+            # Waktu sendiri (tanpa anak) dijumlah per paket: flask, sqlalchemy, app, ...
+            package = match.group(2).split('.')[0]
+            packages[package] = packages.get(package, 0) + int(match.group(1))
+    return float(elapsed), [name for name in loaded.split(',') if name], [path for path in created.split(',') if path], packages
+
+
+def main():
+    budget_ms = float(sys.argv[1]) if len(sys.argv) > 1 else float(os.environ.get('STARTUP_BUDGET_MS', DEFAULT_BUDGET_MS))
+    runs = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+
+    profiles = [profile_startup(tempfile.mkdtemp()) for _ in range(runs)]
+    elapsed, loaded, created, packages = min(profiles, key=lambda profile: profile[0])
+
+    print(f"startup {elapsed:.0f} ms (best of {runs}, budget {budget_ms:.0f} ms)")
+    print("heaviest imports:")
+    for package, micros in sorted(packages.items(), key=lambda item: -item[1])[:10]:
+        print(f"  {package:<24} {micros / 1e3:7.1f} ms")
+
+    failures = []
+    if elapsed > budget_ms:
+        failures.append(f"startup took {elapsed:.0f} ms, over the {budget_ms:.0f} ms budget")
+    if loaded:
+        failures.append(f"imported at startup, should load on first use: {', '.join(loaded)}")
+    if created:
+        # create_app() tidak boleh membuat file (cache, Bloom filter, database, ...)
+        failures.append(f"files created by create_app(): {', '.join(created)}")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
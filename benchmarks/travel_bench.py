@@ -0,0 +1,56 @@
+"""Benchmark: seeding the impossible-travel detector, vectorized replay vs per-event evaluation.
+
+Usage: python benchmarks/travel_bench.py [clock_ins] [employees]
+
+Generates random clock-ins around a few sites (with some spoofed jumps) and
+runs them through app.travel.TravelDetector.replay and through evaluate()
+one event at a time; both must produce the same findings.
+"""
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.travel import TravelDetector  # noqa: E402
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    employees = int(sys.argv[2]) if len(sys.argv) > 2 else 5000
+    rng = np.random.default_rng(1)
+    sites = [(1, -6.2, 106.8, 0.5), (2, -6.9, 107.6, 0.5), (3, -7.25, 112.75, 0.5)]
+
+    employee_ids = np.sort(rng.integers(1, employees + 1, rows))
+    home = rng.integers(0, len(sites), employees + 1)[employee_ids]
+    spoofed = rng.random(rows) < 0.002
+    site = np.where(spoofed, rng.integers(0, len(sites), rows), home)
+    latitudes = np.array([s[1] for s in sites])[site] + rng.normal(0, 0.001, rows)
+    longitudes = np.array([s[2] for s in sites])[site] + rng.normal(0, 0.001, rows)
+    times = np.cumsum(rng.integers(600, 86400, rows).astype(np.float64))  # Naik terus, jadi urut per employee
+    ids = np.arange(1, rows + 1, dtype=np.int64)
+
+    started = time.perf_counter()
+    findings = TravelDetector(sites).replay(ids, employee_ids, latitudes, longitudes, times)
+    replay_s = time.perf_counter() - started
+
+    detector = TravelDetector(sites)
+    started = time.perf_counter()
+    looped = []
+    for index, row in enumerate(zip(employee_ids.tolist(), latitudes.tolist(), longitudes.tolist(),
+                                    times.tolist(), ids.tolist())):
+        finding = detector.evaluate(*row)
+        if finding:
+            looped.append((index, finding[0]))
+    loop_s = time.perf_counter() - started
+
+    assert sorted((index, kind) for index, kind, _, _ in findings) == looped
+    print(f"{rows} clock-ins, {employees} employees, {len(findings)} findings")
+    print(f"vectorized replay  {replay_s:8.2f} s")
+    print(f"per-event evaluate {loop_s:8.2f} s ({loop_s / rows * 1e6:.1f} us/event)")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,6 +1,5 @@
 import os
 import base64
-import logging
 from datetime import timedelta
 
 # Menghasilkan SECRET_KEY dari Base64
@@ -19,26 +18,172 @@ class Config:
     JWT_ACCESS_TOKEN_EXPIRES = timedelta(hours=1)  # Waktu kedaluwarsa token akses
 
 
+    # Kompresi respons (gzip/brotli) untuk respons di atas ukuran minimum (byte)
+    COMPRESS_MIN_SIZE = 1024
+    COMPRESS_LEVEL = 6  # Level gzip
+    COMPRESS_BR_LEVEL = 4  # Level brotli
+    COMPRESS_MIMETYPES = ['application/json', 'text/html', 'text/plain', 'text/csv']
+
     # Menambahkan batas ukuran upload
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16 MB
 
     # Tentukan lokasi folder untuk menyimpan foto
     UPLOAD_FOLDER = os.path.join(os.path.dirname(__file__), '..', 'static', 'uploads')
 
-    # Pastikan folder ada
-    if not os.path.exists(UPLOAD_FOLDER):
-        os.makedirs(UPLOAD_FOLDER)
+    # Offboarding: ukuran batch penghapusan attendance dan jeda antar batch (detik)
+    OFFBOARDING_BATCH_SIZE = 500
+    OFFBOARDING_PAUSE = 0.05
+    OFFBOARDING_STALE_AFTER = 300  # Job 'running' tanpa progres selama ini boleh dilanjutkan
+
+    # Shard attendance (opsional): 0 = satu tabel di database utama; N = baris dibagi ke N file SQLite menurut
+    # hash employee_id (app.attendance_shards). Setelah mengubah angka ini jalankan `flask attendance-shards-rebalance`
+    ATTENDANCE_SHARDS = 0
+    ATTENDANCE_SHARD_FOLDER = None  # Default: <instance>/shards
+
+    # Cold storage: bulan yang lebih tua dari retensi dipindah ke file segment (default: <instance>/segments)
+    ATTENDANCE_RETENTION_MONTHS = 12
+    ARCHIVE_FOLDER = None
+
+    # Folder blob store foto profil (default: <instance>/blobs)
+    BLOB_FOLDER = None
 
     # Konfigurasi SMTP untuk email
     smtp_server = 'smtp.gmail.com'
     smtp_port = 587
+    MAIL_SERVER = os.environ.get('MAIL_SERVER', smtp_server)
+    MAIL_PORT = int(os.environ.get('MAIL_PORT', smtp_port))
+    MAIL_USE_TLS = os.environ.get('MAIL_USE_TLS', '1') == '1'
+    MAIL_USERNAME = os.environ.get('MAIL_USERNAME')
+    MAIL_PASSWORD = os.environ.get('MAIL_PASSWORD')
+    MAIL_DEFAULT_SENDER = os.environ.get('MAIL_DEFAULT_SENDER', MAIL_USERNAME)
+    MAIL_IDLE_TIMEOUT = 30  # Koneksi SMTP yang menganggur lebih lama dari ini ditutup (detik)
+
+    # Rate limit token bucket per endpoint: 'N/second|minute|hour|day', per IP dan/atau per email
+    RATE_LIMIT_ENABLED = True
+    RATE_LIMIT_BACKEND = 'sqlite'  # 'sqlite' (dibagi antar proses worker) atau 'memory' (per proses)
+    RATE_LIMIT_STORAGE = None  # Default: <instance>/ratelimit.db
+    RATE_LIMITS = {
+        'auth_bp.login': {'ip': '30/minute', 'email': '5/minute'},
+        'auth_bp.forgot_password': {'ip': '10/minute', 'email': '3/hour'},
+        'auth_bp.reset_password': {'ip': '10/minute'},
+    }
+
+    # Admission control: batas request bersamaan per kelas endpoint, antrean pendek, lalu 503
+    ADMISSION_CONTROL_ENABLED = True
+    ADMISSION_MAX_CONCURRENT = 24  # Total per proses
+    ADMISSION_CLASSES = {
+        # priority kecil = didahulukan saat slot kosong; timeout = lama maksimum menunggu di antrean (detik)
+        'read': {'priority': 0, 'concurrency': 16, 'queue': 64, 'timeout': 2.0, 'retry_after': 1},
+        'write': {'priority': 1, 'concurrency': 8, 'queue': 32, 'timeout': 2.0, 'retry_after': 2},
+        'admin': {'priority': 2, 'concurrency': 4, 'queue': 16, 'timeout': 1.0, 'retry_after': 2},
+        'report': {'priority': 3, 'concurrency': 2, 'queue': 4, 'timeout': 0.5, 'retry_after': 5},
+    }
+    # Nama endpoint lalu nama blueprint -> kelas; None = tidak dibatasi
+    ADMISSION_ENDPOINTS = {
+        'employee.check_attendance_status': 'read',
+        'employee.profile_photo': 'read',
+        'employee.sync_attendance': 'read',
+        'employee.record_attendance': 'write',
+        'employee.submit_leave': 'write',
+        'user_bp.clock_in': 'write',
+        'user_bp.clock_out': 'write',
+        'user_bp.leave': 'write',
+        'employee.attendance_report': 'report',
+        'attendance.recap': 'report',
+        'admin_bp.attendance_report': 'report',
+        'admin_bp.attendance_matrix': 'report',
+        'admin_bp.metrics': None,
+        'admin_bp.search_employees': 'read',
+        'admin_bp.stream': None,  # Koneksi SSE berumur panjang, tidak memakai slot
+        'admin_bp': 'admin',
+    }
+
+    # Pencabutan token JWT (logout): Bloom filter bersama di <instance>/revoked.bloom + sinkron tabel revoked_tokens
+    REVOCATION_BLOOM_CAPACITY = 100000
+    REVOCATION_BLOOM_ERROR_RATE = 0.001
+    REVOCATION_BLOOM_PATH = None
+    REVOCATION_SYNC_INTERVAL = 5.0  # Detik
+
+    # Jadwal shift: jendela clock-in dibuka sebelum shift mulai; indeks diekspansi untuk horizon hari ini -back..+ahead
+    SHIFT_EARLY_MINUTES = 120
+    SHIFT_INDEX_DAYS_BACK = 7
+    SHIFT_INDEX_DAYS_AHEAD = 35
+    SHIFT_REFRESH_INTERVAL = 30.0  # Detik antar pengecekan perubahan jadwal dari proses lain
+    SHIFT_DEFAULT_GRACE_MINUTES = 0  # Toleransi untuk shift default dari LocationSetting
+    SHIFT_ABSENT_AFTER_MINUTES = None  # Terlambat >= ini dicatat TIDAK HADIR (None = tidak pernah)
+
+    # Kalender kerja: hari kerja mingguan (0 = Senin) sebelum hari libur diterapkan
+    WORKING_WEEKDAYS = (0, 1, 2, 3, 4)
+    CALENDAR_REFRESH_INTERVAL = 30.0  # Detik antar pengecekan perubahan hari libur dari proses lain
+
+    # Feed SSE /admin/stream: ring buffer untuk Last-Event-ID, buffer per subscriber, heartbeat (detik)
+    EVENT_RING_SIZE = 1000
+    EVENT_SUBSCRIBER_BUFFER = 100
+    EVENT_HEARTBEAT = 15.0
+    EVENT_RETRY_MS = 3000
+
+    # Deteksi foto presensi dipakai ulang (dHash 64-bit, butuh Pillow): index di <instance>/photo_hashes.npz
+    PHOTO_HASH_ENABLED = True
+    PHOTO_HASH_MAX_DISTANCE = 6  # Jarak hamming maksimum yang dianggap foto sama
+    PHOTO_HASH_MAX_MATCHES = 20
+    PHOTO_HASH_MAX_FLAGS = 5  # Flag per presensi
+    PHOTO_HASH_INDEX_PATH = None
+    PHOTO_HASH_SYNC_INTERVAL = 5.0  # Detik antar sinkron hash dari proses lain
+    PHOTO_HASH_MERGE_EVERY = 1024
+    PHOTO_HASH_SNAPSHOT_INTERVAL = 300.0
+
+    # Deteksi perjalanan mustahil antar clock-in (flag di attendance_flags)
+    TRAVEL_CHECK_ENABLED = True
+    TRAVEL_MAX_SPEED_KMH = 250.0
+    TRAVEL_MIN_DISTANCE_KM = 2.0  # Perpindahan lebih kecil dianggap noise GPS
+    TRAVEL_SITE_SWITCH_MINUTES = 30  # Clock-in di site lain lebih cepat dari ini ditandai
+    TRAVEL_SEED_DAYS = 30  # Riwayat yang di-replay saat start untuk mengisi state
+    TRAVEL_SYNC_INTERVAL = 5.0  # Detik antar sinkron clock-in dari proses lain
+
+    # Log perubahan attendance untuk /employee/sync; cursor lebih tua dari ini mendapat salinan lengkap
+    CHANGE_LOG_RETENTION_DAYS = 90
+
+    # Shared cache employee/pengaturan (file mmap di <instance>/cache, dipakai bersama semua worker)
+    SHARED_CACHE_ENABLED = True
+    SHARED_CACHE_PATH = None
+    SHARED_CACHE_SLOTS = 4096  # Satu slot per employee/pengaturan
+    SHARED_CACHE_SLOT_SIZE = 1024
+    SHARED_CACHE_LIST_SLOTS = 16  # Daftar lengkap (misal semua employee)
+    SHARED_CACHE_LIST_SLOT_SIZE = 524288
+    SHARED_CACHE_TTL = 300.0  # Detik; batas basi untuk perubahan dari host lain
+
+    # /admin/list_employees: ukuran halaman keyset
+    EMPLOYEE_LIST_PAGE_SIZE = 100
+    EMPLOYEE_LIST_MAX_LIMIT = 1000
+
+    # Pencarian karyawan (/admin/employees/search, index FTS5 trigram)
+    EMPLOYEE_SEARCH_MIN_CHARS = 2  # 2 karakter: hanya awalan nama
+    EMPLOYEE_SEARCH_MAX_PER_PAGE = 100
+    EMPLOYEE_SEARCH_MAX_RESULTS = 100  # Hasil yang diurutkan dan dipaginasi
+    EMPLOYEE_SEARCH_CANDIDATES = 200  # Baris yang dibaca per tahap pencarian
+    EMPLOYEE_SEARCH_FUZZY_BELOW = 20  # Cari salah ketik jika kecocokan langsung kurang dari ini
+    EMPLOYEE_SEARCH_MIN_SIMILARITY = 0.4  # Kemiripan minimum (trigram atau jarak edit) untuk salah ketik
+    EMPLOYEE_SEARCH_FUZZY_TRIGRAMS = 8
+    EMPLOYEE_SEARCH_FUZZY_POSTINGS = 5000  # Batas baris index yang dibaca untuk pencarian salah ketik
+
+    # Antrean job latar belakang: jumlah worker thread per proses (0 = hanya `flask jobs-worker`)
+    JOB_WORKERS = 2
+    JOB_MAX_ATTEMPTS = 5
+    JOB_BACKOFF_BASE = 2  # Detik; retry ke-n menunggu BASE * 2^(n-1)
+    JOB_BACKOFF_MAX = 600
+    JOB_LEASE = 300  # Job 'running' lebih lama dari ini dianggap workernya mati
+    JOB_POLL_INTERVAL = 1.0
+    JOB_BATCH_SIZE = 20
 
-    # Konfigurasi Logging
-    logging.basicConfig(level=logging.INFO,  # Atur level log yang diinginkan (INFO, ERROR, DEBUG, dsb)
-                        format='%(asctime)s - %(levelname)s - %(message)s',
-                        handlers=[
-                            logging.StreamHandler(),  # Output log ke konsol
-                            logging.FileHandler('app_config.log')  # Simpan log ke file app_config.log
-                        ])
+    # Mode ASGI (asgi.py, misal `uvicorn asgi:application`): presensi, izin, status presensi, laporan admin dan feed SSE
+    # dilayani handler async (butuh aiosqlite), endpoint lain oleh aplikasi Flask di thread pool
+    ASGI_ASYNC_ENDPOINTS = True  # False = semua request lewat aplikasi Flask
+    ASGI_WSGI_THREADS = 16  # Thread per proses untuk request yang diteruskan ke aplikasi Flask
+    ASGI_DB_POOL_SIZE = 8  # Koneksi aiosqlite per proses; request async lain menunggu koneksi tanpa memakai thread
+    ASGI_REPORT_CHUNK = 1000  # Baris laporan per potongan yang dikirim
 
-    logging.info("Config loaded successfully")  # Log untuk menandakan konfigurasi telah dimuat
\ No newline at end of file
+    # Konfigurasi Logging (dipasang oleh create_app; mengimpor config tidak menulis log atau membuat folder)
+    LOG_LEVEL = 'INFO'
+    LOG_FILE = 'app.log'  # None = hanya ke konsol
+    LOG_MAX_BYTES = 1000000
+    LOG_BACKUP_COUNT = 5
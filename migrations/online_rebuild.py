@@ -0,0 +1,235 @@
+"""Online table rebuilds for SQLite migrations.
+
+Alembic's batch mode changes a SQLite table by copying it inside one
+transaction, which blocks every writer for as long as the copy takes
+(minutes for a multi-million-row attendance table). rebuild_table() makes
+the same kind of change while the application keeps writing:
+
+1. create the new table next to the live one (<table>_rebuild), with
+   triggers on the live table copying every insert, update and delete
+   across as it happens;
+2. copy the existing rows in chunks of batch_size, each chunk its own
+   short transaction, pausing between chunks so writers get the lock;
+3. swap the tables in one short transaction: the live table's own
+   triggers (search index, counters, change log, ...) are re-created on
+   the new table, its AUTOINCREMENT sequence is kept and foreign keys of
+   other tables keep pointing at the table name;
+4. empty the old table in chunks and drop it.
+
+Use it from a revision file (migrations run with the project root on
+sys.path, so the module imports as migrations.online_rebuild):
+
+    from migrations.online_rebuild import rebuild_table
+
+    def upgrade():
+        rebuild_table('location_settings', LOCATION_SETTINGS_V2,
+                      convert={'latitude': '{row}lat', 'longitude': '{row}long'})
+
+Requirements: the table has an INTEGER PRIMARY KEY (key); rows copied
+twice are matched on it. UNIQUE constraints of the new table must already
+hold for the old rows. Rows are copied, not re-inserted, so the live
+table's triggers do not fire for the copy: when convert changes data that
+triggers derive something from (search index, counts), rebuild that
+afterwards. An interrupted rebuild starts over from step 1 when
+run again (a leftover <table>_old is emptied and dropped first);
+abandon_rebuild() removes the shadow table and its triggers without
+re-running.
+"""
+import logging
+import re
+import time
+
+from alembic import op
+
+BATCH_SIZE = 2000
+PAUSE = 0.05  # Detik antar potongan
+
+logger = logging.getLogger('alembic.online_rebuild')
+
+_INDEX_NAME = re.compile(r'CREATE\s+(?:UNIQUE\s+)?INDEX\s+(?:IF\s+NOT\s+EXISTS\s+)?"?(\w+)"?', re.IGNORECASE)
+
+
+def shadow_name(table):
+    return f'{table}_rebuild'
+
+
+def old_name(table):
+    return f'{table}_old'
+
+
+def _sync_trigger_names(table):
+    return tuple(f'{table}_rebuild_{operation}' for operation in ('insert', 'update', 'delete'))
+
+
+def _values(columns, convert, row):
+    return ', '.join(convert[column].format(row=row) if column in convert else row + column for column in columns)
+
+
+def _sync_triggers(table, columns, convert, key):
+    # Salin setiap perubahan pada tabel aktif ke tabel baru selama penyalinan berjalan
+    shadow = shadow_name(table)
+    insert_name, update_name, delete_name = _sync_trigger_names(table)
+    upsert = f"INSERT OR REPLACE INTO {shadow} ({', '.join(columns)}) VALUES ({_values(columns, convert, 'NEW.')});"
+    return [
+        f"CREATE TRIGGER {insert_name} AFTER INSERT ON {table} BEGIN {upsert} END",
+        f"CREATE TRIGGER {update_name} AFTER UPDATE ON {table} "
+        f"BEGIN DELETE FROM {shadow} WHERE {key} = OLD.{key}; {upsert} END",
+        f"CREATE TRIGGER {delete_name} AFTER DELETE ON {table} "
+        f"BEGIN DELETE FROM {shadow} WHERE {key} = OLD.{key}; END",
+    ]
+
+
+def _chunk_bounds(execute, table, key, batch_size, pause):
+    """(low, high] key ranges of at most batch_size rows; the last range is open-ended."""
+    last = None
+    while True:
+        where = f'WHERE {key} > ? ' if last is not None else ''
+        params = (last, batch_size - 1) if last is not None else (batch_size - 1,)
+        upper = execute(f"SELECT {key} FROM {table} {where}ORDER BY {key} LIMIT 1 OFFSET ?", params).scalar()
+        yield last, upper
+        if upper is None:
+            return
+        last = upper
+        time.sleep(pause)
+
+
+def _in_range(key, low, upper):
+    conditions, params = [], []
+    if low is not None:
+        conditions.append(f'{key} > ?')
+        params.append(low)
+    if upper is not None:
+        conditions.append(f'{key} <= ?')
+        params.append(upper)
+    return ' AND '.join(conditions) or '1', tuple(params)
+
+
+def _table_exists(execute, name):
+    return execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (name,)).scalar() is not None
+
+
+def _drain_and_drop(execute, table, batch_size, pause):
+    # DROP tabel besar sekaligus menahan write lock lama: kosongkan bertahap dulu
+    while execute(f"DELETE FROM {table} WHERE rowid IN (SELECT rowid FROM {table} LIMIT ?)", (batch_size,)).rowcount:
+        time.sleep(pause)
+    execute(f"DROP TABLE {table}")
+
+
+def abandon_rebuild(table):
+    """Drop the shadow table and copy triggers left by an interrupted rebuild_table()."""
+    with op.get_context().autocommit_block():
+        execute = op.get_bind().exec_driver_sql
+        for trigger in _sync_trigger_names(table):
+            execute(f"DROP TRIGGER IF EXISTS {trigger}")
+        execute(f"DROP TABLE IF EXISTS {shadow_name(table)}")
+
+
+def rebuild_table(table, create_sql, indexes=(), convert=None, triggers=None, sweep=None, key='id',
+                  batch_size=BATCH_SIZE, pause=PAUSE):
+    """Rebuild table into the layout of create_sql without holding the write lock for the copy.
+
+    create_sql and indexes are CREATE TABLE / CREATE INDEX statements with
+    {table} where the table name goes. convert maps a column of the new
+    table to an SQL expression over the old row, written with {row} before
+    each old column ('NEW.' in the copy triggers, '' in the chunked copy);
+    other columns are copied as they are, and new columns without an
+    expression get their default. triggers are the CREATE TRIGGER
+    statements for the new table (default: the live table's triggers as
+    they are at the swap). sweep is an optional WHERE clause selecting rows
+    a process wrote in the old form right around the swap; they are
+    converted again with convert afterwards.
+
+    An index whose name the live table still uses is built under a
+    temporary name and re-created under its own name after the swap,
+    which holds the write lock while it builds: prefer new index names.
+    """
+    convert = dict(convert or {})
+    shadow, old = shadow_name(table), old_name(table)
+    sync_triggers = _sync_trigger_names(table)
+
+    with op.get_context().autocommit_block():
+        execute = op.get_bind().exec_driver_sql
+
+        if _table_exists(execute, old):
+            logger.info(f"Dropping {old} left by an interrupted rebuild")
+            _drain_and_drop(execute, old, batch_size, pause)
+
+        # 1. Tabel baru + trigger penyalin (sisa percobaan yang terputus dibuang dulu)
+        for trigger in sync_triggers:
+            execute(f"DROP TRIGGER IF EXISTS {trigger}")
+        execute(f"DROP TABLE IF EXISTS {shadow}")
+        execute(create_sql.format(table=shadow))
+
+        existing = {row[0] for row in execute("SELECT name FROM sqlite_master WHERE type = 'index'").all()}
+        renamed = []
+        for sql in indexes:
+            name = _INDEX_NAME.match(sql.strip()).group(1)
+            if name in existing:
+                renamed.append(sql)
+                sql = _INDEX_NAME.sub(lambda match: match.group(0).replace(name, f'{name}_rebuild'), sql, count=1)
+            execute(sql.format(table=shadow))
+
+        old_columns = {row[1] for row in execute(f"PRAGMA table_info({table})").all()}
+        columns = [row[1] for row in execute(f"PRAGMA table_info({shadow})").all()
+                   if row[1] in convert or row[1] in old_columns]
+        for sql in _sync_triggers(table, columns, convert, key):
+            execute(sql)
+
+        # 2. Salin bertahap; baris yang sudah disalin trigger tidak ditimpa
+        copied = 0
+        for low, upper in _chunk_bounds(execute, table, key, batch_size, pause):
+            where, params = _in_range(key, low, upper)
+            copied += execute(f"INSERT OR IGNORE INTO {shadow} ({', '.join(columns)}) "
+                              f"SELECT {_values(columns, convert, '')} FROM {table} WHERE {where}", params).rowcount
+        logger.info(f"Copied {copied} rows of {table} into {shadow}")
+
+        # 3. Tukar tabel dalam satu transaksi pendek. legacy_alter_table: foreign key dan trigger tabel lain
+        # tetap menunjuk ke nama tabel, bukan ikut pindah ke tabel lama
+        execute("PRAGMA legacy_alter_table = ON")
+        execute("BEGIN IMMEDIATE")
+        try:
+            if triggers is None:
+                recreate = [sql for name, sql in execute(
+                    "SELECT name, sql FROM sqlite_master WHERE type = 'trigger' AND tbl_name = ?", (table,)
+                ).all() if name not in sync_triggers]
+            else:
+                recreate = [sql.format(table=table) for sql in triggers]
+            for trigger in sync_triggers:
+                execute(f"DROP TRIGGER IF EXISTS {trigger}")
+            for (name,) in execute("SELECT name FROM sqlite_master WHERE type = 'trigger' AND tbl_name = ?",
+                                   (table,)).all():
+                execute(f'DROP TRIGGER "{name}"')
+            sequence = execute("SELECT seq FROM sqlite_sequence WHERE name = ?", (table,)).scalar() \
+                if _table_exists(execute, 'sqlite_sequence') else None
+            execute(f"ALTER TABLE {table} RENAME TO {old}")
+            execute(f"ALTER TABLE {shadow} RENAME TO {table}")
+            if sequence is not None:
+                # AUTOINCREMENT: id yang pernah dipakai tidak dipakai ulang
+                execute("INSERT INTO sqlite_sequence (name, seq) SELECT ?, 0 "
+                        "WHERE NOT EXISTS (SELECT 1 FROM sqlite_sequence WHERE name = ?)", (table, table))
+                execute("UPDATE sqlite_sequence SET seq = max(seq, ?) WHERE name = ?", (sequence, table))
+            for sql in recreate:
+                execute(sql)
+            execute("COMMIT")
+        except Exception:
+            execute("ROLLBACK")
+            raise
+        finally:
+            execute("PRAGMA legacy_alter_table = OFF")
+        logger.info(f"Swapped {shadow} in as {table}")
+
+        # 4. Kosongkan tabel lama bertahap, lalu hapus
+        _drain_and_drop(execute, old, batch_size, pause)
+
+        for sql in renamed:
+            name = _INDEX_NAME.match(sql.strip()).group(1)
+            logger.warning(f"Re-creating index {name} on {table}; writes wait until it is built")
+            execute(sql.format(table=table))
+            execute(f"DROP INDEX {name}_rebuild")
+
+        if sweep and convert:
+            # Baris yang ditulis proses lain dalam bentuk lama tepat saat pertukaran
+            assignments = ', '.join(f"{column} = {expression.format(row='')}" for column, expression in convert.items())
+            for low, upper in _chunk_bounds(execute, table, key, batch_size, pause):
+                where, params = _in_range(key, low, upper)
+                execute(f"UPDATE {table} SET {assignments} WHERE {where} AND ({sweep})", params)
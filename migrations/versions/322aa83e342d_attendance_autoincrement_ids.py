@@ -0,0 +1,47 @@
+"""attendance autoincrement ids for cold storage
+
+Revision ID: 322aa83e342d
+Revises: f05ddbffb329
+Create Date: 2026-10-19 13:20:55.104733
+
+Rows archived to segment files are deleted from the live table; with
+AUTOINCREMENT SQLite never hands their ids out again. The table is rebuilt
+online with migrations/online_rebuild.py rather than batch mode, which
+copies the whole table in one transaction and blocks every clock-in until
+it is done. The index keeps its name (f05ddbffb329 drops it by name), so it
+is re-created once after the swap.
+"""
+from migrations.online_rebuild import rebuild_table
+
+
+# revision identifiers, used by Alembic.
+revision = '322aa83e342d'
+down_revision = 'f05ddbffb329'
+branch_labels = None
+depends_on = None
+
+TABLE = 'attendance'
+
+CREATE = """CREATE TABLE {{table}} (
+	id INTEGER NOT NULL {primary_key},
+	employee_id INTEGER NOT NULL,
+	status VARCHAR(11) NOT NULL,
+	date DATE NOT NULL,
+	time TIME NOT NULL,
+	time_out TIME,
+	photo TEXT,
+	latitude FLOAT,
+	longitude FLOAT,
+	reason TEXT,
+	FOREIGN KEY(employee_id) REFERENCES employees (user_id)
+)"""
+
+INDEX = "CREATE INDEX ix_attendance_employee_id_date ON {table} (employee_id, date)"
+
+
+def upgrade():
+    rebuild_table(TABLE, CREATE.format(primary_key='PRIMARY KEY AUTOINCREMENT'), [INDEX])
+
+
+def downgrade():
+    rebuild_table(TABLE, CREATE.format(primary_key='PRIMARY KEY'), [INDEX])
@@ -0,0 +1,62 @@
+"""move profile photos to blob store
+
+Revision ID: a84aa80ef5e3
+Revises: 27840d42a133
+Create Date: 2026-10-19 12:05:41.902117
+
+"""
+import base64
+import logging
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.blob_store import store_profile_photo, read_blob, CONTENT_TYPES
+
+
+# revision identifiers, used by Alembic.
+revision = 'a84aa80ef5e3'
+down_revision = '27840d42a133'
+branch_labels = None
+depends_on = None
+
+CHUNK_SIZE = 200
+
+
+def upgrade():
+    with op.batch_alter_table('employees', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('photo_key', sa.String(length=80), nullable=True))
+
+    # Pindahkan foto inline ke blob store per potongan, hanya referensi yang tetap di baris
+    conn = op.get_bind()
+    last_id = 0
+    while True:
+        rows = conn.execute(sa.text(
+            "SELECT id, photo_profile FROM employees "
+            "WHERE id > :last_id AND photo_profile IS NOT NULL AND photo_profile != '' "
+            "ORDER BY id LIMIT :limit"
+        ), {'last_id': last_id, 'limit': CHUNK_SIZE}).fetchall()
+        if not rows:
+            break
+        for employee_id, payload in rows:
+            last_id = employee_id
+            try:
+                key = store_profile_photo(payload)
+            except ValueError as e:
+                logging.warning(f"Leaving photo of employee {employee_id} inline: {e}")
+                continue
+            conn.execute(sa.text("UPDATE employees SET photo_key = :key, photo_profile = NULL WHERE id = :id"),
+                         {'key': key, 'id': employee_id})
+
+
+def downgrade():
+    conn = op.get_bind()
+    rows = conn.execute(sa.text("SELECT id, photo_key FROM employees WHERE photo_key IS NOT NULL")).fetchall()
+    for employee_id, key in rows:
+        content_type = CONTENT_TYPES[key.rsplit('.', 1)[1]]
+        payload = f"data:{content_type};base64,{base64.b64encode(read_blob(key)).decode('ascii')}"
+        conn.execute(sa.text("UPDATE employees SET photo_profile = :payload WHERE id = :id"),
+                     {'payload': payload, 'id': employee_id})
+
+    with op.batch_alter_table('employees', schema=None) as batch_op:
+        batch_op.drop_column('photo_key')
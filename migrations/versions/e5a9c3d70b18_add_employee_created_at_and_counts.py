@@ -0,0 +1,106 @@
+"""add employee created_at, list indexes and employee counts
+
+Revision ID: e5a9c3d70b18
+Revises: d4b8f2a61c7e
+Create Date: 2026-10-19 23:02:41.118260
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5a9c3d70b18'
+down_revision = 'd4b8f2a61c7e'
+branch_labels = None
+depends_on = None
+
+# Salinan dari app/employee_counts.py pada revisi ini (migrasi tidak mengimpor kode aplikasi)
+_STATUS_OF = "COALESCE((SELECT status FROM users WHERE id = {user_id}), -1)"
+
+_INCREMENT = f"""
+    INSERT INTO employee_counts (gender, status, count) VALUES (NEW.gender, {_STATUS_OF.format(user_id='NEW.user_id')}, 1)
+    ON CONFLICT (gender, status) DO UPDATE SET count = count + 1;"""
+
+_DECREMENT = f"""
+    UPDATE employee_counts SET count = count - 1
+    WHERE gender = OLD.gender AND status = {_STATUS_OF.format(user_id='OLD.user_id')};"""
+
+
+def _move(old_status, new_status, user_id):
+    # Pindahkan semua employee milik satu user dari satu status ke status lain
+    return f"""
+    UPDATE employee_counts
+    SET count = count - (SELECT count(*) FROM employees WHERE user_id = {user_id} AND gender = employee_counts.gender)
+    WHERE status = {old_status};
+    INSERT INTO employee_counts (gender, status, count)
+    SELECT gender, {new_status}, count(*) FROM employees WHERE user_id = {user_id} GROUP BY gender
+    ON CONFLICT (gender, status) DO UPDATE SET count = count + excluded.count;"""
+
+
+TRIGGERS = {
+    'employee_counts_insert': f"""
+CREATE TRIGGER employee_counts_insert AFTER INSERT ON employees
+BEGIN{_INCREMENT}
+END""",
+    'employee_counts_update': f"""
+CREATE TRIGGER employee_counts_update AFTER UPDATE OF gender, user_id ON employees
+BEGIN{_DECREMENT}{_INCREMENT}
+END""",
+    'employee_counts_delete': f"""
+CREATE TRIGGER employee_counts_delete AFTER DELETE ON employees
+BEGIN{_DECREMENT}
+END""",
+    'employee_counts_user_status': f"""
+CREATE TRIGGER employee_counts_user_status AFTER UPDATE OF status ON users
+WHEN OLD.status IS NOT NEW.status
+BEGIN{_move('COALESCE(OLD.status, -1)', 'COALESCE(NEW.status, -1)', 'NEW.id')}
+END""",
+    'employee_counts_user_insert': f"""
+CREATE TRIGGER employee_counts_user_insert AFTER INSERT ON users
+BEGIN{_move('-1', 'COALESCE(NEW.status, -1)', 'NEW.id')}
+END""",
+    'employee_counts_user_delete': f"""
+CREATE TRIGGER employee_counts_user_delete AFTER DELETE ON users
+BEGIN{_move('COALESCE(OLD.status, -1)', '-1', 'OLD.id')}
+END""",
+}
+
+
+def upgrade():
+    # ### commands auto generated by Alembic - please adjust! ###
+    op.create_table('employee_counts',
+    sa.Column('gender', sa.String(length=6), nullable=False),
+    sa.Column('status', sa.Integer(), nullable=False),
+    sa.Column('count', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('gender', 'status')
+    )
+    # Tanpa batch_alter_table: menyalin ulang tabel employees akan menghapus trigger pencarian
+    op.add_column('employees', sa.Column('created_at', sa.DateTime(), nullable=True))
+    op.create_index('ix_employees_gender_name', 'employees', ['gender', sa.text('name COLLATE NOCASE')], unique=False)
+    op.create_index('ix_employees_gender_id', 'employees', ['gender', 'id'], unique=False)
+    op.create_index('ix_employees_created_at', 'employees', ['created_at'], unique=False)
+    op.create_index('ix_employees_user_id', 'employees', ['user_id'], unique=False)
+    # ### end Alembic commands ###
+
+    for sql in TRIGGERS.values():
+        op.execute(sql.strip())
+    op.execute(
+        "INSERT INTO employee_counts (gender, status, count) "
+        "SELECT e.gender, COALESCE(u.status, -1), count(*) FROM employees e LEFT JOIN users u ON u.id = e.user_id "
+        "GROUP BY e.gender, COALESCE(u.status, -1)"
+    )
+
+
+def downgrade():
+    for name in TRIGGERS:
+        op.execute(f'DROP TRIGGER IF EXISTS {name}')
+
+    # ### commands auto generated by Alembic - please adjust! ###
+    op.drop_index('ix_employees_user_id', table_name='employees')
+    op.drop_index('ix_employees_created_at', table_name='employees')
+    op.drop_index('ix_employees_gender_id', table_name='employees')
+    op.drop_index('ix_employees_gender_name', table_name='employees')
+    op.drop_column('employees', 'created_at')
+    op.drop_table('employee_counts')
+    # ### end Alembic commands ###
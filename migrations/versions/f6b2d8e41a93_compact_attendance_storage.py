@@ -0,0 +1,100 @@
+"""compact attendance storage: integer status, day numbers, seconds of day
+
+Revision ID: f6b2d8e41a93
+Revises: e5a9c3d70b18
+Create Date: 2026-10-20 09:12:37.402118
+
+The attendance table is rebuilt online with migrations/online_rebuild.py
+instead of batch mode (which copies the whole table in one transaction and
+blocks every clock-in until it is done); the change log triggers are
+re-created on the new table. Afterwards the few rows a process wrote in
+the old encoding right around the swap are converted again.
+
+The application reads both encodings and switches the encoding it writes
+as soon as it sees the new schema (app/compact_storage.py), so it can keep
+serving throughout. An interrupted upgrade starts over when run again.
+"""
+from migrations.online_rebuild import rebuild_table
+
+
+# revision identifiers, used by Alembic.
+revision = 'f6b2d8e41a93'
+down_revision = 'e5a9c3d70b18'
+branch_labels = None
+depends_on = None
+
+TABLE = 'attendance'
+
+COLUMN_DEFINITIONS = """
+	id INTEGER NOT NULL PRIMARY KEY AUTOINCREMENT,
+	employee_id INTEGER NOT NULL,
+	status {status} NOT NULL,
+	date {date} NOT NULL,
+	time {time} NOT NULL,
+	time_out {time},
+	photo TEXT,
+	latitude FLOAT,
+	longitude FLOAT,
+	reason TEXT,
+	shift_id INTEGER,
+	late_minutes INTEGER,
+	photo_hash BIGINT,
+	FOREIGN KEY(employee_id) REFERENCES employees (user_id){shift_fk}
+"""
+
+# 5d8a0c3e71b4 menambah shift_id tanpa constraint FK; tabel lama dibuat ulang persis seperti sebelum upgrade
+SHIFT_FK = ",\n\tFOREIGN KEY(shift_id) REFERENCES shift_templates (id)"
+
+# Salinan dari app/models.py (STATUS_CODES) pada revisi ini
+STATUS_CODES = {'ALPHA': 1, 'TIDAK_HADIR': 2, 'IJIN': 3, 'HADIR': 4}
+
+COMPACT = {
+    'create': "CREATE TABLE {table} (" + COLUMN_DEFINITIONS.format(status='SMALLINT', date='INTEGER', time='INTEGER',
+                                                                     shift_fk=SHIFT_FK) + ")",
+    'index': "CREATE INDEX ix_attendance_employee_id_day ON {table} (employee_id, date)",
+    'convert': {
+        'status': "CASE {row}status " + ' '.join(f"WHEN '{name}' THEN {code}" for name, code in STATUS_CODES.items())
+                  + " ELSE {row}status END",
+        'date': "CASE WHEN typeof({row}date) = 'text' "
+                "THEN CAST(julianday(substr({row}date, 1, 10)) - 2440587.5 AS INTEGER) ELSE {row}date END",
+        'time': "CASE WHEN typeof({row}time) = 'text' "
+                "THEN substr({row}time, 1, 2) * 3600 + substr({row}time, 4, 2) * 60 + substr({row}time, 7, 2) "
+                "ELSE {row}time END",
+        'time_out': "CASE WHEN typeof({row}time_out) = 'text' "
+                    "THEN substr({row}time_out, 1, 2) * 3600 + substr({row}time_out, 4, 2) * 60 "
+                    "+ substr({row}time_out, 7, 2) ELSE {row}time_out END",
+        'reason': "NULLIF({row}reason, 'N/A')",
+    },
+    'stale': "typeof(status) = 'text' OR typeof(date) = 'text' OR typeof(time) = 'text' "
+             "OR typeof(time_out) = 'text' OR reason = 'N/A'",
+}
+
+LEGACY = {
+    'create': "CREATE TABLE {table} (" + COLUMN_DEFINITIONS.format(status='VARCHAR(11)', date='DATE', time='TIME',
+                                                                     shift_fk='') + ")",
+    'index': "CREATE INDEX ix_attendance_employee_id_date ON {table} (employee_id, date)",
+    'convert': {
+        'status': "CASE {row}status " + ' '.join(f"WHEN {code} THEN '{name}'" for name, code in STATUS_CODES.items())
+                  + " ELSE {row}status END",
+        'date': "CASE WHEN typeof({row}date) = 'integer' THEN date({row}date * 86400, 'unixepoch') ELSE {row}date END",
+        'time': "CASE WHEN typeof({row}time) = 'integer' "
+                "THEN time({row}time, 'unixepoch') || '.000000' ELSE {row}time END",
+        'time_out': "CASE WHEN typeof({row}time_out) = 'integer' "
+                    "THEN time({row}time_out, 'unixepoch') || '.000000' ELSE {row}time_out END",
+        'reason': "COALESCE({row}reason, 'N/A')",
+    },
+    'stale': "typeof(status) = 'integer' OR typeof(date) = 'integer' OR typeof(time) = 'integer' "
+             "OR typeof(time_out) = 'integer' OR reason IS NULL",
+}
+
+
+def _rebuild(layout):
+    rebuild_table(TABLE, layout['create'], [layout['index']], convert=layout['convert'], sweep=layout['stale'])
+
+
+def upgrade():
+    _rebuild(COMPACT)
+
+
+def downgrade():
+    _rebuild(LEGACY)